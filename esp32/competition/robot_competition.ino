@@ -37,6 +37,10 @@
  *   Victims:    'P'=Φ (Harmed, 2 kits), 'S'=Ψ (Stable, 1 kit), 'O'=Ω (Unharmed, 0 kits)
  *   Cognitive:  '2'=Harmed, '1'=Stable, '0'=Unharmed
  *   Tiles:      'B'=Blue tile stop (5s), 'E'=Exit bonus (blink 10s & halt)
+ *   Camera tile: 'n'=Normal, 'k'=Black, 'v'=Silver, 'b'=Blue, 'r'=Red
+ *               (floor_tile.py, on change and once per second; used when
+ *               the TCS34725 is missing; reverts to Normal after 2s
+ *               without a code)
  *
  *  PROTOCOL (ESP32 -> Raspberry, one ASCII byte events):
  *   'b' = Blue tile detected (and stopped)
@@ -113,6 +117,7 @@ const int  BLINK_INTV       = 500;  // victim blink interval
 const int  BLINK_EXIT_INTV  = 1000; // exit blink interval
 const int  BLUE_STOP_MS     = 5000;
 const int  MAX_RESCUE_KITS  = 8;
+const unsigned long CAMERA_TILE_TIMEOUT_MS = 2000; // camera tile expires without updates
 
 // Color thresholds (calibrate in the field)
 const float LUMA_BLACK_THR  = 300.0;
@@ -130,6 +135,8 @@ Mode currentMode = MODE_AUTO;
 MoveCmd currentMove = MOVE_FORWARD; // for manual mode: last movement command
 int kitCount = MAX_RESCUE_KITS;
 TileColor lastTile = TILE_NORMAL;
+TileColor cameraTile = TILE_NORMAL; // last tile classified by the Raspberry camera
+unsigned long cameraTileMs = 0;     // millis() of the last camera tile code
 
 // ── FUNCTION DECLARATIONS ─────────────────────────────────────────
 void setMotorPWM(uint8_t a1, uint8_t a2, uint8_t b1, uint8_t b2);
@@ -151,6 +158,7 @@ void handleTileColor(TileColor tile);
 void initLasers();
 int readDistance(Adafruit_VL53L0X &sensor);
 void processSerial();
+bool parseCameraTile(char cmd);
 void executeManualMovement();
 void doExitBonus();
 
@@ -220,10 +228,12 @@ void loop() {
   // 2. Special handling for Black tile (LoP) – always stop and wait for 'E'
   if (currentTile == TILE_BLACK) {
     stopMotors();
-    if (Serial1.available() > 0) {
+    while (Serial1.available() > 0) {
       char cmd = Serial1.read();
       if (cmd == 'E') {
         doExitBonus();
+      } else {
+        parseCameraTile(cmd); // keep following the camera so we can leave LoP
       }
     }
     delay(100);
@@ -393,7 +403,10 @@ void handleVictim(int status) {
 //  COLOR SENSOR (TCS34725)
 // ═══════════════════════════════════════════════════════════════════
 TileColor readTileColor() {
-  if (!tcsOk) return TILE_NORMAL;
+  if (!tcsOk) { // fallback: camera classification from Raspberry
+    if (millis() - cameraTileMs > CAMERA_TILE_TIMEOUT_MS) cameraTile = TILE_NORMAL;
+    return cameraTile;
+  }
   // Enable TCS LED (shared with PIN_LED)
   digitalWrite(PIN_LED, HIGH);
   delay(60);
@@ -510,6 +523,20 @@ int readDistance(Adafruit_VL53L0X &sensor) {
 // ═══════════════════════════════════════════════════════════════════
 //  SERIAL COMMAND PROCESSING (from Raspberry Pi)
 // ═══════════════════════════════════════════════════════════════════
+// Camera tile codes (n/k/v/b/r). Returns false for any other byte.
+bool parseCameraTile(char cmd) {
+  switch (cmd) {
+    case 'n': cameraTile = TILE_NORMAL; break;
+    case 'k': cameraTile = TILE_BLACK;  break;
+    case 'v': cameraTile = TILE_SILVER; break;
+    case 'b': cameraTile = TILE_BLUE;   break;
+    case 'r': cameraTile = TILE_RED;    break;
+    default: return false;
+  }
+  cameraTileMs = millis();
+  return true;
+}
+
 void processSerial() {
   while (Serial1.available() > 0) {
     char cmd = Serial1.read();
@@ -567,6 +594,10 @@ void processSerial() {
       case 'E':
         doExitBonus();
         break;
+      // Camera tile classification (same codes as handleTileColor events)
+      case 'n': case 'k': case 'v': case 'b': case 'r':
+        parseCameraTile(cmd);
+        break;
       // Drop kit manual
       case 'D':
         deployRescueKit();
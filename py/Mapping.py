@@ -6,16 +6,27 @@ Author: Senior Software Engineer
 Version: 1.0.0
 """
 
+import os
+import sys
 import pygame
 import numpy as np
 import threading
-import queue
 import time
+from abc import ABC, abstractmethod
+from collections import deque
 from enum import Enum
-from typing import Tuple, Optional, Dict, List
-from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Tuple, Optional, Dict, List, Mapping
+from dataclasses import dataclass, field
 import random
 
+# Eseguito come script: i moduli che fanno `import Mapping` (journal, server,
+# simulatore, rasterizer) devono usare queste stesse classi, non una seconda copia
+if __name__ == "__main__":
+    sys.modules.setdefault("Mapping", sys.modules[__name__])
+
+from frame_pool import FramePool, PooledFrame
+
 # ============================================================================
 # CONFIGURAZIONE GLOBALE
 # ============================================================================
@@ -27,21 +38,38 @@ CONFIG = {
     "FPS": 30,
 
     # Grid Settings
-    "TILE_SIZE": 40,
+    "TILE_SIZE": 40,  # zoom iniziale della vista mappa (pixel per cella)
+    "ZOOM_LEVELS": (2, 3, 4, 6, 8, 12, 16, 24, 32, 40, 56, 80),
+    "LOD_TILE_SIZE": 12,  # sotto questa dimensione niente bordi né icone nei tile
+    "FOLLOW_MARGIN": 0.25,  # frazione della vista oltre cui la camera insegue il robot
     "GRID_MAX_SIZE": 50,
     "GRID_OFFSET_X": 50,
     "GRID_OFFSET_Y": 120,
+    "GRID_STORAGE": "dense",  # "dense" (array NumPy) o "dict"
+    "MAP_STATE_DIR": "map_state",  # snapshot + journal della mappa (None = disattivato)
+    "MAP_SNAPSHOT_INTERVAL": 30.0,  # secondi tra due snapshot completi
+    "MAP_RESUME_CLEAN": False,  # True (o --resume): riprende anche una sessione chiusa correttamente
+    "MAP_SERVER_PORT": 8765,  # mappa live per la dashboard web (None = disattivato)
+    "MAP_EXPORT_DIR": "map_export",  # PNG della mappa scritti in background (None = disattivato)
+    "MAP_EXPORT_INTERVAL": 10.0,  # secondi tra due export (solo se la mappa è cambiata)
+    "MAP_EXPORT_SEQUENCE": False,  # True: conserva anche map_00001.png, map_00002.png, ...
 
     # AI Settings
     "MODEL_PATH": "model.tflite",
     "LABELS_PATH": "labels.txt",
     "CONFIDENCE_THRESHOLD": 0.75,
+    "EVIDENCE_HYSTERESIS": 1.5,  # vantaggio log-odds (nat) per cambiare lo stato di una cella nota
+    "EVIDENCE_LIMIT": 20.0,  # distacco massimo (log-odds) tra classe migliore e le altre
     "INPUT_SIZE": (224, 224),
+    "INFERENCE_THREADS": 4,
+    "INFERENCE_WORKERS": 1,  # >1: un interprete per worker, thread divisi tra i worker
+    "TOP_K": 3,
 
     # Camera Settings
     "CAMERA_INDEX": 0,
     "CAMERA_WIDTH": 640,
     "CAMERA_HEIGHT": 480,
+    "FRAME_POOL_DEBUG": False,  # segnala l'uso dei frame dopo il release (più lento)
 
     # Colors (Dark Mode Professional)
     "COLORS": {
@@ -65,10 +93,14 @@ CONFIG = {
         "LETTER_Y": (255, 220, 100),
         "LETTER_H": (180, 100, 255),
         "GRID_LINE": (60, 60, 70),
+        "ROBOT": (255, 150, 50),
     },
 
     # Demo Mode
     "DEMO_MODE": True,  # Cambiar a False per modalità LIVE
+    "DEMO_MAZE_SIZE": 20,  # lato del labirinto simulato (celle)
+    "DEMO_SEED": 0,  # stesso seed = stesso labirinto
+    "DEMO_RATE_HZ": 5.0,  # passi del robot virtuale al secondo (None = senza pause)
 }
 
 
@@ -88,40 +120,198 @@ class CellState(Enum):
     LETTER_H = 7
 
 
+# Muri sui lati di una cella: maschera a 4 bit (y cresce verso Sud)
+WALL_N = 1
+WALL_E = 2
+WALL_S = 4
+WALL_W = 8
+WALL_SIDES = (WALL_N, WALL_E, WALL_S, WALL_W)
+WALL_OFFSETS = {WALL_N: (0, -1), WALL_E: (1, 0), WALL_S: (0, 1), WALL_W: (-1, 0)}
+OPPOSITE_WALL = {WALL_N: WALL_S, WALL_E: WALL_W, WALL_S: WALL_N, WALL_W: WALL_E}
+
+# Offset dei vicini nell'ordine di WALL_SIDES (per query vettoriali)
+NEIGHBOUR_OFFSETS = np.array([WALL_OFFSETS[side] for side in WALL_SIDES], dtype=np.int64)
+_WALL_SIDE_BITS = np.array(WALL_SIDES, dtype=np.uint8)
+
+
+@dataclass
+class MapChanges:
+    """
+    Modifiche alla mappa restituite da GridMap.changes_since().
+
+    Se full_resync è True il journal non copre più la versione richiesta e
+    `cells`/`walls` contengono l'intera mappa; altrimenti solo le celle
+    cambiate (CellState.UNKNOWN = cella rimossa, maschera 0 = nessun muro).
+    """
+    version: int
+    cells: Dict[Tuple[int, int], "CellState"]
+    full_resync: bool
+    walls: Dict[Tuple[int, int], int] = field(default_factory=dict)
+
+
 @dataclass
 class DetectionResult:
     """Risultato di una detection AI."""
     label: str
     confidence: float
     timestamp: float
+    latency_ms: float = 0.0
+    frame_age_ms: float = 0.0
 
 
 # ============================================================================
 # SISTEMA DI VISIONE AI
 # ============================================================================
 
+class InferenceBackend(ABC):
+    """
+    Interfaccia di un backend di inferenza per VisionSystem.
+
+    Il backend espone forma/tipo dell'input e la quantizzazione, ed esegue
+    il modello su un tensore già preparato. load() e invoke() sono astratti:
+    un backend incompleto fallisce già alla costruzione. I test usano un
+    backend locale minimale con la stessa interfaccia, senza modello né rete.
+    """
+
+    input_shape: Tuple[int, ...] = (1, 224, 224, 3)   # (batch, h, w, c)
+    input_dtype = np.float32
+    input_quantization: Tuple[float, int] = (0.0, 0)  # (scale, zero_point), 0 = non quantizzato
+    output_quantization: Tuple[float, int] = (0.0, 0)
+
+    @abstractmethod
+    def load(self, model_path: str, num_threads: int) -> None:
+        """Carica il modello e legge forma, tipo e quantizzazione dei tensori."""
+
+    def resize_batch(self, batch_size: int) -> bool:
+        """Ridimensiona la dimensione batch dell'input; False se non supportato."""
+        return batch_size == self.input_shape[0]
+
+    @abstractmethod
+    def invoke(self, input_tensor: np.ndarray) -> np.ndarray:
+        """Esegue il modello e restituisce l'output grezzo (batch, num_classi)."""
+
+
+class TFLiteBackend(InferenceBackend):
+    """Backend TensorFlow Lite (tflite_runtime o tensorflow.lite)."""
+
+    def __init__(self):
+        self.interpreter = None
+        self._input_index = None
+        self._output_index = None
+
+    def load(self, model_path: str, num_threads: int) -> None:
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            from tensorflow.lite import Interpreter
+
+        self.interpreter = Interpreter(model_path=model_path, num_threads=num_threads)
+        self.interpreter.allocate_tensors()
+        self._read_details()
+
+    def _read_details(self) -> None:
+        input_details = self.interpreter.get_input_details()[0]
+        output_details = self.interpreter.get_output_details()[0]
+        self._input_index = input_details["index"]
+        self._output_index = output_details["index"]
+        self.input_shape = tuple(int(d) for d in input_details["shape"])
+        self.input_dtype = input_details["dtype"]
+        self.input_quantization = tuple(input_details.get("quantization", (0.0, 0)))
+        self.output_quantization = tuple(output_details.get("quantization", (0.0, 0)))
+
+    def resize_batch(self, batch_size: int) -> bool:
+        if batch_size == self.input_shape[0]:
+            return True
+        try:
+            self.interpreter.resize_tensor_input(
+                self._input_index, [batch_size, *self.input_shape[1:]])
+            self.interpreter.allocate_tensors()
+        except (ValueError, RuntimeError):
+            return False
+        self._read_details()
+        return True
+
+    def invoke(self, input_tensor: np.ndarray) -> np.ndarray:
+        self.interpreter.set_tensor(self._input_index, input_tensor)
+        self.interpreter.invoke()
+        return self.interpreter.get_tensor(self._output_index)
+
+
+class _DemoBackend(InferenceBackend):
+    """Backend casuale per la modalità DEMO (nessun modello richiesto)."""
+
+    def __init__(self, num_classes: int):
+        self.num_classes = num_classes
+        self.input_shape = (1, 8, 8, 3)
+
+    def load(self, model_path: str, num_threads: int) -> None:
+        pass
+
+    def resize_batch(self, batch_size: int) -> bool:
+        self.input_shape = (batch_size, *self.input_shape[1:])
+        return True
+
+    def invoke(self, input_tensor: np.ndarray) -> np.ndarray:
+        scores = np.random.uniform(0.0, 0.4, (input_tensor.shape[0], self.num_classes))
+        winners = np.random.randint(0, self.num_classes, input_tensor.shape[0])
+        scores[np.arange(len(winners)), winners] = np.random.uniform(0.6, 0.99, len(winners))
+        return scores.astype(np.float32)
+
+
 class VisionSystem:
     """
     Sistema di Computer Vision per inferenza TensorFlow Lite.
     Gestisce il caricamento del modello e le predizioni.
+
+    L'interprete viene caricato una sola volta; i tensori di input sono
+    preallocati e il preprocessing (resize nearest, BGR->RGB, normalizzazione
+    o quantizzazione) è un'unica operazione vettoriale per frame.
     """
 
-    def __init__(self, model_path: str, labels_path: str):
+    DEMO_LABELS = ["WALL", "FLOOR", "START", "VICTIM", "LETTER_X", "LETTER_Y", "LETTER_H"]
+
+    def __init__(self, model_path: str, labels_path: str,
+                 backend: Optional[InferenceBackend] = None,
+                 num_threads: int = 4, top_k: int = 3):
         """
         Inizializza il sistema di visione.
 
         Args:
             model_path: Path al file .tflite
             labels_path: Path al file labels.txt
+            backend: Backend di inferenza (default: TFLite, o casuale in DEMO)
+            num_threads: Thread usati dall'interprete
+            top_k: Numero di classi decodificate per predizione
         """
         self.model_path = model_path
         self.labels_path = labels_path
+        self.backend = backend
+        self.num_threads = num_threads
+        self.top_k = top_k
         self.interpreter = None
         self.labels = []
         self.input_details = None
         self.output_details = None
         self.is_loaded = False
 
+        # Buffer preallocati e mappe di resize per forma del frame
+        self._input_tensors: Dict[int, np.ndarray] = {}
+        self._resize_maps: Dict[Tuple[int, int], Tuple[np.ndarray, np.ndarray]] = {}
+        self.last_latency_ms = 0.0
+
+    @staticmethod
+    def read_labels(labels_path: str) -> List[str]:
+        """Legge labels.txt: una label per riga, con indice iniziale opzionale ("0 WALL")."""
+        labels = []
+        with open(labels_path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                parts = line.split(maxsplit=1)
+                labels.append(parts[1] if len(parts) == 2 and parts[0].isdigit() else line)
+        return labels
+
     def load_model(self) -> bool:
         """
         Carica il modello TensorFlow Lite.
@@ -130,21 +320,131 @@ class VisionSystem:
             True se il caricamento ha successo
         """
         try:
-            # Simulazione caricamento modello per demo
-            # In produzione: usare tflite_runtime.interpreter
             print(f"[VisionSystem] Caricamento modello: {self.model_path}")
 
-            # Mock labels
-            self.labels = ["WALL", "FLOOR", "START", "VICTIM", "LETTER_X", "LETTER_Y", "LETTER_H"]
+            if self.backend is None and CONFIG["DEMO_MODE"] and not os.path.exists(self.model_path):
+                # Nessun modello in DEMO: predizioni casuali come in passato
+                self.labels = list(self.DEMO_LABELS)
+                self.backend = _DemoBackend(len(self.labels))
+            else:
+                self.labels = self.read_labels(self.labels_path)
+                if self.backend is None:
+                    self.backend = TFLiteBackend()
+            self.backend.load(self.model_path, self.num_threads)
+
+            if isinstance(self.backend, TFLiteBackend):
+                self.interpreter = self.backend.interpreter
+                self.input_details = self.interpreter.get_input_details()
+                self.output_details = self.interpreter.get_output_details()
+
+            self._input_tensors.clear()
+            self._input_tensors[self.backend.input_shape[0]] = np.zeros(
+                self.backend.input_shape, dtype=self.backend.input_dtype)
             self.is_loaded = True
 
-            print("[VisionSystem] Modello caricato con successo")
+            print(f"[VisionSystem] Modello caricato con successo "
+                  f"(input {self.backend.input_shape}, {len(self.labels)} label)")
             return True
 
         except Exception as e:
             print(f"[VisionSystem] Errore caricamento modello: {e}")
             return False
 
+    def _resize_map(self, frame_shape: Tuple[int, int]) -> Tuple[np.ndarray, np.ndarray]:
+        """Indici riga/colonna del resize nearest (calcolati una volta per forma del frame)."""
+        maps = self._resize_maps.get(frame_shape)
+        if maps is None:
+            in_h, in_w = self.backend.input_shape[1:3]
+            src_h, src_w = frame_shape
+            rows = ((np.arange(in_h) + 0.5) * src_h / in_h).astype(np.intp)
+            cols = ((np.arange(in_w) + 0.5) * src_w / in_w).astype(np.intp)
+            maps = (rows[:, None], cols[None, :])
+            self._resize_maps[frame_shape] = maps
+        return maps
+
+    def preprocess(self, frame: np.ndarray, out: np.ndarray) -> np.ndarray:
+        """
+        Resize + BGR->RGB + normalizzazione del frame direttamente nel tensore `out`.
+
+        Args:
+            frame: Frame BGR uint8 (h, w, 3)
+            out: Slot del tensore di input (in_h, in_w, 3)
+        """
+        rows, cols = self._resize_map(frame.shape[:2])
+        rgb = frame[rows, cols, ::-1]  # una sola gather vettoriale
+
+        scale, zero_point = self.backend.input_quantization
+        if np.issubdtype(out.dtype, np.floating):
+            # Normalizzazione in [-1, 1] (MobileNet/EfficientNet-lite)
+            np.multiply(rgb, 1.0 / 127.5, out=out, casting="unsafe")
+            out -= 1.0
+        elif scale:
+            # Input quantizzato: q = (x/127.5 - 1) / scale + zero_point
+            quantized = (rgb * (1.0 / (127.5 * scale)) + (zero_point - 1.0 / scale)).round()
+            np.clip(quantized, np.iinfo(out.dtype).min, np.iinfo(out.dtype).max, out=quantized)
+            out[...] = quantized
+        else:
+            out[...] = rgb
+        return out
+
+    def _input_tensor(self, batch_size: int) -> Optional[np.ndarray]:
+        tensor = self._input_tensors.get(batch_size)
+        if tensor is None:
+            if not self.backend.resize_batch(batch_size):
+                return None
+            tensor = np.zeros((batch_size, *self.backend.input_shape[1:]), dtype=self.backend.input_dtype)
+            self._input_tensors[batch_size] = tensor
+        elif self.backend.input_shape[0] != batch_size:
+            self.backend.resize_batch(batch_size)
+        return tensor
+
+    def _decode(self, raw: np.ndarray) -> np.ndarray:
+        """Dequantizza l'output in punteggi float (batch, num_classi)."""
+        scores = raw.reshape(raw.shape[0], -1).astype(np.float32)
+        scale, zero_point = self.backend.output_quantization
+        if scale:
+            scores = (scores - zero_point) * scale
+        return scores
+
+    def _top_k(self, scores: np.ndarray, k: int, timestamp: float, latency_ms: float) -> List[DetectionResult]:
+        k = min(k, scores.shape[0])
+        idx = np.argpartition(scores, -k)[-k:]
+        idx = idx[np.argsort(scores[idx])[::-1]]
+        return [DetectionResult(label=self.labels[i] if i < len(self.labels) else str(i),
+                                confidence=float(scores[i]), timestamp=timestamp,
+                                latency_ms=latency_ms)
+                for i in idx]
+
+    def predict_top_k(self, frame: np.ndarray, k: Optional[int] = None) -> List[DetectionResult]:
+        """Le k classi più probabili per il frame (ordinate per confidenza)."""
+        return self.predict_batch([frame], k)[0]
+
+    def predict_batch(self, crops: List[np.ndarray], k: Optional[int] = None) -> List[List[DetectionResult]]:
+        """
+        Inferenza su più crop: un solo invoke se il modello accetta batch,
+        altrimenti un invoke per crop con lo stesso tensore preallocato.
+        """
+        if not self.is_loaded or not crops:
+            return [[] for _ in crops]
+        k = k or self.top_k
+
+        start = time.perf_counter()
+        tensor = self._input_tensor(len(crops))
+        if tensor is not None:
+            for i, crop in enumerate(crops):
+                self.preprocess(crop, tensor[i])
+            score_rows = self._decode(self.backend.invoke(tensor))
+        else:
+            single = self._input_tensor(1)
+            score_rows = []
+            for crop in crops:
+                self.preprocess(crop, single[0])
+                score_rows.append(self._decode(self.backend.invoke(single))[0])
+        self.last_latency_ms = (time.perf_counter() - start) * 1000.0
+
+        now = time.time()
+        return [self._top_k(row, k, now, self.last_latency_ms) for row in score_rows]
+
     def predict(self, frame: np.ndarray) -> Optional[DetectionResult]:
         """
         Esegue predizione su un frame.
@@ -153,50 +453,585 @@ class VisionSystem:
             frame: Frame numpy array (BGR)
 
         Returns:
-            DetectionResult o None se fallisce
+            DetectionResult (classe più probabile) o None se fallisce
         """
         if not self.is_loaded:
             return None
 
         try:
-            # Simulazione inferenza per DEMO
-            # In produzione: preprocessing + interpreter.invoke()
-
-            label = random.choice(self.labels)
-            confidence = random.uniform(0.6, 0.99)
-
-            return DetectionResult(
-                label=label,
-                confidence=confidence,
-                timestamp=time.time()
-            )
+            results = self.predict_top_k(frame, 1)
+            return results[0] if results else None
 
         except Exception as e:
             print(f"[VisionSystem] Errore predizione: {e}")
             return None
 
 
+# ============================================================================
+# BUS DI EVENTI (COORDINAMENTO TRA THREAD)
+# ============================================================================
+
+class EventBus:
+    """
+    Bus di eventi in-process basato su una condition variable.
+
+    I produttori pubblicano su un topic ("frame", "detection", "map",
+    "robot", ...) che ha un contatore di versione; i consumer bloccano in
+    wait() finché uno dei topic che seguono cambia, senza timeout di
+    polling. I callback registrati con subscribe() vengono chiamati nel
+    thread del produttore (servono a inoltrare gli eventi a loop che non
+    possono bloccare sul bus, come quello di pygame).
+
+    `stop_event` è l'unico segnale di arresto globale e lo imposta solo
+    stop(), che sveglia tutti i wait() e notifica il topic STOP. I thread
+    che dormono tra due cicli usano un Event proprio ottenuto da
+    stop_signal() (wait(periodo) invece di time.sleep()): lo stop del bus
+    lo imposta, ma lo stop di un singolo componente non ferma il bus.
+    """
+
+    STOP = "stop"
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._versions: Dict[str, int] = {}
+        self._payloads: Dict[str, object] = {}
+        self._wakes = 0
+        self._subscribers: List[Tuple[Optional[frozenset], object]] = []
+        self.stop_event = threading.Event()
+
+        # Statistiche
+        self.published = 0
+        self.wakeups = 0  # ritorni da wait()
+
+    @property
+    def stopped(self) -> bool:
+        return self.stop_event.is_set()
+
+    def publish(self, topic: str, payload=None) -> int:
+        """
+        Pubblica un evento e sveglia chi attende il topic.
+
+        Returns:
+            Nuova versione del topic
+        """
+        with self._cond:
+            version = self._bump(topic, payload)
+        self._notify_subscribers(topic, payload)
+        return version
+
+    def _bump(self, topic: str, payload) -> int:
+        """Nuova versione del topic e risveglio dei wait() (con _cond acquisita)."""
+        version = self._versions.get(topic, 0) + 1
+        self._versions[topic] = version
+        self._payloads[topic] = payload
+        self.published += 1
+        self._cond.notify_all()
+        return version
+
+    def _notify_subscribers(self, topic: str, payload) -> None:
+        """Callback dei subscriber (fuori dal lock, nel thread del produttore)."""
+        for topics, callback in self._subscribers:
+            if topics is None or topic in topics:
+                callback(topic, payload)
+
+    def version(self, topic: str) -> int:
+        return self._versions.get(topic, 0)
+
+    def latest(self, topic: str):
+        """Payload dell'ultimo evento del topic (None se mai pubblicato)."""
+        return self._payloads.get(topic)
+
+    def wait(self, seen: Dict[str, int], timeout: Optional[float] = None) -> Dict[str, int]:
+        """
+        Blocca finché un topic di `seen` ha una versione diversa da quella
+        indicata, il bus viene fermato, qualcuno chiama wake() o scade il timeout.
+
+        Args:
+            seen: Versione già elaborata per ogni topic seguito
+            timeout: Attesa massima in secondi (None = indefinita)
+
+        Returns:
+            Versioni correnti dei topic di `seen` (uguali a `seen` = nessuna novità)
+        """
+        with self._cond:
+            wakes = self._wakes
+            self._cond.wait_for(
+                lambda: self.stop_event.is_set() or self._wakes != wakes
+                or any(self._versions.get(t, 0) != v for t, v in seen.items()),
+                timeout,
+            )
+            self.wakeups += 1
+            return {t: self._versions.get(t, 0) for t in seen}
+
+    def wake(self) -> None:
+        """Sveglia tutti i wait() in corso (es. per lo stop di un singolo componente)."""
+        with self._cond:
+            self._wakes += 1
+            self._cond.notify_all()
+
+    def subscribe(self, callback, topics=None) -> None:
+        """Registra callback(topic, payload) per i topic indicati (None = tutti)."""
+        self._subscribers.append((frozenset(topics) if topics is not None else None, callback))
+
+    def stop_signal(self) -> threading.Event:
+        """Event privato di un componente, impostato dallo stop del bus."""
+        event = threading.Event()
+        self.subscribe(lambda topic, payload: event.set(), (self.STOP,))
+        if self.stopped:
+            event.set()
+        return event
+
+    def stop(self) -> None:
+        """Arresto di tutti i thread collegati al bus (STOP pubblicato una volta sola)."""
+        with self._cond:
+            self.stop_event.set()
+            # controllo e incremento della versione nello stesso blocco: con
+            # più stop() concorrenti solo il primo pubblica STOP
+            first = self._versions.get(self.STOP, 0) == 0
+            if first:
+                self._bump(self.STOP, None)
+            self._cond.notify_all()
+        if first:
+            self._notify_subscribers(self.STOP, None)
+
+
 # ============================================================================
 # SISTEMA DI MAPPATURA
 # ============================================================================
 
+class _DictGridStorage:
+    """Storage della griglia a dizionario (modalità originale, sparsa)."""
+
+    def __init__(self):
+        self.cells: Dict[Tuple[int, int], CellState] = {}
+
+    def get(self, x: int, y: int) -> CellState:
+        return self.cells.get((x, y), CellState.UNKNOWN)
+
+    def set(self, x: int, y: int, state: CellState) -> CellState:
+        """Scrive la cella e restituisce lo stato precedente."""
+        if state == CellState.UNKNOWN:
+            return self.cells.pop((x, y), CellState.UNKNOWN)
+        old = self.cells.get((x, y), CellState.UNKNOWN)
+        self.cells[(x, y)] = state
+        return old
+
+    def states_at(self, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+        """Valori (CellState.value) delle celle indicate, come array int8."""
+        get = self.cells.get
+        out = np.fromiter((get((x, y), CellState.UNKNOWN).value
+                           for x, y in zip(xs.ravel().tolist(), ys.ravel().tolist())),
+                          dtype=np.int8, count=xs.size)
+        return out.reshape(xs.shape)
+
+    def region(self, min_x: int, max_x: int, min_y: int, max_y: int) -> np.ndarray:
+        """Stati del rettangolo indicato come array int8 [y, x]."""
+        out = np.zeros((max_y - min_y + 1, max_x - min_x + 1), dtype=np.int8)
+        for (x, y), state in self.cells.items():
+            if min_x <= x <= max_x and min_y <= y <= max_y:
+                out[y - min_y, x - min_x] = state.value
+        return out
+
+    def to_dict(self) -> Dict[Tuple[int, int], CellState]:
+        return self.cells.copy()
+
+    def frozen_copy(self) -> "_DictGridStorage":
+        clone = _DictGridStorage()
+        clone.cells = self.cells.copy()
+        return clone
+
+    def clear(self) -> None:
+        self.cells.clear()
+
+
+class _DenseGridStorage:
+    """
+    Storage della griglia su array NumPy int8 (valore = CellState.value).
+
+    L'array è indicizzato [y, x] con un offset di origine, così le coordinate
+    possono essere negative; quando una scrittura cade fuori dall'array la
+    dimensione su quell'asse raddoppia (costo ammortizzato O(1) per scrittura).
+    """
+
+    STATES = tuple(CellState)
+
+    def __init__(self, initial_size: int = 16):
+        self.states = np.zeros((initial_size, initial_size), dtype=np.int8)
+        self.origin_x = initial_size // 2
+        self.origin_y = initial_size // 2
+
+    def get(self, x: int, y: int) -> CellState:
+        ix, iy = x + self.origin_x, y + self.origin_y
+        h, w = self.states.shape
+        if 0 <= ix < w and 0 <= iy < h:
+            return self.STATES[self.states[iy, ix]]
+        return CellState.UNKNOWN
+
+    def set(self, x: int, y: int, state: CellState) -> CellState:
+        """Scrive la cella (crescendo se necessario) e restituisce lo stato precedente."""
+        self._ensure(x, y)
+        ix, iy = x + self.origin_x, y + self.origin_y
+        old = self.STATES[self.states[iy, ix]]
+        self.states[iy, ix] = state.value
+        return old
+
+    def _ensure(self, x: int, y: int) -> None:
+        h, w = self.states.shape
+        ix, iy = x + self.origin_x, y + self.origin_y
+        if 0 <= ix < w and 0 <= iy < h:
+            return
+
+        new_w, pad_left = self._grown(w, ix)
+        new_h, pad_top = self._grown(h, iy)
+        grown = np.zeros((new_h, new_w), dtype=self.states.dtype)
+        grown[pad_top:pad_top + h, pad_left:pad_left + w] = self.states
+        self.states = grown
+        self.origin_x += pad_left
+        self.origin_y += pad_top
+
+    @staticmethod
+    def _grown(length: int, index: int) -> Tuple[int, int]:
+        """Nuova lunghezza (raddoppiata) e padding iniziale per contenere `index`."""
+        new_length = length
+        if index < 0:
+            # Lo spazio aggiunto va tutto prima dei dati esistenti
+            while index + (new_length - length) < 0:
+                new_length *= 2
+            return new_length, new_length - length
+        while index >= new_length:
+            new_length *= 2
+        return new_length, 0
+
+    def states_at(self, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+        """Valori (CellState.value) delle celle indicate, come array int8."""
+        ix = xs + self.origin_x
+        iy = ys + self.origin_y
+        h, w = self.states.shape
+        inside = (ix >= 0) & (ix < w) & (iy >= 0) & (iy < h)
+        out = np.zeros(xs.shape, dtype=np.int8)
+        out[inside] = self.states[iy[inside], ix[inside]]
+        return out
+
+    def region(self, min_x: int, max_x: int, min_y: int, max_y: int) -> np.ndarray:
+        """Stati del rettangolo indicato come array int8 [y, x]."""
+        out = np.zeros((max_y - min_y + 1, max_x - min_x + 1), dtype=np.int8)
+        h, w = self.states.shape
+        x0, x1 = max(min_x + self.origin_x, 0), min(max_x + self.origin_x + 1, w)
+        y0, y1 = max(min_y + self.origin_y, 0), min(max_y + self.origin_y + 1, h)
+        if x0 < x1 and y0 < y1:
+            out[y0 - self.origin_y - min_y:y1 - self.origin_y - min_y,
+                x0 - self.origin_x - min_x:x1 - self.origin_x - min_x] = self.states[y0:y1, x0:x1]
+        return out
+
+    def to_dict(self) -> Dict[Tuple[int, int], CellState]:
+        ys, xs = np.nonzero(self.states)
+        values = self.states[ys, xs]
+        ox, oy = self.origin_x, self.origin_y
+        return {(int(x) - ox, int(y) - oy): self.STATES[v]
+                for x, y, v in zip(xs, ys, values)}
+
+    def frozen_copy(self) -> "_DenseGridStorage":
+        """Copia in sola lettura (un memcpy dell'array int8)."""
+        clone = _DenseGridStorage.__new__(_DenseGridStorage)
+        clone.states = self.states.copy()
+        clone.states.setflags(write=False)
+        clone.origin_x = self.origin_x
+        clone.origin_y = self.origin_y
+        return clone
+
+    def clear(self) -> None:
+        self.states.fill(0)
+
+
+class _WallMasks:
+    """
+    Muri tra le celle: maschera a 4 bit (WALL_N/E/S/W) per cella in un array
+    uint8 [y, x] a dimensione fissa, che copre [-max_size, max_size].
+
+    Il lato condiviso tra due celle vicine è salvato in entrambe (bit del
+    lato e bit opposto nel vicino): GridMap li aggiorna sempre in coppia.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        side = 2 * max_size + 1
+        self.masks = np.zeros((side, side), dtype=np.uint8)
+
+    def contains(self, x: int, y: int) -> bool:
+        return -self.max_size <= x <= self.max_size and -self.max_size <= y <= self.max_size
+
+    def get(self, x: int, y: int) -> int:
+        if not self.contains(x, y):
+            return 0
+        m = self.max_size
+        return int(self.masks[y + m, x + m])
+
+    def set(self, x: int, y: int, mask: int) -> int:
+        """Scrive la maschera e restituisce quella precedente."""
+        m = self.max_size
+        old = int(self.masks[y + m, x + m])
+        self.masks[y + m, x + m] = mask
+        return old
+
+    def masks_at(self, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+        """Maschere delle celle indicate (0 fuori griglia)."""
+        m = self.max_size
+        inside = (np.abs(xs) <= m) & (np.abs(ys) <= m)
+        out = np.zeros(xs.shape, dtype=np.uint8)
+        out[inside] = self.masks[ys[inside] + m, xs[inside] + m]
+        return out
+
+    def to_dict(self) -> Dict[Tuple[int, int], int]:
+        ys, xs = np.nonzero(self.masks)
+        m = self.max_size
+        return {(int(x) - m, int(y) - m): int(v) for x, y, v in zip(xs, ys, self.masks[ys, xs])}
+
+    def frozen_copy(self) -> "_WallMasks":
+        clone = _WallMasks.__new__(_WallMasks)
+        clone.max_size = self.max_size
+        clone.masks = self.masks.copy()
+        clone.masks.setflags(write=False)
+        return clone
+
+    def region(self, min_x: int, max_x: int, min_y: int, max_y: int) -> np.ndarray:
+        """Maschere del rettangolo indicato come array uint8 [y, x] (0 fuori griglia)."""
+        out = np.zeros((max_y - min_y + 1, max_x - min_x + 1), dtype=np.uint8)
+        m = self.max_size
+        x0, x1 = max(min_x, -m), min(max_x, m)
+        y0, y1 = max(min_y, -m), min(max_y, m)
+        if x0 <= x1 and y0 <= y1:
+            out[y0 - min_y:y1 - min_y + 1, x0 - min_x:x1 - min_x + 1] = self.masks[y0 + m:y1 + m + 1, x0 + m:x1 + m + 1]
+        return out
+
+    def clear(self) -> None:
+        self.masks.fill(0)
+
+
+class _CellEvidence:
+    """
+    Evidenza probabilistica per cella e per classe (CellState osservabili,
+    UNKNOWN escluso) in un array float32 [y, x, classe] a dimensione fissa.
+
+    Una detection di classe k con confidenza p somma a k il log-rapporto
+    di verosimiglianza log(p * (K - 1) / (1 - p)) (modello: il classificatore
+    sbaglia con probabilità 1 - p, uniforme sulle altre K - 1 classi); con
+    prior uniforme il posterior di ogni classe dipende solo dalle differenze,
+    quindi dopo ogni aggiornamento l'evidenza viene traslata in modo che la
+    classe migliore valga 0. Le altre saturano a -limit: il distacco massimo
+    è limitato e una cella può sempre cambiare stato con abbastanza
+    osservazioni contrarie.
+    """
+
+    CLASSES = tuple(CellState)[1:]
+
+    def __init__(self, max_size: int, limit: float):
+        self.max_size = max_size
+        self.limit = limit
+        side = 2 * max_size + 1
+        self.logodds = np.zeros((side, side, len(self.CLASSES)), dtype=np.float32)
+
+    def add(self, xs: np.ndarray, ys: np.ndarray, values: np.ndarray,
+            confidences: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Somma le detection all'evidenza in un'unica operazione (più detection
+        sulla stessa cella si accumulano).
+
+        Returns:
+            Coordinate (xs, ys) delle celle toccate, senza duplicati
+        """
+        k = len(self.CLASSES)
+        p = np.clip(confidences, 1e-3, 0.999)
+        weights = np.log(p * (k - 1) / (1.0 - p)).astype(np.float32)
+        m = self.max_size
+        rows, cols = ys + m, xs + m
+        np.add.at(self.logodds, (rows, cols, values - 1), weights)
+
+        flat = np.unique(rows * self.logodds.shape[1] + cols)
+        rows, cols = np.divmod(flat, self.logodds.shape[1])
+        ev = self.logodds[rows, cols]
+        ev -= ev.max(axis=1, keepdims=True)
+        self.logodds[rows, cols] = np.maximum(ev, -self.limit)
+        return cols - m, rows - m
+
+    def decide(self, xs: np.ndarray, ys: np.ndarray, current: np.ndarray,
+               hysteresis: float) -> np.ndarray:
+        """
+        Stato da mostrare per le celle indicate, con isteresi.
+
+        Una cella ignota prende la classe più probabile se il suo posterior
+        supera 0.5; una cella nota cambia solo se la nuova classe ha almeno
+        `hysteresis` di evidenza in più di quella attuale.
+
+        Args:
+            current: CellState.value attuali delle celle
+
+        Returns:
+            CellState.value decisi (int64)
+        """
+        m = self.max_size
+        ev = self.logodds[ys + m, xs + m].astype(np.float64)
+        n = np.arange(len(ev))
+        best = ev.argmax(axis=1)
+        best_ev = ev[n, best]
+        # log-odds del posterior della classe migliore contro tutte le altre
+        rest = np.exp(ev - best_ev[:, None]).sum(axis=1) - 1.0
+        confident = -np.log(np.maximum(rest, 1e-12)) > 0.0
+
+        current = current.astype(np.int64)
+        known = current > 0
+        current_ev = ev[n, np.maximum(current - 1, 0)]
+        switch = confident & (~known | (best_ev - current_ev >= hysteresis))
+        return np.where(switch, best + 1, current)
+
+    def seed(self, xs: np.ndarray, ys: np.ndarray, values: np.ndarray) -> None:
+        """
+        Allinea l'evidenza a stati scritti direttamente (set_cell, ripristino):
+        la classe scritta parte col distacco massimo `limit` sulle altre, così
+        servono tante osservazioni contrarie quante per una cella ben
+        osservata; le celle UNKNOWN tornano senza evidenza.
+        """
+        m = self.max_size
+        rows, cols = ys + m, xs + m
+        self.logodds[rows, cols] = -self.limit
+        known = values > 0
+        self.logodds[rows[known], cols[known], values[known] - 1] = 0.0
+        self.logodds[rows[~known], cols[~known]] = 0.0
+
+    def clear(self) -> None:
+        self.logodds.fill(0.0)
+
+
+class MapSnapshot:
+    """
+    Vista immutabile e coerente della mappa ad una certa versione.
+
+    Restituita da GridMap.snapshot(): i reader possono usarla liberamente
+    (anche da più thread) senza lock e senza bloccare chi scrive.
+    """
+
+    __slots__ = ("version", "bounds", "stats", "_storage", "_walls", "_cells")
+
+    def __init__(self, version: int, bounds: Tuple[int, int, int, int],
+                 stats: Dict[str, int], storage, walls: "_WallMasks"):
+        self.version = version
+        self.bounds = bounds
+        self.stats = MappingProxyType(stats)
+        self._storage = storage
+        self._walls = walls
+        self._cells = None
+
+    def get_cell(self, x: int, y: int) -> CellState:
+        return self._storage.get(x, y)
+
+    def get_walls(self, x: int, y: int) -> int:
+        return self._walls.get(x, y)
+
+    def region(self, min_x: int, max_x: int, min_y: int, max_y: int) -> np.ndarray:
+        """Stati del rettangolo indicato come array int8 [y, x]."""
+        return self._storage.region(min_x, max_x, min_y, max_y)
+
+    def wall_region(self, min_x: int, max_x: int, min_y: int, max_y: int) -> np.ndarray:
+        """Maschere dei muri del rettangolo indicato come array uint8 [y, x]."""
+        return self._walls.region(min_x, max_x, min_y, max_y)
+
+    @property
+    def walls(self) -> Dict[Tuple[int, int], int]:
+        """Maschere dei muri delle celle che ne hanno almeno uno."""
+        return self._walls.to_dict()
+
+    @property
+    def cells(self) -> Mapping[Tuple[int, int], CellState]:
+        """Celle note (mapping in sola lettura, costruito al primo accesso)."""
+        if self._cells is None:
+            self._cells = MappingProxyType(self._storage.to_dict())
+        return self._cells
+
+    def __len__(self) -> int:
+        return self.stats["total_cells"]
+
+
 class GridMap:
     """
     Sistema di mappatura dinamica del labirinto.
     Gestisce lo stato della griglia e le statistiche.
+
+    Bounds e conteggi per stato sono mantenuti in modo incrementale ad ogni
+    scrittura, quindi get_bounds() e get_stats() costano O(1).
+
+    Ogni modifica incrementa `version` e finisce in un journal limitato:
+    i consumer (UI, export, planner) chiamano changes_since(versione) e
+    processano solo le celle cambiate.
+
+    I reader che vogliono l'intera mappa usano snapshot(): una vista
+    immutabile condivisa finché la versione non cambia, costruita senza
+    prendere il lock dei writer (seqlock: il reader ripete la copia se una
+    scrittura è avvenuta nel frattempo).
+
+    I muri del labirinto stanno tra le celle: oltre a CellState.WALL (cella
+    intera) ogni cella ha una maschera N/E/S/W in un array uint8, coerente
+    sul lato condiviso con il vicino. passable_neighbours() interroga molte
+    celle in una volta sola e frontier_cells() mantiene l'indice delle celle
+    di frontiera (note, percorribili, con un lato aperto verso l'ignoto).
+
+    Le detection della visione passano da observe()/observe_batch(): ogni
+    cella accumula evidenza log-odds per classe e lo stato visibile cambia
+    solo con un margine (isteresi), invece dell'ultima scrittura che vince.
     """
 
-    def __init__(self, max_size: int = 50):
+    LETTER_STATES = (CellState.LETTER_X, CellState.LETTER_Y, CellState.LETTER_H)
+
+    def __init__(self, max_size: int = 50, storage: str = "dict", journal_size: int = 4096,
+                 evidence_hysteresis: float = 1.5, evidence_limit: float = 20.0,
+                 event_bus: Optional[EventBus] = None):
         """
         Inizializza la griglia.
 
         Args:
             max_size: Dimensione massima della griglia
+            storage: "dict" (dizionario sparso) o "dense" (array NumPy int8)
+            journal_size: Numero massimo di modifiche tenute nel journal
+            evidence_hysteresis: Vantaggio (log-odds) richiesto per cambiare
+                lo stato di una cella nota con observe()
+            evidence_limit: Distacco massimo (log-odds) tra la classe migliore e le altre
+            event_bus: Bus su cui pubblicare "map" (nuova versione) e "robot" (posizione)
         """
+        if storage not in ("dict", "dense"):
+            raise ValueError(f"Storage non valido: {storage}")
+
         self.max_size = max_size
-        self.grid: Dict[Tuple[int, int], CellState] = {}
+        self.storage = storage
+        self._cells = _DenseGridStorage() if storage == "dense" else _DictGridStorage()
         self.current_position = (0, 0)
         self.lock = threading.Lock()
+        self.event_bus = event_bus
+        self._published_version = 0
+
+        # Conteggio celle per stato e bounds, aggiornati ad ogni transizione
+        self._state_counts = [0] * len(CellState)
+        self._bounds: Optional[Tuple[int, int, int, int]] = None
+
+        # Versione monotona e journal delle ultime modifiche
+        # (versione, x, y, stato, maschera muri): None = parte invariata
+        self.version = 0
+        self._journal: deque = deque(maxlen=journal_size)
+        self._resync_below = 0  # versioni precedenti richiedono un resync completo
+
+        # Seqlock per gli snapshot: dispari mentre una scrittura è in corso
+        self._seq = 0
+        self._snapshot: Optional[MapSnapshot] = None
+
+        # Muri sui lati delle celle e indice delle celle di frontiera
+        # (le celle toccate finiscono in _frontier_dirty e vengono
+        # rivalutate, insieme ai vicini, alla prossima frontier_cells())
+        self._walls = _WallMasks(max_size)
+        self._frontier: set = set()
+        self._frontier_dirty: set = set()
+        self._frontier_stale = False
+
+        # Evidenza per cella e classe delle detection (observe), allocata al primo uso
+        self.evidence_hysteresis = evidence_hysteresis
+        self.evidence_limit = evidence_limit
+        self._evidence: Optional[_CellEvidence] = None
 
         # Statistiche
         self.stats = {
@@ -206,9 +1041,16 @@ class GridMap:
             "walls_detected": 0,
         }
 
+    @property
+    def grid(self) -> Dict[Tuple[int, int], CellState]:
+        """Copia delle celle note (compatibilità con il vecchio attributo dict)."""
+        return self.get_all_cells()
+
     def set_cell(self, x: int, y: int, state: CellState) -> None:
         """
-        Imposta lo stato di una cella.
+        Imposta lo stato di una cella (l'ultima scrittura vince).
+
+        Per le detection incerte usare observe(), che accumula evidenza.
 
         Args:
             x: Coordinata X
@@ -219,45 +1061,542 @@ class GridMap:
             if abs(x) > self.max_size or abs(y) > self.max_size:
                 return
 
-            self.grid[(x, y)] = state
-            self._update_stats(state)
+            self._seq += 1
+            self._write_cell(x, y, state)
+            if self._evidence is not None:
+                self._evidence.seed(np.array([x]), np.array([y]), np.array([state.value]))
+            self._seq += 1
+        self._publish_change()
+
+    def _write_cell(self, x: int, y: int, state: CellState) -> None:
+        """Scrittura di una cella (lock e seqlock a carico del chiamante)."""
+        old = self._cells.set(x, y, state)
+        if old != state:
+            self._update_stats(old, state)
+            if state != CellState.UNKNOWN:
+                self._extend_bounds(x, y)
+            self.version += 1
+            self._log(x, y, state, None)
+            self._frontier_dirty.add((x, y))
+
+    def observe(self, x: int, y: int, state: CellState, confidence: float) -> bool:
+        """
+        Aggiunge una detection all'evidenza della cella.
+
+        Returns:
+            True se lo stato visibile della cella è cambiato
+        """
+        return self.observe_batch([x], [y], [state.value], [confidence]) > 0
+
+    def observe_batch(self, xs, ys, states, confidences) -> int:
+        """
+        Fonde un gruppo di detection nell'evidenza log-odds per cella e classe
+        con una sola operazione NumPy, poi ricava lo stato visibile delle
+        celle toccate con isteresi: una detection rumorosa non basta a
+        trasformare un pavimento ben osservato in un muro.
+
+        Args:
+            xs, ys: Coordinate delle detection
+            states: CellState (o CellState.value) rilevati
+            confidences: Confidenza di ogni detection (0-1)
+
+        Returns:
+            Numero di celle il cui stato visibile è cambiato
+        """
+        xs = np.asarray(xs, dtype=np.int64)
+        ys = np.asarray(ys, dtype=np.int64)
+        values = np.array([getattr(s, "value", s) for s in states], dtype=np.int64)
+        confidences = np.asarray(confidences, dtype=np.float64)
+        m = self.max_size
+        keep = (np.abs(xs) <= m) & (np.abs(ys) <= m) & (values != CellState.UNKNOWN.value)
+        if not keep.any():
+            return 0
+        xs, ys, values, confidences = xs[keep], ys[keep], values[keep], confidences[keep]
+
+        with self.lock:
+            if self._evidence is None:
+                self._evidence = _CellEvidence(m, self.evidence_limit)
+                # le celle già scritte (set_cell, ripristino) partono dal loro stato
+                known = self._cells.to_dict()
+                if known:
+                    self._evidence.seed(np.array([x for x, _ in known], dtype=np.int64),
+                                        np.array([y for _, y in known], dtype=np.int64),
+                                        np.array([st.value for st in known.values()], dtype=np.int64))
+            cell_xs, cell_ys = self._evidence.add(xs, ys, values, confidences)
+            current = self._cells.states_at(cell_xs, cell_ys)
+            decided = self._evidence.decide(cell_xs, cell_ys, current, self.evidence_hysteresis)
+            changed = np.flatnonzero(decided != current)
+            if len(changed):
+                self._seq += 1
+                states = _DenseGridStorage.STATES
+                for i in changed.tolist():
+                    self._write_cell(int(cell_xs[i]), int(cell_ys[i]), states[decided[i]])
+                self._seq += 1
+        self._publish_change()
+        return len(changed)
+
+    def evidence_at(self, x: int, y: int) -> Dict[CellState, float]:
+        """
+        Evidenza log-odds per classe nella cella, relativa alla classe più
+        probabile (che vale 0); vuota se la cella non è mai stata osservata.
+        """
+        with self.lock:
+            if self._evidence is None or abs(x) > self.max_size or abs(y) > self.max_size:
+                return {}
+            m = self.max_size
+            row = self._evidence.logodds[y + m, x + m]
+            if not row.any():
+                return {}
+            return {state: float(v) for state, v in zip(_CellEvidence.CLASSES, row)}
+
+    def _publish_change(self) -> None:
+        """Pubblica "map" sul bus (fuori dal lock della mappa) se la versione è avanzata."""
+        bus = self.event_bus
+        if bus is not None and self.version != self._published_version:
+            self._published_version = self.version
+            bus.publish("map", self.version)
+
+    def set_position(self, x: int, y: int) -> None:
+        """Posizione corrente del robot (seguita dalla vista della UI)."""
+        if (x, y) != self.current_position:
+            self.current_position = (x, y)
+            if self.event_bus is not None:
+                self.event_bus.publish("robot", (x, y))
+
+    def _log(self, x: int, y: int, state: Optional[CellState], mask: Optional[int]) -> None:
+        """Accoda una modifica al journal (state o mask None = invariato)."""
+        journal = self._journal
+        if len(journal) == journal.maxlen:
+            # La voce più vecchia sta per uscire: chi è fermo prima di lei
+            # dovrà fare un resync (una versione può avere più voci)
+            self._resync_below = max(self._resync_below, journal[0][0])
+        journal.append((self.version, x, y, state, mask))
+
+    def set_walls(self, x: int, y: int, mask: int) -> None:
+        """
+        Imposta la maschera completa dei muri di una cella.
+
+        Il lato condiviso viene aggiornato anche nella cella vicina, così le
+        due maschere restano coerenti.
+
+        Args:
+            x: Coordinata X
+            y: Coordinata Y
+            mask: OR di WALL_N, WALL_E, WALL_S, WALL_W
+        """
+        with self.lock:
+            changed = self._set_walls_locked(x, y, mask)
+        if changed:
+            self._publish_change()
+
+    def _set_walls_locked(self, x: int, y: int, mask: int) -> bool:
+        """Corpo di set_walls (il chiamante tiene self.lock); True se la maschera è cambiata."""
+        if abs(x) > self.max_size or abs(y) > self.max_size:
+            return False
+        old = self._walls.get(x, y)
+        if old == mask:
+            return False
+
+        self._seq += 1
+        self.version += 1
+        self._walls.set(x, y, mask)
+        self._log(x, y, None, mask)
+        self._frontier_dirty.add((x, y))
+
+        for side in WALL_SIDES:
+            if (old ^ mask) & side:
+                dx, dy = WALL_OFFSETS[side]
+                nx, ny = x + dx, y + dy
+                if not self._walls.contains(nx, ny):
+                    continue
+                n_old = self._walls.get(nx, ny)
+                n_mask = n_old | OPPOSITE_WALL[side] if mask & side else n_old & ~OPPOSITE_WALL[side]
+                self._walls.set(nx, ny, n_mask)
+                self._log(nx, ny, None, n_mask)
+                self._frontier_dirty.add((nx, ny))
+        self._seq += 1
+        return True
+
+    def set_wall(self, x: int, y: int, side: int, present: bool = True) -> None:
+        """Aggiunge (o toglie) il muro sul lato `side` della cella (read-modify-write sotto lock)."""
+        with self.lock:
+            mask = self._walls.get(x, y)
+            changed = self._set_walls_locked(x, y, mask | side if present else mask & ~side)
+        if changed:
+            self._publish_change()
+
+    def get_walls(self, x: int, y: int) -> int:
+        """Maschera dei muri della cella (lettura senza lock di un byte)."""
+        return self._walls.get(x, y)
+
+    def has_wall(self, x: int, y: int, side: int) -> bool:
+        return bool(self._walls.get(x, y) & side)
+
+    def passable_neighbours(self, cells, known_only: bool = False) -> np.ndarray:
+        """
+        Query vettoriale: per ogni cella, quali dei 4 vicini sono raggiungibili.
+
+        Un vicino è raggiungibile se è dentro la griglia, non c'è un muro sul
+        lato condiviso e non è una cella CellState.WALL (con known_only deve
+        anche essere già nota).
+
+        Args:
+            cells: Array (N, 2) di coordinate (x, y)
+
+        Returns:
+            Array bool (N, 4) nell'ordine di WALL_SIDES (N, E, S, W); le
+            coordinate dei vicini sono cells[:, None] + NEIGHBOUR_OFFSETS
+        """
+        cells = np.asarray(cells, dtype=np.int64).reshape(-1, 2)
+        xs, ys = cells[:, 0], cells[:, 1]
+        neighbours = cells[:, None, :] + NEIGHBOUR_OFFSETS[None, :, :]
+        nx, ny = neighbours[..., 0], neighbours[..., 1]
+
+        open_sides = (self._walls.masks_at(xs, ys)[:, None] & _WALL_SIDE_BITS[None, :]) == 0
+        inside = (np.abs(nx) <= self.max_size) & (np.abs(ny) <= self.max_size)
+        states = self._cells.states_at(nx, ny)
+        passable = open_sides & inside & (states != CellState.WALL.value)
+        if known_only:
+            passable &= states != CellState.UNKNOWN.value
+        return passable
+
+    def frontier_cells(self) -> set:
+        """
+        Celle di frontiera: note, non WALL, con almeno un lato senza muro
+        verso una cella sconosciuta dentro la griglia.
+
+        L'indice è aggiornato in modo incrementale dalle celle toccate dopo
+        l'ultima chiamata (ricalcolo vettoriale se sono molte).
+        """
+        with self.lock:
+            dirty = self._frontier_dirty
+            if self._frontier_stale:
+                self._frontier = self._compute_frontier()
+                self._frontier_stale = False
+                self._frontier_dirty = set()
+            elif dirty:
+                if len(dirty) > 256 and len(dirty) * 4 > len(self._frontier) + 256:
+                    self._frontier = self._compute_frontier()
+                else:
+                    touched = set()
+                    for x, y in dirty:
+                        touched.add((x, y))
+                        touched.update((x + dx, y + dy) for dx, dy in WALL_OFFSETS.values())
+                    self._refresh_frontier(touched)
+                self._frontier_dirty = set()
+            return set(self._frontier)
+
+    def _refresh_frontier(self, cells) -> None:
+        cells = [c for c in cells if abs(c[0]) <= self.max_size and abs(c[1]) <= self.max_size]
+        if not cells:
+            return
+        coords = np.array(cells, dtype=np.int64)
+        states = self._cells.states_at(coords[:, 0], coords[:, 1])
+        reachable_unknown = self._open_towards_unknown(coords, states)
+        for cell, is_frontier in zip(cells, reachable_unknown.tolist()):
+            if is_frontier:
+                self._frontier.add(cell)
+            else:
+                self._frontier.discard(cell)
+
+    def _open_towards_unknown(self, coords: np.ndarray, states: np.ndarray) -> np.ndarray:
+        neighbours = coords[:, None, :] + NEIGHBOUR_OFFSETS[None, :, :]
+        nx, ny = neighbours[..., 0], neighbours[..., 1]
+        open_sides = (self._walls.masks_at(coords[:, 0], coords[:, 1])[:, None] & _WALL_SIDE_BITS[None, :]) == 0
+        inside = (np.abs(nx) <= self.max_size) & (np.abs(ny) <= self.max_size)
+        unknown = self._cells.states_at(nx, ny) == CellState.UNKNOWN.value
+        known = (states != CellState.UNKNOWN.value) & (states != CellState.WALL.value)
+        return known & (open_sides & inside & unknown).any(axis=1)
+
+    def _compute_frontier(self) -> set:
+        """Ricalcolo completo dell'indice di frontiera sull'area nota."""
+        if self._bounds is None:
+            return set()
+        min_x, max_x, min_y, max_y = self._bounds
+        ys, xs = np.mgrid[min_y:max_y + 1, min_x:max_x + 1]
+        coords = np.stack([xs.ravel(), ys.ravel()], axis=1).astype(np.int64)
+        states = self._cells.region(min_x, max_x, min_y, max_y).ravel()
+        candidates = (states != CellState.UNKNOWN.value) & (states != CellState.WALL.value)
+        coords = coords[candidates]
+        mask = self._open_towards_unknown(coords, states[candidates])
+        return set(map(tuple, coords[mask].tolist()))
 
     def get_cell(self, x: int, y: int) -> CellState:
         """Ottiene lo stato di una cella."""
         with self.lock:
-            return self.grid.get((x, y), CellState.UNKNOWN)
+            return self._cells.get(x, y)
 
     def get_all_cells(self) -> Dict[Tuple[int, int], CellState]:
-        """Ottiene tutte le celle della griglia (thread-safe)."""
-        with self.lock:
-            return self.grid.copy()
+        """Ottiene tutte le celle della griglia (thread-safe, copia modificabile)."""
+        return dict(self.snapshot().cells)
 
     def get_bounds(self) -> Tuple[int, int, int, int]:
-        """Calcola i bounds della griglia (min_x, max_x, min_y, max_y)."""
+        """
+        Bounds della griglia (min_x, max_x, min_y, max_y).
+
+        Coprono tutte le celle scritte dall'ultimo clear(). La tupla viene
+        sostituita atomicamente, quindi la lettura non richiede il lock.
+        """
+        return self._bounds or (0, 0, 0, 0)
+
+    def snapshot(self) -> MapSnapshot:
+        """
+        Vista immutabile e coerente della mappa.
+
+        Se la mappa non è cambiata dall'ultimo snapshot viene restituito lo
+        stesso oggetto (nessuna copia); altrimenti si copia lo storage senza
+        prendere il lock, ripetendo se un writer ha scritto durante la copia.
+        """
+        snap = self._snapshot
+        if snap is not None and snap.version == self.version:
+            return snap
+
+        while True:
+            seq = self._seq
+            if seq & 1:
+                time.sleep(0)  # scrittura in corso: cede il GIL al writer
+                continue
+            version = self.version
+            storage = self._cells.frozen_copy()
+            walls = self._walls.frozen_copy()
+            bounds = self._bounds or (0, 0, 0, 0)
+            stats = self.stats
+            if self._seq == seq:
+                break
+
+        snap = MapSnapshot(version, bounds, dict(stats), storage, walls)
+        self._snapshot = snap
+        return snap
+
+    def clear(self) -> None:
+        """Svuota la mappa."""
         with self.lock:
-            if not self.grid:
-                return (0, 0, 0, 0)
+            self._seq += 1
+            self._cells.clear()
+            self._walls.clear()
+            self._frontier = set()
+            self._frontier_dirty = set()
+            self._frontier_stale = False
+            if self._evidence is not None:
+                self._evidence.clear()
+            self._state_counts = [0] * len(CellState)
+            self._bounds = None
+            self._refresh_stats()
+            self.version += 1
+            self._journal.clear()
+            self._resync_below = self.version
+            self._seq += 1
+        self._publish_change()
+
+    def load_arrays(self, xs: np.ndarray, ys: np.ndarray, states: np.ndarray,
+                    wall_xs: np.ndarray, wall_ys: np.ndarray, masks: np.ndarray) -> None:
+        """
+        Sostituisce l'intera mappa con celle e muri dati come array (caricamento
+        in blocco, es. ripristino da snapshot).
 
-            xs = [x for x, y in self.grid.keys()]
-            ys = [y for x, y in self.grid.keys()]
+        Come clear(), i consumer di changes_since() ricevono un full_resync.
 
-            return (min(xs), max(xs), min(ys), max(ys))
+        Args:
+            xs, ys, states: Coordinate e CellState.value delle celle note
+            wall_xs, wall_ys, masks: Coordinate e maschere dei muri (già
+                coerenti tra vicini)
+        """
+        m = self.max_size
+        xs, ys, states = (np.asarray(a, dtype=np.int64) for a in (xs, ys, states))
+        keep = (np.abs(xs) <= m) & (np.abs(ys) <= m) & (states != CellState.UNKNOWN.value)
+        xs, ys, states = xs[keep], ys[keep], states[keep]
+        wall_xs, wall_ys, masks = (np.asarray(a, dtype=np.int64) for a in (wall_xs, wall_ys, masks))
+        keep = (np.abs(wall_xs) <= m) & (np.abs(wall_ys) <= m)
+        wall_xs, wall_ys, masks = wall_xs[keep], wall_ys[keep], masks[keep]
 
-    def _update_stats(self, state: CellState) -> None:
-        """Aggiorna le statistiche interne."""
-        self.stats["total_cells"] = len(self.grid)
+        with self.lock:
+            self._seq += 1
+            self._cells.clear()
+            self._walls.clear()
+
+            if isinstance(self._cells, _DenseGridStorage):
+                if len(xs):
+                    self._cells._ensure(int(xs.min()), int(ys.min()))
+                    self._cells._ensure(int(xs.max()), int(ys.max()))
+                    self._cells.states[ys + self._cells.origin_y, xs + self._cells.origin_x] = states
+            else:
+                all_states = _DenseGridStorage.STATES
+                self._cells.cells = {(x, y): all_states[v]
+                                     for x, y, v in zip(xs.tolist(), ys.tolist(), states.tolist())}
+            self._walls.masks[wall_ys + m, wall_xs + m] = masks
+
+            self._state_counts = np.bincount(states, minlength=len(CellState)).tolist()
+            self._state_counts[CellState.UNKNOWN.value] = 0
+            self._bounds = ((int(xs.min()), int(xs.max()), int(ys.min()), int(ys.max()))
+                            if len(xs) else None)
+            self._refresh_stats()
+            self._frontier = set()
+            self._frontier_stale = True  # ricalcolo completo alla prossima frontier_cells()
+            self._frontier_dirty = set()
+            if self._evidence is not None:
+                self._evidence.clear()
+                self._evidence.seed(xs, ys, states)
+
+            self.version += 1
+            self._journal.clear()
+            self._resync_below = self.version
+            self._seq += 1
+        self._publish_change()
+
+    def changes_since(self, version: int) -> MapChanges:
+        """
+        Celle modificate dopo `version`, in O(modifiche).
 
-        if state == CellState.VICTIM_FOUND:
-            self.stats["victims_found"] += 1
-        elif state in [CellState.LETTER_X, CellState.LETTER_Y, CellState.LETTER_H]:
-            self.stats["letters_found"] += 1
-        elif state == CellState.WALL:
-            self.stats["walls_detected"] += 1
+        Se il journal è stato sovrascritto (o la mappa svuotata) dopo quella
+        versione, restituisce l'intera mappa con full_resync=True.
+        """
+        with self.lock:
+            if version >= self.version:
+                return MapChanges(self.version, {}, False)
+
+            if version < self._resync_below:
+                return MapChanges(self.version, self._cells.to_dict(), True, self._walls.to_dict())
+
+            changed = []
+            for entry in reversed(self._journal):
+                if entry[0] <= version:
+                    break
+                changed.append(entry)
+
+            cells = {}
+            walls = {}
+            for _, x, y, state, mask in reversed(changed):
+                if state is not None:
+                    cells[(x, y)] = state
+                if mask is not None:
+                    walls[(x, y)] = mask
+            return MapChanges(self.version, cells, False, walls)
+
+    def _extend_bounds(self, x: int, y: int) -> None:
+        if self._bounds is None:
+            self._bounds = (x, x, y, y)
+            return
+        min_x, max_x, min_y, max_y = self._bounds
+        if x < min_x or x > max_x or y < min_y or y > max_y:
+            self._bounds = (min(min_x, x), max(max_x, x), min(min_y, y), max(max_y, y))
+
+    def _update_stats(self, old: CellState, new: CellState) -> None:
+        """Aggiorna le statistiche interne per la transizione old -> new."""
+        if old != CellState.UNKNOWN:
+            self._state_counts[old.value] -= 1
+        if new != CellState.UNKNOWN:
+            self._state_counts[new.value] += 1
+        self._refresh_stats()
+
+    def _refresh_stats(self) -> None:
+        # Nuovo dict assegnato in un colpo: i reader senza lock non lo vedono mai a metà
+        counts = self._state_counts
+        self.stats = {
+            "total_cells": sum(counts) - counts[CellState.UNKNOWN.value],
+            "victims_found": counts[CellState.VICTIM_FOUND.value],
+            "letters_found": sum(counts[s.value] for s in self.LETTER_STATES),
+            "walls_detected": counts[CellState.WALL.value],
+        }
 
     def get_stats(self) -> Dict[str, int]:
-        """Ottiene le statistiche correnti."""
-        with self.lock:
-            return self.stats.copy()
+        """Ottiene le statistiche correnti (senza lock)."""
+        return self.stats.copy()
+
+
+# ============================================================================
+# HANDOFF DEI FRAME (ULTIMO FRAME VINCE)
+# ============================================================================
+
+class LatestFrameSlot:
+    """
+    Slot a un solo frame tra camera e inferenza: il nuovo frame sovrascrive
+    quello non ancora consumato, così l'inferenza lavora sempre sull'ultima
+    acquisizione invece che su frame vecchi accodati.
+
+    Ogni `take()` consuma il frame e assegna un ticket progressivo, usato
+    dai worker di inferenza per consegnare i risultati in ordine.
+
+    I PooledFrame sovrascritti prima di essere consumati (o rimasti nello
+    slot alla chiusura) vengono restituiti al loro pool.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._frame = None
+        self._timestamp = 0.0
+        self._seq = 0
+        self._taken_seq = 0
+        self._next_ticket = 0
+        self._closed = False
+
+        # Statistiche
+        self.published = 0
+        self.dropped = 0
+
+    def put(self, frame, timestamp: Optional[float] = None) -> None:
+        """Pubblica un frame (ndarray o PooledFrame, timestamp in time.monotonic())."""
+        with self._cond:
+            replaced = self._frame
+            if replaced is not None:
+                self.dropped += 1
+            self._frame = frame
+            self._timestamp = time.monotonic() if timestamp is None else timestamp
+            self._seq += 1
+            self.published += 1
+            self._cond.notify()
+        if isinstance(replaced, PooledFrame):
+            replaced.release()
+
+    def take(self, timeout: Optional[float] = None) -> Optional[Tuple[int, np.ndarray, float]]:
+        """
+        Attende e consuma il frame più recente.
+
+        Returns:
+            (ticket, frame, timestamp) o None se scade il timeout o lo slot è chiuso
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._frame is not None or self._closed, timeout):
+                return None
+            if self._frame is None:
+                return None
+            frame, timestamp = self._frame, self._timestamp
+            self._frame = None
+            self._taken_seq = self._seq
+            ticket = self._next_ticket
+            self._next_ticket += 1
+            return ticket, frame, timestamp
+
+    def close(self) -> None:
+        """Sveglia i consumatori in attesa (allo shutdown)."""
+        with self._cond:
+            self._closed = True
+            leftover, self._frame = self._frame, None
+            self._cond.notify_all()
+        if isinstance(leftover, PooledFrame):
+            leftover.release()
+
+
+class OrderedDelivery:
+    """
+    Riordina i risultati dei worker per ticket: un risultato viene consegnato
+    solo dopo tutti quelli con ticket precedente. I worker devono inviare
+    anche i ticket senza risultato (None) per non bloccare la coda.
+    """
+
+    def __init__(self, deliver):
+        self._deliver = deliver
+        self._pending: Dict[int, Optional[DetectionResult]] = {}
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def submit(self, ticket: int, result: Optional[DetectionResult]) -> None:
+        with self._lock:
+            self._pending[ticket] = result
+            while self._next in self._pending:
+                ready = self._pending.pop(self._next)
+                self._next += 1
+                if ready is not None:
+                    self._deliver(ready)
 
 
 # ============================================================================
@@ -265,21 +1604,36 @@ class GridMap:
 # ============================================================================
 
 class CameraThread(threading.Thread):
-    """Thread per acquisizione frame dalla camera."""
+    """
+    Thread per acquisizione frame dalla camera.
+
+    I frame vengono letti in buffer riciclati di un FramePool: lo slot e i
+    worker di inferenza li restituiscono al pool dopo l'uso, quindi a regime
+    l'acquisizione non alloca memoria. Con tutti i buffer in uso il frame
+    viene saltato.
+    """
 
-    def __init__(self, camera_index: int, frame_queue: queue.Queue):
+    def __init__(self, camera_index: int, frame_slot: LatestFrameSlot,
+                 pool_size: int = 4, debug: bool = False, event_bus: Optional[EventBus] = None):
         """
         Inizializza il thread camera.
 
         Args:
             camera_index: Indice della camera
-            frame_queue: Queue per i frame
+            frame_slot: Slot dell'ultimo frame acquisito
+            pool_size: Buffer del pool (>= worker di inferenza + 2)
+            debug: Controllo di uso dopo il release sui frame del pool
+            event_bus: Bus il cui stop ferma il thread
         """
         super().__init__(daemon=True)
         self.camera_index = camera_index
-        self.frame_queue = frame_queue
+        self.frame_slot = frame_slot
         self.running = False
+        self._stop_event = event_bus.stop_signal() if event_bus is not None else threading.Event()
         self.cap = None
+        self.pool = FramePool((CONFIG["CAMERA_HEIGHT"], CONFIG["CAMERA_WIDTH"], 3),
+                              capacity=pool_size, debug=debug)
+        self.skipped = 0
 
     def run(self) -> None:
         """Loop principale del thread."""
@@ -288,15 +1642,25 @@ class CameraThread(threading.Thread):
             print(f"[CameraThread] Inizializzazione camera {self.camera_index}")
             self.running = True
 
-            while self.running:
-                # Simulazione frame per DEMO
-                time.sleep(0.033)  # ~30 FPS
-
-                # Mock frame (in prod: ret, frame = self.cap.read())
-                mock_frame = np.zeros((480, 640, 3), dtype=np.uint8)
-
-                if not self.frame_queue.full():
-                    self.frame_queue.put(mock_frame)
+            while self.running and not self._stop_event.is_set():
+                if self.cap is not None:
+                    ok, frame = self.pool.read(self.cap, timeout=0.033)
+                    if not ok:
+                        self.skipped += 1
+                        continue
+                else:
+                    # Simulazione frame per DEMO (~30 FPS, si interrompe allo stop)
+                    if self._stop_event.wait(0.033):
+                        break
+
+                    # Mock frame scritto in un buffer del pool (in prod: self.pool.read(self.cap))
+                    frame = self.pool.acquire()
+                    if frame is None:
+                        self.skipped += 1
+                        continue
+                    frame.array.fill(0)
+
+                self.frame_slot.put(frame)
 
         except Exception as e:
             print(f"[CameraThread] Errore: {e}")
@@ -306,6 +1670,7 @@ class CameraThread(threading.Thread):
     def stop(self) -> None:
         """Ferma il thread."""
         self.running = False
+        self._stop_event.set()
         if self.cap is not None:
             self.cap.release()
 
@@ -315,48 +1680,117 @@ class CameraThread(threading.Thread):
 # ============================================================================
 
 class InferenceThread(threading.Thread):
-    """Thread per inferenza AI e aggiornamento mappa."""
+    """
+    Thread per inferenza AI e aggiornamento mappa.
+
+    Con più VisionSystem (uno per worker, l'interprete TFLite non è
+    thread-safe) avvia altrettanti worker che prendono ciascuno il frame più
+    recente dallo slot; gli aggiornamenti della mappa vengono applicati
+    nell'ordine di acquisizione tramite OrderedDelivery.
+    """
 
-    def __init__(self, vision_system: VisionSystem, grid_map: GridMap,
-                 frame_queue: queue.Queue):
+    def __init__(self, vision_system, grid_map: GridMap,
+                 frame_slot: LatestFrameSlot, age_window: int = 300,
+                 event_bus: Optional[EventBus] = None):
         """
         Inizializza il thread di inferenza.
 
         Args:
-            vision_system: Sistema di visione
+            vision_system: Sistema di visione, o lista con uno per worker
             grid_map: Mappa della griglia
-            frame_queue: Queue dei frame da processare
+            frame_slot: Slot dell'ultimo frame da processare
+            age_window: Campioni tenuti per le statistiche di età dei frame
+            event_bus: Bus su cui pubblicare "detection" (lo stop chiude lo slot)
         """
         super().__init__(daemon=True)
-        self.vision_system = vision_system
+        if isinstance(vision_system, (list, tuple)):
+            self.vision_systems = list(vision_system)
+        else:
+            self.vision_systems = [vision_system]
+        self.vision_system = self.vision_systems[0]
         self.grid_map = grid_map
-        self.frame_queue = frame_queue
+        self.frame_slot = frame_slot
+        self.event_bus = event_bus
+        if event_bus is not None:
+            event_bus.subscribe(lambda topic, payload: frame_slot.close(), (EventBus.STOP,))
         self.running = False
         self.last_detection = None
         self.current_x = 0
         self.current_y = 0
 
+        self.delivery = OrderedDelivery(self._deliver)
+        self.workers: List[threading.Thread] = []
+
+        # Età del frame (ms) all'inizio dell'inferenza
+        self.frame_ages_ms = deque(maxlen=age_window)
+        self.last_frame_age_ms = 0.0
+
+    @property
+    def num_workers(self) -> int:
+        return len(self.vision_systems)
+
     def run(self) -> None:
-        """Loop principale del thread."""
-        print("[InferenceThread] Avviato")
+        """Loop principale del thread (worker 0, avvia gli altri)."""
+        print(f"[InferenceThread] Avviato ({self.num_workers} worker)")
         self.running = True
 
+        self.workers = [
+            threading.Thread(target=self._worker_loop, args=(vision,), daemon=True,
+                             name=f"InferenceWorker-{i}")
+            for i, vision in enumerate(self.vision_systems[1:], start=1)
+        ]
+        for worker in self.workers:
+            worker.start()
+
+        self._worker_loop(self.vision_system)
+
+    def _worker_loop(self, vision_system: VisionSystem) -> None:
         while self.running:
+            # Bloccante senza timeout: si sveglia solo per un frame o per close()
+            item = self.frame_slot.take()
+            if item is None:
+                break
+            ticket, frame, captured_at = item
+
+            result = None
             try:
-                # Ottiene frame dalla queue
-                frame = self.frame_queue.get(timeout=0.1)
+                age_ms = (time.monotonic() - captured_at) * 1000.0
+                self.frame_ages_ms.append(age_ms)
+                self.last_frame_age_ms = age_ms
 
                 # Esegue predizione
-                result = self.vision_system.predict(frame)
-
-                if result and result.confidence >= CONFIG["CONFIDENCE_THRESHOLD"]:
-                    self.last_detection = result
-                    self._update_map(result)
-
-            except queue.Empty:
-                continue
+                image = frame.array if isinstance(frame, PooledFrame) else frame
+                result = vision_system.predict(image)
+                if result is not None:
+                    result.frame_age_ms = age_ms
             except Exception as e:
                 print(f"[InferenceThread] Errore: {e}")
+            finally:
+                if isinstance(frame, PooledFrame):
+                    frame.release()  # il buffer torna alla camera
+                # Anche i ticket senza risultato vanno consegnati
+                self.delivery.submit(ticket, result)
+
+    def _deliver(self, result: DetectionResult) -> None:
+        if result.confidence >= CONFIG["CONFIDENCE_THRESHOLD"]:
+            self.last_detection = result
+            self._update_map(result)
+            if self.event_bus is not None:
+                self.event_bus.publish("detection", result)
+
+    def frame_age_stats(self) -> Dict[str, float]:
+        """Età dei frame (ms) al momento dell'inferenza: media, p50, p95, max."""
+        ages = sorted(self.frame_ages_ms)
+        if not ages:
+            return {"count": 0}
+        n = len(ages)
+        return {
+            "count": n,
+            "mean_ms": sum(ages) / n,
+            "p50_ms": ages[n // 2],
+            "p95_ms": ages[min(n - 1, int(n * 0.95))],
+            "max_ms": ages[-1],
+        }
 
     def _update_map(self, result: DetectionResult) -> None:
         """
@@ -376,46 +1810,203 @@ class InferenceThread(threading.Thread):
             "LETTER_H": CellState.LETTER_H,
         }
 
+        # La detection si somma all'evidenza della cella, pesata per confidenza
         state = label_to_state.get(result.label, CellState.FLOOR)
-        self.grid_map.set_cell(self.current_x, self.current_y, state)
+        self.grid_map.observe(self.current_x, self.current_y, state, result.confidence)
 
         # Avanza posizione (simulazione movimento)
         self.current_x += random.choice([-1, 0, 1])
         self.current_y += random.choice([-1, 0, 1])
 
     def stop(self) -> None:
-        """Ferma il thread."""
+        """Ferma il thread e i worker."""
         self.running = False
+        self.frame_slot.close()
+        for worker in self.workers:
+            worker.join(timeout=1.0)
 
 
 # ============================================================================
 # SISTEMA UI (PYGAME)
 # ============================================================================
 
+class MapViewport:
+    """
+    Camera della vista mappa.
+
+    La cella (x, y) occupa i pixel "mondo" [x * tile, (x + 1) * tile);
+    `origin` è il pixel mondo nell'angolo in alto a sinistra della vista.
+    Lo zoom scorre sui livelli di CONFIG["ZOOM_LEVELS"]; sotto
+    `lod_tile_size` i tile si disegnano senza bordi né icone.
+    """
+
+    def __init__(self, width: int, height: int, tile_size: int = CONFIG["TILE_SIZE"],
+                 zoom_levels=CONFIG["ZOOM_LEVELS"], lod_tile_size: int = CONFIG["LOD_TILE_SIZE"]):
+        """
+        Args:
+            width, height: Dimensione della vista in pixel
+            tile_size: Zoom iniziale (pixel per cella)
+            zoom_levels: Dimensioni ammesse del tile
+            lod_tile_size: Dimensione minima del tile con bordi e icone
+        """
+        self.width = width
+        self.height = height
+        self.zoom_levels = sorted(set(zoom_levels) | {tile_size})
+        self.tile_size = tile_size
+        self.lod_tile_size = lod_tile_size
+        self.origin = (0, 0)
+
+    @property
+    def detailed(self) -> bool:
+        return self.tile_size >= self.lod_tile_size
+
+    def state(self) -> Tuple[int, int, int]:
+        """Chiave della vista corrente: se cambia la griglia va ridisegnata da zero."""
+        return self.origin[0], self.origin[1], self.tile_size
+
+    def visible_cells(self) -> Tuple[int, int, int, int]:
+        """(min_x, max_x, min_y, max_y) delle celle che intersecano la vista."""
+        size = self.tile_size
+        ox, oy = self.origin
+        return ox // size, (ox + self.width - 1) // size, oy // size, (oy + self.height - 1) // size
+
+    def cell_rect(self, x: int, y: int) -> pygame.Rect:
+        """Rettangolo della cella in coordinate della vista."""
+        size = self.tile_size
+        return pygame.Rect(x * size - self.origin[0], y * size - self.origin[1], size, size)
+
+    def anchor(self, x: int, y: int) -> None:
+        """Porta la cella (x, y) nell'angolo in alto a sinistra."""
+        self.origin = (x * self.tile_size, y * self.tile_size)
+
+    def pan(self, dx: int, dy: int) -> None:
+        """Sposta il contenuto di (dx, dy) pixel (come trascinandolo)."""
+        self.origin = (self.origin[0] - dx, self.origin[1] - dy)
+
+    def zoom(self, steps: int, anchor: Optional[Tuple[int, int]] = None) -> bool:
+        """
+        Cambia livello di zoom tenendo fermo il punto sotto `anchor`.
+
+        Args:
+            steps: Livelli da salire (>0, ingrandisce) o scendere (<0)
+            anchor: Pixel della vista che resta fermo (default: centro)
+
+        Returns:
+            True se lo zoom è cambiato
+        """
+        index = self.zoom_levels.index(self.tile_size) if self.tile_size in self.zoom_levels else 0
+        index = min(max(index + steps, 0), len(self.zoom_levels) - 1)
+        new_size = self.zoom_levels[index]
+        if new_size == self.tile_size:
+            return False
+        ax, ay = anchor if anchor is not None else (self.width // 2, self.height // 2)
+        wx = (self.origin[0] + ax) / self.tile_size
+        wy = (self.origin[1] + ay) / self.tile_size
+        self.tile_size = new_size
+        self.origin = (round(wx * new_size - ax), round(wy * new_size - ay))
+        return True
+
+    def follow(self, x: int, y: int, margin: float = CONFIG["FOLLOW_MARGIN"]) -> None:
+        """
+        Tiene la cella (x, y) nella zona centrale: la vista si sposta solo
+        quando la cella entra nel margine esterno (se è fuori vista, la centra).
+        """
+        rect = self.cell_rect(x, y)
+        if rect.right <= 0 or rect.bottom <= 0 or rect.x >= self.width or rect.y >= self.height:
+            size = self.tile_size
+            self.origin = (x * size + size // 2 - self.width // 2, y * size + size // 2 - self.height // 2)
+            return
+        mx, my = int(self.width * margin), int(self.height * margin)
+        dx = dy = 0
+        if rect.x < mx:
+            dx = rect.x - mx
+        elif rect.right > self.width - mx:
+            dx = rect.right - (self.width - mx)
+        if rect.y < my:
+            dy = rect.y - my
+        elif rect.bottom > self.height - my:
+            dy = rect.bottom - (self.height - my)
+        self.origin = (self.origin[0] + dx, self.origin[1] + dy)
+
+
 class MazeMapperUI:
     """
     Interfaccia grafica professionale per la mappatura.
     Gestisce rendering e interazione utente.
+
+    Il rendering è incrementale: la griglia vive su una surface off-screen in
+    cui si ridisegnano solo le celle cambiate (GridMap.changes_since), testi
+    e legenda sono pre-renderizzati e lo schermo viene aggiornato solo nei
+    rettangoli sporchi, così il costo per frame segue le modifiche della
+    mappa e non la sua dimensione.
+
+    La griglia è vista attraverso una MapViewport (zoom, pan, inseguimento
+    del robot): si disegnano solo le celle visibili, quindi anche il
+    ridisegno completo costa al massimo una vista, qualunque sia la mappa.
     """
 
-    def __init__(self, grid_map: GridMap, inference_thread: InferenceThread):
+    LEGEND_ITEMS = [
+        ("Muro", "WALL", "rect"),
+        ("Pavimento", "FLOOR", "rect"),
+        ("Partenza", "START", "circle"),
+        ("Vittima", "VICTIM", "circle"),
+        ("Lettera X", "LETTER_X", "text"),
+        ("Lettera Y", "LETTER_Y", "text"),
+        ("Lettera H", "LETTER_H", "text"),
+        ("Robot", "ROBOT", "rect"),
+    ]
+
+    # Frecce: spostamento del contenuto (la vista va nel verso della freccia)
+    PAN_KEYS = {
+        pygame.K_LEFT: (1, 0),
+        pygame.K_RIGHT: (-1, 0),
+        pygame.K_UP: (0, 1),
+        pygame.K_DOWN: (0, -1),
+    }
+
+    # Evento pygame con cui il bus sveglia il loop (mappa, detection, robot)
+    WAKE_EVENT = pygame.USEREVENT
+    # Attesa massima senza eventi (aggiorna comunque la barra di stato)
+    IDLE_WAIT_MS = 1000
+    # Driver SDL in cui pygame.event.wait() dorme davvero (SDL >= 2.0.22); con
+    # gli altri (dummy, kmsdrm, ...) SDL la implementa con un ciclo da 1 ms,
+    # quindi si attende sul bus leggendo l'input ogni INPUT_POLL_S, intervallo
+    # che raddoppia a riposo fino a INPUT_POLL_MAX_S
+    BLOCKING_EVENT_DRIVERS = ("x11", "wayland", "windows", "cocoa")
+    INPUT_POLL_S = 0.03
+    INPUT_POLL_MAX_S = 0.25
+
+    def __init__(self, grid_map: GridMap, inference_thread: InferenceThread,
+                 event_bus: Optional[EventBus] = None):
         """
         Inizializza la UI.
 
         Args:
             grid_map: Sistema di mappatura
             inference_thread: Thread di inferenza (per stats)
+            event_bus: Se presente il loop dorme finché non arriva un evento
+                (input, mappa, detection, robot) invece di ridisegnare a FPS fissi
         """
         pygame.init()
 
         self.grid_map = grid_map
         self.inference_thread = inference_thread
+        self.event_bus = event_bus
+        self._wake_pending = False
+        self._blocking_events = False  # deciso dopo l'apertura della finestra
+        self._bus_topics = ("map", "detection", "robot", EventBus.STOP)
+        self._bus_seen = {topic: -1 for topic in self._bus_topics}
+        self._input_poll_s = self.INPUT_POLL_S
+        if event_bus is not None:
+            event_bus.subscribe(self._on_bus_event, self._bus_topics)
 
         # Setup finestra
         self.screen = pygame.display.set_mode(
             (CONFIG["WINDOW_WIDTH"], CONFIG["WINDOW_HEIGHT"])
         )
         pygame.display.set_caption("Sistema di Mappatura Labirinto")
+        self._blocking_events = (pygame.display.get_driver() in self.BLOCKING_EVENT_DRIVERS
+                                 and pygame.get_sdl_version() >= (2, 0, 22))
 
         # Clock per FPS
         self.clock = pygame.time.Clock()
@@ -430,148 +2021,251 @@ class MazeMapperUI:
         self.legend_panel_rect = pygame.Rect(
             CONFIG["WINDOW_WIDTH"] - 280, 80, 260, 500
         )
+        self.status_rect = pygame.Rect(
+            0, CONFIG["WINDOW_HEIGHT"] - 40, CONFIG["WINDOW_WIDTH"], 40
+        )
+
+        # Area della griglia: tra header, legenda e barra di stato
+        self.grid_rect = pygame.Rect(
+            CONFIG["GRID_OFFSET_X"], CONFIG["GRID_OFFSET_Y"],
+            self.legend_panel_rect.x - 20 - CONFIG["GRID_OFFSET_X"],
+            self.status_rect.y - 10 - CONFIG["GRID_OFFSET_Y"],
+        )
+        self.grid_surface = pygame.Surface(self.grid_rect.size)
+
+        # Colori e tile pre-renderizzati per ogni stato
+        self._cell_colors = {
+            CellState.WALL: CONFIG["COLORS"]["WALL"],
+            CellState.FLOOR: CONFIG["COLORS"]["FLOOR"],
+            CellState.START_POINT: CONFIG["COLORS"]["START"],
+            CellState.VICTIM_FOUND: CONFIG["COLORS"]["VICTIM"],
+            CellState.LETTER_X: CONFIG["COLORS"]["LETTER_X"],
+            CellState.LETTER_Y: CONFIG["COLORS"]["LETTER_Y"],
+            CellState.LETTER_H: CONFIG["COLORS"]["LETTER_H"],
+            CellState.UNKNOWN: CONFIG["COLORS"]["FLOOR"],
+        }
+        self._viewport = MapViewport(*self.grid_rect.size)
+        self._view_mode = "anchor"  # "anchor" (angolo della mappa), "follow" (robot), "free"
+        self._drag_start = None
+        self._rasterizers = {}
+        self._set_tile_size()
+
+        # Superfici statiche
+        self._header_surface = self._build_header()
+        self._legend_surface, self._legend_dynamic_rect = self._build_legend_panel()
+        self._status_surface = self._build_status_bar()
+        self._waiting_text = self.font_normal.render(
+            "In attesa di dati...", True, CONFIG["COLORS"]["TEXT_SECONDARY"]
+        )
+
+        # Stato del rendering incrementale
+        self._map_version = -1
+        self._view_state = None  # stato della viewport usato per l'ultimo disegno
+        self._robot_drawn = None  # cella in cui è disegnato il robot
+        self._grid_empty = True
+        self._legend_state = None
+        self._status_fps = None
+        self._needs_full_redraw = True
 
     def run(self) -> None:
         """Loop principale della UI."""
         while self.running:
-            self._handle_events()
+            self._handle_events(self._wait_for_events())
             self._update()
             self._render()
-            self.clock.tick(CONFIG["FPS"])
+            self.clock.tick(CONFIG["FPS"])  # limite superiore al ritmo di ridisegno
 
+        self._wake_pending = True  # nessun altro evento dal bus dopo la chiusura
         pygame.quit()
 
-    def _handle_events(self) -> None:
+    def _wait_for_events(self) -> list:
+        """
+        Eventi pygame da gestire. Senza bus restituisce subito quelli in coda
+        (ridisegno a FPS fissi); con il bus dorme finché non arriva un evento.
+        """
+        if self.event_bus is None:
+            return pygame.event.get()
+        if not self._blocking_events:
+            seen = self.event_bus.wait(self._bus_seen, self._input_poll_s)
+            events = pygame.event.get()
+            if events or seen != self._bus_seen:
+                self._input_poll_s = self.INPUT_POLL_S
+            else:
+                self._input_poll_s = min(2 * self._input_poll_s, self.INPUT_POLL_MAX_S)
+            self._bus_seen = seen
+            return events
+        first = pygame.event.wait(self.IDLE_WAIT_MS)
+        if first.type == pygame.NOEVENT:
+            return []
+        return [first] + pygame.event.get()
+
+    def _on_bus_event(self, topic: str, payload) -> None:
+        """Callback del bus (thread del produttore): un solo WAKE_EVENT in coda alla volta."""
+        try:
+            if topic == EventBus.STOP:
+                pygame.event.post(pygame.event.Event(pygame.QUIT))
+            elif self._blocking_events and not self._wake_pending:
+                self._wake_pending = True
+                pygame.event.post(pygame.event.Event(self.WAKE_EVENT))
+        except pygame.error:
+            pass  # display già chiuso
+
+    def _handle_events(self, events: Optional[list] = None) -> None:
         """Gestisce eventi pygame."""
-        for event in pygame.event.get():
+        for event in events if events is not None else pygame.event.get():
             if event.type == pygame.QUIT:
                 self.running = False
+            elif event.type == self.WAKE_EVENT:
+                self._wake_pending = False
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_ESCAPE:
                     self.running = False
                 elif event.key == pygame.K_c:
                     # Clear map
-                    self.grid_map.grid.clear()
+                    self.grid_map.clear()
+                elif event.key in (pygame.K_PLUS, pygame.K_EQUALS, pygame.K_KP_PLUS):
+                    self._zoom(1)
+                elif event.key in (pygame.K_MINUS, pygame.K_KP_MINUS):
+                    self._zoom(-1)
+                elif event.key in self.PAN_KEYS:
+                    dx, dy = self.PAN_KEYS[event.key]
+                    step = 3 * self._viewport.tile_size
+                    self._pan(dx * step, dy * step)
+                elif event.key == pygame.K_f:
+                    self._view_mode = "free" if self._view_mode == "follow" else "follow"
+                elif event.key == pygame.K_HOME:
+                    self._reset_view()
+            elif event.type == pygame.MOUSEWHEEL:
+                mouse = pygame.mouse.get_pos()
+                if self.grid_rect.collidepoint(mouse):
+                    self._zoom(event.y, (mouse[0] - self.grid_rect.x, mouse[1] - self.grid_rect.y))
+            elif event.type == pygame.MOUSEBUTTONDOWN and event.button in (1, 3):
+                if self.grid_rect.collidepoint(event.pos):
+                    self._drag_start = event.pos
+            elif event.type == pygame.MOUSEBUTTONUP and event.button in (1, 3):
+                self._drag_start = None
+            elif event.type == pygame.MOUSEMOTION and self._drag_start is not None:
+                self._pan(*event.rel)
+            elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                self._needs_full_redraw = True
+
+    def _zoom(self, steps: int, anchor: Optional[Tuple[int, int]] = None) -> None:
+        """Zoom della vista; in modalità "anchor" la vista diventa libera."""
+        if self._viewport.zoom(steps, anchor):
+            if self._view_mode == "anchor":
+                self._view_mode = "free"
+            self._set_tile_size()
+
+    def _pan(self, dx: int, dy: int) -> None:
+        """Sposta la vista a mano (interrompe anche l'inseguimento del robot)."""
+        self._viewport.pan(dx, dy)
+        self._view_mode = "free"
+
+    def _reset_view(self) -> None:
+        """Zoom iniziale e angolo della mappa in alto a sinistra."""
+        self._view_mode = "anchor"
+        if self._viewport.tile_size != CONFIG["TILE_SIZE"]:
+            self._viewport.tile_size = CONFIG["TILE_SIZE"]
+            self._set_tile_size()
+
+    def _update_viewport(self) -> None:
+        """Aggiorna la camera secondo la modalità corrente."""
+        if self._view_mode == "anchor":
+            min_x, _, min_y, _ = self.grid_map.get_bounds()
+            self._viewport.anchor(min_x, min_y)
+        elif self._view_mode == "follow":
+            self._viewport.follow(*self.grid_map.current_position)
 
     def _update(self) -> None:
         """Aggiorna logica (se necessario)."""
         pass
 
     def _render(self) -> None:
-        """Renderizza tutta la UI."""
-        # Background
-        self.screen.fill(CONFIG["COLORS"]["BACKGROUND"])
-
-        # Header
-        self._render_header()
-
-        # Grid
-        self._render_grid()
-
-        # Legend Panel
-        self._render_legend_panel()
-
-        # Status Bar
-        self._render_status_bar()
-
-        pygame.display.flip()
-
-    def _render_header(self) -> None:
+        """Aggiorna lo schermo ridisegnando solo le parti cambiate."""
+        dirty = self._render_grid()
+        dirty += self._render_legend_panel()
+        dirty += self._render_status_bar()
+
+        if self._needs_full_redraw:
+            self.screen.fill(CONFIG["COLORS"]["BACKGROUND"])
+            self.screen.blit(self._header_surface, (0, 0))
+            self.screen.blit(self.grid_surface, self.grid_rect)
+            self.screen.blit(self._legend_surface, self.legend_panel_rect)
+            self._blit_legend_dynamic()
+            self.screen.blit(self._status_surface, self.status_rect)
+            self._blit_status_text()
+            pygame.display.flip()
+            self._needs_full_redraw = False
+        elif dirty:
+            pygame.display.update(dirty)
+
+    # ------------------------------------------------------------------
+    # Superfici pre-renderizzate
+    # ------------------------------------------------------------------
+
+    def _set_tile_size(self) -> None:
+        """Raster e tile pre-renderizzati per lo zoom (e livello di dettaglio) correnti."""
+        from map_raster import MapRasterizer
+        key = (self._viewport.tile_size, self._viewport.detailed)
+        if key not in self._rasterizers:
+            self._rasterizers[key] = MapRasterizer(key[0], CONFIG["COLORS"], detail=key[1])
+        self._rasterizer = self._rasterizers[key]
+        self._tiles = {state: self._build_tile(state) for state in CellState}
+
+    def _build_tile(self, state: CellState) -> pygame.Surface:
+        """Tile completo (sfondo, bordo, icona) per uno stato, dallo stesso raster dell'export."""
+        return pygame.surfarray.make_surface(self._rasterizer.stamps[state.value].transpose(1, 0, 2))
+
+    def _build_header(self) -> pygame.Surface:
         """Renderizza l'header."""
-        header_rect = pygame.Rect(0, 0, CONFIG["WINDOW_WIDTH"], 70)
-        pygame.draw.rect(self.screen, CONFIG["COLORS"]["HEADER_BG"], header_rect)
+        header = pygame.Surface((CONFIG["WINDOW_WIDTH"], 70))
+        header.fill(CONFIG["COLORS"]["HEADER_BG"])
 
         # Titolo
         title_text = self.font_title.render(
             "🗺️  MAPPATURA DEL LABIRINTO", True, CONFIG["COLORS"]["TEXT_PRIMARY"]
         )
         title_rect = title_text.get_rect(center=(CONFIG["WINDOW_WIDTH"] // 2, 35))
-        self.screen.blit(title_text, title_rect)
-
-    def _render_grid(self) -> None:
-        """Renderizza la griglia del labirinto."""
-        cells = self.grid_map.get_all_cells()
-
-        if not cells:
-            # Nessuna cella da renderizzare
-            no_data_text = self.font_normal.render(
-                "In attesa di dati...", True, CONFIG["COLORS"]["TEXT_SECONDARY"]
-            )
-            self.screen.blit(no_data_text, (CONFIG["GRID_OFFSET_X"], CONFIG["GRID_OFFSET_Y"]))
-            return
-
-        # Calcola bounds
-        min_x, max_x, min_y, max_y = self.grid_map.get_bounds()
+        header.blit(title_text, title_rect)
+        return header
 
-        # Renderizza celle
-        for (x, y), state in cells.items():
-            screen_x = CONFIG["GRID_OFFSET_X"] + (x - min_x) * CONFIG["TILE_SIZE"]
-            screen_y = CONFIG["GRID_OFFSET_Y"] + (y - min_y) * CONFIG["TILE_SIZE"]
+    def _build_legend_panel(self) -> Tuple[pygame.Surface, pygame.Rect]:
+        """
+        Parte statica del pannello legenda.
 
-            cell_rect = pygame.Rect(
-                screen_x, screen_y, CONFIG["TILE_SIZE"], CONFIG["TILE_SIZE"]
-            )
+        Returns:
+            (surface del pannello, rettangolo delle statistiche in coordinate pannello)
+        """
+        panel = pygame.Surface(self.legend_panel_rect.size)
+        panel.fill(CONFIG["COLORS"]["BACKGROUND"])
+        local_rect = panel.get_rect()
 
-            # Colore in base allo stato
-            color = self._get_cell_color(state)
-            pygame.draw.rect(self.screen, color, cell_rect)
-            pygame.draw.rect(self.screen, CONFIG["COLORS"]["GRID_LINE"], cell_rect, 1)
-
-            # Icona/Testo per stati speciali
-            if state == CellState.VICTIM_FOUND:
-                pygame.draw.circle(
-                    self.screen, CONFIG["COLORS"]["ACCENT_RED"],
-                    cell_rect.center, CONFIG["TILE_SIZE"] // 3
-                )
-            elif state in [CellState.LETTER_X, CellState.LETTER_Y, CellState.LETTER_H]:
-                letter = state.name.split("_")[1]
-                letter_text = self.font_small.render(letter, True, (255, 255, 255))
-                letter_rect = letter_text.get_rect(center=cell_rect.center)
-                self.screen.blit(letter_text, letter_rect)
-
-    def _render_legend_panel(self) -> None:
-        """Renderizza il pannello legenda."""
         # Background
-        pygame.draw.rect(
-            self.screen, CONFIG["COLORS"]["PANEL_BG"], self.legend_panel_rect, 0, 10
-        )
-        pygame.draw.rect(
-            self.screen, CONFIG["COLORS"]["ACCENT_BLUE"], self.legend_panel_rect, 2, 10
-        )
+        pygame.draw.rect(panel, CONFIG["COLORS"]["PANEL_BG"], local_rect, 0, 10)
+        pygame.draw.rect(panel, CONFIG["COLORS"]["ACCENT_BLUE"], local_rect, 2, 10)
 
         # Titolo legenda
         title = self.font_normal.render("📋 LEGENDA", True, CONFIG["COLORS"]["TEXT_PRIMARY"])
-        self.screen.blit(title, (self.legend_panel_rect.x + 20, self.legend_panel_rect.y + 15))
+        panel.blit(title, (20, 15))
 
         # Elementi legenda
-        legend_items = [
-            ("Muro", CONFIG["COLORS"]["WALL"], "rect"),
-            ("Pavimento", CONFIG["COLORS"]["FLOOR"], "rect"),
-            ("Partenza", CONFIG["COLORS"]["START"], "circle"),
-            ("Vittima", CONFIG["COLORS"]["VICTIM"], "circle"),
-            ("Lettera X", CONFIG["COLORS"]["LETTER_X"], "text"),
-            ("Lettera Y", CONFIG["COLORS"]["LETTER_Y"], "text"),
-            ("Lettera H", CONFIG["COLORS"]["LETTER_H"], "text"),
-        ]
-
         y_offset = 55
-        for label, color, shape_type in legend_items:
-            icon_x = self.legend_panel_rect.x + 25
-            icon_y = self.legend_panel_rect.y + y_offset
+        for label, color_key, shape_type in self.LEGEND_ITEMS:
+            color = CONFIG["COLORS"][color_key]
+            icon_x, icon_y = 25, y_offset
 
             if shape_type == "rect":
-                pygame.draw.rect(self.screen, color, (icon_x, icon_y, 20, 20))
+                pygame.draw.rect(panel, color, (icon_x, icon_y, 20, 20))
             elif shape_type == "circle":
-                pygame.draw.circle(self.screen, color, (icon_x + 10, icon_y + 10), 10)
+                pygame.draw.circle(panel, color, (icon_x + 10, icon_y + 10), 10)
             elif shape_type == "text":
                 letter = label.split()[-1]
                 letter_surf = self.font_small.render(letter, True, (255, 255, 255))
-                letter_bg = pygame.Rect(icon_x, icon_y, 20, 20)
-                pygame.draw.rect(self.screen, color, letter_bg)
-                self.screen.blit(letter_surf, (icon_x + 5, icon_y + 3))
+                pygame.draw.rect(panel, color, pygame.Rect(icon_x, icon_y, 20, 20))
+                panel.blit(letter_surf, (icon_x + 5, icon_y + 3))
 
             text = self.font_small.render(label, True, CONFIG["COLORS"]["TEXT_SECONDARY"])
-            self.screen.blit(text, (icon_x + 30, icon_y + 2))
+            panel.blit(text, (icon_x + 30, icon_y + 2))
 
             y_offset += 35
 
@@ -580,12 +2274,162 @@ class MazeMapperUI:
         stats_title = self.font_normal.render(
             "📊 STATISTICHE", True, CONFIG["COLORS"]["TEXT_PRIMARY"]
         )
-        self.screen.blit(stats_title, (self.legend_panel_rect.x + 20,
-                                       self.legend_panel_rect.y + y_offset))
+        panel.blit(stats_title, (20, y_offset))
+        y_offset += 35
+
+        # Righe statistiche (4) + confidenza AI
+        dynamic_rect = pygame.Rect(20, y_offset, local_rect.width - 30, 4 * 25 + 10 + 20)
+        return panel, dynamic_rect
+
+    def _build_status_bar(self) -> pygame.Surface:
+        """Parte statica della barra di stato (sfondo e istruzioni)."""
+        bar = pygame.Surface(self.status_rect.size)
+        bar.fill(CONFIG["COLORS"]["HEADER_BG"])
+
+        # Istruzioni
+        help_text = "ESC: Esci  |  C: Pulisci  |  +/-: Zoom  |  Frecce: Sposta  |  F: Segui robot  |  Home: Reset"
+        help_surf = self.font_small.render(
+            help_text, True, CONFIG["COLORS"]["TEXT_SECONDARY"]
+        )
+        help_rect = help_surf.get_rect(right=CONFIG["WINDOW_WIDTH"] - 20, centery=20)
+        bar.blit(help_surf, help_rect)
+        return bar
+
+    # ------------------------------------------------------------------
+    # Aggiornamenti incrementali
+    # ------------------------------------------------------------------
+
+    def _render_grid(self) -> List[pygame.Rect]:
+        """
+        Aggiorna la surface della griglia con le celle cambiate.
+
+        Returns:
+            Rettangoli dello schermo da aggiornare
+        """
+        changes = self.grid_map.changes_since(self._map_version)
+        self._update_viewport()
+        view_state = self._viewport.state()
+        robot = self.grid_map.current_position
+        if (changes.version == self._map_version and view_state == self._view_state
+                and (self._grid_empty or robot == self._robot_drawn)):
+            return []
+        self._map_version = changes.version
+
+        if changes.full_resync or view_state != self._view_state:
+            # Vista spostata/zoomata (o resync): si ridisegna tutta la surface
+            self._view_state = view_state
+            self._redraw_grid_surface()
+            self.screen.blit(self.grid_surface, self.grid_rect)
+            return [self.grid_rect.copy()]
+
+        if self._grid_empty:
+            self.grid_surface.fill(CONFIG["COLORS"]["BACKGROUND"])
+            self._grid_empty = False
+            self.screen.blit(self.grid_surface, self.grid_rect)
+            dirty_local = [self.grid_surface.get_rect()]
+        else:
+            dirty_local = []
+
+        for (x, y), state in changes.cells.items():
+            rect = self._draw_tile(x, y, state, self.grid_map.get_walls(x, y))
+            if rect is not None:
+                dirty_local.append(rect)
+        for (x, y), walls in changes.walls.items():
+            if (x, y) not in changes.cells:
+                rect = self._draw_tile(x, y, self.grid_map.get_cell(x, y), walls)
+                if rect is not None:
+                    dirty_local.append(rect)
+
+        # Robot: si ripristina la cella lasciata e si ridisegna quella corrente
+        if robot != self._robot_drawn or robot in changes.cells or robot in changes.walls:
+            for x, y in {self._robot_drawn, robot} - {None}:
+                rect = self._draw_tile(x, y, self.grid_map.get_cell(x, y), self.grid_map.get_walls(x, y))
+                if rect is not None:
+                    dirty_local.append(rect)
+            self._draw_robot(*robot)
+            self._robot_drawn = robot
+
+        dirty = []
+        for rect in dirty_local:
+            screen_rect = rect.move(self.grid_rect.topleft)
+            self.screen.blit(self.grid_surface, screen_rect, area=rect)
+            dirty.append(screen_rect)
+        return dirty
+
+    def _redraw_grid_surface(self) -> None:
+        """Ridisegna da zero la surface della griglia (raster NumPy della sola vista + un blit)."""
+        snapshot = self.grid_map.snapshot()
+        self._grid_empty = not snapshot.cells and not snapshot.walls
+
+        if self._grid_empty:
+            # Nessuna cella da renderizzare
+            self.grid_surface.fill(CONFIG["COLORS"]["BACKGROUND"])
+            self.grid_surface.blit(self._waiting_text, (0, 0))
+            self._robot_drawn = None
+            return
+
+        # Solo le celle visibili, poi si ritaglia lo scostamento sub-cella dell'origine
+        view = self._viewport
+        bounds = view.visible_cells()
+        robot = self.grid_map.current_position
+        image = self._rasterizer.render(snapshot, bounds, markers=[(*robot, CONFIG["COLORS"]["ROBOT"])])
+        size = view.tile_size
+        sx, sy = view.origin[0] - bounds[0] * size, view.origin[1] - bounds[2] * size
+        image = image[sy:sy + view.height, sx:sx + view.width]
+        pygame.surfarray.blit_array(self.grid_surface, image.transpose(1, 0, 2))
+        self._robot_drawn = robot
+
+    def _draw_tile(self, x: int, y: int, state: CellState, walls: int = 0) -> Optional[pygame.Rect]:
+        """Disegna una cella (con i muri sui lati) sulla surface della griglia (None se fuori vista)."""
+        rect = self._viewport.cell_rect(x, y)
+        area = self.grid_surface.get_rect()
+        if not rect.colliderect(area):
+            return None
 
+        if state == CellState.UNKNOWN:
+            self.grid_surface.fill(CONFIG["COLORS"]["BACKGROUND"], rect)
+        else:
+            self.grid_surface.blit(self._tiles[state], rect)
+
+        size = rect.width
+        if walls and size >= 4:
+            color = CONFIG["COLORS"]["WALL"]
+            thickness = self._rasterizer.wall_thickness
+            if walls & WALL_N:
+                self.grid_surface.fill(color, (rect.x, rect.y, size, thickness))
+            if walls & WALL_S:
+                self.grid_surface.fill(color, (rect.x, rect.bottom - thickness, size, thickness))
+            if walls & WALL_W:
+                self.grid_surface.fill(color, (rect.x, rect.y, thickness, size))
+            if walls & WALL_E:
+                self.grid_surface.fill(color, (rect.right - thickness, rect.y, thickness, size))
+        return rect.clip(area)
+
+    def _draw_robot(self, x: int, y: int) -> None:
+        """Marker del robot (stesso quadrato di MapRasterizer.draw_marker)."""
+        rect = self._viewport.cell_rect(x, y)
+        inset = rect.width // 4
+        self.grid_surface.fill(CONFIG["COLORS"]["ROBOT"], rect.inflate(-2 * inset, -2 * inset))
+
+    def _render_legend_panel(self) -> List[pygame.Rect]:
+        """Aggiorna statistiche e confidenza solo se cambiate."""
         stats = self.grid_map.get_stats()
-        y_offset += 35
+        detection = self.inference_thread.last_detection
+        conf = round(detection.confidence * 100, 1) if detection else None
 
+        state = (tuple(stats.values()), conf)
+        if state == self._legend_state:
+            return []
+        self._legend_state = state
+        return [self._blit_legend_dynamic()]
+
+    def _blit_legend_dynamic(self) -> pygame.Rect:
+        """Disegna la parte dinamica della legenda e ne restituisce il rettangolo a schermo."""
+        area = self._legend_dynamic_rect
+        screen_rect = area.move(self.legend_panel_rect.topleft)
+        self.screen.blit(self._legend_surface, screen_rect, area=area)
+
+        stats = self.grid_map.get_stats()
         stats_lines = [
             f"Celle mappate: {stats['total_cells']}",
             f"Vittime trovate: {stats['victims_found']}",
@@ -593,28 +2437,37 @@ class MazeMapperUI:
             f"Muri rilevati: {stats['walls_detected']}",
         ]
 
+        x = self.legend_panel_rect.x + 25
+        y = screen_rect.y
         for line in stats_lines:
             text = self.font_small.render(line, True, CONFIG["COLORS"]["TEXT_SECONDARY"])
-            self.screen.blit(text, (self.legend_panel_rect.x + 25,
-                                   self.legend_panel_rect.y + y_offset))
-            y_offset += 25
+            self.screen.blit(text, (x, y))
+            y += 25
 
         # Confidenza ultima detection
         if self.inference_thread.last_detection:
-            y_offset += 10
+            y += 10
             conf = self.inference_thread.last_detection.confidence * 100
             conf_text = self.font_small.render(
                 f"Confidenza AI: {conf:.1f}%", True, CONFIG["COLORS"]["ACCENT_GREEN"]
             )
-            self.screen.blit(conf_text, (self.legend_panel_rect.x + 25,
-                                        self.legend_panel_rect.y + y_offset))
+            self.screen.blit(conf_text, (x, y))
 
-    def _render_status_bar(self) -> None:
-        """Renderizza la barra di stato in basso."""
-        status_rect = pygame.Rect(
-            0, CONFIG["WINDOW_HEIGHT"] - 40, CONFIG["WINDOW_WIDTH"], 40
-        )
-        pygame.draw.rect(self.screen, CONFIG["COLORS"]["HEADER_BG"], status_rect)
+        return screen_rect
+
+    def _render_status_bar(self) -> List[pygame.Rect]:
+        """Aggiorna la barra di stato solo quando cambia l'FPS mostrato."""
+        fps = int(self.clock.get_fps())
+        if fps == self._status_fps:
+            return []
+        self._status_fps = fps
+        return [self._blit_status_text()]
+
+    def _blit_status_text(self) -> pygame.Rect:
+        """Disegna il testo di stato e restituisce il rettangolo a schermo."""
+        area = pygame.Rect(0, 0, CONFIG["WINDOW_WIDTH"] // 2, self.status_rect.height)
+        screen_rect = area.move(self.status_rect.topleft)
+        self.screen.blit(self._status_surface, screen_rect, area=area)
 
         # Status
         mode = "DEMO" if CONFIG["DEMO_MODE"] else "LIVE"
@@ -624,81 +2477,11 @@ class MazeMapperUI:
             status_text, True, CONFIG["COLORS"]["ACCENT_GREEN"]
         )
         self.screen.blit(text_surf, (20, CONFIG["WINDOW_HEIGHT"] - 25))
-
-        # Istruzioni
-        help_text = "ESC: Esci  |  C: Pulisci mappa"
-        help_surf = self.font_small.render(
-            help_text, True, CONFIG["COLORS"]["TEXT_SECONDARY"]
-        )
-        help_rect = help_surf.get_rect(right=CONFIG["WINDOW_WIDTH"] - 20,
-                                       centery=CONFIG["WINDOW_HEIGHT"] - 20)
-        self.screen.blit(help_surf, help_rect)
+        return screen_rect
 
     def _get_cell_color(self, state: CellState) -> Tuple[int, int, int]:
         """Mappa CellState a colore."""
-        color_map = {
-            CellState.WALL: CONFIG["COLORS"]["WALL"],
-            CellState.FLOOR: CONFIG["COLORS"]["FLOOR"],
-            CellState.START_POINT: CONFIG["COLORS"]["START"],
-            CellState.VICTIM_FOUND: CONFIG["COLORS"]["VICTIM"],
-            CellState.LETTER_X: CONFIG["COLORS"]["LETTER_X"],
-            CellState.LETTER_Y: CONFIG["COLORS"]["LETTER_Y"],
-            CellState.LETTER_H: CONFIG["COLORS"]["LETTER_H"],
-            CellState.UNKNOWN: CONFIG["COLORS"]["FLOOR"],
-        }
-        return color_map.get(state, CONFIG["COLORS"]["FLOOR"])
-
-
-# ============================================================================
-# MODALITÀ DEMO
-# ============================================================================
-
-class DemoSimulator(threading.Thread):
-    """Simulatore per popolare la mappa con dati casuali (modalità DEMO)."""
-
-    def __init__(self, grid_map: GridMap):
-        super().__init__(daemon=True)
-        self.grid_map = grid_map
-        self.running = False
-
-    def run(self) -> None:
-        """Loop simulazione."""
-        print("[DemoSimulator] Avviato - Generazione mappa casuale")
-        self.running = True
-
-        x, y = 0, 0
-
-        while self.running:
-            # Genera stato casuale
-            state_choices = [
-                CellState.FLOOR, CellState.FLOOR, CellState.FLOOR,  # Più pavimenti
-                CellState.WALL,
-                CellState.VICTIM_FOUND,
-                CellState.LETTER_X, CellState.LETTER_Y, CellState.LETTER_H,
-            ]
-
-            state = random.choice(state_choices)
-            self.grid_map.set_cell(x, y, state)
-
-            # Movimento casuale
-            direction = random.choice(['N', 'S', 'E', 'W', 'NE', 'NW', 'SE', 'SW'])
-            if 'N' in direction:
-                y -= 1
-            if 'S' in direction:
-                y += 1
-            if 'E' in direction:
-                x += 1
-            if 'W' in direction:
-                x -= 1
-
-            # Limita espansione
-            x = max(-15, min(15, x))
-            y = max(-15, min(15, y))
-
-            time.sleep(0.2)  # Aggiornamento ogni 200ms
-
-    def stop(self) -> None:
-        self.running = False
+        return self._cell_colors.get(state, CONFIG["COLORS"]["FLOOR"])
 
 
 # ============================================================================
@@ -714,53 +2497,106 @@ def main():
     print(f" Risoluzione: {CONFIG['WINDOW_WIDTH']}x{CONFIG['WINDOW_HEIGHT']}")
     print("=" * 70)
 
-    # Inizializza componenti
-    grid_map = GridMap(max_size=CONFIG["GRID_MAX_SIZE"])
-    vision_system = VisionSystem(CONFIG["MODEL_PATH"], CONFIG["LABELS_PATH"])
+    # Inizializza componenti: i thread si coordinano sul bus (nessun polling)
+    # e si fermano tutti con event_bus.stop()
+    event_bus = EventBus()
+    grid_map = GridMap(max_size=CONFIG["GRID_MAX_SIZE"], storage=CONFIG["GRID_STORAGE"],
+                       evidence_hysteresis=CONFIG["EVIDENCE_HYSTERESIS"],
+                       evidence_limit=CONFIG["EVIDENCE_LIMIT"], event_bus=event_bus)
+
+    # Persistenza crash-safe: ripristina la mappa solo dopo un crash o un
+    # riavvio (una sessione chiusa correttamente riparte da una mappa vuota)
+    map_journal = None
+    if CONFIG["MAP_STATE_DIR"]:
+        from map_journal import MapJournal
+        map_journal = MapJournal(grid_map, CONFIG["MAP_STATE_DIR"],
+                                 snapshot_interval_s=CONFIG["MAP_SNAPSHOT_INTERVAL"],
+                                 resume_clean=CONFIG["MAP_RESUME_CLEAN"] or "--resume" in sys.argv)
+        map_journal.start()
+
+    # Mappa live per la dashboard web (evento completo + delta)
+    map_server = None
+    if CONFIG["MAP_SERVER_PORT"]:
+        from map_server import MapServer
+        try:
+            map_server = MapServer(grid_map, port=CONFIG["MAP_SERVER_PORT"])
+            map_server.start()
+        except OSError as e:
+            print(f"[MapServer] Avvio fallito: {e}")
+            map_server = None
+
+    # PNG della mappa in background (utile senza display)
+    map_exporter = None
+    if CONFIG["MAP_EXPORT_DIR"]:
+        from map_raster import MapExporter
+        map_exporter = MapExporter(grid_map, CONFIG["MAP_EXPORT_DIR"],
+                                   interval_s=CONFIG["MAP_EXPORT_INTERVAL"],
+                                   sequence=CONFIG["MAP_EXPORT_SEQUENCE"])
+        map_exporter.start()
+
+    workers = max(1, CONFIG["INFERENCE_WORKERS"])
+    vision_systems = [
+        VisionSystem(CONFIG["MODEL_PATH"], CONFIG["LABELS_PATH"],
+                     num_threads=max(1, CONFIG["INFERENCE_THREADS"] // workers), top_k=CONFIG["TOP_K"])
+        for _ in range(workers)
+    ]
 
     # Carica modello AI
-    if not CONFIG["DEMO_MODE"]:
-        if not vision_system.load_model():
+    for vision_system in vision_systems:
+        if not vision_system.load_model() and not CONFIG["DEMO_MODE"]:
             print("[ERRORE] Impossibile caricare il modello AI")
             return
-    else:
-        vision_system.load_model()
 
-    # Queue per comunicazione thread
-    frame_queue = queue.Queue(maxsize=5)
+    # Slot dell'ultimo frame tra camera e inferenza
+    frame_slot = LatestFrameSlot()
 
     # Inizializza threads
     if CONFIG["DEMO_MODE"]:
         # Modalità DEMO: usa simulatore invece di camera/AI reali
         print("[INFO] Avvio modalità DEMO - Simulazione attiva")
-        demo_thread = DemoSimulator(grid_map)
+        from maze_sim import MazeSimulator
+        # Il simulatore esplora da zero: una mappa ripristinata dal journal
+        # risulterebbe già completa (o con muri di un altro labirinto)
+        grid_map.clear()
+        demo_thread = MazeSimulator(grid_map, size=CONFIG["DEMO_MAZE_SIZE"], seed=CONFIG["DEMO_SEED"],
+                                    rate_hz=CONFIG["DEMO_RATE_HZ"], event_bus=event_bus)
         demo_thread.start()
 
         # Thread inferenza dummy
-        inference_thread = InferenceThread(vision_system, grid_map, frame_queue)
+        inference_thread = InferenceThread(vision_systems, grid_map, frame_slot, event_bus=event_bus)
     else:
         # Modalità LIVE: usa camera e AI reali
         print("[INFO] Avvio modalità LIVE - Camera e AI attivi")
-        camera_thread = CameraThread(CONFIG["CAMERA_INDEX"], frame_queue)
+        camera_thread = CameraThread(CONFIG["CAMERA_INDEX"], frame_slot, pool_size=workers + 2,
+                                     debug=CONFIG["FRAME_POOL_DEBUG"], event_bus=event_bus)
         camera_thread.start()
 
-        inference_thread = InferenceThread(vision_system, grid_map, frame_queue)
+        inference_thread = InferenceThread(vision_systems, grid_map, frame_slot, event_bus=event_bus)
         inference_thread.start()
 
     # Avvia UI (thread principale)
     try:
-        ui = MazeMapperUI(grid_map, inference_thread)
+        ui = MazeMapperUI(grid_map, inference_thread, event_bus=event_bus)
         ui.run()
     except KeyboardInterrupt:
         print("\n[INFO] Interruzione da tastiera")
     finally:
-        # Cleanup
+        # Cleanup: un solo segnale sveglia e ferma tutti i thread, poi si
+        # attende la loro uscita e si persistono le ultime modifiche
         print("[INFO] Arresto sistema...")
+        event_bus.stop()
         if CONFIG["DEMO_MODE"]:
-            demo_thread.stop()
+            demo_thread.join(timeout=2.0)
         else:
-            camera_thread.stop()
-            inference_thread.stop()
+            camera_thread.join(timeout=2.0)
+            inference_thread.join(timeout=2.0)
+            inference_thread.stop()  # attende anche i worker
+        if map_server is not None:
+            map_server.stop()
+        if map_exporter is not None:
+            map_exporter.stop()
+        if map_journal is not None:
+            map_journal.stop()
 
         print("[INFO] Sistema arrestato correttamente")
         print("=" * 70)
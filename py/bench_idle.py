@@ -0,0 +1,113 @@
+"""
+Benchmark a riposo della pipeline di Mapping.py: CPU e risvegli al secondo
+dei thread (context switch da /proc) con la mappa ferma, con e senza
+EventBus. Senza bus UI, journal, server ed export fanno polling a intervalli
+fissi; con il bus dormono finché non c'è lavoro.
+
+Misura anche la latenza tra una modifica della mappa e il record nel
+journal: in entrambe le modalità vale circa poll_interval_s (con il bus è la
+finestra in cui si raggruppano le modifiche), quindi il bus non la peggiora.
+
+Uso:
+    python3 bench_idle.py [--seconds 5] [--mode polling bus]
+"""
+
+import argparse
+import glob
+import os
+import tempfile
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+from Mapping import (CONFIG, CellState, EventBus, GridMap, InferenceThread, LatestFrameSlot,
+                     MazeMapperUI, VisionSystem)
+from map_journal import MapJournal
+from map_raster import MapExporter
+from map_server import MapServer
+
+
+def context_switches() -> int:
+    """Context switch (volontari + involontari) di tutti i thread del processo."""
+    total = 0
+    for path in glob.glob(f"/proc/{os.getpid()}/task/*/status"):
+        try:
+            with open(path) as f:
+                for line in f:
+                    if line.startswith(("voluntary_ctxt_switches", "nonvoluntary_ctxt_switches")):
+                        total += int(line.split()[1])
+        except OSError:
+            pass  # thread terminato durante la lettura
+    return total
+
+
+def run_idle(mode, seconds, directory):
+    bus = EventBus() if mode == "bus" else None
+    grid = GridMap(max_size=50, storage="dense", event_bus=bus)
+    grid.set_cell(0, 0, CellState.START_POINT)
+
+    slot = LatestFrameSlot()
+    inference = InferenceThread(VisionSystem("", ""), grid, slot, event_bus=bus)
+    inference.start()
+    journal = MapJournal(grid, os.path.join(directory, mode, "state"), fsync=False)
+    journal.start()
+    server = MapServer(grid, host="127.0.0.1", port=0)
+    server.start()
+    exporter = MapExporter(grid, os.path.join(directory, mode, "export"), interval_s=CONFIG["MAP_EXPORT_INTERVAL"])
+    exporter.start()
+    ui = MazeMapperUI(grid, inference, event_bus=bus)
+
+    def ui_loop(duration):
+        deadline = time.monotonic() + duration
+        while time.monotonic() < deadline:
+            ui._handle_events(ui._wait_for_events())
+            ui._render()
+            ui.clock.tick(CONFIG["FPS"])
+
+    ui_loop(0.5)  # primo disegno e flush iniziali
+    switches, cpu, wall = context_switches(), time.process_time(), time.perf_counter()
+    ui_loop(seconds)
+    wall = time.perf_counter() - wall
+    cpu = time.process_time() - cpu
+    switches = context_switches() - switches
+
+    # Latenza: modifica -> record nel journal
+    latencies = []
+    for i in range(20):
+        written = journal.records_written
+        start = time.perf_counter()
+        grid.set_cell(i + 1, 0, CellState.FLOOR)
+        while journal.records_written == written:
+            time.sleep(0.0005)
+        latencies.append((time.perf_counter() - start) * 1000.0)
+    latencies.sort()
+
+    if bus is not None:
+        bus.stop()
+    inference.stop()
+    inference.join(timeout=1.0)
+    for component in (server, exporter, journal):
+        component.stop()
+    return {
+        "cpu_pct": 100.0 * cpu / wall,
+        "wakeups_s": switches / wall,
+        "journal_p50_ms": latencies[len(latencies) // 2],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CPU e risvegli a riposo, polling vs EventBus")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--mode", nargs="+", default=["polling", "bus"], choices=["polling", "bus"])
+    args = parser.parse_args()
+
+    print(f"== Pipeline a riposo ({args.seconds:.0f} s, driver SDL {os.environ['SDL_VIDEODRIVER']}) ==")
+    print(f"{'modalità':>9} {'CPU %':>7} {'risvegli/s':>11} {'journal p50 ms':>15}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in args.mode:
+            r = run_idle(mode, args.seconds, tmp)
+            print(f"{mode:>9} {r['cpu_pct']:7.2f} {r['wakeups_s']:11.1f} {r['journal_p50_ms']:15.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Benchmark del sistema di mappatura (GridMap).
+
+Uso:
+    python3 bench_mapping.py
+"""
+
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import numpy as np
+
+from Mapping import (GridMap, CellState, MazeMapperUI, InferenceThread, VisionSystem, LatestFrameSlot,
+                     WALL_SIDES, WALL_OFFSETS)
+
+
+def _time_per_call(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e6  # us
+
+
+def _fill(grid, side):
+    half = side // 2
+    states = (CellState.FLOOR, CellState.FLOOR, CellState.WALL, CellState.VICTIM_FOUND, CellState.LETTER_X)
+    start = time.perf_counter()
+    for y in range(-half, side - half):
+        for x in range(-half, side - half):
+            grid.set_cell(x, y, states[(x * 7 + y * 13) % len(states)])
+    return (time.perf_counter() - start) / (side * side) * 1e6
+
+
+def _legacy_bounds(cells):
+    """get_bounds originale: due liste di chiavi ad ogni chiamata."""
+    xs = [x for x, y in cells.keys()]
+    ys = [y for x, y in cells.keys()]
+    return (min(xs), max(xs), min(ys), max(ys))
+
+
+def bench_grid_storage(sizes=(101, 501, 1001)):
+    print("== GridMap storage: dict vs dense ==")
+    print(f"{'lato':>6} {'storage':>8} {'set_cell us':>12} {'get_bounds us':>14} "
+          f"{'get_stats us':>13} {'get_cell us':>12} {'legacy bounds us':>17}")
+    for side in sizes:
+        for storage in ("dict", "dense"):
+            grid = GridMap(max_size=side, storage=storage)
+            set_us = _fill(grid, side)
+            repeat = 2000
+            bounds_us = _time_per_call(grid.get_bounds, repeat)
+            stats_us = _time_per_call(grid.get_stats, repeat)
+            cell_us = _time_per_call(lambda: grid.get_cell(3, -4), repeat)
+            legacy = ""
+            if storage == "dict":
+                cells = grid.get_all_cells()
+                legacy = f"{_time_per_call(lambda: _legacy_bounds(cells), 5):17.1f}"
+            print(f"{side:>6} {storage:>8} {set_us:12.2f} {bounds_us:14.2f} "
+                  f"{stats_us:13.2f} {cell_us:12.2f} {legacy:>17}")
+
+
+def bench_ui_render(sides=(11, 31, 51), frames=200):
+    """Tempo per frame della UI: ridisegno completo vs incrementale (1 cella cambiata/frame)."""
+    print("== MazeMapperUI: ridisegno completo vs incrementale ==")
+    print(f"{'lato':>6} {'completo ms':>12} {'incrementale ms':>16}")
+    for side in sides:
+        grid = GridMap(max_size=side, storage="dense")
+        _fill(grid, side)
+        ui = MazeMapperUI(grid, InferenceThread(VisionSystem("", ""), grid, LatestFrameSlot()))
+        ui._render()
+
+        results = []
+        for full in (True, False):
+            start = time.perf_counter()
+            for i in range(frames):
+                grid.set_cell(i % 5, 0, CellState.WALL if i % 2 else CellState.FLOOR)
+                if full:
+                    ui._map_version = -1
+                    ui._needs_full_redraw = True
+                ui._render()
+            results.append((time.perf_counter() - start) / frames * 1000)
+        print(f"{side:>6} {results[0]:12.3f} {results[1]:16.3f}")
+
+
+def _dict_bytes(d):
+    """Memoria approssimata di un dict {(x, y): valore}: tabella + tuple chiave + interi."""
+    size = sys.getsizeof(d)
+    for x, y in d:
+        size += sys.getsizeof((x, y)) + sys.getsizeof(x) + sys.getsizeof(y)
+    return size
+
+
+def _dict_passable(cells, walls, queries, max_size):
+    """Vicini raggiungibili con lookup nei dict, una cella alla volta."""
+    out = []
+    for x, y in queries:
+        mask = walls.get((x, y), 0)
+        row = []
+        for side in WALL_SIDES:
+            dx, dy = WALL_OFFSETS[side]
+            nx, ny = x + dx, y + dy
+            row.append(abs(nx) <= max_size and abs(ny) <= max_size and not mask & side
+                       and cells.get((nx, ny), CellState.UNKNOWN) != CellState.WALL)
+        out.append(row)
+    return out
+
+
+def bench_walls(sides=(21, 101, 501, 1001), queries=10000):
+    """Muri sui lati: memoria e query dei vicini, dict vs maschere uint8."""
+    print("== Muri: dict vs maschere uint8 ==")
+    print(f"{'lato':>6} {'dict MB':>9} {'array MB':>9} {'vicini dict ms':>15} {'vicini vett. ms':>16}")
+    for side in sides:
+        rnd = random.Random(side)
+        half = side // 2
+        grid = GridMap(max_size=half, storage="dense")
+        cells, walls = {}, {}
+        for y in range(-half, half + 1):
+            for x in range(-half, half + 1):
+                cells[(x, y)] = CellState.FLOOR
+                grid._cells.set(x, y, CellState.FLOOR)
+                if rnd.random() < 0.3:
+                    mask = 1 << rnd.randrange(4)
+                    walls[(x, y)] = mask
+                    grid._walls.set(x, y, mask)
+
+        dict_mb = (_dict_bytes(cells) + _dict_bytes(walls)) / 1e6
+        array_mb = (grid._cells.states.nbytes + grid._walls.masks.nbytes) / 1e6
+
+        coords = np.array([(rnd.randint(-half, half), rnd.randint(-half, half)) for _ in range(queries)])
+        as_tuples = [tuple(c) for c in coords.tolist()]
+        start = time.perf_counter()
+        _dict_passable(cells, walls, as_tuples, half)
+        dict_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        grid.passable_neighbours(coords)
+        vec_ms = (time.perf_counter() - start) * 1000
+        print(f"{side:>6} {dict_mb:9.2f} {array_mb:9.2f} {dict_ms:15.2f} {vec_ms:16.2f}")
+
+
+if __name__ == "__main__":
+    bench_grid_storage()
+    bench_ui_render()
+    bench_walls()
@@ -0,0 +1,79 @@
+"""
+Benchmark del planner di esplorazione (D* Lite incrementale vs BFS completa).
+
+Uso:
+    python3 bench_planner.py
+"""
+
+import random
+import time
+from collections import deque
+
+from Mapping import GridMap, CellState
+from planner import ExplorationPlanner, FREE
+
+
+def synthetic_map(side, seed=0, known_ratio=0.7, wall_ratio=0.2):
+    """Griglia side x side: colonne a sinistra note (muri casuali), il resto ignoto."""
+    rnd = random.Random(seed)
+    half = side // 2
+    grid = GridMap(max_size=half, storage="dense")
+    known_until = -half + int(side * known_ratio)
+    for y in range(-half, half + 1):
+        for x in range(-half, known_until):
+            grid.set_cell(x, y, CellState.WALL if rnd.random() < wall_ratio else CellState.FLOOR)
+    grid.set_cell(-half, 0, CellState.START_POINT)
+    return grid, (-half, 0)
+
+
+def bfs_replan(occ, start):
+    """Ripianificazione da zero: BFS dal robot alla frontiera più vicina."""
+    cells = occ.cells
+    seen = {start}
+    queue = deque([start])
+    while queue:
+        i = queue.popleft()
+        if occ.is_frontier(i):
+            return i
+        for n in occ.neighbours(i):
+            if cells[n] == FREE and n not in seen:
+                seen.add(n)
+                queue.append(n)
+    return None
+
+
+def bench(sides=(21, 101, 501, 1001), steps=100, seed=0):
+    print("== Planner: D* Lite incrementale vs BFS da zero ==")
+    print(f"{'lato':>6} {'init ms':>9} {'replan p50 ms':>14} {'replan p95 ms':>14} "
+          f"{'BFS p50 ms':>11} {'espansioni':>11}")
+    for side in sides:
+        rnd = random.Random(seed)
+        grid, position = synthetic_map(side, seed)
+        planner = ExplorationPlanner(grid, position=position)
+        init_ms = planner.update()
+
+        replan, bfs = [], []
+        for _ in range(steps):
+            path = planner.frontier_path()
+            if len(path) > 1:
+                position = path[1]
+            # Il robot osserva la cella oltre la frontiera e qualche muro sul percorso
+            if path:
+                fx, fy = path[-1]
+                grid.set_cell(fx + 1, fy, CellState.WALL if rnd.random() < 0.3 else CellState.FLOOR)
+                if len(path) > 4 and rnd.random() < 0.2:
+                    grid.set_cell(*path[len(path) // 2], CellState.WALL)
+            replan.append(planner.update(position=position))
+
+            start = time.perf_counter()
+            bfs_replan(planner.occ, planner.occ.index(*position))
+            bfs.append((time.perf_counter() - start) * 1000.0)
+
+        replan.sort()
+        bfs.sort()
+        print(f"{side:>6} {init_ms:9.1f} {replan[steps // 2]:14.3f} {replan[int(steps * 0.95)]:14.3f} "
+              f"{bfs[steps // 2]:11.3f} {planner.stats()['expansions']:11d}")
+
+
+if __name__ == "__main__":
+    bench()
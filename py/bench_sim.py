@@ -0,0 +1,89 @@
+"""
+Benchmark end-to-end su labirinti simulati (maze_sim): generazione,
+throughput degli aggiornamenti della mappa, latenza del planner e tempo per
+frame della UI, da 20x20 a 1000x1000.
+
+Uso:
+    python3 bench_sim.py [--sizes 20 100 1000] [--steps 500] [--seed 0] [--loops 0.1]
+"""
+
+import argparse
+import os
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import numpy as np
+
+from Mapping import GridMap, MazeMapperUI, InferenceThread, VisionSystem, LatestFrameSlot
+from maze_sim import generate_maze, VirtualRobot, Observation
+
+
+def _percentile(values, q):
+    return float(np.percentile(values, q)) if len(values) else 0.0
+
+
+def bench_bulk_updates(maze, grid, count, seed):
+    """Throughput di set_cell + set_walls per osservazioni su celle casuali del labirinto."""
+    gen = np.random.default_rng(seed)
+    rows = gen.integers(0, maze.height, count)
+    cols = gen.integers(0, maze.width, count)
+    observations = [Observation(int(c) + maze.x0, int(r) + maze.y0, maze.tile_at(int(c) + maze.x0, int(r) + maze.y0),
+                                int(maze.walls[r, c])) for r, c in zip(rows, cols)]
+    start = time.perf_counter()
+    for obs in observations:
+        grid.set_cell(obs.x, obs.y, obs.tile)
+        grid.set_walls(obs.x, obs.y, obs.walls)
+    return count / (time.perf_counter() - start)
+
+
+def run(sizes, steps, seed, loops, ui_frames):
+    print("== Labirinto simulato: mappa, planner, UI ==")
+    print(f"{'lato':>6} {'gen s':>7} {'oss/s bulk':>11} {'oss/s robot':>12} {'plan init ms':>13} "
+          f"{'plan p50 ms':>12} {'plan p95 ms':>12} {'UI p50 ms':>10} {'UI p95 ms':>10} {'passi':>7} {'esplorato':>10}")
+    for side in sizes:
+        start = time.perf_counter()
+        maze = generate_maze(side, seed=seed, loops=loops)
+        gen_s = time.perf_counter() - start
+
+        bulk = bench_bulk_updates(maze, GridMap(max_size=maze.max_size, storage="dense"),
+                                  min(side * side, 20000), seed)
+
+        grid = GridMap(max_size=maze.max_size, storage="dense")
+        robot = VirtualRobot(maze, grid, view_range=3, seed=seed)
+        for _ in range(steps):
+            if not robot.step():
+                break
+        stats = robot.stats()
+        plan_init = robot.plan_ms[0]
+        plan = robot.plan_ms[1:]
+
+        # UI: una frame per passo del robot (rendering incrementale delle celle cambiate)
+        ui = MazeMapperUI(grid, InferenceThread(VisionSystem("", ""), grid, LatestFrameSlot()))
+        ui._render()
+        frames = []
+        for _ in range(ui_frames):
+            robot.step()
+            start = time.perf_counter()
+            ui._render()
+            frames.append((time.perf_counter() - start) * 1000.0)
+
+        explored = "completo" if robot.done else f"{len(grid.get_all_cells()) / (side * side):.1%}"
+        print(f"{side:>6} {gen_s:7.2f} {bulk:11.0f} {stats['updates_per_s']:12.0f} {plan_init:13.2f} "
+              f"{_percentile(plan, 50):12.3f} {_percentile(plan, 95):12.3f} "
+              f"{_percentile(frames, 50):10.3f} {_percentile(frames, 95):10.3f} {stats['steps']:7d} {explored:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark su labirinti simulati")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[20, 50, 100, 200, 500, 1000])
+    parser.add_argument("--steps", type=int, default=500, help="passi del robot per dimensione")
+    parser.add_argument("--ui-frames", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--loops", type=float, default=0.1, help="0 = labirinto perfetto")
+    args = parser.parse_args()
+    run(args.sizes, args.steps, args.seed, args.loops, args.ui_frames)
+
+
+if __name__ == "__main__":
+    main()
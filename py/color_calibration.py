@@ -0,0 +1,310 @@
+"""
+Calibrazione dei colori: profili HSV -> etichetta compilati in una LUT su file.
+
+Sul campo di gara la luce è diversa dal laboratorio: invece di ritoccare le
+soglie nel codice si catturano campioni di ogni colore con la camera, si
+calcolano i confini tra le classi e si salva il profilo (`.hsvlut`). I
+detector aprono il file in memory-map all'avvio (nessuna ricostruzione) e
+condividono la stessa tabella; cambiare profilo costa pochi millisecondi.
+
+Uso:
+    python3 color_calibration.py capture --camera 1 --out color_profiles/arena.hsvlut
+    python3 color_calibration.py fit --samples color_profiles/arena.npz --out color_profiles/arena.hsvlut
+    python3 color_calibration.py ranges --out color_profiles/lab.hsvlut
+
+In `capture`: tasti 1-7 scelgono il colore, spazio aggiunge la patch al
+centro dell'inquadratura, `c` calcola e salva il profilo, `q` esce. I frame
+passano dalla stessa normalizzazione fotometrica del wrapper (`--raw` per
+campionare i colori grezzi, da usare con `wrapper.py --no-normalize`).
+"""
+
+import argparse
+import os
+import struct
+import time
+
+import numpy as np
+
+# Nomi canonici dei colori nei profili (0 = UNKNOWN, sempre presente)
+COLOR_NAMES = ("ROSSO", "GIALLO", "VERDE", "BLU", "NERO", "BIANCO", "SILVER")
+UNKNOWN = "UNKNOWN"
+
+# Layout del file (little-endian):
+#   header (64 byte): magic, versione, bit di S, bit di V, numero etichette, data di creazione
+#   etichette: MAX_LABELS x 16 byte (nome UTF-8, zero-padded)
+#   tabella: 180 x 2^s_bits x 2^v_bits uint8 (indice dell'etichetta)
+MAGIC = b"HSVLUT\x00\x01"
+VERSION = 1
+HEADER_FORMAT = "<8sIIIId"
+HEADER_SIZE = 64
+MAX_LABELS = 32
+LABEL_SIZE = 16
+TABLE_OFFSET = HEADER_SIZE + MAX_LABELS * LABEL_SIZE
+HUE_BINS = 180
+
+
+class ColorProfile:
+    """
+    LUT HSV (OpenCV: H 0-179, S e V 0-255) -> indice di etichetta.
+
+    S e V possono essere quantizzati (s_bits/v_bits < 8) per tenere piccolo
+    il file: con 6 bit la tabella è 180 x 64 x 64 = 720 KB. La tabella può
+    essere un np.memmap in sola lettura (load) o un array in memoria.
+    """
+
+    def __init__(self, labels, table, name="", path=None):
+        if labels[0] != UNKNOWN:
+            raise ValueError(f"L'etichetta 0 deve essere {UNKNOWN}")
+        self.labels = list(labels)
+        self.table = table
+        self.name = name
+        self.path = path
+        self.s_bits = int(np.log2(table.shape[1]))
+        self.v_bits = int(np.log2(table.shape[2]))
+        self._index = {label: i for i, label in enumerate(self.labels)}
+
+    def __contains__(self, label):
+        return label in self._index
+
+    def index_of(self, label):
+        """Indice dell'etichetta, -1 se il profilo non la contiene."""
+        return self._index.get(label, -1)
+
+    def classify(self, hsv):
+        """Indice di etichetta per ogni pixel di un'immagine HSV uint8 (stessa forma senza canali)."""
+        h = hsv[..., 0].astype(np.intp)
+        s = hsv[..., 1] >> (8 - self.s_bits)
+        v = hsv[..., 2] >> (8 - self.v_bits)
+        h <<= self.s_bits + self.v_bits
+        h |= s.astype(np.intp) << self.v_bits
+        h |= v
+        return np.take(self.table.reshape(-1), h)
+
+    def label_of(self, hsv_pixel):
+        """Nome del colore di un singolo pixel HSV."""
+        h, s, v = (int(c) for c in hsv_pixel)
+        return self.labels[self.table[h, s >> (8 - self.s_bits), v >> (8 - self.v_bits)]]
+
+    def save(self, path):
+        """Scrive il profilo in modo atomico (file temporaneo + rename)."""
+        if len(self.labels) > MAX_LABELS:
+            raise ValueError(f"Troppe etichette ({len(self.labels)}), massimo {MAX_LABELS}")
+        header = struct.pack(HEADER_FORMAT, MAGIC, VERSION, self.s_bits, self.v_bits,
+                             len(self.labels), time.time())
+        names = b"".join(label.encode()[:LABEL_SIZE].ljust(LABEL_SIZE, b"\0") for label in self.labels)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(header.ljust(HEADER_SIZE, b"\0"))
+            f.write(names.ljust(MAX_LABELS * LABEL_SIZE, b"\0"))
+            f.write(np.ascontiguousarray(self.table, dtype=np.uint8).tobytes())
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        """Apre un profilo in memory-map (sola lettura, nessuna copia della tabella)."""
+        with open(path, "rb") as f:
+            raw = f.read(TABLE_OFFSET)
+        if len(raw) < TABLE_OFFSET:
+            raise ValueError(f"{path}: non è un profilo colori valido")
+        magic, version, s_bits, v_bits, count, _ = struct.unpack_from(HEADER_FORMAT, raw)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path}: non è un profilo colori valido")
+        labels = [raw[HEADER_SIZE + i * LABEL_SIZE:HEADER_SIZE + (i + 1) * LABEL_SIZE].rstrip(b"\0").decode()
+                  for i in range(count)]
+        table = np.memmap(path, dtype=np.uint8, mode="r", offset=TABLE_OFFSET,
+                          shape=(HUE_BINS, 1 << s_bits, 1 << v_bits))
+        name = os.path.splitext(os.path.basename(path))[0]
+        return cls(labels, table, name=name, path=path)
+
+
+# Profili già aperti: tutti i detector dello stesso processo condividono la tabella
+_loaded = {}
+
+
+def load_profile(path):
+    """ColorProfile.load con cache per percorso (riaperto se il file è cambiato)."""
+    key = os.path.abspath(path)
+    mtime = os.stat(key).st_mtime_ns
+    cached = _loaded.get(key)
+    if cached is None or cached[0] != mtime:
+        cached = (mtime, ColorProfile.load(key))
+        _loaded[key] = cached
+    return cached[1]
+
+
+def _bin_centers(bits):
+    """Valore centrale di ogni livello quantizzato (0-255)."""
+    step = 256 >> bits
+    return np.arange(1 << bits) * step + (step - 1) / 2.0
+
+
+def compile_ranges(ranges, s_bits=8, v_bits=8, name="ranges"):
+    """
+    Profilo da range HSV a box, come quelli scritti nei detector.
+
+    Args:
+        ranges: {nome: [((h, s, v) min, (h, s, v) max), ...]}; vince il primo colore che contiene il pixel
+        s_bits, v_bits: Quantizzazione di S e V (8 = esatto)
+    """
+    labels = [UNKNOWN] + list(ranges)
+    h = np.arange(HUE_BINS)[:, None, None]
+    s = _bin_centers(s_bits)[None, :, None]
+    v = _bin_centers(v_bits)[None, None, :]
+    table = np.zeros((HUE_BINS, 1 << s_bits, 1 << v_bits), dtype=np.uint8)
+    for index in range(len(labels) - 1, 0, -1):  # all'indietro: i primi sovrascrivono
+        for lower, upper in ranges[labels[index]]:
+            inside = ((h >= lower[0]) & (h <= upper[0]) & (s >= lower[1]) & (s <= upper[1])
+                      & (v >= lower[2]) & (v <= upper[2]))
+            table[inside] = index
+    return ColorProfile(labels, table, name=name)
+
+
+def _features(h, s, v):
+    """Spazio in cui si calcolano le distanze: tinta circolare pesata dalla saturazione, più V."""
+    angle = np.asarray(h, dtype=np.float32) * np.float32(2 * np.pi / HUE_BINS)
+    s = np.asarray(s, dtype=np.float32)
+    return np.stack(np.broadcast_arrays(s * np.cos(angle), s * np.sin(angle),
+                                        np.asarray(v, dtype=np.float32)), axis=-1)
+
+
+def fit_samples(samples, s_bits=6, v_bits=6, max_distance=4.0, min_std=4.0, name="fit"):
+    """
+    Profilo dai campioni di ogni colore.
+
+    Ogni colore è una gaussiana (media e covarianza dei campioni) nello spazio
+    (S cos H, S sin H, V): la tinta è circolare (il rosso a 2 e a 178 è lo
+    stesso colore) e conta meno quando la saturazione è bassa. Ogni cella
+    della LUT va al colore con la distanza di Mahalanobis minore, oppure a
+    UNKNOWN se anche quella supera max_distance.
+
+    Args:
+        samples: {nome: array (N, 3) di pixel HSV uint8}
+        min_std: Deviazione minima per asse (livelli), evita classi degeneri
+    """
+    labels = [UNKNOWN] + list(samples)
+    h = np.arange(HUE_BINS)[:, None, None]
+    s = _bin_centers(s_bits)[None, :, None]
+    v = _bin_centers(v_bits)[None, None, :]
+    grid = _features(h, s, v).reshape(-1, 3)
+
+    best = np.full(len(grid), np.inf, dtype=np.float32)
+    table = np.zeros(len(grid), dtype=np.uint8)
+    for index, label in enumerate(labels[1:], start=1):
+        pixels = np.asarray(samples[label]).reshape(-1, 3)
+        if len(pixels) < 2:
+            raise ValueError(f"Servono almeno 2 campioni per {label}")
+        feats = _features(pixels[:, 0], pixels[:, 1], pixels[:, 2])
+        mean = feats.mean(axis=0)
+        cov = np.cov(feats, rowvar=False) + np.eye(3) * min_std ** 2
+        inv = np.linalg.inv(cov).astype(np.float32)
+        diff = grid - mean.astype(np.float32)
+        dist = np.einsum("ij,jk,ik->i", diff, inv, diff)
+        closer = dist < best
+        best[closer] = dist[closer]
+        table[closer] = index
+    table[best > max_distance ** 2] = 0
+    return ColorProfile(labels, table.reshape(HUE_BINS, 1 << s_bits, 1 << v_bits), name=name)
+
+
+def accuracy(profile, samples):
+    """Frazione di campioni di ogni colore classificati correttamente dal profilo."""
+    result = {}
+    for label, pixels in samples.items():
+        pixels = np.asarray(pixels, dtype=np.uint8).reshape(-1, 1, 3)
+        result[label] = float(np.mean(profile.classify(pixels) == profile.index_of(label)))
+    return result
+
+
+def save_samples(path, samples):
+    np.savez_compressed(path, **{label: np.asarray(pixels, dtype=np.uint8) for label, pixels in samples.items()})
+
+
+def load_samples(path):
+    with np.load(path) as data:
+        return {label: data[label] for label in data.files}
+
+
+def fit_and_save(samples, out, **kwargs):
+    profile = fit_samples(samples, name=os.path.splitext(os.path.basename(out))[0], **kwargs)
+    profile.save(out)
+    print(f"[Calibrazione] Profilo salvato in {out}")
+    for label, value in accuracy(profile, samples).items():
+        print(f"[Calibrazione]   {label:>8}: {len(samples[label]):6d} campioni, {value * 100:5.1f}% corretti")
+    return profile
+
+
+def capture(camera, out, patch=40, colors=COLOR_NAMES, normalize=True):
+    """Cattura interattiva dei campioni dalla camera (vedi docstring del modulo)."""
+    import cv2
+    from photometric import PhotometricNormalizer
+
+    normalizer = PhotometricNormalizer() if normalize else None
+
+    samples_path = os.path.splitext(out)[0] + ".npz"
+    samples = load_samples(samples_path) if os.path.exists(samples_path) else {}
+    samples = {label: list(pixels.reshape(-1, 3)) for label, pixels in samples.items()}
+    current = colors[0]
+    cap = cv2.VideoCapture(camera)
+    try:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            if normalizer is not None:
+                normalizer.process(frame)
+            h, w = frame.shape[:2]
+            x0, y0 = (w - patch) // 2, (h - patch) // 2
+            view = frame.copy()
+            cv2.rectangle(view, (x0, y0), (x0 + patch, y0 + patch), (255, 255, 255), 2)
+            counts = " ".join(f"{i + 1}:{c}({len(samples.get(c, []))})" for i, c in enumerate(colors))
+            cv2.putText(view, f"Colore: {current}", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
+            cv2.putText(view, counts, (10, h - 15), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 255, 255), 1)
+            cv2.imshow("Calibrazione colori", view)
+
+            key = cv2.waitKey(1) & 0xFF
+            if ord("1") <= key < ord("1") + len(colors):
+                current = colors[key - ord("1")]
+            elif key == ord(" "):
+                hsv = cv2.cvtColor(frame[y0:y0 + patch, x0:x0 + patch], cv2.COLOR_BGR2HSV)
+                samples.setdefault(current, []).extend(hsv.reshape(-1, 3))
+            elif key == ord("c") and samples:
+                arrays = {label: np.array(pixels, dtype=np.uint8) for label, pixels in samples.items()}
+                save_samples(samples_path, arrays)
+                fit_and_save(arrays, out)
+            elif key == ord("q"):
+                break
+    finally:
+        cap.release()
+        cv2.destroyAllWindows()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibrazione colori: profili HSV -> LUT")
+    sub = parser.add_subparsers(dest="command", required=True)
+    cap = sub.add_parser("capture", help="Campioni dalla camera e profilo")
+    cap.add_argument("--camera", type=int, default=1)
+    cap.add_argument("--out", required=True)
+    cap.add_argument("--raw", action="store_true", help="Senza normalizzazione fotometrica")
+    fit = sub.add_parser("fit", help="Profilo da campioni salvati (.npz)")
+    fit.add_argument("--samples", required=True)
+    fit.add_argument("--out", required=True)
+    fit.add_argument("--max-distance", type=float, default=4.0)
+    rng = sub.add_parser("ranges", help="Profilo dai range HSV di floor_tile.COLOR_RANGES")
+    rng.add_argument("--out", required=True)
+    args = parser.parse_args()
+
+    if args.command == "capture":
+        capture(args.camera, args.out, normalize=not args.raw)
+    elif args.command == "fit":
+        fit_and_save(load_samples(args.samples), args.out, max_distance=args.max_distance)
+    else:
+        from floor_tile import COLOR_RANGES
+        compile_ranges(COLOR_RANGES, name=os.path.splitext(os.path.basename(args.out))[0]).save(args.out)
+        print(f"[Calibrazione] Profilo salvato in {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from stage_profiler import NULL_PROFILER
+
+
+class FramePlanes:
+    """
+    Piani di un frame condivisi tra i detector (bgr, gray, hsv).
+
+    I piani derivati vengono calcolati una sola volta per frame e solo se
+    almeno un detector schedulato li ha dichiarati. `temporal` sono le
+    statistiche temporali per blocco (TemporalStats) già aggiornate con
+    questo frame, o None.
+    """
+
+    CONVERSIONS = {
+        "gray": cv2.COLOR_BGR2GRAY,
+        "hsv": cv2.COLOR_BGR2HSV,
+    }
+
+    def __init__(self, bgr, profiler=None, temporal=None):
+        self.bgr = bgr
+        self.temporal = temporal
+        self.profiler = profiler or NULL_PROFILER
+        self._planes = {"bgr": bgr}
+
+    def get(self, name):
+        plane = self._planes.get(name)
+        if plane is None:
+            if name not in self.CONVERSIONS:
+                raise KeyError(f"Piano sconosciuto: {name}")
+            with self.profiler.stage("color_conversion"):
+                plane = cv2.cvtColor(self.bgr, self.CONVERSIONS[name])
+            self._planes[name] = plane
+        return plane
+
+    def prepare(self, names):
+        for name in names:
+            self.get(name)
+
+    @property
+    def gray(self):
+        return self.get("gray")
+
+    @property
+    def hsv(self):
+        return self.get("hsv")
+
+
+@dataclass
+class DetectorSpec:
+    """Detector registrato: frequenza desiderata, priorità e piani richiesti."""
+    name: str
+    process: Callable[[FramePlanes], Any]
+    rate_hz: Optional[float] = None   # None = ad ogni frame
+    priority: int = 0                 # 0 = massima priorità
+    planes: Tuple[str, ...] = ("bgr",)
+    on_result: Optional[Callable[[Any], None]] = None
+    enabled: bool = True
+    prewarm: Optional[Callable[[], None]] = None
+
+    # Stato runtime del scheduler
+    next_due: float = 0.0
+    first_due: Optional[float] = None  # primo frame in cui lo scheduler l'ha trovato scaduto
+    cost_ms: float = 0.0
+    runs: int = 0
+    shed: int = 0
+    last_result: Any = field(default=None, repr=False)
+
+    def is_due(self, now):
+        return self.rate_hz is None or now >= self.next_due
+
+
+class DetectorRegistry:
+    """Registro dei detector eseguiti dal wrapper."""
+
+    def __init__(self):
+        self._detectors: Dict[str, DetectorSpec] = {}
+
+    def register(self, name, process, rate_hz=None, priority=0, planes=("bgr",),
+                 on_result=None, enabled=True, prewarm=None) -> DetectorSpec:
+        if name in self._detectors:
+            raise ValueError(f"Detector già registrato: {name}")
+        spec = DetectorSpec(name=name, process=process, rate_hz=rate_hz, priority=priority,
+                            planes=tuple(planes), on_result=on_result, enabled=enabled,
+                            prewarm=prewarm)
+        self._detectors[name] = spec
+        return spec
+
+    def unregister(self, name):
+        return self._detectors.pop(name, None)
+
+    def get(self, name) -> Optional[DetectorSpec]:
+        return self._detectors.get(name)
+
+    def set_enabled(self, name, enabled):
+        self._detectors[name].enabled = enabled
+
+    def set_rate(self, name, rate_hz):
+        self._detectors[name].rate_hz = rate_hz
+
+    def __iter__(self):
+        return iter(self._detectors.values())
+
+    def __len__(self):
+        return len(self._detectors)
+
+    def __contains__(self, name):
+        return name in self._detectors
+
+
+class DetectorScheduler:
+    """
+    Decide quali detector eseguire su ogni frame.
+
+    Vengono considerati solo i detector abilitati e "scaduti" secondo la loro
+    frequenza; in ordine di priorità si aggiungono finché il costo stimato
+    (media mobile esponenziale dei tempi misurati) resta nel budget CPU del
+    frame. Il detector più prioritario viene sempre eseguito, quelli meno
+    prioritari vengono scartati per primi in caso di sovraccarico; un detector
+    in ritardo di oltre `starvation_s` viene comunque eseguito, così anche
+    sotto carico continua a girare a frequenza ridotta. Per un detector mai
+    eseguito il ritardo si conta dal primo frame in cui era scaduto.
+
+    Con `temporal` (TemporalStats) le statistiche temporali vengono
+    aggiornate su ogni frame, anche quando nessun detector le legge, così la
+    finestra resta continua. Con `normalizer` (PhotometricNormalizer) il
+    frame viene corretto in place con una sola LUT prima dei detector, che
+    vedono tutti lo stesso frame normalizzato; le statistiche temporali
+    restano sul frame grezzo, così un cambio di LUT non sembra un riflesso.
+    """
+
+    def __init__(self, registry: DetectorRegistry, budget_ms=33.0, cost_alpha=0.2,
+                 starvation_s=1.0, profiler=None, temporal=None, normalizer=None):
+        self.registry = registry
+        self.temporal = temporal
+        self.normalizer = normalizer
+        self.budget_ms = budget_ms
+        self.cost_alpha = cost_alpha
+        self.starvation_s = starvation_s
+        self.profiler = profiler or NULL_PROFILER
+
+    def select(self, now) -> List[DetectorSpec]:
+        due = sorted((d for d in self.registry if d.enabled and d.is_due(now)),
+                     key=lambda d: d.priority)
+        selected = []
+        spent = 0.0
+        for det in due:
+            if det.first_due is None:
+                det.first_due = now
+            waiting_since = det.next_due if det.runs else det.first_due
+            starving = now - waiting_since > self.starvation_s
+            if selected and spent + det.cost_ms > self.budget_ms and not starving:
+                det.shed += 1
+                continue
+            selected.append(det)
+            spent += det.cost_ms
+        return selected
+
+    def run_frame(self, frame, now=None) -> Dict[str, Any]:
+        """Esegue i detector selezionati sul frame e restituisce i risultati per nome."""
+        now = time.monotonic() if now is None else now
+        selected = self.select(now)
+        if self.temporal is not None:
+            with self.profiler.stage("temporal_stats"):
+                self.temporal.update(frame)
+        if self.normalizer is not None:
+            with self.profiler.stage("normalize"):
+                self.normalizer.process(frame)
+        planes = FramePlanes(frame, self.profiler, self.temporal)
+        results = {}
+
+        for det in selected:
+            planes.prepare(det.planes)
+            start = time.perf_counter()
+            result = det.process(planes)
+            elapsed_ms = (time.perf_counter() - start) * 1000.0
+
+            det.cost_ms = elapsed_ms if det.runs == 0 else (
+                (1 - self.cost_alpha) * det.cost_ms + self.cost_alpha * elapsed_ms)
+            det.runs += 1
+            det.last_result = result
+            if det.rate_hz:
+                # Si riprogramma dalla scadenza precedente per non accumulare deriva
+                det.next_due = max(det.next_due + 1.0 / det.rate_hz, now)
+            else:
+                det.next_due = now
+            if self.profiler.enabled:
+                self.profiler.record(f"detector:{det.name}", elapsed_ms)
+            if det.on_result is not None:
+                det.on_result(result)
+            results[det.name] = result
+
+        return results
+
+    def prewarm(self, width=640, height=480):
+        """
+        Esegue ogni detector una volta prima del loop, così i costi del primo
+        utilizzo (import, allocazioni, primo OCR/Hough) non cadono durante la gara.
+        Usa il metodo prewarm del detector se fornito, altrimenti un frame sintetico.
+        Restituisce i tempi in ms per detector.
+        """
+        timings = {}
+        synthetic = None
+        for det in self.registry:
+            start = time.perf_counter()
+            if det.prewarm is not None:
+                det.prewarm()
+            else:
+                if synthetic is None:
+                    synthetic = np.full((height, width, 3), 127, dtype=np.uint8)
+                planes = FramePlanes(synthetic.copy())
+                planes.prepare(det.planes)
+                det.process(planes)
+            timings[det.name] = (time.perf_counter() - start) * 1000.0
+        return timings
+
+    def stats(self):
+        return {d.name: {"runs": d.runs, "shed": d.shed, "cost_ms": round(d.cost_ms, 3),
+                         "rate_hz": d.rate_hz, "priority": d.priority, "enabled": d.enabled}
+                for d in self.registry}
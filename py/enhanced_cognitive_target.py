@@ -3,8 +3,13 @@ import numpy as np
 import time
 from collections import deque
 
+from stage_profiler import NULL_PROFILER
+
 class EnhancedCognitiveTarget:
-    def __init__(self, history_size=5):
+    # Calibrated profile colour names (color_calibration.COLOR_NAMES) -> detector colours
+    PROFILE_COLORS = {"NERO": "NERO", "ROSSO": "ROSSO", "GIALLO": "GIALLO", "VERDE": "VERDE", "BLU": "AZZURRO"}
+
+    def __init__(self, history_size=5, profiler=None, color_profile=None, clahe=True):
         # BGR target colors for distance comparison (simplified)
         self.target_colors = {
             "ROSSO": (0, 0, 255),
@@ -25,12 +30,23 @@ class EnhancedCognitiveTarget:
         }
         
         self.history = deque(maxlen=history_size)
-        self.clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+        # None when frames are already normalized upstream (PhotometricNormalizer)
+        self.clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8)) if clahe else None
+        self.profiler = profiler or NULL_PROFILER
+        self.color_profile = color_profile
+
+    def set_color_profile(self, color_profile):
+        """Switches to a calibrated ColorProfile (None: back to the built-in hue ranges)."""
+        self.color_profile = color_profile
 
     def preprocess(self, frame):
         """Enhances contrast for low-light conditions."""
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        enhanced = self.clahe.apply(gray)
+        with self.profiler.stage("color_conversion"):
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if self.clahe is None:
+            return gray
+        with self.profiler.stage("clahe"):
+            enhanced = self.clahe.apply(gray)
         return enhanced
 
     def get_robust_color(self, frame, ellipse, scale):
@@ -73,6 +89,8 @@ class EnhancedCognitiveTarget:
         """Maps BGR value to one of the 5 predefined colors."""
         hsv_frame = np.uint8([[bgr]])
         hsv = cv2.cvtColor(hsv_frame, cv2.COLOR_BGR2HSV)[0][0]
+        if self.color_profile is not None:
+            return self.PROFILE_COLORS.get(self.color_profile.label_of(hsv), "UNKNOWN")
         h, s, v = hsv
         
         # Black if value is very low
@@ -95,39 +113,51 @@ class EnhancedCognitiveTarget:
             
         return res
 
+    def prewarm(self):
+        """Runs the pipeline once on a synthetic target to pay first-call costs before the loop."""
+        frame = np.full((480, 640, 3), 200, dtype=np.uint8)
+        for r in [180, 140, 100, 60, 20]:
+            cv2.circle(frame, (320, 240), r, (0, 255, 255), -1)
+        self.process_frame(frame)
+        self.history.clear()
+
     def process_frame(self, frame):
         if frame is None:
             return None, "NO_FRAME"
             
+        profiler = self.profiler
         enhanced = self.preprocess(frame)
         
         # Combine Adaptive Threshold and Canny for maximum robustness
         # Synthetic images often work better with simple thresholding
-        _, thresh = cv2.threshold(enhanced, 50, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
-        edges = cv2.Canny(enhanced, 30, 100)
-        combined = cv2.bitwise_or(thresh, edges)
-        
-        kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3,3))
-        combined = cv2.morphologyEx(combined, cv2.MORPH_CLOSE, kernel)
+        with profiler.stage("threshold"):
+            _, thresh = cv2.threshold(enhanced, 50, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+            edges = cv2.Canny(enhanced, 30, 100)
+            combined = cv2.bitwise_or(thresh, edges)
+            
+            kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3,3))
+            combined = cv2.morphologyEx(combined, cv2.MORPH_CLOSE, kernel)
         
-        contours, _ = cv2.findContours(combined, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        with profiler.stage("contours"):
+            contours, _ = cv2.findContours(combined, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
         
         best_ellipse = None
         max_area = 0
         
-        for cnt in contours:
-            if len(cnt) < 5: continue
-            area = cv2.contourArea(cnt)
-            if area < 300: continue
-            
-            ellipse = cv2.fitEllipse(cnt)
-            (xc, yc), (ma, Mi), angle = ellipse
-            
-            ratio = ma / Mi if Mi != 0 else 0
-            if 0.5 < ratio < 2.0:
-                if area > max_area:
-                    max_area = area
-                    best_ellipse = ellipse
+        with profiler.stage("ellipse_fit"):
+            for cnt in contours:
+                if len(cnt) < 5: continue
+                area = cv2.contourArea(cnt)
+                if area < 300: continue
+                
+                ellipse = cv2.fitEllipse(cnt)
+                (xc, yc), (ma, Mi), angle = ellipse
+                
+                ratio = ma / Mi if Mi != 0 else 0
+                if 0.5 < ratio < 2.0:
+                    if area > max_area:
+                        max_area = area
+                        best_ellipse = ellipse
         
         if best_ellipse:
             cv2.ellipse(frame, best_ellipse, (0, 255, 0), 2)
@@ -138,9 +168,10 @@ class EnhancedCognitiveTarget:
             # Normalized: 0.11, 0.33, 0.55, 0.77, 1.0 (approx)
             scales = [0.1, 0.3, 0.5, 0.7, 0.9] # From inside to outside
             ring_colors = []
-            for s in scales:
-                color = self.get_robust_color(frame, best_ellipse, s)
-                ring_colors.append(color)
+            with profiler.stage("ring_sampling"):
+                for s in scales:
+                    color = self.get_robust_color(frame, best_ellipse, s)
+                    ring_colors.append(color)
             
             # Action Mapping based on ring colors
             score = sum(self.score_map.get(c, 0) for c in ring_colors if c != "UNKNOWN")
@@ -153,8 +184,9 @@ class EnhancedCognitiveTarget:
                 elif score == 2: action = "VICTIM_STOP_LED_2KIT"
 
             # Debouncing
-            self.history.append(action)
-            debounced_action = max(set(self.history), key=list(self.history).count)
+            with profiler.stage("debounce"):
+                self.history.append(action)
+                debounced_action = max(set(self.history), key=list(self.history).count)
             
             # HUD text
             cv2.putText(frame, f"Colors: {ring_colors}", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
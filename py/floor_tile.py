@@ -0,0 +1,205 @@
+from collections import Counter, deque
+from enum import IntEnum
+
+import cv2
+import numpy as np
+
+from stage_profiler import NULL_PROFILER
+
+
+class TileColor(IntEnum):
+    """Stessi valori di enum TileColor nel firmware ESP32 (robot_competition.ino)."""
+    NORMAL = 0
+    BLACK = 1
+    SILVER = 2
+    BLUE = 3
+    RED = 4
+
+    @property
+    def serial_code(self) -> str:
+        """Carattere inviato all'ESP32 (gli stessi codici di handleTileColor su Serial1)."""
+        return "nkvbr"[self]
+
+
+# Range HSV (Lower, Upper) per colore, come in colorLetters.get_detected_color,
+# più il blu delle piastrelle di stop. L'ordine decide i pareggi.
+COLOR_RANGES = {
+    "ROSSO": [((0, 50, 50), (10, 255, 255)), ((160, 50, 50), (180, 255, 255))],
+    "GIALLO": [((20, 100, 100), (40, 255, 255))],
+    "VERDE": [((40, 50, 50), (90, 255, 255))],
+    "NERO": [((0, 0, 0), (180, 255, 50))],
+    "BIANCO": [((0, 0, 180), (180, 40, 220))],
+    "SILVER": [((0, 0, 100), (180, 30, 200))],
+    "BLU": [((100, 80, 50), (130, 255, 255))],
+}
+
+# Colore rilevato -> piastrella del regolamento (gli altri sono NORMAL)
+TILE_OF_COLOR = {
+    "NERO": TileColor.BLACK,
+    "SILVER": TileColor.SILVER,
+    "BLU": TileColor.BLUE,
+    "ROSSO": TileColor.RED,
+}
+
+
+class FloorTileDetector:
+    """
+    Colore della piastrella sotto il robot, dalla parte bassa del frame.
+
+    Ogni range HSV è un box: a ogni box corrisponde un bit e tre LUT da 256
+    valori (una per canale H, S, V) dicono di quali box fa parte ogni valore.
+    Un solo cv2.LUT sulla ROI ridotta e l'AND dei tre canali danno per ogni
+    pixel l'insieme dei colori a cui appartiene (un colore può sovrapporsi a
+    un altro, es. BIANCO e SILVER, come nel prototipo). Un solo bincount sui
+    pattern di bit dà tutte le percentuali insieme, invece di un inRange +
+    bitwise_or + sum per colore.
+
+    Con un profilo calibrato (color_profile) le etichette vengono dalla LUT
+    HSV del profilo, condivisa con gli altri detector.
+
+    Il SILVER vale solo se la V dei suoi pixel varia abbastanza (riflessi):
+    una superficie grigia uniforme non è una piastrella argentata. Con le
+    statistiche temporali del frame (TemporalStats, finestra piena) si usa la
+    deviazione standard nel tempo dei blocchi argento della ROI, più stabile
+    di quella spaziale del singolo frame; altrimenti quella spaziale.
+    """
+
+    def __init__(self, ranges=None, roi_fraction=0.25, roi_width=80, min_ratio=0.05,
+                 silver_min_std=10.0, silver_min_temporal_std=4.0, history_size=3,
+                 color_profile=None, profiler=None):
+        self.ranges = ranges or COLOR_RANGES
+        self.roi_fraction = roi_fraction
+        self.roi_width = roi_width
+        self.min_ratio = min_ratio
+        self.silver_min_std = silver_min_std
+        self.silver_min_temporal_std = silver_min_temporal_std
+        self.set_color_profile(color_profile)
+
+        self.history = deque(maxlen=history_size)
+        self.last_ratios = {}
+        self.profiler = profiler or NULL_PROFILER
+
+    def set_color_profile(self, color_profile):
+        """
+        Usa un profilo calibrato (color_calibration.ColorProfile) al posto dei
+        range: ogni pixel ha una sola etichetta, letta dalla LUT del profilo.
+        Con None si torna ai range HSV.
+        """
+        self.color_profile = color_profile
+        if color_profile is not None:
+            self.colors = color_profile.labels[1:]
+            self.channel_lut = None
+            # Etichetta -> colore (UNKNOWN non conta in nessuna percentuale)
+            self.membership = np.eye(len(color_profile.labels))[:, 1:]
+        else:
+            self._compile_ranges(self.ranges)
+        self.default_color = "BIANCO" if "BIANCO" in self.colors else self.colors[0]
+        self._silver_patterns = (self.membership[:, self.colors.index("SILVER")] > 0
+                                 if "SILVER" in self.colors else None)
+
+    def _compile_ranges(self, ranges):
+        boxes = [(name, box) for name, color_boxes in ranges.items() for box in color_boxes]
+        if len(boxes) > 16:
+            raise ValueError(f"Troppi range HSV ({len(boxes)}), massimo 16")
+        dtype = np.uint8 if len(boxes) <= 8 else np.uint16
+        self.colors = list(ranges)
+
+        # LUT per canale: bit i = il valore sta nel box i
+        values = np.arange(256)
+        self.channel_lut = np.zeros((1, 256, 3), dtype=dtype)
+        color_bits = np.zeros(len(self.colors), dtype=np.int64)
+        for bit, (name, (lower, upper)) in enumerate(boxes):
+            for channel in range(3):
+                inside = (values >= lower[channel]) & (values <= upper[channel])
+                self.channel_lut[0, inside, channel] |= dtype(1 << bit)
+            color_bits[self.colors.index(name)] |= 1 << bit
+
+        # Pattern di bit -> colori a cui appartiene (matrice patterns x colori)
+        patterns = np.arange(1 << len(boxes))[:, None]
+        self.membership = ((patterns & color_bits[None, :]) != 0).astype(np.float64)
+
+    def roi(self, frame):
+        """Fascia bassa del frame (roi_fraction dell'altezza), ridotta a roi_width colonne."""
+        h, w = frame.shape[:2]
+        top = h - max(1, int(round(h * self.roi_fraction)))
+        band = frame[top:]
+        width = min(self.roi_width, w)
+        height = max(1, int(round(band.shape[0] * width / w)))
+        # INTER_NEAREST campiona i pixel senza mediarli: la varianza di V resta quella reale
+        return cv2.resize(band, (width, height), interpolation=cv2.INTER_NEAREST)
+
+    def labels(self, hsv):
+        """Pattern di bit (box HSV di appartenenza) o etichetta del profilo per ogni pixel."""
+        if self.color_profile is not None:
+            return self.color_profile.classify(hsv)
+        bits = cv2.LUT(hsv, self.channel_lut)
+        return bits[..., 0] & bits[..., 1] & bits[..., 2]
+
+    def silver_is_reflective(self, hsv, silver_mask, temporal=None):
+        """True se i pixel argento variano abbastanza, nel tempo o nello spazio."""
+        if temporal is not None and temporal.ready:
+            band = temporal.region(temporal.std(), 1.0 - self.roi_fraction)
+            mask = cv2.resize(silver_mask.view(np.uint8), (band.shape[1], band.shape[0]),
+                              interpolation=cv2.INTER_NEAREST)
+            if mask.any():
+                return float(band[mask != 0].mean()) >= self.silver_min_temporal_std
+        return float(np.std(hsv[..., 2][silver_mask])) >= self.silver_min_std
+
+    def classify_hsv(self, hsv, temporal=None):
+        """
+        Colore dominante di un'immagine HSV.
+
+        Args:
+            hsv: ROI in HSV
+            temporal: TemporalStats del frame da cui viene la ROI (opzionale)
+
+        Returns:
+            (nome del colore, percentuali per colore)
+        """
+        profiler = self.profiler
+        with profiler.stage("tile_lut"):
+            labels = self.labels(hsv)
+        with profiler.stage("bincount"):
+            counts = np.bincount(labels.ravel(), minlength=len(self.membership))
+            ratios = counts @ self.membership / labels.size
+
+        scores = np.where(ratios > self.min_ratio, ratios, 0.0)
+        if self._silver_patterns is not None:
+            silver = self.colors.index("SILVER")
+            if scores[silver] > 0 and not self.silver_is_reflective(
+                    hsv, self._silver_patterns[labels], temporal):
+                scores[silver] = 0.0
+        best = int(np.argmax(scores))
+        color = self.colors[best] if scores[best] > 0 else self.default_color
+        return color, dict(zip(self.colors, ratios.tolist()))
+
+    def prewarm(self):
+        """Esegue la pipeline una volta su un frame sintetico prima del loop."""
+        self.process_frame(np.full((480, 640, 3), 200, dtype=np.uint8))
+        self.history.clear()
+
+    def process_frame(self, frame, temporal=None):
+        """
+        Piastrella sotto il robot.
+
+        Args:
+            frame: Frame BGR della camera
+            temporal: TemporalStats già aggiornate con questo frame (opzionale)
+
+        Returns:
+            (TileColor dopo il debounce, nome del colore), (None, "NO_FRAME") senza frame
+        """
+        if frame is None:
+            return None, "NO_FRAME"
+
+        profiler = self.profiler
+        with profiler.stage("roi_resize"):
+            roi = self.roi(frame)
+        with profiler.stage("color_conversion"):
+            hsv = cv2.cvtColor(roi, cv2.COLOR_BGR2HSV)
+        color, self.last_ratios = self.classify_hsv(hsv, temporal)
+
+        # Debounce: il colore più frequente negli ultimi frame
+        self.history.append(color)
+        color = Counter(self.history).most_common(1)[0][0]
+        return TILE_OF_COLOR.get(color, TileColor.NORMAL), color
@@ -0,0 +1,152 @@
+import threading
+from typing import Optional, Tuple
+
+import numpy as np
+
+# Valore scritto nei buffer rilasciati in modalità debug: un consumer che
+# legge ancora un frame restituito al pool vede un'immagine grigia uniforme
+POISON = 0xCD
+
+
+class PooledFrame:
+    """
+    Buffer di un FramePool con conteggio dei riferimenti.
+
+    Chi riceve il frame lo restituisce con release() (o usandolo come
+    context manager); chi lo passa ad un altro consumer chiama prima
+    retain(). Il buffer torna al pool quando i riferimenti arrivano a zero.
+    In modalità debug `array` dopo l'ultimo release solleva RuntimeError.
+    """
+
+    __slots__ = ("pool", "index", "_array", "refs")
+
+    def __init__(self, pool: "FramePool", index: int, array: np.ndarray):
+        self.pool = pool
+        self.index = index
+        self._array = array
+        self.refs = 0
+
+    @property
+    def array(self) -> np.ndarray:
+        if self.refs <= 0 and self.pool.debug:
+            raise RuntimeError(f"[FramePool] Frame {self.index} usato dopo il release")
+        return self._array
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        return self._array.shape
+
+    def retain(self) -> "PooledFrame":
+        self.pool._retain(self)
+        return self
+
+    def release(self) -> None:
+        self.pool._release(self)
+
+    def __enter__(self) -> "PooledFrame":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.release()
+
+
+class FramePool:
+    """
+    Pool limitato di buffer preallocati per i frame della camera.
+
+    L'acquisizione legge direttamente in un buffer libero
+    (cap.read(image=...)), quindi a regime non si alloca nulla per frame.
+    Se tutti i buffer sono in uso acquire() restituisce None dopo il
+    timeout: il produttore salta il frame invece di allocarne uno nuovo.
+    """
+
+    def __init__(self, shape: Tuple[int, ...], dtype=np.uint8, capacity: int = 4, debug: bool = False):
+        """
+        Args:
+            shape: Forma dei frame (es. (480, 640, 3))
+            dtype: Tipo dei pixel
+            capacity: Numero di buffer (frame in volo al massimo)
+            debug: Avvelena i buffer rilasciati e segnala gli accessi dopo il release
+        """
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.capacity = capacity
+        self.debug = debug
+
+        self._cond = threading.Condition()
+        self._frames = [PooledFrame(self, i, np.empty(self.shape, dtype=self.dtype)) for i in range(capacity)]
+        # LIFO: il buffer appena rilasciato è ancora in cache
+        self._free = list(reversed(self._frames))
+
+        # Statistiche
+        self.allocations = capacity  # buffer allocati (costante dopo la costruzione)
+        self.acquired = 0
+        self.exhausted = 0           # acquire falliti per pool vuoto
+        self.copies = 0              # letture che non hanno riempito il buffer in place
+
+    @property
+    def available(self) -> int:
+        with self._cond:
+            return len(self._free)
+
+    def acquire(self, timeout: Optional[float] = 0.0) -> Optional[PooledFrame]:
+        """
+        Prende un buffer libero (riferimenti = 1).
+
+        Args:
+            timeout: Attesa massima in secondi (None = indefinita, 0 = nessuna)
+
+        Returns:
+            PooledFrame o None se il pool resta vuoto
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._free, timeout):
+                self.exhausted += 1
+                return None
+            frame = self._free.pop()
+            frame.refs = 1
+            self.acquired += 1
+            return frame
+
+    def read(self, cap, timeout: Optional[float] = 0.0) -> Tuple[bool, Optional[PooledFrame]]:
+        """
+        Legge un frame da una sorgente con interfaccia cv2.VideoCapture in un
+        buffer del pool.
+
+        Returns:
+            (ok, frame): ok è False se la sorgente è finita o il pool è vuoto
+        """
+        frame = self.acquire(timeout)
+        if frame is None:
+            return False, None
+        buffer = frame._array
+        ok, image = cap.read(image=buffer)
+        if not ok or image is None:
+            frame.release()
+            return False, None
+        if image is not buffer and not np.may_share_memory(image, buffer):
+            # Sorgente che ignora image= (o formato diverso dal pool)
+            if image.shape != self.shape:
+                frame.release()
+                raise ValueError(f"[FramePool] Frame {image.shape} diverso dal pool {self.shape}")
+            np.copyto(buffer, image)
+            self.copies += 1
+        return True, frame
+
+    def _retain(self, frame: PooledFrame) -> None:
+        with self._cond:
+            if frame.refs <= 0:
+                raise RuntimeError(f"[FramePool] retain su frame {frame.index} già rilasciato")
+            frame.refs += 1
+
+    def _release(self, frame: PooledFrame) -> None:
+        with self._cond:
+            if frame.refs <= 0:
+                raise RuntimeError(f"[FramePool] Doppio release del frame {frame.index}")
+            frame.refs -= 1
+            if frame.refs:
+                return
+            if self.debug:
+                frame._array.fill(POISON)
+            self._free.append(frame)
+            self._cond.notify()
@@ -0,0 +1,187 @@
+import struct
+import time
+
+import numpy as np
+
+# Layout del file (tutto little-endian, nessuna codifica dei frame):
+#   header (64 byte): magic, versione, width, height, channels, capacity, count
+#   indice: capacity x float64 (timestamp di cattura)
+#   frame:  capacity x (height x width x channels) uint8 raw
+MAGIC = b"RCFRAMES"
+VERSION = 1
+HEADER_FORMAT = "<8sIIIIQQ"
+HEADER_SIZE = 64
+
+
+def _layout(width, height, channels, capacity):
+    """Restituisce (offset indice, offset frame, byte per frame, dimensione file)."""
+    frame_bytes = width * height * channels
+    index_offset = HEADER_SIZE
+    frames_offset = index_offset + capacity * 8
+    return index_offset, frames_offset, frame_bytes, frames_offset + capacity * frame_bytes
+
+
+class FrameRecorder:
+    """
+    Registra frame e timestamp di cattura in un file raw memory-mapped preallocato.
+
+    Ogni write() è una copia in memoria nel frame successivo del file, senza
+    codifica; il contatore nell'header viene aggiornato dopo ogni frame, quindi
+    anche una registrazione interrotta resta rileggibile.
+    """
+
+    def __init__(self, path, width=640, height=480, channels=3, capacity=1800):
+        self.path = path
+        self.width = width
+        self.height = height
+        self.channels = channels
+        self.capacity = capacity
+        self.count = 0
+
+        index_offset, frames_offset, _, file_size = _layout(width, height, channels, capacity)
+
+        # Preallocazione dell'intero file
+        with open(path, "wb") as f:
+            f.truncate(file_size)
+
+        self._header = np.memmap(path, dtype=np.uint8, mode="r+", offset=0, shape=(HEADER_SIZE,))
+        self._index = np.memmap(path, dtype="<f8", mode="r+", offset=index_offset, shape=(capacity,))
+        self._frames = np.memmap(path, dtype=np.uint8, mode="r+", offset=frames_offset,
+                                 shape=(capacity, height, width, channels))
+        self._write_header()
+
+    def _write_header(self):
+        header = struct.pack(HEADER_FORMAT, MAGIC, VERSION, self.width, self.height,
+                             self.channels, self.capacity, self.count)
+        self._header[:len(header)] = np.frombuffer(header, dtype=np.uint8)
+
+    @property
+    def full(self):
+        return self.count >= self.capacity
+
+    def write(self, frame, timestamp=None):
+        """Copia il frame nel prossimo slot. Restituisce False se il file è pieno."""
+        if self.full:
+            return False
+        if frame.shape != (self.height, self.width, self.channels):
+            raise ValueError(f"Frame {frame.shape} diverso da {(self.height, self.width, self.channels)}")
+
+        self._frames[self.count] = frame
+        self._index[self.count] = time.time() if timestamp is None else timestamp
+        self.count += 1
+        self._write_header()
+        return True
+
+    def close(self):
+        if self._frames is None:
+            return
+        self._write_header()
+        self._frames.flush()
+        self._index.flush()
+        self._header.flush()
+        self._frames = self._index = self._header = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+class ReplayCapture:
+    """
+    Sorgente di frame registrati con la stessa interfaccia di cv2.VideoCapture
+    (read, isOpened, get, set, release), utilizzabile al posto della camera.
+
+    Con realtime=True rispetta i tempi originali di cattura, altrimenti
+    restituisce i frame il più velocemente possibile.
+    """
+
+    def __init__(self, path, realtime=False, loop=False, copy=True):
+        self.path = path
+        self.realtime = realtime
+        self.loop = loop
+        self.copy = copy
+        self.position = 0
+
+        with open(path, "rb") as f:
+            raw = f.read(struct.calcsize(HEADER_FORMAT))
+        magic, version, width, height, channels, capacity, count = struct.unpack(HEADER_FORMAT, raw)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path}: non è una registrazione valida")
+
+        self.width = width
+        self.height = height
+        self.channels = channels
+        self.frame_count = count
+
+        index_offset, frames_offset, _, _ = _layout(width, height, channels, capacity)
+        self.timestamps = np.memmap(path, dtype="<f8", mode="r", offset=index_offset, shape=(capacity,))[:count]
+        self._frames = np.memmap(path, dtype=np.uint8, mode="r", offset=frames_offset,
+                                 shape=(capacity, height, width, channels))[:count]
+
+        self._start_wall = None
+        self._start_ts = None
+
+    def isOpened(self):
+        return self._frames is not None
+
+    def read(self, image=None):
+        if self._frames is None or self.frame_count == 0:
+            return False, None
+        if self.position >= self.frame_count:
+            if not self.loop:
+                return False, None
+            self.position = 0
+            self._start_wall = None
+
+        idx = self.position
+        if self.realtime:
+            ts = self.timestamps[idx]
+            if self._start_wall is None:
+                self._start_wall, self._start_ts = time.perf_counter(), ts
+            delay = (ts - self._start_ts) - (time.perf_counter() - self._start_wall)
+            if delay > 0:
+                time.sleep(delay)
+
+        self.position += 1
+        src = self._frames[idx]
+        if image is not None and image.shape == src.shape:
+            np.copyto(image, src)
+            return True, image
+        # I detector disegnano sul frame: di default si restituisce una copia scrivibile
+        return True, (np.array(src) if self.copy else src)
+
+    def timestamp(self, idx=None):
+        """Timestamp di cattura originale del frame `idx` (default: ultimo letto)."""
+        idx = self.position - 1 if idx is None else idx
+        return float(self.timestamps[idx])
+
+    def get(self, prop):
+        import cv2
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self.width)
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self.height)
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return float(self.frame_count)
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            return float(self.position)
+        if prop == cv2.CAP_PROP_FPS and self.frame_count > 1:
+            span = self.timestamps[-1] - self.timestamps[0]
+            return float((self.frame_count - 1) / span) if span > 0 else 0.0
+        return 0.0
+
+    def set(self, prop, value):
+        import cv2
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            self.position = max(0, min(int(value), self.frame_count))
+            self._start_wall = None
+            return True
+        # Risoluzione/FPS sono fissati dalla registrazione
+        return False
+
+    def release(self):
+        self._frames = None
+        self.timestamps = None
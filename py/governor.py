@@ -0,0 +1,210 @@
+import json
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+
+@dataclass(frozen=True)
+class DegradationLevel:
+    """Un livello di degradazione del loop di visione."""
+    name: str
+    scale: float = 1.0                  # scala della risoluzione di elaborazione
+    ocr_rate_hz: Optional[float] = 5.0  # frequenza del detector lettere
+    max_priority: Optional[int] = None  # detector con priorità maggiore vengono disabilitati
+
+
+# Dal più completo al più leggero
+DEFAULT_LEVELS = (
+    DegradationLevel("full", scale=1.0, ocr_rate_hz=5.0),
+    DegradationLevel("ocr_ridotto", scale=1.0, ocr_rate_hz=2.0),
+    DegradationLevel("risoluzione_75", scale=0.75, ocr_rate_hz=2.0),
+    DegradationLevel("risoluzione_50", scale=0.5, ocr_rate_hz=1.0, max_priority=1),
+    DegradationLevel("minimo", scale=0.5, ocr_rate_hz=0.5, max_priority=0),
+)
+
+
+class SysfsThermalSource:
+    """
+    Legge temperatura e frequenza CPU da sysfs (Raspberry Pi / Linux).
+
+    I path sono configurabili: nei test si puntano a file temporanei scritti a mano.
+    Se un file non esiste la lettura restituisce None.
+    """
+
+    def __init__(self,
+                 temp_path="/sys/class/thermal/thermal_zone0/temp",
+                 freq_path="/sys/devices/system/cpu/cpu0/cpufreq/scaling_cur_freq",
+                 max_freq_path="/sys/devices/system/cpu/cpu0/cpufreq/scaling_max_freq"):
+        self.temp_path = temp_path
+        self.freq_path = freq_path
+        self.max_freq_path = max_freq_path
+
+    @staticmethod
+    def _read_int(path):
+        try:
+            with open(path) as f:
+                return int(f.read().strip())
+        except (OSError, ValueError):
+            return None
+
+    def temperature_c(self):
+        value = self._read_int(self.temp_path)
+        return None if value is None else value / 1000.0  # milligradi
+
+    def frequency_mhz(self):
+        value = self._read_int(self.freq_path)
+        return None if value is None else value / 1000.0  # kHz
+
+    def max_frequency_mhz(self):
+        value = self._read_int(self.max_freq_path)
+        return None if value is None else value / 1000.0
+
+
+class DegradationGovernor:
+    """
+    Sceglie il livello di degradazione in base a FPS del loop, latenza per
+    frame, carico dei singoli detector, temperatura e frequenza CPU.
+
+    Scende di un livello quando c'è pressione (FPS sotto target, latenza oltre
+    budget, temperatura alta o CPU in throttling), al massimo una volta ogni
+    `step_interval_s`. Risale di un livello solo dopo `restore_hold_s` secondi
+    continui di margine (FPS sopra target * restore_ratio e temperatura sotto
+    `temp_ok_c`), per evitare oscillazioni. Ogni cambio viene stampato, tenuto
+    in `history` e opzionalmente accodato in JSON Lines su `log_path`.
+
+    `detector_budgets` limita il carico di singoli detector (ms di CPU per
+    secondo di loop): il p95 del frame intero non vede un OCR lento che gira
+    solo su un frame ogni tanto. Se è l'OCR (`ocr_detector`) a sforare, il
+    governor passa direttamente al primo livello con frequenza OCR più bassa.
+    """
+
+    def __init__(self, levels=DEFAULT_LEVELS, target_fps=20.0, restore_ratio=1.3,
+                 frame_budget_ms=None, temp_high_c=75.0, temp_ok_c=68.0,
+                 throttle_ratio=0.8, step_interval_s=2.0, restore_hold_s=5.0,
+                 detector_budgets: Optional[Dict[str, float]] = None, ocr_detector="letters",
+                 thermal=None, log_path=None,
+                 on_change: Optional[Callable[[DegradationLevel], None]] = None):
+        self.levels = tuple(levels)
+        self.target_fps = target_fps
+        self.restore_ratio = restore_ratio
+        self.frame_budget_ms = frame_budget_ms
+        self.temp_high_c = temp_high_c
+        self.temp_ok_c = temp_ok_c
+        self.throttle_ratio = throttle_ratio
+        self.step_interval_s = step_interval_s
+        self.restore_hold_s = restore_hold_s
+        self.detector_budgets = dict(detector_budgets or {})
+        self.ocr_detector = ocr_detector
+        self.thermal = thermal
+        self.log_path = log_path
+        self.on_change = on_change
+
+        self.index = 0
+        self.history: List[dict] = []
+        self._last_change = None
+        self._headroom_since = None
+        self.last_reading = {}
+
+    @property
+    def level(self) -> DegradationLevel:
+        return self.levels[self.index]
+
+    def _over_budget(self, detector_load_ms, ratio=1.0):
+        """Detector il cui carico (ms/s) supera ratio * budget."""
+        if not detector_load_ms:
+            return []
+        return [name for name, budget in self.detector_budgets.items()
+                if detector_load_ms.get(name) is not None and detector_load_ms[name] > budget * ratio]
+
+    def _ocr_relief_index(self):
+        """Primo livello più leggero con frequenza OCR inferiore a quella attuale."""
+        rate = self.level.ocr_rate_hz
+        for i in range(self.index + 1, len(self.levels)):
+            lower = self.levels[i].ocr_rate_hz
+            if rate is None or (lower is not None and lower < rate):
+                return i
+        return min(self.index + 1, len(self.levels) - 1)
+
+    def _pressure_reasons(self, fps, frame_p95_ms, temp, freq, max_freq, detector_load_ms=None):
+        reasons = []
+        if fps is not None and fps < self.target_fps:
+            reasons.append(f"fps {fps:.1f} < {self.target_fps:.0f}")
+        if self.frame_budget_ms and frame_p95_ms is not None and frame_p95_ms > self.frame_budget_ms:
+            reasons.append(f"frame p95 {frame_p95_ms:.1f}ms > {self.frame_budget_ms:.0f}ms")
+        for name in self._over_budget(detector_load_ms):
+            reasons.append(f"{name} {detector_load_ms[name]:.0f}ms/s > {self.detector_budgets[name]:.0f}ms/s")
+        if temp is not None and temp >= self.temp_high_c:
+            reasons.append(f"temp {temp:.1f}C >= {self.temp_high_c:.0f}C")
+        if freq is not None and max_freq and freq < max_freq * self.throttle_ratio:
+            reasons.append(f"throttling {freq:.0f}/{max_freq:.0f}MHz")
+        return reasons
+
+    def _has_headroom(self, fps, frame_p95_ms, temp, detector_load_ms=None):
+        if fps is not None and fps < self.target_fps * self.restore_ratio:
+            return False
+        if self.frame_budget_ms and frame_p95_ms is not None and frame_p95_ms > self.frame_budget_ms * 0.7:
+            return False
+        if self._over_budget(detector_load_ms, 0.7):
+            return False
+        if temp is not None and temp > self.temp_ok_c:
+            return False
+        return True
+
+    def update(self, fps=None, frame_p95_ms=None, detector_load_ms=None, now=None) -> DegradationLevel:
+        """
+        Valuta le misure correnti e restituisce il livello (eventualmente cambiato).
+
+        Args:
+            detector_load_ms: ms di CPU spesi nell'ultimo secondo da ogni
+                detector (nome -> ms), confrontati con `detector_budgets`
+        """
+        now = time.monotonic() if now is None else now
+        temp = freq = max_freq = None
+        if self.thermal is not None:
+            temp = self.thermal.temperature_c()
+            freq = self.thermal.frequency_mhz()
+            max_freq = self.thermal.max_frequency_mhz()
+        self.last_reading = {"fps": fps, "frame_p95_ms": frame_p95_ms, "temp_c": temp, "freq_mhz": freq}
+        if detector_load_ms:
+            self.last_reading["detector_load_ms"] = dict(detector_load_ms)
+
+        can_step = self._last_change is None or now - self._last_change >= self.step_interval_s
+        reasons = self._pressure_reasons(fps, frame_p95_ms, temp, freq, max_freq, detector_load_ms)
+
+        if reasons:
+            self._headroom_since = None
+            if can_step and self.index < len(self.levels) - 1:
+                target = self.index + 1
+                if self.ocr_detector in self._over_budget(detector_load_ms):
+                    target = self._ocr_relief_index()
+                self._change(target, "; ".join(reasons), now)
+        elif self._has_headroom(fps, frame_p95_ms, temp, detector_load_ms):
+            if self._headroom_since is None:
+                self._headroom_since = now
+            elif (self.index > 0 and can_step
+                  and now - self._headroom_since >= self.restore_hold_s):
+                self._change(self.index - 1, "margine recuperato", now)
+                self._headroom_since = now
+        else:
+            self._headroom_since = None
+
+        return self.level
+
+    def _change(self, new_index, reason, now):
+        old = self.level
+        self.index = new_index
+        self._last_change = now
+        entry = {"timestamp": time.time(), "from": old.name, "to": self.level.name,
+                 "reason": reason, **self.last_reading}
+        self.history.append(entry)
+        print(f"[Governor] {old.name} -> {self.level.name} ({reason})")
+
+        if self.log_path:
+            try:
+                with open(self.log_path, "a") as f:
+                    f.write(json.dumps(entry) + "\n")
+            except OSError as e:
+                print(f"[Governor] Impossibile scrivere il log: {e}")
+
+        if self.on_change is not None:
+            self.on_change(self.level)
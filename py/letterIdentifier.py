@@ -1,20 +1,31 @@
 
 import cv2
-import pytesseract
+import numpy as np
 import os
 import platform
 import threading
 import time
 from collections import deque, Counter
 
+from stage_profiler import NULL_PROFILER
+
 # Configurazione Tesseract
 script_dir = os.path.dirname(os.path.abspath(__file__))
 tessdata_dir = os.path.join(script_dir, 'tessdata')
 
-if platform.system() == "Windows":
-    pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
-elif os.path.exists('/usr/bin/tesseract'):
-    pytesseract.pytesseract.tesseract_cmd = '/usr/bin/tesseract'
+_pytesseract = None
+
+def get_pytesseract():
+    """Importa e configura pytesseract solo al primo utilizzo (avvio più rapido)."""
+    global _pytesseract
+    if _pytesseract is None:
+        import pytesseract
+        if platform.system() == "Windows":
+            pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
+        elif os.path.exists('/usr/bin/tesseract'):
+            pytesseract.pytesseract.tesseract_cmd = '/usr/bin/tesseract'
+        _pytesseract = pytesseract
+    return _pytesseract
 
 class VideoStream:
     """Classe per gestire l'acquisizione video multithread per aumentare gli FPS."""
@@ -49,31 +60,89 @@ class VideoStream:
         # self.stream.release()
 
 class LetterDetector:
-    def __init__(self, size=100, velocita=12):
+    def __init__(self, size=100, velocita=12, profiler=None, clahe=True):
+        self.base_size = size
+        self.base_velocita = velocita
         self.size = size
         self.velocita = velocita
         self.step_y = int(size/4)
-        self.pause_frames = 0
+
+        # Velocità, pause, cadenza OCR e finestra di debounce sono in frame a
+        # REFERENCE_FPS e vengono convertite in tempo: se lo scheduler chiama
+        # il detector meno spesso, scansione e OCR mantengono la velocità reale
+        self.REFERENCE_FPS = 20.0
+        self.pause_until = 0.0
+        self._last_time = None
+        self._call_interval = 1.0 / self.REFERENCE_FPS
         
         # Variabili di stato
         self.x = None
         self.y = None
         self.direzione = 1
+        self._scale = 1.0
         
-        # Buffer per stabilizzazione temporale
+        # Buffer per stabilizzazione temporale: (istante, carattere) dei risultati OCR
         self.detection_buffer = deque(maxlen=20)
+        self.DEBOUNCE_FRAMES = 20
+        self.DEBOUNCE_MIN_RESULTS = 7
         
         # Variabili per calcolo OCR
-        self.frame_count = 0
+        self.last_ocr_time = None
         self.OCR_SKIP_FRAMES = 3
         
         # Configurazione Tesseract
         self.script_dir = os.path.dirname(os.path.abspath(__file__))
         self.tessdata_dir = os.path.join(self.script_dir, 'tessdata')
+
+        # Misura latenza per stage (nessun costo se disabilitato)
+        self.profiler = profiler or NULL_PROFILER
+
+        # CLAHE creato una volta; None se il frame arriva già normalizzato (PhotometricNormalizer)
+        self.clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8)) if clahe else None
+
+    def set_scale(self, scale):
+        """Adatta ROI, passo di scansione e velocità a un frame ridimensionato di `scale`."""
+        self.size = max(8, int(round(self.base_size * scale)))
+        self.velocita = max(1, int(round(self.base_velocita * scale)))
+        self.step_y = max(1, int(self.size/4))
+        if self.x is not None:
+            self.x = int(self.x * scale / self._scale)
+            self.y = int(self.y * scale / self._scale)
+        self._scale = scale
+
+    def _lock(self, frames, now):
+        """Ferma la scansione per `frames` frame di riferimento (almeno fino alla prossima chiamata)."""
+        hold = max(frames / self.REFERENCE_FPS, 1.5 * self._call_interval)
+        self.pause_until = max(self.pause_until, now + hold)
+
+    def run_ocr(self, image):
+        """Esegue Tesseract sull'immagine binarizzata e restituisce il testo."""
+        config = f'--tessdata-dir "{self.tessdata_dir}" -l grc --psm 10 -c tessedit_char_whitelist=ΩΦΨ'
+        return get_pytesseract().image_to_string(image, config=config).strip()
+
+    def prewarm(self):
+        """
+        Paga i costi una-tantum (import pytesseract, primo avvio di Tesseract,
+        primo CLAHE) prima del loop, senza toccare lo stato di scansione.
+        """
+        blank = np.full((self.size * 2, self.size * 2), 255, dtype=np.uint8)
+        if self.clahe is not None:
+            self.clahe.apply(blank)
+        try:
+            self.run_ocr(blank)
+        except Exception as e:
+            print(f"Avviso: pre-warm OCR fallito: {e}")
         
-    def process_frame(self, frame):
+    def process_frame(self, frame, now=None):
         if frame is None:
             return None, "NO_FRAME"
+        now = time.monotonic() if now is None else now
+        if self._last_time is None:
+            elapsed_frames = 1.0
+        else:
+            self._call_interval = max(now - self._last_time, 1e-3)
+            elapsed_frames = self._call_interval * self.REFERENCE_FPS
+        self._last_time = now
             
         h, w, _ = frame.shape
         
@@ -89,11 +158,9 @@ class LetterDetector:
             self.y = scan_y_min
 
         # Aggiornamento posizione solo se non siamo in pausa
-        if self.pause_frames > 0:
-            self.pause_frames -= 1
-        else:
-            # Aggiornamento posizione X
-            self.x += self.direzione * self.velocita
+        if now >= self.pause_until:
+            # Aggiornamento posizione X (al massimo mezza ROI per chiamata, per non saltare lettere)
+            self.x += self.direzione * int(round(min(self.velocita * elapsed_frames, self.size / 2)))
             
             # Controllo bordi e aggiornamento Y
             if self.x >= scan_x_max or self.x <= scan_x_min:
@@ -108,63 +175,80 @@ class LetterDetector:
         
         roi = frame[self.y:self.y + self.size, self.x:self.x + self.size]
 
+        profiler = self.profiler
+
         # Pre-processing ottimizzato
-        gray = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY)
-        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
-        gray = clahe.apply(gray)
+        with profiler.stage("color_conversion"):
+            gray = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY)
+        if self.clahe is not None:
+            with profiler.stage("clahe"):
+                gray = self.clahe.apply(gray)
         
         # Resize ridotto a 2x invece di 3x per velocità
         gray_resized = cv2.resize(gray, (self.size*2, self.size*2), interpolation=cv2.INTER_LINEAR)
         
         # Gaussian Blur
-        gray_filtered = cv2.GaussianBlur(gray_resized, (5, 5), 0)
+        with profiler.stage("blur"):
+            gray_filtered = cv2.GaussianBlur(gray_resized, (5, 5), 0)
         
         # Adaptive Thresholding
-        thresh = cv2.adaptiveThreshold(gray_filtered, 255, 
-                                       cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
-                                       cv2.THRESH_BINARY_INV, 25, 10)
+        with profiler.stage("threshold"):
+            thresh = cv2.adaptiveThreshold(gray_filtered, 255, 
+                                           cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
+                                           cv2.THRESH_BINARY_INV, 25, 10)
 
-        # Pulizia morfologica ridotta
-        kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3))
-        thresh = cv2.morphologyEx(thresh, cv2.MORPH_CLOSE, kernel)
+            # Pulizia morfologica ridotta
+            kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3))
+            thresh = cv2.morphologyEx(thresh, cv2.MORPH_CLOSE, kernel)
 
         detected_char = None
         
         # Esegue OCR solo periodicamente o se siamo lockati su una detection
-        self.frame_count += 1
-        if self.pause_frames > 0 or self.frame_count % self.OCR_SKIP_FRAMES == 0:
-            config = f'--tessdata-dir "{self.tessdata_dir}" -l grc --psm 10 -c tessedit_char_whitelist=ΩΦΨ'
+        ocr_interval = (self.OCR_SKIP_FRAMES - 0.5) / self.REFERENCE_FPS
+        ocr_done = False
+        if now < self.pause_until or self.last_ocr_time is None or now - self.last_ocr_time >= ocr_interval:
+            self.last_ocr_time = now
+            ocr_done = True
             try:
-                text = pytesseract.image_to_string(thresh, config=config).strip()
+                with profiler.stage("ocr"):
+                    text = self.run_ocr(thresh)
                 if text:
                     detected_char = text[0]
-                    self.pause_frames = 10 
+                    self._lock(10, now)
             except Exception:
                 pass
 
-        self.detection_buffer.append(detected_char)
-        valid_detections = [c for c in self.detection_buffer if c is not None]
-        
         greek_map = {'Ω': 'Omega', 'Φ': 'Phi', 'Ψ': 'Psi'}
         result_text = None
 
-        if valid_detections:
-            counts = Counter(valid_detections)
-            most_common, count = counts.most_common(1)[0]
-            
-            if most_common in greek_map and count >= 5:
-                self.pause_frames = 5
-                result_text = greek_map[most_common]
+        with profiler.stage("debounce"):
+            if ocr_done:
+                self.detection_buffer.append((now, detected_char))
+            # Finestra di DEBOUNCE_FRAMES frame, ma con almeno DEBOUNCE_MIN_RESULTS chiamate
+            window = max(self.DEBOUNCE_FRAMES / self.REFERENCE_FPS,
+                         self.DEBOUNCE_MIN_RESULTS * self._call_interval)
+            while self.detection_buffer and self.detection_buffer[0][0] < now - window:
+                self.detection_buffer.popleft()
+            valid_detections = [c for _, c in self.detection_buffer if c is not None]
+
+            if valid_detections:
+                counts = Counter(valid_detections)
+                most_common, count = counts.most_common(1)[0]
+                
+                if most_common in greek_map and count >= 5:
+                    self._lock(5, now)
+                    result_text = greek_map[most_common]
         
         # Visualizzazione sul frame
-        status = "SCANNING" if self.pause_frames == 0 else "LOCKING..."
+        locked = now < self.pause_until
+        status = "SCANNING" if not locked else "LOCKING..."
         cv2.putText(frame, f"Mode: {status}", (w-200, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 0), 2)
         cv2.rectangle(frame, (scan_x_min, scan_y_min), (scan_x_max + self.size, scan_y_max + self.size), (100, 100, 100), 1)
         
         if result_text:
              cv2.putText(frame, f"Greca: {result_text}", (50, 80), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
 
-        color = (0, 255, 0) if self.pause_frames > 0 else (127, 0, 255)
+        color = (0, 255, 0) if locked else (127, 0, 255)
         cv2.rectangle(frame, (self.x, self.y), (self.x + self.size, self.y + self.size), color, 2)
         
         return result_text, status
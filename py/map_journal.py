@@ -0,0 +1,354 @@
+import os
+import struct
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from Mapping import CellState, GridMap
+
+# Journal: header seguito da record a dimensione fissa, ciascuno con il suo CRC32.
+#   header: magic, versione formato
+#   record: seq (uint64), x, y (int32), tipo (0 = stato cella, 1 = maschera muri), valore (uint8), crc32
+# Un record scritto a metà (crash durante l'append) o con CRC errato chiude il
+# journal: al riavvio i byte da lì in poi vengono scartati e sovrascritti.
+JOURNAL_MAGIC = b"RCMAPJNL"
+SNAPSHOT_MAGIC = b"RCMAPSNP"
+FORMAT_VERSION = 1
+JOURNAL_HEADER = struct.Struct("<8sI")
+RECORD = struct.Struct("<QiiBB")
+CRC = struct.Struct("<I")
+RECORD_SIZE = RECORD.size + CRC.size
+
+# Snapshot: header, poi array (x int32, y int32, valore uint8) di celle e muri, poi crc32 di tutto
+SNAPSHOT_HEADER = struct.Struct("<8sIQIII")
+
+KIND_CELL = 0
+KIND_WALLS = 1
+
+JOURNAL_FILE = "map.journal"
+SNAPSHOT_FILE = "map.snapshot"
+CLEAN_FILE = "map.clean"     # scritto da stop(): la sessione è stata chiusa correttamente
+PREVIOUS_SUFFIX = ".prev"    # snapshot/journal di una sessione chiusa, non più ripristinati
+
+
+def _pack_record(seq, x, y, kind, value):
+    body = RECORD.pack(seq, x, y, kind, value)
+    return body + CRC.pack(zlib.crc32(body))
+
+
+def read_journal(path):
+    """
+    Legge i record validi del journal.
+
+    Returns:
+        (lista di (seq, x, y, tipo, valore), offset di fine dell'ultimo record valido,
+         byte scartati in coda)
+    """
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return [], 0, 0
+
+    if len(data) < JOURNAL_HEADER.size:
+        return [], 0, len(data)
+    magic, version = JOURNAL_HEADER.unpack_from(data, 0)
+    if magic != JOURNAL_MAGIC or version != FORMAT_VERSION:
+        raise ValueError(f"Journal non valido: {path}")
+
+    records = []
+    offset = JOURNAL_HEADER.size
+    while offset + RECORD_SIZE <= len(data):
+        body = data[offset:offset + RECORD.size]
+        (crc,) = CRC.unpack_from(data, offset + RECORD.size)
+        if zlib.crc32(body) != crc:
+            break
+        records.append(RECORD.unpack(body))
+        offset += RECORD_SIZE
+    return records, offset, len(data) - offset
+
+
+def write_snapshot_file(path, seq, max_size, cells, walls):
+    """Scrive uno snapshot compatto in modo atomico (file temporaneo + fsync + rename)."""
+    cell_xy = np.array(list(cells.keys()), dtype="<i4").reshape(-1, 2)
+    cell_values = np.fromiter((state.value for state in cells.values()), dtype=np.uint8, count=len(cells))
+    wall_xy = np.array(list(walls.keys()), dtype="<i4").reshape(-1, 2)
+    wall_values = np.fromiter(walls.values(), dtype=np.uint8, count=len(walls))
+
+    payload = b"".join((
+        SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, FORMAT_VERSION, seq, max_size, len(cells), len(walls)),
+        np.ascontiguousarray(cell_xy[:, 0]).tobytes(), np.ascontiguousarray(cell_xy[:, 1]).tobytes(),
+        cell_values.tobytes(),
+        np.ascontiguousarray(wall_xy[:, 0]).tobytes(), np.ascontiguousarray(wall_xy[:, 1]).tobytes(),
+        wall_values.tobytes(),
+    ))
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(payload)
+        f.write(CRC.pack(zlib.crc32(payload)))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def read_snapshot_file(path):
+    """
+    Legge uno snapshot.
+
+    Returns:
+        (seq, array xy celle, valori celle, array xy muri, maschere) o None se
+        assente o corrotto
+    """
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None
+
+    if len(data) < SNAPSHOT_HEADER.size + CRC.size:
+        return None
+    (crc,) = CRC.unpack_from(data, len(data) - CRC.size)
+    payload = memoryview(data)[:len(data) - CRC.size]
+    if zlib.crc32(payload) != crc:
+        print(f"[MapJournal] Snapshot corrotto ignorato: {path}")
+        return None
+
+    magic, version, seq, _, n_cells, n_walls = SNAPSHOT_HEADER.unpack_from(payload, 0)
+    if magic != SNAPSHOT_MAGIC or version != FORMAT_VERSION:
+        return None
+
+    offset = SNAPSHOT_HEADER.size
+    arrays = []
+    for count in (n_cells, n_walls):
+        xs = np.frombuffer(payload, dtype="<i4", count=count, offset=offset)
+        ys = np.frombuffer(payload, dtype="<i4", count=count, offset=offset + 4 * count)
+        values = np.frombuffer(payload, dtype=np.uint8, count=count, offset=offset + 8 * count)
+        arrays.append((xs, ys, values))
+        offset += 9 * count
+    (cx, cy, cv), (wx, wy, wv) = arrays
+    return seq, cx, cy, cv, wx, wy, wv
+
+
+class MapJournal:
+    """
+    Persistenza crash-safe di una GridMap: journal binario append-only più
+    snapshot compatti periodici.
+
+    Il thread di background legge le modifiche con GridMap.changes_since()
+    e le accoda al journal, quindi set_cell/set_walls non fanno mai I/O.
+    Ogni `snapshot_interval_s` (o dopo un full_resync del journal della
+    mappa, es. clear()) scrive uno snapshot atomico e svuota il journal.
+
+    Al riavvio restore() carica l'ultimo snapshot e riapplica i record del
+    journal con seq successivo; un record finale scritto a metà viene
+    scartato.
+
+    Il ripristino serve solo dopo un crash o un riavvio: stop() lascia il
+    marcatore `map.clean` e la sessione successiva (un nuovo round) parte da
+    una mappa vuota, spostando snapshot e journal in `*.prev`. Con
+    `resume_clean=True` anche una sessione chiusa correttamente viene ripresa.
+    """
+
+    def __init__(self, grid_map: GridMap, directory: str, snapshot_interval_s: float = 30.0,
+                 poll_interval_s: float = 0.05, fsync: bool = True, resume_clean: bool = False):
+        self.grid_map = grid_map
+        self.directory = directory
+        self.resume_clean = resume_clean
+        self.snapshot_interval_s = snapshot_interval_s
+        self.poll_interval_s = poll_interval_s
+        self.fsync = fsync
+
+        self.journal_path = os.path.join(directory, JOURNAL_FILE)
+        self.snapshot_path = os.path.join(directory, SNAPSHOT_FILE)
+        self.clean_path = os.path.join(directory, CLEAN_FILE)
+
+        self.seq = 0                # ultimo seq scritto (continua tra le sessioni)
+        self.snapshot_seq = 0       # seq coperto dall'ultimo snapshot
+        self.map_version = -1       # versione della GridMap già persistita
+        self.records_written = 0
+        self.snapshots_written = 0
+
+        self._file = None
+        self._io_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._last_snapshot = time.monotonic()
+
+    # ------------------------------------------------------------------
+    # Avvio / ripristino
+    # ------------------------------------------------------------------
+
+    def restore(self) -> dict:
+        """
+        Ricostruisce la mappa da snapshot + coda del journal.
+
+        Da chiamare prima di start(): le celle ripristinate non vengono
+        riscritte nel journal.
+        """
+        t0 = time.perf_counter()
+        os.makedirs(self.directory, exist_ok=True)
+        cells = walls = 0
+
+        # Da qui la sessione è "aperta": un crash prima di stop() verrà ripristinato
+        clean = os.path.exists(self.clean_path)
+        if clean:
+            if not self.resume_clean:
+                for path in (self.snapshot_path, self.journal_path):
+                    if os.path.exists(path):
+                        os.replace(path, path + PREVIOUS_SUFFIX)
+                print("[MapJournal] Sessione precedente chiusa correttamente: mappa nuova")
+            os.remove(self.clean_path)
+
+        snapshot = read_snapshot_file(self.snapshot_path)
+        if snapshot is not None:
+            self.snapshot_seq, cx, cy, cv, wx, wy, wv = snapshot
+            self.grid_map.load_arrays(cx, cy, cv, wx, wy, wv)
+            cells, walls = len(cv), len(wv)
+        self.seq = self.snapshot_seq
+
+        records, valid_end, torn = read_journal(self.journal_path)
+        replayed = 0
+        for seq, x, y, kind, value in records:
+            if seq <= self.snapshot_seq:
+                continue  # già nello snapshot (crash tra snapshot e troncamento)
+            if kind == KIND_CELL:
+                self.grid_map.set_cell(x, y, CellState(value))
+            else:
+                self.grid_map.set_walls(x, y, value)
+            self.seq = max(self.seq, seq)
+            replayed += 1
+
+        self._open_journal(valid_end)
+        self.map_version = self.grid_map.version
+        elapsed = (time.perf_counter() - t0) * 1000.0
+
+        info = {"snapshot_cells": cells, "snapshot_walls": walls, "journal_records": replayed,
+                "torn_bytes": torn, "restore_ms": elapsed, "previous_clean": clean}
+        if cells or walls or replayed:
+            print(f"[MapJournal] Mappa ripristinata: {cells} celle, {walls} muri da snapshot, "
+                  f"{replayed} record dal journal in {elapsed:.1f} ms")
+        if torn:
+            print(f"[MapJournal] Scartati {torn} byte incompleti in coda al journal")
+        return info
+
+    def _open_journal(self, valid_end: int) -> None:
+        """Apre il journal in append, tagliando un'eventuale coda non valida."""
+        if valid_end < JOURNAL_HEADER.size:
+            self._reset_journal()
+            return
+        self._file = open(self.journal_path, "r+b")
+        self._file.truncate(valid_end)
+        self._file.seek(valid_end)
+
+    def _reset_journal(self) -> None:
+        if self._file is not None:
+            self._file.close()
+        self._file = open(self.journal_path, "wb")
+        self._file.write(JOURNAL_HEADER.pack(JOURNAL_MAGIC, FORMAT_VERSION))
+        self._sync()
+
+    def _sync(self) -> None:
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+    # ------------------------------------------------------------------
+    # Scrittura
+    # ------------------------------------------------------------------
+
+    def flush(self) -> int:
+        """Accoda al journal le modifiche non ancora persistite. Restituisce i record scritti."""
+        with self._io_lock:
+            if self._file is None:
+                return 0  # journal non aperto: serve restore() o start()
+            changes = self.grid_map.changes_since(self.map_version)
+            if changes.full_resync:
+                self.map_version = changes.version
+                self._write_snapshot(changes.cells, changes.walls)
+                return 0
+            if changes.version == self.map_version:
+                return 0
+
+            chunks = []
+            for (x, y), state in changes.cells.items():
+                self.seq += 1
+                chunks.append(_pack_record(self.seq, x, y, KIND_CELL, state.value))
+            for (x, y), mask in changes.walls.items():
+                self.seq += 1
+                chunks.append(_pack_record(self.seq, x, y, KIND_WALLS, mask))
+            self._file.write(b"".join(chunks))
+            self._sync()
+
+            self.map_version = changes.version
+            self.records_written += len(chunks)
+            return len(chunks)
+
+    def write_snapshot(self) -> None:
+        """Persiste subito le ultime modifiche e scrive uno snapshot completo."""
+        self.flush()
+        with self._io_lock:
+            snap = self.grid_map.snapshot()
+            self._write_snapshot(snap.cells, snap.walls)
+
+    def _write_snapshot(self, cells, walls) -> None:
+        # Le modifiche successive allo snapshot finiscono comunque nel journal
+        # con seq maggiore: riapplicarle sopra lo snapshot è idempotente.
+        write_snapshot_file(self.snapshot_path, self.seq, self.grid_map.max_size, cells, walls)
+        self.snapshot_seq = self.seq
+        self._reset_journal()
+        self.snapshots_written += 1
+        self._last_snapshot = time.monotonic()
+
+    # ------------------------------------------------------------------
+    # Thread di background
+    # ------------------------------------------------------------------
+
+    def start(self) -> None:
+        if self._file is None:
+            self.restore()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="MapJournal")
+        self._thread.start()
+
+    def _run(self) -> None:
+        bus = self.grid_map.event_bus
+        seen = {"map": -1}  # il primo wait() ritorna subito: modifiche precedenti all'avvio
+        while not self._stop.is_set():
+            if bus is None:
+                if self._stop.wait(self.poll_interval_s):
+                    break
+            else:
+                # Dorme finché la mappa non cambia (o scade lo snapshot in
+                # sospeso), poi raggruppa le modifiche per poll_interval_s
+                timeout = None
+                if self.seq > self.snapshot_seq:
+                    timeout = max(0.0, self._last_snapshot + self.snapshot_interval_s - time.monotonic())
+                seen = bus.wait(seen, timeout)
+                if bus.stopped or self._stop.wait(self.poll_interval_s):
+                    break
+            try:
+                self.flush()
+                if (time.monotonic() - self._last_snapshot >= self.snapshot_interval_s
+                        and self.seq > self.snapshot_seq):
+                    self.write_snapshot()
+            except OSError as e:
+                print(f"[MapJournal] Errore di scrittura: {e}")
+
+    def stop(self) -> None:
+        """Ferma il thread, persiste le ultime modifiche e marca la sessione come chiusa."""
+        self._stop.set()
+        if self.grid_map.event_bus is not None:
+            self.grid_map.event_bus.wake()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+        if self._file is not None:
+            self.flush()
+            with self._io_lock:
+                self._file.close()
+                self._file = None
+                with open(self.clean_path, "wb") as f:
+                    if self.fsync:
+                        os.fsync(f.fileno())
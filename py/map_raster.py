@@ -0,0 +1,255 @@
+import os
+import struct
+import threading
+import time
+import zlib
+from typing import Callable, Iterable, Optional, Tuple
+
+import numpy as np
+
+from Mapping import CONFIG, CellState, GridMap, WALL_N, WALL_E, WALL_S, WALL_W
+
+# Marker aggiuntivo: (x, y, colore RGB), es. posizione del robot
+Marker = Tuple[int, int, Tuple[int, int, int]]
+
+_STATE_COLORS = {
+    CellState.UNKNOWN: "BACKGROUND",
+    CellState.WALL: "WALL",
+    CellState.FLOOR: "FLOOR",
+    CellState.START_POINT: "START",
+    CellState.VICTIM_FOUND: "VICTIM",
+    CellState.LETTER_X: "LETTER_X",
+    CellState.LETTER_Y: "LETTER_Y",
+    CellState.LETTER_H: "LETTER_H",
+}
+
+
+def _letter_mask(letter: str, size: int) -> np.ndarray:
+    """Glifo a tratti (X, Y o H) centrato in un tile size x size."""
+    rows, cols = np.mgrid[0:size, 0:size] + 0.5
+    lo, hi = size * 0.3, size * 0.7
+    mid = size / 2
+    width = max(1.0, size / 14)
+    inside = (rows >= lo) & (rows <= hi) & (cols >= lo) & (cols <= hi)
+    diag = np.abs((rows - lo) - (cols - lo)) <= width
+    anti = np.abs((rows - lo) + (cols - lo) - (hi - lo)) <= width
+    if letter == "X":
+        mask = diag | anti
+    elif letter == "Y":
+        mask = ((diag | anti) & (rows <= mid)) | ((np.abs(cols - mid) <= width) & (rows >= mid))
+    else:
+        mask = (np.abs(cols - lo - width) <= width) | (np.abs(cols - hi + width) <= width) \
+            | (np.abs(rows - mid) <= width / 2 + 0.5)
+    return mask & inside
+
+
+class MapRasterizer:
+    """
+    Rasterizzazione headless della GridMap in un'immagine RGB (array NumPy).
+
+    Ogni stato ha un tile pre-calcolato (colore da CONFIG["COLORS"], bordo,
+    icona): l'immagine si ottiene indicizzando la tabella dei tile con
+    l'array degli stati in un solo passo vettoriale, poi i muri sui lati
+    vengono sovrapposti con maschere booleane. Con detail=False (livello di
+    dettaglio ridotto) i tile sono solo il colore dello stato; con
+    tile_size < 4 ogni cella è un pixel di quel colore (LUT pura).
+
+    Lo stesso raster è usato da MazeMapperUI per il ridisegno completo e
+    dall'export PNG, quindi finestra e immagini esportate coincidono.
+    """
+
+    def __init__(self, tile_size: int = CONFIG["TILE_SIZE"], colors: Optional[dict] = None,
+                 detail: bool = True):
+        colors = colors or CONFIG["COLORS"]
+        self.tile_size = tile_size
+        self.detail = detail
+        self.background = np.array(colors["BACKGROUND"], dtype=np.uint8)
+        self.wall_color = np.array(colors["WALL"], dtype=np.uint8)
+        self.wall_thickness = max(2, tile_size // 8)
+
+        # Colore per stato (indice = CellState.value)
+        self.lut = np.array([colors[_STATE_COLORS[state]] for state in CellState], dtype=np.uint8)
+        self.stamps = self._build_stamps(colors)
+
+    def _build_stamps(self, colors: dict) -> np.ndarray:
+        """Tile (size x size x 3) per ogni stato, come quelli della UI."""
+        size = self.tile_size
+        stamps = np.broadcast_to(self.lut[:, None, None, :], (len(self.lut), size, size, 3)).copy()
+        if size < 4 or not self.detail:
+            return stamps
+
+        rows, cols = np.mgrid[0:size, 0:size] + 0.5
+        center = size / 2
+        circle = (rows - center) ** 2 + (cols - center) ** 2 <= (size // 3) ** 2
+        grid_line = np.array(colors["GRID_LINE"], dtype=np.uint8)
+        for state in CellState:
+            if state == CellState.UNKNOWN:
+                continue
+            stamp = stamps[state.value]
+            stamp[0, :] = stamp[-1, :] = stamp[:, 0] = stamp[:, -1] = grid_line
+            if state == CellState.VICTIM_FOUND:
+                stamp[circle] = colors["ACCENT_RED"]
+            elif state in GridMap.LETTER_STATES:
+                stamp[_letter_mask(state.name.split("_")[1], size)] = (255, 255, 255)
+        return stamps
+
+    def rasterize(self, cells: np.ndarray, walls: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Immagine RGB di un rettangolo di celle.
+
+        Args:
+            cells: CellState.value come array [righe, colonne]
+            walls: Maschere dei muri con la stessa forma (opzionale)
+
+        Returns:
+            Array uint8 (righe * tile, colonne * tile, 3)
+        """
+        size = self.tile_size
+        h, w = cells.shape
+        tiles = self.stamps[cells.astype(np.intp)]  # (h, w, size, size, 3), copia scrivibile
+        if walls is not None and size >= 4 and walls.any():
+            t = self.wall_thickness
+            color = self.wall_color
+            tiles[(walls & WALL_N) != 0, :t] = color
+            tiles[(walls & WALL_S) != 0, size - t:] = color
+            tiles[(walls & WALL_W) != 0, :, :t] = color
+            tiles[(walls & WALL_E) != 0, :, size - t:] = color
+        return tiles.transpose(0, 2, 1, 3, 4).reshape(h * size, w * size, 3)
+
+    def render(self, source, bounds: Optional[Tuple[int, int, int, int]] = None,
+               markers: Iterable[Marker] = ()) -> np.ndarray:
+        """
+        Immagine RGB della mappa.
+
+        Args:
+            source: GridMap o MapSnapshot
+            bounds: (min_x, max_x, min_y, max_y) da rasterizzare (default: bounds della mappa)
+            markers: Marker (x, y, colore) disegnati al centro delle celle
+        """
+        snap = source.snapshot() if isinstance(source, GridMap) else source
+        bounds = bounds or snap.bounds
+        image = self.rasterize(snap.region(*bounds), snap.wall_region(*bounds))
+        for x, y, color in markers:
+            self.draw_marker(image, bounds, x, y, color)
+        return image
+
+    def draw_marker(self, image: np.ndarray, bounds: Tuple[int, int, int, int],
+                    x: int, y: int, color) -> None:
+        """Quadrato pieno al centro della cella (x, y) di un'immagine prodotta da render()."""
+        min_x, max_x, min_y, max_y = bounds
+        if not (min_x <= x <= max_x and min_y <= y <= max_y):
+            return
+        size = self.tile_size
+        inset = size // 4
+        px, py = (x - min_x) * size, (y - min_y) * size
+        image[py + inset:py + size - inset, px + inset:px + size - inset] = color
+
+
+def write_png(path: str, image: np.ndarray, level: int = 6) -> None:
+    """
+    Salva un'immagine RGB uint8 come PNG (solo zlib, senza dipendenze) in
+    modo atomico: file temporaneo + rename.
+    """
+    h, w, _ = image.shape
+    raw = np.zeros((h, w * 3 + 1), dtype=np.uint8)  # byte 0 di ogni riga: filtro "None"
+    raw[:, 1:] = image.reshape(h, w * 3)
+
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data))
+
+    png = b"".join((
+        b"\x89PNG\r\n\x1a\n",
+        chunk(b"IHDR", struct.pack(">IIBBBBB", w, h, 8, 2, 0, 0, 0)),
+        chunk(b"IDAT", zlib.compress(raw.tobytes(), level)),
+        chunk(b"IEND", b""),
+    ))
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(png)
+    os.replace(tmp, path)
+
+
+class MapExporter:
+    """
+    Export periodico della mappa in PNG da un thread di background.
+
+    Ogni `interval_s` secondi, se la mappa è cambiata, scrive `map.png`
+    (sovrascritto in modo atomico) e con sequence=True anche
+    `map_00001.png`, `map_00002.png`, ... per ricostruire la corsa. stop()
+    scrive l'immagine finale: a fine corsa resta la mappa senza display.
+    Con un EventBus sulla GridMap il thread dorme finché la mappa non cambia.
+    """
+
+    def __init__(self, grid_map: GridMap, directory: str, interval_s: float = 10.0,
+                 sequence: bool = False, tile_size: int = 16,
+                 markers: Optional[Callable[[], Iterable[Marker]]] = None):
+        self.grid_map = grid_map
+        self.directory = directory
+        self.interval_s = interval_s
+        self.sequence = sequence
+        self.markers = markers
+        self.rasterizer = MapRasterizer(tile_size)
+
+        self.latest_path = os.path.join(directory, "map.png")
+        self.exported_version = -1
+        self.frames_written = 0
+        self.last_export_ms = 0.0
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def export(self, force: bool = False) -> Optional[str]:
+        """Scrive l'immagine se la mappa è cambiata (o se force); restituisce il percorso."""
+        with self._lock:
+            snap = self.grid_map.snapshot()
+            if snap.version == self.exported_version and not force:
+                return None
+            t0 = time.perf_counter()
+            os.makedirs(self.directory, exist_ok=True)
+            markers = list(self.markers()) if self.markers is not None else ()
+            image = self.rasterizer.render(snap, markers=markers)
+            write_png(self.latest_path, image)
+            path = self.latest_path
+            if self.sequence:
+                self.frames_written += 1
+                path = os.path.join(self.directory, f"map_{self.frames_written:05d}.png")
+                write_png(path, image)
+            self.exported_version = snap.version
+            self.last_export_ms = (time.perf_counter() - t0) * 1000.0
+            return path
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="MapExporter")
+        self._thread.start()
+
+    def _run(self) -> None:
+        bus = self.grid_map.event_bus
+        seen = {"map": -1}  # il primo wait() ritorna subito: modifiche precedenti all'avvio
+        while not self._stop.is_set():
+            if bus is not None:
+                seen = bus.wait(seen)
+                if bus.stopped:
+                    break
+            if self._stop.wait(self.interval_s):
+                break
+            try:
+                self.export()
+            except OSError as e:
+                print(f"[MapExporter] Errore di scrittura: {e}")
+
+    def stop(self) -> None:
+        """Ferma il thread e scrive l'immagine finale."""
+        self._stop.set()
+        if self.grid_map.event_bus is not None:
+            self.grid_map.event_bus.wake()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+        try:
+            path = self.export()
+            if path:
+                print(f"[MapExporter] Mappa finale salvata in {path}")
+        except OSError as e:
+            print(f"[MapExporter] Errore di scrittura: {e}")
@@ -0,0 +1,284 @@
+import json
+import queue
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from Mapping import GridMap, MapChanges
+
+# Protocollo (JSON, coordinate in celle, y cresce verso Sud):
+#   full : {"type": "full", "version", "x0", "y0", "width", "height",
+#           "cells": [valore, ripetizioni, ...],   # RLE riga per riga del rettangolo
+#           "walls": [x, y, maschera, ...]}
+#   delta: {"type": "delta", "version", "cells": [x, y, valore, ...], "walls": [x, y, maschera, ...]}
+# I valori delta sono assoluti (CellState.value, 0 = cella rimossa; maschera 0 = nessun muro),
+# quindi riapplicare un delta già coperto da un full è innocuo.
+
+
+def encode_rle(values: np.ndarray) -> list:
+    """RLE di un array 1D: [valore, ripetizioni, valore, ripetizioni, ...]."""
+    if len(values) == 0:
+        return []
+    starts = np.flatnonzero(np.r_[True, values[1:] != values[:-1]])
+    runs = np.diff(np.r_[starts, len(values)])
+    out = np.empty(2 * len(starts), dtype=np.int64)
+    out[0::2] = values[starts]
+    out[1::2] = runs
+    return out.tolist()
+
+
+def decode_rle(rle: list) -> np.ndarray:
+    return np.repeat(np.asarray(rle[0::2], dtype=np.int8), rle[1::2])
+
+
+def _flatten(items: Dict[Tuple[int, int], int]) -> list:
+    out = []
+    for (x, y), value in items.items():
+        out += (x, y, value)
+    return out
+
+
+def encode_full(grid_map: GridMap) -> Tuple[int, str]:
+    """Mappa completa (celle in RLE sul rettangolo dei bounds) come messaggio JSON."""
+    snap = grid_map.snapshot()
+    if len(snap):
+        min_x, max_x, min_y, max_y = snap.bounds
+        cells = snap.region(min_x, max_x, min_y, max_y)
+    else:
+        min_x = min_y = 0
+        cells = np.zeros((0, 0), dtype=np.int8)
+    message = {
+        "type": "full", "version": snap.version,
+        "x0": min_x, "y0": min_y, "width": cells.shape[1], "height": cells.shape[0],
+        "cells": encode_rle(cells.ravel()),
+        "walls": _flatten(snap.walls),
+    }
+    return snap.version, json.dumps(message, separators=(",", ":"))
+
+
+def encode_delta(changes: MapChanges) -> str:
+    message = {
+        "type": "delta", "version": changes.version,
+        "cells": _flatten({xy: state.value for xy, state in changes.cells.items()}),
+        "walls": _flatten(changes.walls),
+    }
+    return json.dumps(message, separators=(",", ":"))
+
+
+class _Client:
+    """Client SSE connesso: buffer limitato di messaggi (versione, evento, dati)."""
+
+    def __init__(self, address, max_buffer: int):
+        self.address = address
+        self.buffer = queue.Queue(maxsize=max_buffer)
+        self.dropped = False
+
+    def push(self, message: Tuple[int, str, str]) -> bool:
+        try:
+            self.buffer.put_nowait(message)
+            return True
+        except queue.Full:
+            self.dropped = True
+            return False
+
+
+class MapServer:
+    """
+    Endpoint HTTP locale per la mappa live della dashboard web.
+
+    - GET /map            mappa completa (JSON, celle in RLE)
+    - GET /map?since=N    solo le modifiche dopo la versione N (o la mappa
+                          completa se il journal della GridMap non la copre più)
+    - GET /map/stream     Server-Sent Events: un evento "full" alla connessione,
+                          poi un evento "delta" per ogni gruppo di modifiche
+
+    Un solo thread legge GridMap.changes_since() ogni `poll_interval_s` e
+    codifica ogni delta una volta per tutti i client, quindi il costo per il
+    robot non cresce con il numero di dashboard aperte. Se la GridMap ha un
+    EventBus il thread dorme finché la mappa non cambia e `poll_interval_s`
+    diventa la finestra in cui si raggruppano le modifiche. Ogni client ha un
+    buffer di `max_buffer` messaggi: se si riempie (client lento) la
+    connessione viene chiusa e l'EventSource del browser si riconnette
+    ricevendo una mappa completa.
+    """
+
+    def __init__(self, grid_map: GridMap, host: str = "0.0.0.0", port: int = 8765,
+                 poll_interval_s: float = 0.1, max_buffer: int = 64,
+                 write_timeout_s: float = 2.0, heartbeat_s: float = 15.0):
+        self.grid_map = grid_map
+        self.poll_interval_s = poll_interval_s
+        self.max_buffer = max_buffer
+        self.write_timeout_s = write_timeout_s
+        self.heartbeat_s = heartbeat_s
+
+        self.version = grid_map.version
+        self.messages_sent = 0
+        self.clients_dropped = 0
+
+        self._clients = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._broadcaster = None
+        self._server_thread = None
+
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+
+    @property
+    def port(self) -> int:
+        return self.httpd.server_address[1]
+
+    @property
+    def num_clients(self) -> int:
+        with self._lock:
+            return len(self._clients)
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path == "/map":
+                    server._serve_map(self, parse_qs(url.query))
+                elif url.path == "/map/stream":
+                    server._serve_stream(self)
+                else:
+                    self.send_error(404)
+
+            def log_message(self, format, *args):
+                pass  # niente log per richiesta (polling frequente)
+
+        return Handler
+
+    # ------------------------------------------------------------------
+    # Richieste
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _headers(handler, content_type: str) -> None:
+        handler.send_response(200)
+        handler.send_header("Content-Type", content_type)
+        handler.send_header("Cache-Control", "no-cache")
+        handler.send_header("Access-Control-Allow-Origin", "*")
+
+    def _serve_map(self, handler, query) -> None:
+        since = query.get("since")
+        body = None
+        if since:
+            try:
+                changes = self.grid_map.changes_since(int(since[0]))
+            except ValueError:
+                handler.send_error(400, "since non valido")
+                return
+            if not changes.full_resync:
+                body = encode_delta(changes)
+        if body is None:
+            _, body = encode_full(self.grid_map)
+
+        data = body.encode()
+        self._headers(handler, "application/json")
+        handler.send_header("Content-Length", str(len(data)))
+        handler.end_headers()
+        handler.wfile.write(data)
+
+    def _serve_stream(self, handler) -> None:
+        # Registra il client prima di leggere la mappa: nessun delta va perso
+        client = _Client(handler.client_address, self.max_buffer)
+        with self._lock:
+            self._clients.append(client)
+        try:
+            handler.connection.settimeout(self.write_timeout_s)
+            self._headers(handler, "text/event-stream")
+            handler.end_headers()
+
+            version, full = encode_full(self.grid_map)
+            self._write_event(handler, "full", version, full)
+            last_write = time.monotonic()
+
+            while not self._stop.is_set() and not client.dropped:
+                try:
+                    msg_version, event, data = client.buffer.get(timeout=0.5)
+                except queue.Empty:
+                    if time.monotonic() - last_write >= self.heartbeat_s:
+                        handler.wfile.write(b": ping\n\n")
+                        handler.wfile.flush()
+                        last_write = time.monotonic()
+                    continue
+                if event == "delta" and msg_version <= version:
+                    continue  # già contenuto nella mappa completa inviata
+                self._write_event(handler, event, msg_version, data)
+                version = msg_version
+                last_write = time.monotonic()
+        except OSError:
+            pass  # client disconnesso o troppo lento in scrittura
+        finally:
+            with self._lock:
+                if client in self._clients:
+                    self._clients.remove(client)
+            if client.dropped:
+                print(f"[MapServer] Client lento scollegato: {client.address[0]}")
+
+    def _write_event(self, handler, event: str, version: int, data: str) -> None:
+        handler.wfile.write(f"event: {event}\nid: {version}\ndata: {data}\n\n".encode())
+        handler.wfile.flush()
+        self.messages_sent += 1
+
+    # ------------------------------------------------------------------
+    # Broadcast
+    # ------------------------------------------------------------------
+
+    def poll(self) -> bool:
+        """Invia ai client le modifiche dopo l'ultima versione trasmessa."""
+        changes = self.grid_map.changes_since(self.version)
+        if changes.version == self.version:
+            return False
+        if changes.full_resync:
+            version, data = encode_full(self.grid_map)
+            message = (version, "full", data)
+        else:
+            version = changes.version
+            message = (version, "delta", encode_delta(changes))
+        self.version = version
+
+        with self._lock:
+            for client in self._clients:
+                if not client.dropped and not client.push(message):
+                    self.clients_dropped += 1
+        return True
+
+    def _run_broadcaster(self) -> None:
+        bus = self.grid_map.event_bus
+        if bus is None:
+            while not self._stop.wait(self.poll_interval_s):
+                self.poll()
+            return
+
+        seen = {"map": -1}  # il primo wait() ritorna subito
+        while not (self._stop.is_set() or bus.stopped):
+            seen = bus.wait(seen)
+            if bus.stopped or self._stop.wait(self.poll_interval_s):
+                break
+            self.poll()
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._broadcaster = threading.Thread(target=self._run_broadcaster, daemon=True, name="MapServer")
+        self._broadcaster.start()
+        self._server_thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._server_thread.start()
+        print(f"[MapServer] Mappa live su http://{self.httpd.server_address[0]}:{self.port}/map/stream")
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self.grid_map.event_bus is not None:
+            self.grid_map.event_bus.wake()
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        for thread in (self._broadcaster, self._server_thread):
+            if thread is not None:
+                thread.join(timeout=2.0)
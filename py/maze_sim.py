@@ -0,0 +1,368 @@
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from Mapping import (CellState, EventBus, GridMap, WALL_N, WALL_E, WALL_S, WALL_W,
+                     WALL_SIDES, WALL_OFFSETS, OPPOSITE_WALL)
+from planner import ExplorationPlanner
+
+ALL_WALLS = WALL_N | WALL_E | WALL_S | WALL_W
+LETTERS = (CellState.LETTER_X, CellState.LETTER_Y, CellState.LETTER_H)
+
+
+@dataclass
+class Maze:
+    """
+    Labirinto generato: maschere dei muri e tipo di tile per ogni cella.
+
+    Gli array sono indicizzati [riga, colonna]; la cella (x, y) della
+    GridMap corrisponde a [y - y0, x - x0]. La partenza è in (0, 0).
+    """
+    walls: np.ndarray   # uint8 [h, w], bit WALL_N/E/S/W
+    tiles: np.ndarray   # int8 [h, w], CellState.value
+    x0: int
+    y0: int
+    seed: int
+
+    @property
+    def width(self) -> int:
+        return self.walls.shape[1]
+
+    @property
+    def height(self) -> int:
+        return self.walls.shape[0]
+
+    @property
+    def max_size(self) -> int:
+        """max_size minimo di una GridMap che contiene tutto il labirinto."""
+        return max(-self.x0, -self.y0, self.x0 + self.width - 1, self.y0 + self.height - 1)
+
+    def contains(self, x: int, y: int) -> bool:
+        return 0 <= x - self.x0 < self.width and 0 <= y - self.y0 < self.height
+
+    def walls_at(self, x: int, y: int) -> int:
+        return int(self.walls[y - self.y0, x - self.x0])
+
+    def tile_at(self, x: int, y: int) -> CellState:
+        return CellState(int(self.tiles[y - self.y0, x - self.x0]))
+
+
+def generate_maze(width: int, height: Optional[int] = None, seed: int = 0,
+                  loops: float = 0.0, victims: float = 0.02, letters: float = 0.02) -> Maze:
+    """
+    Genera un labirinto deterministico (stesso seed = stesso labirinto).
+
+    Args:
+        width, height: Dimensioni in celle (height default = width)
+        seed: Seed del generatore
+        loops: Frazione dei muri interni rimasti da abbattere. 0 = labirinto
+            perfetto (un solo percorso tra due celle), >0 = con anelli
+        victims, letters: Frazione di celle con vittima / lettera X, Y o H
+
+    Returns:
+        Maze centrato sulla partenza (0, 0)
+    """
+    height = height or width
+    rnd = random.Random(seed)
+    n = width * height
+    walls = bytearray([ALL_WALLS]) * n
+
+    # Recursive backtracker iterativo su indici piatti
+    moves = ((WALL_N, -width, 0, -1), (WALL_E, 1, 1, 0), (WALL_S, width, 0, 1), (WALL_W, -1, -1, 0))
+    visited = bytearray(n)
+    start = (height // 2) * width + width // 2
+    visited[start] = 1
+    stack = [start]
+    while stack:
+        i = stack[-1]
+        row, col = divmod(i, width)
+        options = [(side, i + step) for side, step, dx, dy in moves
+                   if 0 <= col + dx < width and 0 <= row + dy < height and not visited[i + step]]
+        if not options:
+            stack.pop()
+            continue
+        side, j = options[rnd.randrange(len(options))] if len(options) > 1 else options[0]
+        walls[i] &= ~side
+        walls[j] &= ~OPPOSITE_WALL[side]
+        visited[j] = 1
+        stack.append(j)
+
+    walls = np.frombuffer(walls, dtype=np.uint8).reshape(height, width).copy()
+    gen = np.random.default_rng(seed)
+
+    if loops > 0:
+        # Abbatte muri E e S interni scelti a caso (aggiornando il lato del vicino)
+        for side, opposite, dy, dx in ((WALL_E, WALL_W, 0, 1), (WALL_S, WALL_N, 1, 0)):
+            inner = walls[:height - dy, :width - dx]
+            rows, cols = np.nonzero(inner & side)
+            pick = gen.random(len(rows)) < loops
+            rows, cols = rows[pick], cols[pick]
+            walls[rows, cols] &= ~np.uint8(side)
+            walls[rows + dy, cols + dx] &= ~np.uint8(opposite)
+
+    tiles = np.full((height, width), CellState.FLOOR.value, dtype=np.int8)
+    roll = gen.random((height, width))
+    tiles[roll < victims] = CellState.VICTIM_FOUND.value
+    letter_cells = (roll >= victims) & (roll < victims + letters)
+    tiles[letter_cells] = gen.choice([s.value for s in LETTERS], size=int(letter_cells.sum()))
+    tiles[height // 2, width // 2] = CellState.START_POINT.value
+
+    return Maze(walls, tiles, -(width // 2), -(height // 2), seed)
+
+
+@dataclass
+class Observation:
+    """Lettura sintetica dei sensori su una cella (tile a terra + muri dai ToF)."""
+    x: int
+    y: int
+    tile: CellState
+    walls: int
+
+
+class VirtualRobot:
+    """
+    Robot virtuale che esplora un Maze scrivendo le osservazioni su una GridMap.
+
+    Ad ogni step osserva la cella corrente (e, con view_range > 1, le celle
+    in linea retta finché un muro non blocca la vista), aggiorna il planner
+    e si sposta di una cella: verso la frontiera più vicina, poi verso la
+    partenza. Quando è su una cella di frontiera entra nel vicino ignoto.
+    Con wall_noise > 0 ogni bit dei muri osservati viene invertito con
+    quella probabilità; un passo contro un muro reale fallisce (urto) e la
+    cella viene riosservata. Le letture di ogni lato (contato una volta per
+    le due celle che lo condividono) si sommano come voti e la GridMap
+    riceve la maggioranza. Quando il planner non ha più frontiere, un muro
+    con meno di `confirm_votes` voti netti che chiude la zona raggiungibile
+    è sospetto: il robot torna sulla cella e lo rilegge prima di chiudere.
+    """
+
+    def __init__(self, maze: Maze, grid_map: GridMap, view_range: int = 1,
+                 wall_noise: float = 0.0, seed: int = 0, confirm_votes: int = 3):
+        self.maze = maze
+        self.grid_map = grid_map
+        self.view_range = view_range
+        self.wall_noise = wall_noise
+        self.confirm_votes = confirm_votes
+        self.rnd = random.Random(seed)
+        # lato (cella, WALL_N o WALL_W) -> somma delle letture (+1 muro, -1 aperto)
+        self._wall_votes: Dict[Tuple[int, int, int], int] = {}
+
+        self.position = (0, 0)
+        grid_map.set_position(*self.position)
+        self.planner = ExplorationPlanner(grid_map, position=self.position)
+        self.done = False
+
+        self.steps = 0
+        self.bumps = 0
+        self.rechecks = 0
+        self.observations = 0
+        self.map_update_s = 0.0
+        self.plan_ms: List[float] = []
+
+    def observe(self) -> List[Observation]:
+        """Osservazioni sintetiche dalla posizione corrente."""
+        maze = self.maze
+        x, y = self.position
+        cells = [(x, y)]
+        for side in WALL_SIDES:
+            dx, dy = WALL_OFFSETS[side]
+            cx, cy = x, y
+            for _ in range(self.view_range - 1):
+                if maze.walls_at(cx, cy) & side:
+                    break
+                cx, cy = cx + dx, cy + dy
+                cells.append((cx, cy))
+
+        out = []
+        for cx, cy in cells:
+            mask = maze.walls_at(cx, cy)
+            if self.wall_noise:
+                for side in WALL_SIDES:
+                    if self.rnd.random() < self.wall_noise:
+                        mask ^= side
+            out.append(Observation(cx, cy, maze.tile_at(cx, cy), mask))
+        return out
+
+    @staticmethod
+    def _edge(x: int, y: int, side: int) -> Tuple[int, int, int]:
+        """Chiave unica del lato: i lati E e S diventano W e N del vicino."""
+        if side in (WALL_E, WALL_S):
+            dx, dy = WALL_OFFSETS[side]
+            return x + dx, y + dy, OPPOSITE_WALL[side]
+        return x, y, side
+
+    def _fuse_walls(self, obs: Observation) -> int:
+        """Somma la lettura ai voti dei quattro lati; restituisce la maschera a maggioranza."""
+        mask = 0
+        for side in WALL_SIDES:
+            edge = self._edge(obs.x, obs.y, side)
+            wall = obs.walls & side
+            votes = self._wall_votes.get(edge, 0) + (1 if wall else -1)
+            self._wall_votes[edge] = votes
+            if votes > 0 or (votes == 0 and wall):  # parità: vale l'ultima lettura
+                mask |= side
+        return mask
+
+    def apply(self, observations: List[Observation]) -> None:
+        start = time.perf_counter()
+        for obs in observations:
+            if self.grid_map.get_cell(obs.x, obs.y) != obs.tile:
+                self.grid_map.set_cell(obs.x, obs.y, obs.tile)
+            walls = self._fuse_walls(obs) if self.wall_noise else obs.walls
+            if self.grid_map.get_walls(obs.x, obs.y) != walls:
+                self.grid_map.set_walls(obs.x, obs.y, walls)
+        self.map_update_s += time.perf_counter() - start
+        self.observations += len(observations)
+
+    def _choose_move(self) -> Optional[Tuple[int, int]]:
+        waypoint = self.planner.next_waypoint()
+        frontier = self.planner.frontier_path()
+        if len(frontier) == 1:
+            # Sulla frontiera: entra in un vicino ancora ignoto senza muro in mezzo
+            x, y = self.position
+            walls = self.grid_map.get_walls(x, y)
+            for side in WALL_SIDES:
+                dx, dy = WALL_OFFSETS[side]
+                if not walls & side and self.maze.contains(x + dx, y + dy) \
+                        and self.grid_map.get_cell(x + dx, y + dy) == CellState.UNKNOWN:
+                    return x + dx, y + dy
+        return waypoint
+
+    def _recheck_move(self) -> Optional[Tuple[int, int]]:
+        """
+        Primo passo verso la cella sospetta più vicina, la posizione corrente
+        se è già sospetta, None se non ce ne sono.
+
+        La BFS visita le celle note raggiungibili; è sospetta una cella con
+        un muro interno al labirinto con meno di confirm_votes voti netti
+        che la separa da una cella ignota o da una cella nota fuori dalla
+        zona raggiungibile (un muro fantasma può isolare anche celle già
+        viste, compresa la partenza).
+        """
+        grid = self.grid_map
+        start = self.position
+        parent = {start: None}
+        order = [start]
+        for cell in order:  # BFS: la lista cresce durante il ciclo
+            x, y = cell
+            walls = grid.get_walls(x, y)
+            for side in WALL_SIDES:
+                dx, dy = WALL_OFFSETS[side]
+                n = (x + dx, y + dy)
+                if not walls & side and n not in parent \
+                        and grid.get_cell(*n) not in (CellState.UNKNOWN, CellState.WALL):
+                    parent[n] = cell
+                    order.append(n)
+
+        for cell in order:
+            x, y = cell
+            walls = grid.get_walls(x, y)
+            for side in WALL_SIDES:
+                dx, dy = WALL_OFFSETS[side]
+                n = (x + dx, y + dy)
+                if walls & side and n not in parent and self.maze.contains(*n) \
+                        and self._wall_votes.get(self._edge(x, y, side), 0) < self.confirm_votes:
+                    while parent[cell] is not None and parent[cell] != start:
+                        cell = parent[cell]
+                    return cell
+        return None
+
+    def step(self) -> bool:
+        """
+        Un ciclo osserva-pianifica-muovi.
+
+        Returns:
+            False quando l'esplorazione è finita e il robot è tornato alla partenza
+        """
+        if self.done:
+            return False
+        self.apply(self.observe())
+        self.plan_ms.append(self.planner.update(position=self.position))
+
+        target = self._choose_move()
+        if self.wall_noise and (target is None or not self.planner.frontier_path()):
+            # Nessuna frontiera utile: prima del ritorno rilegge i muri sospetti
+            recheck = self._recheck_move()
+            if recheck == self.position:
+                self.rechecks += 1  # resta fermo: il prossimo step rilegge i muri
+                self.steps += 1
+                return True
+            target = recheck or target
+        if target is None:
+            self.done = True
+            return False
+
+        x, y = self.position
+        side = next(s for s in WALL_SIDES if WALL_OFFSETS[s] == (target[0] - x, target[1] - y))
+        if self.maze.walls_at(x, y) & side:
+            self.bumps += 1  # muro non visto per rumore: resta fermo e riosserva
+        else:
+            self.position = target
+            self.grid_map.set_position(*target)
+        self.steps += 1
+        return True
+
+    def stats(self) -> dict:
+        plan = sorted(self.plan_ms) or [0.0]
+        return {
+            "steps": self.steps,
+            "bumps": self.bumps,
+            "rechecks": self.rechecks,
+            "observations": self.observations,
+            "updates_per_s": self.observations / self.map_update_s if self.map_update_s else 0.0,
+            "plan_p50_ms": plan[len(plan) // 2],
+            "plan_p95_ms": plan[int(len(plan) * 0.95)],
+            "done": self.done,
+        }
+
+
+class MazeSimulator(threading.Thread):
+    """
+    Simulatore per la modalità DEMO: genera un labirinto e lo fa esplorare
+    da un VirtualRobot a `rate_hz` step al secondo (None = senza pause).
+    Tra due passi attende su un Event collegato allo stop del bus (se dato),
+    così lo stop è immediato anche a frequenze basse.
+    """
+
+    def __init__(self, grid_map: GridMap, size: int = 20, seed: int = 0, loops: float = 0.1,
+                 rate_hz: Optional[float] = 5.0, view_range: int = 1, wall_noise: float = 0.0,
+                 event_bus: Optional[EventBus] = None):
+        super().__init__(daemon=True)
+        self.maze = generate_maze(size, seed=seed, loops=loops)
+        if self.maze.max_size > grid_map.max_size:
+            raise ValueError(f"Labirinto {size}x{size} più grande della GridMap (max_size={grid_map.max_size})")
+        self.robot = VirtualRobot(self.maze, grid_map, view_range=view_range,
+                                  wall_noise=wall_noise, seed=seed)
+        self.rate_hz = rate_hz
+        self.running = False
+        self._stop_event = event_bus.stop_signal() if event_bus is not None else threading.Event()
+
+    def run(self) -> None:
+        """Loop simulazione."""
+        print(f"[MazeSimulator] Avviato - Labirinto {self.maze.width}x{self.maze.height} (seed {self.maze.seed})")
+        self.running = True
+        period = 1.0 / self.rate_hz if self.rate_hz else 0.0
+        next_step = time.perf_counter()
+
+        while self.running and self.robot.step():
+            if period:
+                next_step += period
+                delay = next_step - time.perf_counter()
+                if delay > 0:
+                    if self._stop_event.wait(delay):
+                        break
+                else:
+                    next_step = time.perf_counter()
+
+        if self.robot.done:
+            stats = self.robot.stats()
+            print(f"[MazeSimulator] Esplorazione completata in {stats['steps']} passi "
+                  f"(replan p50 {stats['plan_p50_ms']:.2f} ms)")
+
+    def stop(self) -> None:
+        self.running = False
+        self._stop_event.set()
@@ -0,0 +1,101 @@
+import cv2
+import numpy as np
+
+
+class PhotometricNormalizer:
+    """
+    Normalizzazione fotometrica condivisa: guadagno e bilanciamento del bianco.
+
+    La stima si fa su una miniatura del frame e solo ogni `update_every`
+    frame, oppure subito se la luminosità media cambia di oltre
+    `change_threshold` (relativo) rispetto all'ultima stima. La correzione è
+    una LUT per canale (1 x 256 x 3) applicata con un solo cv2.LUT,
+    anche in place sul frame: tutti i detector vedono lo stesso frame
+    corretto, invece di un CLAHE per detector.
+
+    - Guadagno: porta il percentile `high_pct` della luminosità (max dei
+      canali) a `target_high`, limitato a [1 / max_gain, max_gain]. Se quel
+      percentile è sotto `min_high` il guadagno non sale sopra 1.
+    - Bianco: medie dei canali sui soli pixel poco saturi (grigio/bianco);
+      se sono meno di `min_neutral` del frame (es. una piastrella colorata
+      riempie l'inquadratura) resta il bilanciamento precedente, per non
+      scambiare il colore della scena per una dominante della luce.
+
+    Una scena buia e una piastrella nera che riempie il frame hanno la stessa
+    luminosità: il solo limite max_gain non basta (V=30 x 4 = 120 è già
+    "BIANCO"), quindi senza nemmeno un pixel sopra `min_high` il frame non
+    viene schiarito e il nero resta nero.
+    """
+
+    def __init__(self, update_every=30, change_threshold=0.15, target_high=240.0, high_pct=99.0,
+                 max_gain=4.0, min_high=60.0, neutral_chroma=0.4, min_neutral=0.05, thumb_size=(80, 60)):
+        self.update_every = update_every
+        self.change_threshold = change_threshold
+        self.target_high = target_high
+        self.high_pct = high_pct
+        self.max_gain = max_gain
+        self.min_high = min_high
+        self.neutral_chroma = neutral_chroma
+        self.min_neutral = min_neutral
+
+        self.gain = 1.0
+        self.white_balance = np.ones(3, dtype=np.float32)
+        self.lut = np.empty((1, 256, 3), dtype=np.uint8)
+        self._levels = np.arange(256, dtype=np.float32)
+        self._thumb = np.empty((thumb_size[1], thumb_size[0], 3), dtype=np.uint8)
+        self.reference_brightness = None
+        self.frames_since_estimate = 0
+        self.estimates = 0
+        self._build_lut()
+
+    def _build_lut(self):
+        for channel in range(3):
+            scale = self.gain * float(self.white_balance[channel])
+            self.lut[0, :, channel] = np.clip(self._levels * scale + 0.5, 0, 255)
+
+    def estimate(self, thumb):
+        """Nuovi guadagno e bilanciamento da una miniatura BGR; ricostruisce la LUT."""
+        pixels = thumb.reshape(-1, 3).astype(np.float32)
+        brightness = pixels.max(axis=1)
+        high = max(float(np.percentile(brightness, self.high_pct)), 1.0)
+        self.gain = float(np.clip(self.target_high / high, 1.0 / self.max_gain, self.max_gain))
+        if high < self.min_high:
+            self.gain = min(self.gain, 1.0)   # frame tutto scuro: probabilmente una piastrella nera
+
+        chroma = brightness - pixels.min(axis=1)
+        neutral = (chroma <= self.neutral_chroma * brightness) & (brightness >= 20)
+        if neutral.mean() >= self.min_neutral:
+            means = pixels[neutral].mean(axis=0)
+            self.white_balance = np.clip(means.mean() / np.maximum(means, 1.0), 0.5, 2.0).astype(np.float32)
+
+        self._build_lut()
+        self.estimates += 1
+
+    def update(self, frame):
+        """
+        Aggiorna la stima se è il momento o se la scena è cambiata.
+
+        Returns:
+            True se la LUT è stata ricalcolata
+        """
+        thumb = cv2.resize(frame, self._thumb.shape[1::-1], dst=self._thumb, interpolation=cv2.INTER_AREA)
+        brightness = sum(cv2.mean(thumb)[:3]) / 3.0
+        self.frames_since_estimate += 1
+        reference = self.reference_brightness
+        changed = reference is None or abs(brightness - reference) > self.change_threshold * max(reference, 1.0)
+        if not changed and self.frames_since_estimate < self.update_every:
+            return False
+        self.estimate(thumb)
+        self.reference_brightness = brightness
+        self.frames_since_estimate = 0
+        return True
+
+    def apply(self, frame, dst=None):
+        """Applica la LUT corrente (dst=frame per correggere in place)."""
+        return cv2.LUT(frame, self.lut, dst=dst)
+
+    def process(self, frame):
+        """update() e correzione in place del frame."""
+        self.update(frame)
+        self.apply(frame, dst=frame)
+        return frame
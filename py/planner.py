@@ -0,0 +1,395 @@
+import heapq
+import itertools
+import time
+from typing import Callable, Iterable, List, Optional, Tuple
+
+from Mapping import CellState, GridMap, WALL_N, WALL_E, WALL_S, WALL_W
+
+INF = float("inf")
+
+# Codici della griglia di occupazione del planner
+UNKNOWN = 0
+BLOCKED = 1
+FREE = 2
+OUTSIDE = 3  # bordo oltre max_size: né percorribile né frontiera
+
+Cell = Tuple[int, int]
+
+
+class Occupancy:
+    """
+    Copia compatta (bytearray) della GridMap per il planner.
+
+    Copre il quadrato [-max_size, max_size] più un bordo OUTSIDE di una
+    cella, così i vicini di ogni cella interna sono sempre indici validi.
+    Le celle sono indicizzate con un intero (riga * width + colonna).
+    `walls` tiene le maschere N/E/S/W della GridMap: un lato con muro non
+    è attraversabile.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.width = 2 * max_size + 3
+        self.offset = max_size + 1
+        self.cells = bytearray([UNKNOWN]) * (self.width * self.width)
+        self.walls = bytearray(self.width * self.width)
+        w = self.width
+        for i in range(w):
+            self.cells[i] = self.cells[(w - 1) * w + i] = OUTSIDE
+            self.cells[i * w] = self.cells[i * w + w - 1] = OUTSIDE
+
+    def index(self, x: int, y: int) -> int:
+        return (y + self.offset) * self.width + x + self.offset
+
+    def coords(self, i: int) -> Cell:
+        row, col = divmod(i, self.width)
+        return col - self.offset, row - self.offset
+
+    def contains(self, x: int, y: int) -> bool:
+        return abs(x) <= self.max_size and abs(y) <= self.max_size
+
+    def neighbours(self, i: int) -> Tuple[int, ...]:
+        """Vicini raggiungibili senza attraversare un muro (N, E, S, W)."""
+        w = self.width
+        mask = self.walls[i]
+        if not mask:
+            return i - w, i + 1, i + w, i - 1
+        return tuple(n for n, side in ((i - w, WALL_N), (i + 1, WALL_E), (i + w, WALL_S), (i - 1, WALL_W))
+                     if not mask & side)
+
+    def set_walls(self, x: int, y: int, mask: int) -> Optional[int]:
+        """Aggiorna la maschera dei muri; restituisce l'indice o None se fuori griglia."""
+        if not self.contains(x, y):
+            return None
+        i = self.index(x, y)
+        self.walls[i] = mask
+        return i
+
+    def set_state(self, x: int, y: int, state: CellState) -> Optional[int]:
+        """Aggiorna una cella; restituisce l'indice o None se fuori griglia."""
+        if not self.contains(x, y):
+            return None
+        i = self.index(x, y)
+        if state == CellState.UNKNOWN:
+            self.cells[i] = UNKNOWN
+        elif state == CellState.WALL:
+            self.cells[i] = BLOCKED
+        else:
+            self.cells[i] = FREE
+        return i
+
+    def is_frontier(self, i: int) -> bool:
+        """Cella percorribile con almeno un vicino ancora sconosciuto."""
+        cells = self.cells
+        if cells[i] != FREE:
+            return False
+        return any(cells[n] == UNKNOWN for n in self.neighbours(i))
+
+
+class DStarLite:
+    """
+    D* Lite (Koenig & Likhachev, versione ottimizzata) su griglia 4-connessa
+    a costo unitario, ricerca all'indietro dai goal verso il robot.
+
+    I goal possono essere molti (tutte le celle di frontiera): equivale ad
+    un nodo goal virtuale collegato a costo 0 a ciascuno di essi, per cui
+    ogni cella goal ha rhs = 0. Dopo il primo calcolo, cambi di celle e
+    spostamenti del robot riespandono solo i vertici interessati.
+    """
+
+    def __init__(self, occupancy: Occupancy, start: int,
+                 is_goal: Callable[[int], bool], goals: Iterable[int]):
+        self.occ = occupancy
+        self.is_goal = is_goal
+        size = len(occupancy.cells)
+        self.g = [INF] * size
+        self.rhs = [INF] * size
+        self.goals = set(goals)
+
+        self.start = start
+        self._last_start = start
+        self._start_xy = occupancy.coords(start)
+        self.km = 0
+
+        self._heap: List[tuple] = []
+        self._open = {}
+        self._counter = itertools.count()
+        self.expansions = 0
+
+        for goal in self.goals:
+            self.rhs[goal] = 0.0
+            self._push(goal, self._key(goal))
+
+    # ------------------------------------------------------------------
+
+    def _h(self, i: int) -> int:
+        x, y = self.occ.coords(i)
+        return abs(x - self._start_xy[0]) + abs(y - self._start_xy[1])
+
+    def _key(self, i: int) -> Tuple[float, float]:
+        m = min(self.g[i], self.rhs[i])
+        return m + self._h(i) + self.km, m
+
+    def _push(self, i: int, key: Tuple[float, float]) -> None:
+        self._open[i] = key
+        heapq.heappush(self._heap, (key[0], key[1], next(self._counter), i))
+
+    def _compute_rhs(self, i: int) -> float:
+        cells = self.occ.cells
+        if cells[i] != FREE:
+            return INF
+        if i in self.goals:
+            return 0.0
+        g = self.g
+        best = INF
+        for n in self.occ.neighbours(i):
+            if cells[n] == FREE and g[n] < best:
+                best = g[n]
+        return best + 1.0
+
+    def _update_vertex(self, i: int) -> None:
+        if self.g[i] != self.rhs[i]:
+            self._push(i, self._key(i))
+        else:
+            self._open.pop(i, None)  # rimozione lazy dallo heap
+
+    # ------------------------------------------------------------------
+
+    def move_start(self, start: int) -> None:
+        """Sposta il robot: aggiorna km invece di ricostruire la coda."""
+        if start == self.start:
+            return
+        self.start = start
+        self._start_xy = self.occ.coords(start)
+        self.km += self._h(self._last_start)
+        self._last_start = start
+
+    def cells_changed(self, changed: Iterable[int]) -> None:
+        """Notifica celle cambiate: aggiorna goal e rhs di celle e vicini."""
+        affected = set()
+        for i in changed:
+            affected.add(i)
+            affected.update(self.occ.neighbours(i))
+
+        cells = self.occ.cells
+        for i in affected:
+            if cells[i] == OUTSIDE:
+                continue
+            if self.is_goal(i):
+                self.goals.add(i)
+            else:
+                self.goals.discard(i)
+        for i in affected:
+            if cells[i] != OUTSIDE:
+                self.rhs[i] = self._compute_rhs(i)
+                self._update_vertex(i)
+
+    def compute(self) -> None:
+        """ComputeShortestPath: espande finché il vertice del robot è consistente."""
+        g, rhs, heap, open_ = self.g, self.rhs, self._heap, self._open
+        cells = self.occ.cells
+        start = self.start
+
+        while heap:
+            k1, k2, _, u = heap[0]
+            if open_.get(u) != (k1, k2):
+                heapq.heappop(heap)  # voce superata
+                continue
+            if (k1, k2) >= self._key(start) and rhs[start] == g[start]:
+                break
+
+            k_new = self._key(u)
+            if (k1, k2) < k_new:
+                heapq.heappop(heap)
+                self._push(u, k_new)
+                continue
+
+            heapq.heappop(heap)
+            del open_[u]
+            self.expansions += 1
+
+            if g[u] > rhs[u]:
+                g[u] = rhs[u]
+                cost = g[u] + 1.0
+                for s in self.occ.neighbours(u):
+                    if cells[s] == FREE and rhs[s] > cost:
+                        rhs[s] = cost
+                        self._update_vertex(s)
+            else:
+                g_old = g[u]
+                g[u] = INF
+                for s in (u, *self.occ.neighbours(u)):
+                    if cells[s] == FREE and (s == u or rhs[s] == g_old + 1.0):
+                        rhs[s] = self._compute_rhs(s)
+                        self._update_vertex(s)
+
+    def distance(self) -> float:
+        """Lunghezza del percorso minimo dal robot al goal più vicino (INF se irraggiungibile)."""
+        return self.rhs[self.start]
+
+    def path(self) -> List[int]:
+        """Percorso (indici) dal robot al goal più vicino, vuoto se irraggiungibile."""
+        if self.rhs[self.start] == INF:
+            return []
+        cells, g = self.occ.cells, self.g
+        current = self.start
+        path = [current]
+        limit = int(self.rhs[self.start]) + 1
+        while current not in self.goals:
+            best, best_g = None, INF
+            for n in self.occ.neighbours(current):
+                if cells[n] == FREE and g[n] < best_g:
+                    best, best_g = n, g[n]
+            if best is None or len(path) > limit:
+                return []
+            current = best
+            path.append(current)
+        return path
+
+
+class ExplorationPlanner:
+    """
+    Planner di esplorazione sopra GridMap.
+
+    Mantiene due ricerche D* Lite sulla stessa griglia di occupazione: una
+    verso la frontiera più vicina (celle note percorribili con un vicino
+    sconosciuto) e una verso lo START_POINT per il ritorno. update() legge
+    solo le celle cambiate da GridMap.changes_since() e ripianifica in modo
+    incrementale; un full_resync del journal ricostruisce tutto.
+
+    Le celle sconosciute e i muri (celle WALL o lati con muro) non sono
+    percorribili: il robot pianifica solo attraverso celle già viste.
+    """
+
+    def __init__(self, grid_map: GridMap, position: Cell = (0, 0)):
+        self.grid_map = grid_map
+        self.position = position
+        self.home: Optional[Cell] = None
+        self.frontier: Optional[DStarLite] = None
+        self.return_home: Optional[DStarLite] = None
+
+        self.version = -1
+        self.last_replan_ms = 0.0
+        self.replans = 0
+
+    # ------------------------------------------------------------------
+
+    def _rebuild(self, cells, walls) -> None:
+        self.occ = Occupancy(self.grid_map.max_size)
+        self.home = None
+        for (x, y), state in cells.items():
+            self.occ.set_state(x, y, state)
+            if state == CellState.START_POINT:
+                self.home = (x, y)
+        for (x, y), mask in walls.items():
+            self.occ.set_walls(x, y, mask)
+
+        # Goal iniziali dall'indice di frontiera della GridMap (le celle
+        # cambiate dopo lo snapshot vengono rivalutate al prossimo update)
+        occ = self.occ
+        start = occ.index(*self.position)
+        goals = [i for i in (occ.index(x, y) for x, y in self.grid_map.frontier_cells())
+                 if occ.is_frontier(i)]
+        self.frontier = DStarLite(occ, start, occ.is_frontier, goals)
+        self._build_home()
+
+    def _build_home(self) -> None:
+        self.return_home = None
+        if self.home is None:
+            return
+        home = self.occ.index(*self.home)
+        self.return_home = DStarLite(self.occ, self.occ.index(*self.position),
+                                     lambda i: i == home and self.occ.cells[i] == FREE,
+                                     [home] if self.occ.cells[home] == FREE else [])
+
+    def update(self, position: Optional[Cell] = None) -> float:
+        """
+        Sincronizza la griglia con la mappa e ripianifica.
+
+        Args:
+            position: Nuova posizione del robot (default: invariata)
+
+        Returns:
+            Tempo di ripianificazione in ms
+        """
+        t0 = time.perf_counter()
+        if position is not None:
+            self.position = position
+
+        changes = self.grid_map.changes_since(self.version)
+        if changes.full_resync or self.frontier is None:
+            if changes.full_resync:
+                cells, walls = changes.cells, changes.walls
+            else:
+                snapshot = self.grid_map.snapshot()
+                cells, walls = snapshot.cells, snapshot.walls
+            self.version = changes.version
+            self._rebuild(cells, walls)
+        else:
+            self.version = changes.version
+            changed = []
+            home_moved = False
+            for (x, y), state in changes.cells.items():
+                i = self.occ.set_state(x, y, state)
+                if i is None:
+                    continue
+                changed.append(i)
+                if state == CellState.START_POINT and self.home != (x, y):
+                    self.home = (x, y)
+                    home_moved = True
+            for (x, y), mask in changes.walls.items():
+                i = self.occ.set_walls(x, y, mask)
+                if i is not None:
+                    changed.append(i)
+
+            start = self.occ.index(*self.position)
+            self.frontier.move_start(start)
+            self.frontier.cells_changed(changed)
+            if home_moved:
+                self._build_home()
+            elif self.return_home is not None:
+                self.return_home.move_start(start)
+                self.return_home.cells_changed(changed)
+
+        self.frontier.compute()
+        if self.return_home is not None:
+            self.return_home.compute()
+
+        self.replans += 1
+        self.last_replan_ms = (time.perf_counter() - t0) * 1000.0
+        return self.last_replan_ms
+
+    # ------------------------------------------------------------------
+
+    def frontier_path(self) -> List[Cell]:
+        """Percorso dalla posizione corrente alla frontiera più vicina (vuoto se non ce ne sono)."""
+        if self.frontier is None:
+            return []
+        return [self.occ.coords(i) for i in self.frontier.path()]
+
+    def home_path(self) -> List[Cell]:
+        """Percorso dalla posizione corrente allo START_POINT (vuoto se ignoto o irraggiungibile)."""
+        if self.return_home is None:
+            return []
+        return [self.occ.coords(i) for i in self.return_home.path()]
+
+    def next_waypoint(self) -> Optional[Cell]:
+        """
+        Prossima cella da raggiungere: verso la frontiera più vicina finché
+        ce n'è una raggiungibile, poi verso lo START_POINT.
+        """
+        for path in (self.frontier_path(), self.home_path()):
+            if len(path) > 1:
+                return path[1]
+        return None
+
+    def stats(self) -> dict:
+        return {
+            "replans": self.replans,
+            "last_replan_ms": self.last_replan_ms,
+            "frontier_cells": len(self.frontier.goals) if self.frontier else 0,
+            "frontier_distance": self.frontier.distance() if self.frontier else INF,
+            "home_distance": self.return_home.distance() if self.return_home else INF,
+            "expansions": (self.frontier.expansions if self.frontier else 0)
+                          + (self.return_home.expansions if self.return_home else 0),
+        }
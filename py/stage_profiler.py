@@ -0,0 +1,215 @@
+import json
+import threading
+import time
+from collections import deque
+
+# Nomi canonici degli stage instrumentati nei detector
+STAGES = (
+    "color_conversion",
+    "blur",
+    "hough",
+    "contours",
+    "ellipse_fit",
+    "ring_sampling",
+    "clahe",
+    "threshold",
+    "ocr",
+    "debounce",
+)
+
+# Bordi (ms) dei bin dell'istogramma: l'ultimo bin raccoglie tutto ciò che supera 100ms
+HISTOGRAM_EDGES_MS = (0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 33.0, 50.0, 100.0)
+
+
+class _NullStage:
+    """Context manager vuoto restituito quando il profiler è disabilitato."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    """Context manager che misura la durata di uno stage."""
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.profiler.record(self.name, (time.perf_counter() - self.start) * 1000.0)
+        return False
+
+
+class StageHistogram:
+    """Istogramma mobile delle durate (ms) di uno stage sugli ultimi `window` campioni."""
+
+    def __init__(self, window=300):
+        self.samples = deque(maxlen=window)
+        self.total_count = 0
+
+    def add(self, ms):
+        self.samples.append(ms)
+        self.total_count += 1
+
+    def summary(self):
+        """Statistiche sulla finestra corrente (count, mean, p50, p95, max, bins)."""
+        if not self.samples:
+            return {"count": 0, "total_count": self.total_count}
+
+        ordered = sorted(self.samples)
+        n = len(ordered)
+        bins = [0] * (len(HISTOGRAM_EDGES_MS) + 1)
+        for ms in ordered:
+            idx = 0
+            while idx < len(HISTOGRAM_EDGES_MS) and ms > HISTOGRAM_EDGES_MS[idx]:
+                idx += 1
+            bins[idx] += 1
+
+        return {
+            "count": n,
+            "total_count": self.total_count,
+            "mean_ms": sum(ordered) / n,
+            "p50_ms": ordered[n // 2],
+            "p95_ms": ordered[min(n - 1, int(n * 0.95))],
+            "max_ms": ordered[-1],
+            "bin_edges_ms": list(HISTOGRAM_EDGES_MS),
+            "bins": bins,
+        }
+
+
+class StageProfiler:
+    """
+    Misura la latenza dei singoli stage dei detector.
+
+    Uso:
+        with profiler.stage("hough"):
+            circles = cv2.HoughCircles(...)
+
+    Da disabilitato `stage()` restituisce sempre lo stesso context manager vuoto,
+    quindi il costo è una chiamata a metodo per stage.
+    """
+
+    def __init__(self, enabled=True, window=300):
+        self.enabled = enabled
+        self.window = window
+        self.histograms = {}
+
+    def stage(self, name):
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name)
+
+    def record(self, name, ms):
+        """Registra manualmente una durata (ms) per lo stage `name`."""
+        hist = self.histograms.get(name)
+        if hist is None:
+            hist = self.histograms[name] = StageHistogram(self.window)
+        hist.add(ms)
+
+    def summary(self):
+        return {name: hist.summary() for name, hist in self.histograms.items()}
+
+    def reset(self):
+        self.histograms.clear()
+
+    def dump_json(self, path, extra=None):
+        """Salva le statistiche per stage su file JSON (es. allo shutdown)."""
+        data = {"timestamp": time.time(), "stages": self.summary()}
+        if extra:
+            data.update(extra)
+        with open(path, "w") as f:
+            json.dump(data, f, indent=2)
+        return path
+
+    def draw_hud(self, frame, origin=(10, 200)):
+        """Disegna sul frame un pannello con media e p95 di ogni stage."""
+        if not self.histograms:
+            return frame
+
+        import cv2
+
+        x, y = origin
+        lines = ["STAGE          mean   p95 (ms)"]
+        for name, stats in sorted(self.summary().items()):
+            if stats["count"]:
+                lines.append(f"{name[:14]:<14} {stats['mean_ms']:5.1f} {stats['p95_ms']:5.1f}")
+
+        height = 18 * len(lines) + 10
+        cv2.rectangle(frame, (x - 5, y - 15), (x + 260, y - 15 + height), (0, 0, 0), -1)
+        for i, line in enumerate(lines):
+            cv2.putText(frame, line, (x, y + i * 18), cv2.FONT_HERSHEY_PLAIN, 1.0, (0, 255, 255), 1)
+        return frame
+
+
+class StartupProfile:
+    """
+    Scompone i tempi di avvio in step nominati (anche eseguiti in parallelo da
+    thread diversi) e misura il tempo al primo frame elaborato.
+    """
+
+    def __init__(self, t0=None):
+        self.t0 = time.perf_counter() if t0 is None else t0
+        self.steps = []  # (nome, inizio relativo ms, durata ms)
+        self.time_to_first_frame_ms = None
+        self._lock = threading.Lock()
+
+    def step(self, name):
+        return _StartupStep(self, name)
+
+    def add(self, name, start, end):
+        with self._lock:
+            self.steps.append((name, (start - self.t0) * 1000.0, (end - start) * 1000.0))
+
+    def mark_first_frame(self):
+        """Da chiamare dopo il primo frame elaborato; le chiamate successive sono ignorate."""
+        if self.time_to_first_frame_ms is None:
+            self.time_to_first_frame_ms = (time.perf_counter() - self.t0) * 1000.0
+        return self.time_to_first_frame_ms
+
+    def as_dict(self):
+        return {
+            "steps": [{"name": n, "start_ms": round(s, 2), "duration_ms": round(d, 2)}
+                      for n, s, d in sorted(self.steps, key=lambda st: st[1])],
+            "time_to_first_frame_ms": self.time_to_first_frame_ms,
+        }
+
+    def report(self):
+        print("Tempi di avvio:")
+        for name, start, duration in sorted(self.steps, key=lambda st: st[1]):
+            print(f"  {name:<24} +{start:8.1f} ms  {duration:8.1f} ms")
+        if self.time_to_first_frame_ms is not None:
+            print(f"  {'primo frame elaborato':<24} +{self.time_to_first_frame_ms:8.1f} ms")
+
+
+class _StartupStep:
+    __slots__ = ("profile", "name", "start")
+
+    def __init__(self, profile, name):
+        self.profile = profile
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.profile.add(self.name, self.start, time.perf_counter())
+        return False
+
+
+# Profiler condiviso di default: disabilitato, costo quasi nullo
+NULL_PROFILER = StageProfiler(enabled=False)
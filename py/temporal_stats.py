@@ -0,0 +1,116 @@
+import cv2
+import numpy as np
+
+
+class TemporalStats:
+    """
+    Statistiche temporali per blocco della luminosità V (= max(B, G, R)).
+
+    Media e varianza sono mobili esponenziali (Welford pesato): con
+    alpha = 2 / (window + 1) pesano circa gli ultimi `window` frame, senza
+    tenere i frame in memoria. Ogni frame costa lo stesso numero di
+    operazioni vettoriali su array float32 preallocati di (h/block, w/block)
+    celle, qualunque sia la durata della finestra.
+
+    Oltre alla varianza tiene la frequenza dei riflessi (flicker): la
+    frazione mobile di frame in cui il blocco è più luminoso della sua media
+    di oltre `glint_delta` livelli di V. Un confronto con k deviazioni
+    standard non funzionerebbe: riflessi ripetuti gonfiano la varianza e
+    smettono di superarla.
+    Una piastrella argentata vista dal robot in movimento ha varianza e
+    flicker alti, una superficie opaca no.
+
+    Se la dimensione del frame cambia (es. scala del governor) le statistiche
+    ripartono da zero.
+    """
+
+    def __init__(self, block=8, window=15, glint_delta=24.0):
+        self.block = block
+        self.window = window
+        self.alpha = 2.0 / (window + 1)
+        self.glint_delta = glint_delta
+        self.frame_shape = None
+        self.frames = 0
+
+    def _allocate(self, frame_shape):
+        h, w = frame_shape[:2]
+        gh, gw = max(1, h // self.block), max(1, w // self.block)
+        self.frame_shape = frame_shape
+        self.frames = 0
+        self._small = np.empty((gh, gw, 3), dtype=np.uint8)
+        self._v8 = np.empty((gh, gw), dtype=np.uint8)
+        self.value = np.empty((gh, gw), dtype=np.float32)
+        self.mean = np.zeros((gh, gw), dtype=np.float32)
+        self.variance = np.zeros((gh, gw), dtype=np.float32)
+        self.flicker = np.zeros((gh, gw), dtype=np.float32)
+        self._delta = np.empty((gh, gw), dtype=np.float32)
+        self._tmp = np.empty((gh, gw), dtype=np.float32)
+        self._glint = np.empty((gh, gw), dtype=bool)
+        self._std = np.empty((gh, gw), dtype=np.float32)
+
+    @property
+    def shape(self):
+        """(righe, colonne) della griglia dei blocchi, None prima del primo frame."""
+        return None if self.frame_shape is None else self.mean.shape
+
+    @property
+    def ready(self):
+        """True quando la finestra è piena e la varianza è affidabile."""
+        return self.frames >= self.window
+
+    def reset(self):
+        self.frame_shape = None
+        self.frames = 0
+
+    def update(self, frame):
+        """Aggiunge un frame BGR alle statistiche."""
+        if frame.shape != self.frame_shape:
+            self._allocate(frame.shape)
+
+        small = self._small
+        if self.block > 1:
+            cv2.resize(frame, small.shape[1::-1], dst=small, interpolation=cv2.INTER_AREA)
+        else:
+            small = frame
+        v8 = self._v8
+        np.maximum(small[..., 0], small[..., 1], out=v8)
+        np.maximum(v8, small[..., 2], out=v8)
+        np.copyto(self.value, v8)
+
+        if self.frames == 0:
+            np.copyto(self.mean, self.value)
+            self.variance.fill(0.0)
+            self.flicker.fill(0.0)
+            self.frames = 1
+            return
+
+        a = self.alpha
+        delta, tmp = self._delta, self._tmp
+        np.subtract(self.value, self.mean, out=delta)
+
+        # Riflessi contati solo a finestra piena, quando la media è assestata
+        if self.ready:
+            np.greater(delta, self.glint_delta, out=self._glint)
+            self.flicker *= 1.0 - a
+            np.multiply(self._glint, a, out=tmp)
+            self.flicker += tmp
+
+        # Welford esponenziale: mean += a*d; var = (1-a) * (var + a*d^2)
+        np.multiply(delta, delta, out=tmp)
+        tmp *= a
+        self.variance += tmp
+        self.variance *= 1.0 - a
+        delta *= a
+        self.mean += delta
+        self.frames += 1
+
+    def std(self):
+        """Deviazione standard temporale per blocco (buffer riusato a ogni chiamata)."""
+        return np.sqrt(self.variance, out=self._std)
+
+    def region(self, values, top, bottom=1.0):
+        """Righe di una mappa per blocco tra due frazioni dell'altezza del frame (0 = in alto)."""
+        rows = values.shape[0]
+        start = min(rows - 1, int(top * rows))
+        stop = max(start + 1, int(round(bottom * rows)))
+        return values[start:stop]
@@ -0,0 +1,148 @@
+import os
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from cognitive_target import CognitiveTargetDetector
+from color_calibration import (UNKNOWN, ColorProfile, accuracy, compile_ranges, fit_samples,
+                               load_profile, load_samples, save_samples)
+from enhanced_cognitive_target import EnhancedCognitiveTarget
+from floor_tile import COLOR_RANGES, FloorTileDetector, TileColor
+
+
+def box_label(pixel, ranges):
+    """Primo colore i cui range contengono il pixel (riferimento per compile_ranges)."""
+    for name, boxes in ranges.items():
+        for lower, upper in boxes:
+            if all(lower[i] <= pixel[i] <= upper[i] for i in range(3)):
+                return name
+    return UNKNOWN
+
+
+def random_pixels(rng, n):
+    pixels = np.empty((n, 3), dtype=np.uint8)
+    pixels[:, 0] = rng.integers(0, 180, n)
+    pixels[:, 1:] = rng.integers(0, 256, (n, 2))
+    return pixels
+
+
+def cluster(rng, h, s, v, n=400, spread=(3, 12, 12)):
+    """Campioni HSV attorno a un colore (la tinta gira attorno a 180)."""
+    pixels = np.empty((n, 3), dtype=np.uint8)
+    pixels[:, 0] = np.round(rng.normal(h, spread[0], n)).astype(int) % 180
+    pixels[:, 1] = np.clip(rng.normal(s, spread[1], n), 0, 255)
+    pixels[:, 2] = np.clip(rng.normal(v, spread[2], n), 0, 255)
+    return pixels
+
+
+def test_compiled_ranges_match_boxes():
+    profile = compile_ranges(COLOR_RANGES)
+    pixels = random_pixels(np.random.default_rng(0), 3000)
+    labels = profile.classify(pixels.reshape(-1, 1, 3)).ravel()
+    for pixel, label in zip(pixels, labels):
+        assert profile.labels[label] == box_label(pixel, COLOR_RANGES)
+        assert profile.label_of(pixel) == profile.labels[label]
+
+
+def test_save_and_memory_map():
+    profile = compile_ranges(COLOR_RANGES, s_bits=6, v_bits=6, name="lab")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "profiles", "lab.hsvlut")
+        profile.save(path)
+        assert os.path.getsize(path) < 800 * 1024
+
+        start = time.perf_counter()
+        loaded = load_profile(path)
+        load_ms = (time.perf_counter() - start) * 1000.0
+        print(f"Apertura profilo: {load_ms:.2f} ms")
+        assert isinstance(loaded.table, np.memmap) and not loaded.table.flags.writeable
+        assert loaded.labels == profile.labels and loaded.name == "lab"
+        assert np.array_equal(loaded.table, profile.table)
+        assert load_profile(path) is loaded   # stessa tabella per tutti i detector
+
+        # Dopo una nuova calibrazione il file cambia e viene riaperto
+        compile_ranges({"NERO": COLOR_RANGES["NERO"]}, s_bits=6, v_bits=6).save(path)
+        os.utime(path, ns=(time.time_ns(), time.time_ns() + 10**9))
+        assert load_profile(path).labels == [UNKNOWN, "NERO"]
+
+        with open(os.path.join(tmp, "bad.hsvlut"), "wb") as f:
+            f.write(b"x" * 1000)
+        try:
+            ColorProfile.load(os.path.join(tmp, "bad.hsvlut"))
+            assert False, "file non valido accettato"
+        except ValueError:
+            pass
+
+
+def test_fit_from_samples():
+    rng = np.random.default_rng(1)
+    samples = {
+        "ROSSO": np.concatenate([cluster(rng, 2, 200, 160), cluster(rng, 177, 200, 160)]),
+        "VERDE": cluster(rng, 60, 180, 140),
+        "BLU": cluster(rng, 115, 200, 120),
+        "NERO": cluster(rng, 90, 60, 25, spread=(40, 30, 8)),
+        "BIANCO": cluster(rng, 90, 15, 215, spread=(40, 6, 8)),
+    }
+    profile = fit_samples(samples)
+    for label, value in accuracy(profile, samples).items():
+        assert value > 0.97, (label, value)
+
+    # Campioni nuovi dagli stessi colori e un colore mai visto
+    assert profile.label_of((179, 190, 150)) == "ROSSO"
+    assert profile.label_of((0, 210, 170)) == "ROSSO"
+    assert profile.label_of((62, 170, 150)) == "VERDE"
+    assert profile.label_of((150, 220, 200)) == UNKNOWN       # magenta: nessuna classe vicina
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "arena.npz")
+        save_samples(path, samples)
+        loaded = load_samples(path)
+        assert set(loaded) == set(samples) and np.array_equal(loaded["BLU"], samples["BLU"])
+
+
+def test_detectors_share_profile():
+    # Profilo "arena": la luce gialla sposta il bianco verso S alte e il blu verso il ciano
+    rng = np.random.default_rng(2)
+    samples = {
+        "BIANCO": cluster(rng, 25, 70, 210, spread=(3, 8, 8)),
+        "NERO": cluster(rng, 20, 80, 30, spread=(10, 20, 8)),
+        "BLU": cluster(rng, 95, 200, 150),
+        "ROSSO": cluster(rng, 4, 210, 170),
+        "GIALLO": cluster(rng, 28, 200, 200),
+        "VERDE": cluster(rng, 60, 180, 140),
+    }
+    profile = fit_samples(samples)
+    floor = FloorTileDetector(history_size=1, color_profile=profile)
+    cognitive = CognitiveTargetDetector(color_profile=profile)
+    enhanced = EnhancedCognitiveTarget(color_profile=profile)
+
+    def bgr(h, s, v):
+        return cv2.cvtColor(np.uint8([[[h, s, v]]]), cv2.COLOR_HSV2BGR)[0, 0]
+
+    frame = np.empty((480, 640, 3), dtype=np.uint8)
+    frame[:] = bgr(25, 70, 210)              # bianco sotto luce gialla
+    assert floor.process_frame(frame) == (TileColor.NORMAL, "BIANCO")
+    frame[360:] = bgr(95, 200, 150)          # blu che i range fissi (H >= 100) non vedono
+    assert floor.process_frame(frame) == (TileColor.BLUE, "BLU")
+    assert FloorTileDetector(history_size=1).process_frame(frame)[0] != TileColor.BLUE
+
+    assert cognitive.identify_color((95, 200, 150)) == "BLUE"
+    assert cognitive.identify_color((25, 70, 210)) == "UNKNOWN"
+    assert enhanced.map_to_color_name(bgr(95, 200, 150).astype(np.float32)) == "AZZURRO"
+    assert floor.color_profile.table is cognitive.color_profile.table
+
+    # Ritorno ai range fissi
+    floor.set_color_profile(None)
+    cognitive.set_color_profile(None)
+    assert floor.process_frame(frame)[0] != TileColor.BLUE
+    assert cognitive.identify_color((95, 200, 150)) == "UNKNOWN"
+
+
+if __name__ == "__main__":
+    test_compiled_ranges_match_boxes()
+    test_save_and_memory_map()
+    test_fit_from_samples()
+    test_detectors_share_profile()
+    print("PASSED")
@@ -0,0 +1,150 @@
+import numpy as np
+
+from cognitive_target import CognitiveTargetDetector
+from detector_registry import DetectorRegistry, DetectorScheduler
+from letterIdentifier import LetterDetector
+
+
+def test_rate_limiting():
+    registry = DetectorRegistry()
+    calls = {"victims": 0, "ocr": 0}
+
+    def counter(name):
+        def process(planes):
+            calls[name] += 1
+            return name
+        return process
+
+    registry.register("victims", counter("victims"), rate_hz=None, priority=0)
+    registry.register("ocr", counter("ocr"), rate_hz=5.0, priority=1)
+    scheduler = DetectorScheduler(registry, budget_ms=1000.0)
+
+    frame = np.zeros((48, 64, 3), dtype=np.uint8)
+    # 30 frame in un secondo simulato
+    for i in range(30):
+        scheduler.run_frame(frame, now=i / 30.0)
+
+    print(f"Calls: {calls}")
+    assert calls["victims"] == 30
+    assert calls["ocr"] == 5
+
+
+def test_low_priority_shed_first():
+    registry = DetectorRegistry()
+    high = registry.register("victims", lambda p: None, priority=0)
+    mid = registry.register("floor", lambda p: None, priority=1)
+    low = registry.register("ocr", lambda p: None, priority=2)
+    scheduler = DetectorScheduler(registry, budget_ms=20.0)
+
+    high.cost_ms, mid.cost_ms, low.cost_ms = 12.0, 6.0, 15.0
+    assert [d.name for d in scheduler.select(now=0.0)] == ["victims", "floor"]
+    assert low.shed == 1 and mid.shed == 0
+
+    # Sovraccarico: il detector più prioritario gira comunque
+    high.cost_ms = 40.0
+    assert [d.name for d in scheduler.select(now=0.0)] == ["victims"]
+
+    registry.set_enabled("victims", False)
+    assert [d.name for d in scheduler.select(now=0.0)] == ["floor"]
+
+
+def test_shed_detector_does_not_starve():
+    registry = DetectorRegistry()
+    registry.register("victims", lambda p: None, priority=0)
+    ocr = registry.register("ocr", lambda p: None, rate_hz=5.0, priority=1)
+    scheduler = DetectorScheduler(registry, budget_ms=20.0, starvation_s=1.0)
+
+    frame = np.zeros((8, 8, 3), dtype=np.uint8)
+    scheduler.run_frame(frame, now=0.0)
+    registry.get("victims").cost_ms, ocr.cost_ms = 15.0, 50.0
+
+    ran = [t for t in range(1, 61) if "ocr" in scheduler.run_frame(frame, now=t / 30.0)]
+    print(f"OCR eseguito ai frame {ran}")
+    assert ran and ran[0] > 30, "Sotto carico l'OCR deve essere rimandato, non eliminato"
+
+
+def test_never_run_detector_does_not_starve():
+    registry = DetectorRegistry()
+    victims = registry.register("victims", lambda p: None, priority=0)
+    victims.cost_ms, victims.runs = 30.0, 1   # già misurato: da solo sfora il budget
+    registry.register("late", lambda p: None, priority=1)
+    scheduler = DetectorScheduler(registry, budget_ms=20.0, starvation_s=1.0)
+
+    frame = np.zeros((8, 8, 3), dtype=np.uint8)
+    ran = []
+    for t in range(61):
+        victims.cost_ms = 30.0   # carico costante
+        if "late" in scheduler.run_frame(frame, now=100.0 + t / 30.0):
+            ran.append(t)
+    print(f"Detector mai eseguito: frame {ran}")
+    assert ran and 30 < ran[0] <= 32, "Anche un detector mai eseguito va eseguito dopo starvation_s"
+
+
+def test_rate_limited_letters_keep_real_time_speed():
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+
+    def scan(rate_hz, text="", seconds=2):
+        """Chiamate come dallo scheduler a rate_hz per `seconds`; posizione dopo 1 s, OCR e risultati."""
+        detector = LetterDetector(size=200, velocita=6, clahe=False)   # come nel wrapper
+        ocr = []
+        detector.run_ocr = lambda image: ocr.append(image) or text
+        x_at_1s, found = None, []
+        for i in range(int(seconds * rate_hz) + 1):
+            now = i / rate_hz
+            if detector.process_frame(frame.copy(), now=now)[0]:
+                found.append(now)
+            if i == rate_hz:
+                x_at_1s = detector.x
+        return x_at_1s, len(ocr), found
+
+    x_full, ocr_full, _ = scan(20)
+    x_rate, ocr_rate, _ = scan(5)
+    print(f"x dopo 1 s: {x_full} (20 Hz) / {x_rate} (5 Hz), OCR in 2 s: {ocr_full} / {ocr_rate}")
+    assert x_rate == x_full                # la ROI avanza alla stessa velocità reale
+    assert ocr_rate == 11                  # un OCR per chiamata a 5 Hz, non uno ogni 3
+    for rate_hz in (20, 5, 1):
+        found = scan(rate_hz, text="Ω", seconds=6)[2]
+        assert found and found[0] <= 5.0 / min(rate_hz, 5), rate_hz   # 5 letture concordi
+
+
+def test_planes_shared_and_lazy():
+    registry = DetectorRegistry()
+    seen = []
+    registry.register("a", lambda p: seen.append(p.gray), planes=("gray",))
+    registry.register("b", lambda p: seen.append(p.gray), planes=("gray", "hsv"))
+    registry.register("c", lambda p: p, rate_hz=1.0, planes=("bgr",))
+    scheduler = DetectorScheduler(registry)
+
+    results = scheduler.run_frame(np.zeros((48, 64, 3), dtype=np.uint8), now=0.0)
+    assert seen[0] is seen[1], "Il piano gray deve essere calcolato una sola volta"
+    assert "hsv" in results["c"]._planes
+
+    # Un frame in cui gira solo "a" non deve convertire in HSV
+    registry.unregister("b")
+    results = scheduler.run_frame(np.zeros((48, 64, 3), dtype=np.uint8), now=0.1)
+    assert "c" not in results
+
+
+def test_prewarm_leaves_detector_state_clean():
+    detector = CognitiveTargetDetector(history_size=5)
+    registry = DetectorRegistry()
+    registry.register("victims", lambda p: detector.process_frame(p.bgr), prewarm=detector.prewarm)
+    generic = []
+    registry.register("generic", lambda p: generic.append(p.gray.shape), planes=("gray",))
+
+    timings = DetectorScheduler(registry).prewarm()
+    print(f"Pre-warm: {timings}")
+    assert set(timings) == {"victims", "generic"}
+    assert len(detector.history) == 0, "Il pre-warm non deve influenzare il debouncing"
+    assert generic == [(480, 640)]
+
+
+if __name__ == "__main__":
+    test_rate_limiting()
+    test_low_priority_shed_first()
+    test_shed_detector_does_not_starve()
+    test_never_run_detector_does_not_starve()
+    test_rate_limited_letters_keep_real_time_speed()
+    test_planes_shared_and_lazy()
+    test_prewarm_leaves_detector_state_clean()
+    print("PASSED")
@@ -0,0 +1,203 @@
+import os
+import sys
+import tempfile
+import threading
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+
+from Mapping import (CameraThread, CellState, EventBus, GridMap, InferenceThread, LatestFrameSlot, MazeMapperUI,
+                     VisionSystem)
+from map_journal import MapJournal
+from maze_sim import MazeSimulator
+
+
+def test_wait_blocks_until_publish():
+    bus = EventBus()
+    seen = {"map": 0, "detection": 0}
+    assert bus.wait(seen, timeout=0.02) == seen  # timeout: nessuna novità
+
+    woke = {}
+
+    def consumer():
+        start = time.perf_counter()
+        woke["versions"] = bus.wait(seen)
+        woke["ms"] = (time.perf_counter() - start) * 1000.0
+
+    thread = threading.Thread(target=consumer)
+    thread.start()
+    time.sleep(0.05)
+    assert thread.is_alive()             # nessun risveglio senza eventi
+    bus.publish("robot", (1, 1))         # topic non seguito
+    time.sleep(0.02)
+    assert thread.is_alive()
+    start = time.perf_counter()
+    bus.publish("detection", "payload")
+    thread.join(timeout=1.0)
+    latency_ms = (time.perf_counter() - start) * 1000.0
+    assert woke["versions"] == {"map": 0, "detection": 1}
+    assert bus.latest("detection") == "payload"
+    print(f"Risveglio dopo publish: {latency_ms:.2f} ms")
+
+    # wake() sveglia senza novità, stop() sveglia tutti e resta attivo
+    threading.Timer(0.02, bus.wake).start()
+    assert bus.wait({"map": 0}, timeout=1.0) == {"map": 0}
+    received = []
+    bus.subscribe(lambda topic, payload: received.append(topic), (EventBus.STOP,))
+    threading.Timer(0.02, bus.stop).start()
+    start = time.perf_counter()
+    bus.wait({"map": 0})
+    assert bus.wait({"map": 0}) == {"map": 0} and bus.stopped
+    assert time.perf_counter() - start < 0.5 and received == [EventBus.STOP]
+
+
+def test_grid_map_publishes_only_real_changes():
+    bus = EventBus()
+    topics = []
+    bus.subscribe(lambda topic, payload: topics.append((topic, payload)))
+    grid = GridMap(max_size=10, storage="dense", event_bus=bus)
+
+    grid.set_cell(0, 0, CellState.FLOOR)
+    grid.set_cell(0, 0, CellState.FLOOR)      # invariata: nessun evento
+    grid.set_walls(0, 0, 1)
+    grid.observe(1, 0, CellState.WALL, 0.9)
+    grid.set_position(1, 0)
+    grid.set_position(1, 0)
+    grid.clear()
+    assert topics == [("map", 1), ("map", 2), ("map", 3), ("robot", (1, 0)), ("map", 4)]
+    assert bus.version("map") == 4
+
+
+def test_single_stop_event_shuts_down_threads():
+    bus = EventBus()
+    grid = GridMap(max_size=30, storage="dense", event_bus=bus)
+    slot = LatestFrameSlot()
+    inference = InferenceThread([VisionSystem("", ""), VisionSystem("", "")], grid, slot, event_bus=bus)
+    inference.start()
+    sim = MazeSimulator(grid, size=8, seed=1, rate_hz=0.5, event_bus=bus)  # un passo ogni 2 s
+    sim.start()
+    with tempfile.TemporaryDirectory() as tmp:
+        journal = MapJournal(grid, tmp, poll_interval_s=0.01, fsync=False)
+        journal.start()
+        time.sleep(0.1)
+
+        start = time.perf_counter()
+        bus.stop()
+        for thread in [inference, sim, journal._thread] + inference.workers:
+            thread.join(timeout=1.0)
+            assert not thread.is_alive()
+        elapsed_ms = (time.perf_counter() - start) * 1000.0
+        print(f"Arresto di inferenza, simulatore e journal: {elapsed_ms:.1f} ms")
+        assert elapsed_ms < 500
+        journal.stop()
+
+
+def test_component_stop_does_not_stop_bus():
+    bus = EventBus()
+    grid = GridMap(max_size=30, storage="dense", event_bus=bus)
+    slot = LatestFrameSlot()
+    inference = InferenceThread(VisionSystem("", ""), grid, slot, event_bus=bus)
+    cam = CameraThread(0, slot, event_bus=bus)
+    sim = MazeSimulator(grid, size=8, seed=1, rate_hz=0.5, event_bus=bus)
+    cam.stop()                             # ferma solo la camera
+    assert not bus.stopped and bus.version(EventBus.STOP) == 0
+    assert not sim._stop_event.is_set()
+
+    waiter = threading.Thread(target=bus.wait, args=({"map": bus.version("map")},))
+    waiter.start()
+    bus.stop()
+    bus.stop()
+    waiter.join(timeout=1.0)
+    assert not waiter.is_alive()
+    assert bus.version(EventBus.STOP) == 1 and sim._stop_event.is_set()
+    assert inference.frame_slot.take(timeout=1.0) is None   # slot chiuso dallo STOP
+
+
+def test_concurrent_stops_publish_once():
+    # cambi di thread frequenti: senza atomicità più stop() vedrebbero STOP non ancora pubblicato
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        _concurrent_stops(rounds=200)
+    finally:
+        sys.setswitchinterval(interval)
+
+
+def _concurrent_stops(rounds):
+    for _ in range(rounds):
+        bus = EventBus()
+        calls = []
+        bus.subscribe(lambda topic, payload: calls.append(topic), (EventBus.STOP,))
+        start = threading.Barrier(8)
+
+        def stop():
+            start.wait()
+            bus.stop()
+
+        threads = [threading.Thread(target=stop) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(timeout=1.0)
+        assert bus.version(EventBus.STOP) == 1 and calls == [EventBus.STOP], (bus.version(EventBus.STOP), calls)
+
+
+def test_consumers_sleep_while_idle():
+    bus = EventBus()
+    grid = GridMap(max_size=10, storage="dense", event_bus=bus)
+    with tempfile.TemporaryDirectory() as tmp:
+        journal = MapJournal(grid, tmp, poll_interval_s=0.01, snapshot_interval_s=60.0, fsync=False)
+        journal.start()
+        grid.set_cell(0, 0, CellState.START_POINT)
+        time.sleep(0.1)
+        assert journal.records_written == 1
+
+        wakeups = bus.wakeups
+        time.sleep(0.3)
+        assert bus.wakeups == wakeups  # a riposo il journal non si sveglia
+
+        grid.set_cell(1, 0, CellState.FLOOR)
+        deadline = time.monotonic() + 1.0
+        while journal.records_written < 2 and time.monotonic() < deadline:
+            time.sleep(0.005)
+        assert journal.records_written == 2
+        journal.stop()
+        assert not journal._thread
+
+
+def test_ui_wakes_on_map_events():
+    bus = EventBus()
+    grid = GridMap(max_size=10, storage="dense", event_bus=bus)
+    ui = MazeMapperUI(grid, InferenceThread(VisionSystem("", ""), grid, LatestFrameSlot()), event_bus=bus)
+    ui._handle_events(ui._wait_for_events())
+    ui._render()
+
+    # A riposo l'attesa si allunga fino a INPUT_POLL_MAX_S
+    for _ in range(6):
+        ui._wait_for_events()
+    assert ui._input_poll_s == ui.INPUT_POLL_MAX_S
+
+    threading.Timer(0.02, grid.set_cell, (2, 2, CellState.VICTIM_FOUND)).start()
+    start = time.perf_counter()
+    ui._handle_events(ui._wait_for_events())
+    assert time.perf_counter() - start < ui.INPUT_POLL_MAX_S / 2
+    assert ui._input_poll_s == ui.INPUT_POLL_S
+    assert ui._render_grid()  # la cella nuova viene disegnata
+
+    bus.stop()
+    ui._handle_events(ui._wait_for_events())
+    assert not ui.running
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    test_wait_blocks_until_publish()
+    test_grid_map_publishes_only_real_changes()
+    test_single_stop_event_shuts_down_threads()
+    test_component_stop_does_not_stop_bus()
+    test_concurrent_stops_publish_once()
+    test_consumers_sleep_while_idle()
+    test_ui_wakes_on_map_events()
+    print("PASSED")
@@ -0,0 +1,171 @@
+import tempfile
+import time
+
+import numpy as np
+
+from Mapping import GridMap, CellState
+from map_journal import MapJournal
+
+
+def test_single_confident_detection_sets_cell():
+    grid = GridMap(max_size=5)
+    assert grid.observe(1, 1, CellState.FLOOR, 0.9)
+    assert grid.get_cell(1, 1) == CellState.FLOOR
+
+    # Detection debole: evidenza accumulata ma cella ancora ignota
+    assert not grid.observe(2, 2, CellState.WALL, 0.3)
+    assert grid.get_cell(2, 2) == CellState.UNKNOWN
+    evidence = grid.evidence_at(2, 2)
+    assert evidence[CellState.WALL] == 0.0 and evidence[CellState.FLOOR] < 0
+    assert grid.evidence_at(3, 3) == {}
+
+
+def test_noisy_frame_does_not_flip_cell():
+    grid = GridMap(max_size=5, storage="dense")
+    for _ in range(5):
+        grid.observe(0, 0, CellState.FLOOR, 0.9)
+    version = grid.version
+
+    # Un frame rumoroso (anche molto sicuro) non trasforma il pavimento in muro
+    assert not grid.observe(0, 0, CellState.WALL, 0.95)
+    assert grid.get_cell(0, 0) == CellState.FLOOR and grid.version == version
+
+    # Osservazioni ripetute sì, e la saturazione limita quante ne servono
+    flips = 0
+    while grid.get_cell(0, 0) != CellState.WALL:
+        grid.observe(0, 0, CellState.WALL, 0.9)
+        flips += 1
+    assert flips < 10
+    changes = grid.changes_since(version)
+    assert changes.cells == {(0, 0): CellState.WALL}
+
+
+def test_hysteresis_prevents_flicker():
+    # Pavimento osservato con costanza, un muro molto "sicuro" ogni tre frame
+    sequence = [(CellState.FLOOR, 0.8), (CellState.FLOOR, 0.8), (CellState.WALL, 0.95)] * 20
+
+    fused = GridMap(max_size=5)
+    changes = sum(fused.observe(0, 0, state, conf) for state, conf in sequence)
+    assert changes == 1 and fused.get_cell(0, 0) == CellState.FLOOR
+
+    # Con l'ultima scrittura che vince la cella cambierebbe ad ogni muro rumoroso
+    last_write = GridMap(max_size=5)
+    for state, _ in sequence:
+        last_write.set_cell(0, 0, state)
+    assert last_write.version > 30
+
+
+def test_batch_accumulates_duplicates_in_one_operation():
+    a = GridMap(max_size=10, storage="dense", evidence_limit=100.0)
+    b = GridMap(max_size=10, storage="dict", evidence_limit=100.0)
+    rnd = np.random.default_rng(2)
+    n = 500
+    xs, ys = rnd.integers(-10, 11, n), rnd.integers(-10, 11, n)
+    states = rnd.choice([CellState.FLOOR.value, CellState.WALL.value, CellState.VICTIM_FOUND.value], n)
+    conf = rnd.uniform(0.5, 0.99, n)
+
+    a.observe_batch(xs, ys, states, conf)
+    for x, y, s, c in zip(xs, ys, states, conf):
+        b.observe(int(x), int(y), CellState(int(s)), float(c))
+    assert np.allclose(a._evidence.logodds, b._evidence.logodds, atol=1e-4)
+
+    # Dopo il batch ogni cella mostra la classe con più evidenza
+    for (x, y), state in a.get_all_cells().items():
+        evidence = a.evidence_at(x, y)
+        assert state == max(evidence, key=evidence.get)
+
+    # Fuori griglia e UNKNOWN vengono ignorati
+    assert a.observe_batch([50, 0], [0, 50], [CellState.FLOOR, CellState.FLOOR], [0.9, 0.9]) == 0
+    assert a.observe_batch([0], [0], [CellState.UNKNOWN], [0.9]) == 0
+
+
+def test_clear_resets_evidence():
+    grid = GridMap(max_size=5)
+    for _ in range(10):
+        grid.observe(1, 0, CellState.FLOOR, 0.9)
+    grid.clear()
+    assert grid.evidence_at(1, 0) == {}
+    assert grid.observe(1, 0, CellState.WALL, 0.9) and grid.get_cell(1, 0) == CellState.WALL
+
+
+def test_written_cell_resists_single_detection():
+    grid = GridMap(max_size=5)
+    grid.observe(2, 2, CellState.FLOOR, 0.9)   # evidenza già allocata
+    grid.set_cell(0, 0, CellState.START_POINT)
+    assert not grid.observe(0, 0, CellState.WALL, 0.76)
+    assert grid.get_cell(0, 0) == CellState.START_POINT
+
+    # Celle scritte prima della prima observe(): evidenza creata dallo stato attuale
+    fresh = GridMap(max_size=5, storage="dict")
+    fresh.set_cell(1, 0, CellState.FLOOR)
+    assert not fresh.observe(1, 0, CellState.WALL, 0.76)
+    assert fresh.get_cell(1, 0) == CellState.FLOOR
+
+    # Con abbastanza osservazioni contrarie la cella cambia comunque
+    flips = 0
+    while grid.get_cell(0, 0) != CellState.WALL:
+        grid.observe(0, 0, CellState.WALL, 0.9)
+        flips += 1
+    assert 1 < flips < 12
+
+
+def test_restored_map_resists_single_detection():
+    with tempfile.TemporaryDirectory() as tmp:
+        grid = GridMap(max_size=10)
+        journal = MapJournal(grid, tmp, fsync=False)
+        journal.start()
+        for x in range(-3, 4):
+            grid.set_cell(x, 0, CellState.FLOOR)
+        grid.set_cell(0, 1, CellState.START_POINT)
+        journal.write_snapshot()
+        grid.set_cell(4, 0, CellState.FLOOR)   # solo nel journal
+        journal.stop()
+
+        copy = GridMap(max_size=10)
+        copy.observe(5, 5, CellState.WALL, 0.9)
+        MapJournal(copy, tmp, fsync=False, resume_clean=True).restore()
+        assert copy.get_all_cells() == grid.get_all_cells()
+        for x, y in ((0, 0), (4, 0), (0, 1)):
+            state = copy.get_cell(x, y)
+            assert not copy.observe(x, y, CellState.WALL, 0.76)
+            assert copy.get_cell(x, y) == state
+        assert copy.evidence_at(5, 5) == {}   # evidenza della sessione precedente azzerata
+
+        # Ripristino su una mappa senza evidenza: la prima observe() parte dagli stati caricati
+        lazy = GridMap(max_size=10, storage="dict")
+        MapJournal(lazy, tmp, fsync=False, resume_clean=True).restore()
+        assert not lazy.observe(-3, 0, CellState.WALL, 0.76)
+        assert lazy.get_cell(-3, 0) == CellState.FLOOR
+
+
+def test_batch_throughput():
+    grid = GridMap(max_size=50, storage="dense")
+    rnd = np.random.default_rng(5)
+    n = 20000
+    xs, ys = rnd.integers(-50, 51, n), rnd.integers(-50, 51, n)
+    states = rnd.choice([CellState.FLOOR.value, CellState.WALL.value], n)
+    conf = rnd.uniform(0.6, 0.99, n)
+
+    start = time.perf_counter()
+    grid.observe_batch(xs, ys, states, conf)
+    batch_ms = (time.perf_counter() - start) * 1000
+
+    single = GridMap(max_size=50, storage="dense")
+    start = time.perf_counter()
+    for i in range(2000):
+        single.observe(int(xs[i]), int(ys[i]), CellState(int(states[i])), float(conf[i]))
+    single_ms = (time.perf_counter() - start) * 1000 * n / 2000
+    print(f"{n} detection: batch {batch_ms:.1f} ms, una alla volta ~{single_ms:.0f} ms")
+    assert batch_ms < single_ms
+
+
+if __name__ == "__main__":
+    test_single_confident_detection_sets_cell()
+    test_noisy_frame_does_not_flip_cell()
+    test_hysteresis_prevents_flicker()
+    test_batch_accumulates_duplicates_in_one_operation()
+    test_clear_resets_evidence()
+    test_written_cell_resists_single_detection()
+    test_restored_map_resists_single_detection()
+    test_batch_throughput()
+    print("PASSED")
@@ -0,0 +1,121 @@
+import time
+
+import cv2
+import numpy as np
+
+from floor_tile import COLOR_RANGES, FloorTileDetector, TileColor
+
+# I sei colori del prototipo not_current/colorLetters.py
+PROTOTYPE_RANGES = {name: COLOR_RANGES[name] for name in
+                    ("ROSSO", "GIALLO", "VERDE", "NERO", "BIANCO", "SILVER")}
+
+
+def prototype_color(hsv):
+    """Logica di colorLetters.get_detected_color: un inRange per range e un sum per colore."""
+    V = hsv[..., 2]
+    max_ratio = 0
+    detected_color = "BIANCO"
+    for color, ranges in PROTOTYPE_RANGES.items():
+        mask_total = np.zeros(hsv.shape[:2], dtype=np.uint8)
+        for lower, upper in ranges:
+            mask_total = cv2.bitwise_or(mask_total, cv2.inRange(hsv, np.array(lower), np.array(upper)))
+        ratio = np.sum(mask_total > 0) / (hsv.shape[0] * hsv.shape[1])
+        if ratio > 0.05:
+            if color == "SILVER" and np.std(V[mask_total > 0]) < 10:
+                continue
+            if ratio > max_ratio:
+                max_ratio = ratio
+                detected_color = color
+    return detected_color
+
+
+def random_hsv(rng, shape):
+    """Immagine HSV a macchie di colore uniforme, con rumore e valori ai bordi dei range."""
+    h, w = shape
+    hsv = np.empty((h, w, 3), dtype=np.uint8)
+    hsv[..., 0] = rng.integers(0, 180, (h, w))
+    hsv[..., 1:] = rng.integers(0, 256, (h, w, 2))
+    for _ in range(rng.integers(1, 4)):
+        y, x = rng.integers(0, h), rng.integers(0, w)
+        dy, dx = rng.integers(h // 4, h), rng.integers(w // 4, w)
+        base = (rng.integers(0, 180), rng.integers(0, 256), rng.integers(0, 256))
+        noise = rng.integers(-12, 13, (min(dy, h - y), min(dx, w - x), 3))
+        patch = np.clip(np.array(base) + noise, 0, 255)
+        patch[..., 0] %= 180
+        hsv[y:y + dy, x:x + dx] = patch
+    return hsv
+
+
+def test_matches_prototype():
+    detector = FloorTileDetector(ranges=PROTOTYPE_RANGES)
+    rng = np.random.default_rng(0)
+    for _ in range(300):
+        hsv = random_hsv(rng, (60, 80))
+        color, ratios = detector.classify_hsv(hsv)
+        assert color == prototype_color(hsv)
+        for name, ranges in PROTOTYPE_RANGES.items():
+            mask = np.zeros(hsv.shape[:2], dtype=bool)
+            for lower, upper in ranges:
+                mask |= cv2.inRange(hsv, np.array(lower), np.array(upper)) > 0
+            assert abs(ratios[name] - mask.mean()) < 1e-12
+
+
+def test_tiles_from_bottom_roi():
+    detector = FloorTileDetector(history_size=1)
+    frame = np.full((480, 640, 3), 255, dtype=np.uint8)
+    frame[:300] = (0, 0, 255)                  # rosso fuori dalla ROI: ignorato
+    assert detector.process_frame(frame) == (TileColor.NORMAL, "BIANCO")
+
+    frame[400:] = (10, 10, 10)
+    assert detector.process_frame(frame) == (TileColor.BLACK, "NERO")
+    frame[400:] = (200, 40, 0)                 # BGR: blu
+    assert detector.process_frame(frame) == (TileColor.BLUE, "BLU")
+    frame[400:] = (0, 0, 200)
+    assert detector.process_frame(frame) == (TileColor.RED, "ROSSO")
+
+    # Grigio uniforme: stessi pixel di un argento, ma senza riflessi
+    frame[400:] = 150
+    assert detector.process_frame(frame) == (TileColor.NORMAL, "BIANCO")
+    assert detector.last_ratios["SILVER"] > 0.5
+    frame[400:] = np.random.default_rng(1).integers(110, 190, (80, 640, 1), dtype=np.uint8)
+    assert detector.process_frame(frame) == (TileColor.SILVER, "SILVER")
+    assert [tile.serial_code for tile in TileColor] == ["n", "k", "v", "b", "r"]
+
+
+def test_debounce_and_prewarm():
+    detector = FloorTileDetector(history_size=3)
+    detector.prewarm()
+    assert not detector.history
+    black = np.zeros((120, 160, 3), dtype=np.uint8)
+    white = np.full((120, 160, 3), 200, dtype=np.uint8)
+    assert detector.process_frame(black)[0] == TileColor.BLACK
+    assert detector.process_frame(white)[0] == TileColor.BLACK   # un frame isolato non basta
+    assert detector.process_frame(white)[0] == TileColor.NORMAL
+    assert detector.process_frame(None) == (None, "NO_FRAME")
+
+
+def test_faster_than_six_passes():
+    frame = np.random.default_rng(2).integers(0, 256, (480, 640, 3), dtype=np.uint8)
+    detector = FloorTileDetector()
+    detector.process_frame(frame)
+
+    runs = 50
+    start = time.perf_counter()
+    for _ in range(runs):
+        detector.process_frame(frame)
+    single_ms = (time.perf_counter() - start) * 1000.0 / runs
+
+    start = time.perf_counter()
+    for _ in range(runs):
+        prototype_color(cv2.cvtColor(cv2.resize(frame, (320, 240)), cv2.COLOR_BGR2HSV))
+    prototype_ms = (time.perf_counter() - start) * 1000.0 / runs
+    print(f"Piastrella: {single_ms:.3f} ms/frame, prototipo a sei passate {prototype_ms:.3f} ms/frame")
+    assert single_ms < prototype_ms
+
+
+if __name__ == "__main__":
+    test_matches_prototype()
+    test_tiles_from_bottom_roi()
+    test_debounce_and_prewarm()
+    test_faster_than_six_passes()
+    print("PASSED")
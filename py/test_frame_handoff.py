@@ -0,0 +1,130 @@
+import queue
+import random
+import threading
+import time
+
+import numpy as np
+
+from Mapping import (GridMap, InferenceThread, LatestFrameSlot, OrderedDelivery,
+                     DetectionResult, CONFIG)
+
+
+class SlowVision:
+    """Stand-in di VisionSystem: la label è l'indice del frame, la durata è variabile."""
+
+    def __init__(self, seed, min_s=0.005, max_s=0.03):
+        self.rnd = random.Random(seed)
+        self.min_s = min_s
+        self.max_s = max_s
+
+    def predict(self, frame):
+        time.sleep(self.rnd.uniform(self.min_s, self.max_s))
+        return DetectionResult(label=str(int(frame[0, 0])), confidence=0.99, timestamp=time.time())
+
+
+def frame(idx):
+    f = np.zeros((4, 4), dtype=np.int64)
+    f[0, 0] = idx
+    return f
+
+
+def test_slot_overwrites_oldest():
+    slot = LatestFrameSlot()
+    for i in range(3):
+        slot.put(frame(i))
+    ticket, latest, _ = slot.take(timeout=0.1)
+    assert ticket == 0 and latest[0, 0] == 2
+    assert slot.dropped == 2 and slot.published == 3
+    assert slot.take(timeout=0.01) is None, "Il frame è già stato consumato"
+
+    slot.close()
+    assert slot.take(timeout=1.0) is None
+
+
+def test_ordered_delivery():
+    delivered = []
+    delivery = OrderedDelivery(lambda r: delivered.append(r.label))
+    make = lambda label: DetectionResult(label=label, confidence=1.0, timestamp=0.0)
+    delivery.submit(2, make("c"))
+    delivery.submit(1, None)
+    assert delivered == []
+    delivery.submit(0, make("a"))
+    assert delivered == ["a", "c"]
+
+
+def run_pipeline(workers, duration=0.6, camera_hz=200):
+    grid = GridMap(max_size=1000)
+    slot = LatestFrameSlot()
+    inference = InferenceThread([SlowVision(i) for i in range(workers)], grid, slot)
+    delivered = []
+    inference._update_map = lambda result: delivered.append(int(result.label))
+    inference.start()
+
+    end = time.monotonic() + duration
+    idx = 0
+    while time.monotonic() < end:
+        slot.put(frame(idx))
+        idx += 1
+        time.sleep(1.0 / camera_hz)
+    inference.stop()
+    inference.join(timeout=1.0)
+    return delivered, inference.frame_age_stats()
+
+
+def legacy_queue_ages(duration=0.6, camera_hz=200):
+    """Comportamento precedente: Queue(maxsize=5) che scarta i frame nuovi quando è piena."""
+    frames = queue.Queue(maxsize=5)
+    ages = []
+    stop = threading.Event()
+    vision = SlowVision(0)
+
+    def consumer():
+        while not stop.is_set():
+            try:
+                captured_at, f = frames.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            ages.append((time.monotonic() - captured_at) * 1000.0)
+            vision.predict(f)
+
+    thread = threading.Thread(target=consumer)
+    thread.start()
+    end = time.monotonic() + duration
+    idx = 0
+    while time.monotonic() < end:
+        if not frames.full():
+            frames.put((time.monotonic(), frame(idx)))
+        idx += 1
+        time.sleep(1.0 / camera_hz)
+    stop.set()
+    thread.join()
+    ages.sort()
+    return ages[len(ages) // 2]
+
+
+def test_workers_deliver_in_capture_order_with_fresh_frames():
+    legacy_p50 = legacy_queue_ages()
+    for workers in (1, 3):
+        delivered, ages = run_pipeline(workers)
+        assert delivered, "Nessun risultato consegnato"
+        assert delivered == sorted(delivered) and len(set(delivered)) == len(delivered), \
+            "Gli aggiornamenti devono arrivare in ordine di acquisizione"
+        print(f"{workers} worker: {len(delivered)} risultati, età frame p50 {ages['p50_ms']:.1f} ms "
+              f"p95 {ages['p95_ms']:.1f} ms (coda legacy p50 {legacy_p50:.1f} ms)")
+        assert ages["p50_ms"] < legacy_p50
+
+
+def test_low_confidence_not_applied():
+    grid = GridMap(max_size=10)
+    inference = InferenceThread(SlowVision(0), grid, LatestFrameSlot())
+    low = DetectionResult(label="WALL", confidence=CONFIG["CONFIDENCE_THRESHOLD"] / 2, timestamp=0.0)
+    inference.delivery.submit(0, low)
+    assert inference.last_detection is None and grid.get_stats()["total_cells"] == 0
+
+
+if __name__ == "__main__":
+    test_slot_overwrites_oldest()
+    test_ordered_delivery()
+    test_workers_deliver_in_capture_order_with_fresh_frames()
+    test_low_confidence_not_applied()
+    print("PASSED")
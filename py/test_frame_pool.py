@@ -0,0 +1,216 @@
+import os
+import tempfile
+import threading
+import time
+import tracemalloc
+
+import numpy as np
+
+from frame_pool import FramePool, POISON
+from frame_recorder import FrameRecorder, ReplayCapture
+from Mapping import CameraThread, LatestFrameSlot
+
+SHAPE = (480, 640, 3)
+
+
+class FakeCapture:
+    """Sorgente con interfaccia VideoCapture; in_place=False ignora image= come alcune sorgenti."""
+
+    def __init__(self, shape=SHAPE, in_place=True):
+        self.shape = shape
+        self.in_place = in_place
+        self.count = 0
+
+    def read(self, image=None):
+        self.count += 1
+        if self.in_place and image is not None and image.shape == self.shape:
+            image[0, 0, 0] = self.count % 256
+            return True, image
+        frame = np.zeros(self.shape, dtype=np.uint8)
+        frame[0, 0, 0] = self.count % 256
+        return True, frame
+
+
+def test_refcount_and_exhaustion():
+    pool = FramePool(SHAPE, capacity=2)
+    a = pool.acquire()
+    b = pool.acquire()
+    assert pool.acquire() is None and pool.exhausted == 1
+
+    a.retain()           # secondo consumer
+    a.release()
+    assert pool.available == 0
+    a.release()
+    assert pool.available == 1 and pool.acquire() is a  # LIFO
+
+    with b:
+        pass
+    assert b.refs == 0
+    try:
+        b.release()
+        raise AssertionError("Doppio release accettato")
+    except RuntimeError:
+        pass
+
+    # acquire bloccante: si sblocca quando un altro thread rilascia
+    assert pool.acquire() is b and pool.available == 0
+    threading.Timer(0.05, a.release).start()
+    assert pool.acquire(timeout=0.5) is a
+
+
+def test_debug_guard_catches_use_after_release():
+    pool = FramePool((4, 4, 3), capacity=1, debug=True)
+    frame = pool.acquire()
+    frame.array[:] = 7
+    view = frame.array
+    frame.release()
+    try:
+        frame.array
+        raise AssertionError("Accesso dopo il release non segnalato")
+    except RuntimeError:
+        pass
+    assert (view == POISON).all()  # chi teneva una vista vede il buffer avvelenato
+    try:
+        frame.retain()
+        raise AssertionError("retain dopo il release accettato")
+    except RuntimeError:
+        pass
+
+    # Senza debug nessun controllo (e nessun costo) sull'accesso
+    fast = FramePool((4, 4, 3), capacity=1)
+    frame = fast.acquire()
+    frame.release()
+    assert frame.array.shape == (4, 4, 3)
+
+
+def test_read_in_place_and_fallback():
+    pool = FramePool(SHAPE, capacity=2)
+    ok, frame = pool.read(FakeCapture())
+    assert ok and frame.array[0, 0, 0] == 1 and pool.copies == 0
+    frame.release()
+
+    ok, frame = pool.read(FakeCapture(in_place=False))
+    assert ok and frame.array[0, 0, 0] == 1 and pool.copies == 1
+    frame.release()
+
+    try:
+        pool.read(FakeCapture(shape=(240, 320, 3), in_place=False))
+        raise AssertionError("Formato diverso accettato")
+    except ValueError:
+        assert pool.available == 2
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "s.rcf")
+        recorder = FrameRecorder(path, 64, 48, 3, capacity=5)
+        for i in range(5):
+            recorder.write(np.full((48, 64, 3), i, dtype=np.uint8))
+        recorder.close()
+
+        replay = ReplayCapture(path)
+        replay_pool = FramePool((48, 64, 3), capacity=1)
+        for i in range(5):
+            ok, frame = replay_pool.read(replay)
+            assert ok and (frame.array == i).all()
+            frame.release()
+        assert replay_pool.copies == 0 and replay_pool.read(replay) == (False, None)
+        replay.release()
+
+
+def test_slot_releases_dropped_frames():
+    pool = FramePool((2, 2, 3), capacity=3)
+    slot = LatestFrameSlot()
+    first, second = pool.acquire(), pool.acquire()
+    slot.put(first)
+    slot.put(second)  # first non consumato: torna al pool
+    assert first.refs == 0 and pool.available == 2
+
+    _, taken, _ = slot.take(timeout=0.1)
+    assert taken is second
+    taken.release()
+
+    slot.put(pool.acquire())
+    slot.close()      # frame rimasto nello slot: rilasciato
+    assert pool.available == 3
+
+
+def _pipeline(frames, pooled):
+    """Camera -> slot -> consumer; restituisce il picco di memoria allocata durante il regime."""
+    pool = FramePool(SHAPE, capacity=3)
+    slot = LatestFrameSlot()
+    cap = FakeCapture()
+    done = threading.Event()
+
+    def consumer():
+        while not done.is_set():
+            item = slot.take(timeout=0.01)
+            if item is not None:
+                frame = item[1]
+                image = frame.array if pooled else frame
+                int(image[0, 0, 0])
+                if pooled:
+                    frame.release()
+
+    worker = threading.Thread(target=consumer)
+    worker.start()
+
+    def produce(n):
+        for _ in range(n):
+            if pooled:
+                ok, frame = pool.read(cap, timeout=1.0)
+            else:
+                ok, frame = cap.read()
+                frame = frame.copy()  # come np.zeros / cap.read(): un array nuovo per frame
+            slot.put(frame)
+
+    produce(20)  # warm-up
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    base = tracemalloc.get_traced_memory()[0]
+    produce(frames)
+    peak = tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+
+    done.set()
+    worker.join()
+    slot.close()
+    return peak, pool
+
+
+def test_steady_state_allocations():
+    frame_bytes = int(np.prod(SHAPE))
+    pooled_peak, pool = _pipeline(300, pooled=True)
+    naive_peak, _ = _pipeline(300, pooled=False)
+    print(f"Picco allocato a regime: pool {pooled_peak / 1024:.1f} KiB, "
+          f"array nuovo per frame {naive_peak / 1024:.1f} KiB")
+    assert pool.allocations == 3 and pool.acquired >= 320
+    assert pooled_peak < frame_bytes // 10
+    assert naive_peak >= frame_bytes
+
+
+def test_camera_thread_recycles_buffers():
+    slot = LatestFrameSlot()
+    camera = CameraThread(0, slot, pool_size=3, debug=True)
+    camera.start()
+    taken = 0
+    deadline = time.monotonic() + 0.5
+    while time.monotonic() < deadline:
+        item = slot.take(timeout=0.1)
+        if item is not None:
+            frame = item[1]
+            assert frame.array.shape == SHAPE and not frame.array.any()
+            frame.release()
+            taken += 1
+    camera.running = False
+    camera.join(timeout=1.0)
+    slot.close()
+    assert taken >= 5 and camera.pool.allocations == 3 and camera.pool.available == 3
+
+
+if __name__ == "__main__":
+    test_refcount_and_exhaustion()
+    test_debug_guard_catches_use_after_release()
+    test_read_in_place_and_fallback()
+    test_slot_releases_dropped_frames()
+    test_steady_state_allocations()
+    test_camera_thread_recycles_buffers()
+    print("PASSED")
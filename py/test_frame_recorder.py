@@ -0,0 +1,90 @@
+import os
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from frame_recorder import FrameRecorder, ReplayCapture
+from cognitive_target import CognitiveTargetDetector, VideoStream
+
+
+def make_frame(i, size=(120, 160)):
+    frame = np.zeros((*size, 3), dtype=np.uint8)
+    frame[:] = (i * 7 % 256, i * 13 % 256, i * 29 % 256)
+    return frame
+
+
+def test_record_and_replay():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "session.rcf")
+        with FrameRecorder(path, width=160, height=120, capacity=10) as rec:
+            for i in range(12):
+                rec.write(make_frame(i), timestamp=100.0 + i * 0.01)
+            assert rec.full
+            assert rec.count == 10
+
+        replay = ReplayCapture(path)
+        assert replay.isOpened()
+        assert replay.frame_count == 10
+        assert replay.get(cv2.CAP_PROP_FRAME_WIDTH) == 160
+        assert abs(replay.get(cv2.CAP_PROP_FPS) - 100.0) < 1e-6
+
+        for i in range(10):
+            ret, frame = replay.read()
+            assert ret
+            assert np.array_equal(frame, make_frame(i))
+            assert replay.timestamp() == 100.0 + i * 0.01
+
+        # Fine registrazione: stesso comportamento di una camera scollegata
+        ret, frame = replay.read()
+        assert not ret and frame is None
+
+        # Lettura in un buffer preallocato
+        replay.set(cv2.CAP_PROP_POS_FRAMES, 3)
+        buf = np.empty((120, 160, 3), dtype=np.uint8)
+        ret, out = replay.read(image=buf)
+        assert ret and out is buf and np.array_equal(buf, make_frame(3))
+        replay.release()
+
+
+def test_replay_realtime_timing():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "session.rcf")
+        with FrameRecorder(path, width=16, height=16, capacity=5) as rec:
+            for i in range(5):
+                rec.write(np.zeros((16, 16, 3), dtype=np.uint8), timestamp=i * 0.02)
+
+        replay = ReplayCapture(path, realtime=True)
+        start = time.perf_counter()
+        while replay.read()[0]:
+            pass
+        elapsed = time.perf_counter() - start
+        print(f"Realtime replay: {elapsed * 1000:.1f} ms (attesi ~80 ms)")
+        assert elapsed >= 0.075
+        replay.release()
+
+
+def test_replay_drives_detector():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "target.rcf")
+        target = np.full((480, 640, 3), 200, dtype=np.uint8)
+        for r in [150, 120, 90, 60, 30]:
+            cv2.circle(target, (320, 240), r, (0, 255, 255), -1)
+        with FrameRecorder(path, capacity=3) as rec:
+            for _ in range(3):
+                rec.write(target)
+
+        # ReplayCapture può sostituire la camera anche dentro VideoStream
+        vs = VideoStream(cap=ReplayCapture(path))
+        detector = CognitiveTargetDetector(history_size=1)
+        score, action = detector.process_frame(vs.read())
+        assert action == "VICTIM_STOP_LED" and score == 0
+        vs.stop()
+
+
+if __name__ == "__main__":
+    test_record_and_replay()
+    test_replay_realtime_timing()
+    test_replay_drives_detector()
+    print("PASSED")
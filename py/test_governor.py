@@ -0,0 +1,131 @@
+import json
+import os
+import tempfile
+
+import numpy as np
+
+from governor import DegradationGovernor, SysfsThermalSource, DEFAULT_LEVELS
+from letterIdentifier import LetterDetector
+
+
+def write(path, value):
+    with open(path, "w") as f:
+        f.write(f"{value}\n")
+
+
+def make_thermal(tmp):
+    paths = {name: os.path.join(tmp, name) for name in ("temp", "cur_freq", "max_freq")}
+    write(paths["temp"], 55000)
+    write(paths["cur_freq"], 2400000)
+    write(paths["max_freq"], 2400000)
+    return SysfsThermalSource(paths["temp"], paths["cur_freq"], paths["max_freq"]), paths
+
+
+def test_thermal_source_reads_files():
+    with tempfile.TemporaryDirectory() as tmp:
+        thermal, paths = make_thermal(tmp)
+        assert thermal.temperature_c() == 55.0
+        assert thermal.frequency_mhz() == 2400.0
+        assert SysfsThermalSource(temp_path=os.path.join(tmp, "missing")).temperature_c() is None
+
+
+def test_degrade_on_heat_and_restore():
+    with tempfile.TemporaryDirectory() as tmp:
+        thermal, paths = make_thermal(tmp)
+        log_path = os.path.join(tmp, "governor.jsonl")
+        applied = []
+        gov = DegradationGovernor(target_fps=20, thermal=thermal, step_interval_s=2.0,
+                                  restore_hold_s=5.0, log_path=log_path, on_change=applied.append)
+
+        # Tutto ok: resta al livello pieno
+        assert gov.update(fps=30, now=0.0).name == "full"
+
+        # Chip caldo e in throttling: scende di un livello ogni step_interval_s
+        write(paths["temp"], 82000)
+        write(paths["cur_freq"], 1500000)
+        gov.update(fps=30, now=1.0)
+        gov.update(fps=30, now=2.0)   # troppo presto per un secondo step
+        gov.update(fps=30, now=3.1)
+        assert gov.index == 2, gov.index
+        assert [lvl.name for lvl in applied] == ["ocr_ridotto", "risoluzione_75"]
+
+        # Raffreddato: risale solo dopo restore_hold_s di margine continuo
+        write(paths["temp"], 60000)
+        write(paths["cur_freq"], 2400000)
+        gov.update(fps=30, now=10.0)
+        gov.update(fps=30, now=12.0)
+        assert gov.index == 2
+        gov.update(fps=30, now=15.0)
+        assert gov.index == 1
+        gov.update(fps=30, now=20.5)
+        assert gov.level is DEFAULT_LEVELS[0]
+
+        with open(log_path) as f:
+            entries = [json.loads(line) for line in f]
+        print(f"Log governor: {[(e['from'], e['to'], e['reason']) for e in entries]}")
+        assert len(entries) == 4
+        assert "temp" in entries[0]["reason"] and entries[0]["temp_c"] == 82.0
+
+
+def test_low_fps_degrades_without_sysfs():
+    gov = DegradationGovernor(target_fps=20, frame_budget_ms=33.0, step_interval_s=1.0)
+    for t in range(10):
+        gov.update(fps=8, frame_p95_ms=80.0, now=float(t))
+    assert gov.level is DEFAULT_LEVELS[-1], "Deve fermarsi all'ultimo livello"
+    assert gov.level.max_priority == 0
+
+    # FPS appena sopra target non bastano per risalire (isteresi)
+    for t in range(10, 30):
+        gov.update(fps=22, frame_p95_ms=20.0, now=float(t))
+    assert gov.level is DEFAULT_LEVELS[-1]
+
+
+def test_ocr_load_triggers_ocr_level():
+    gov = DegradationGovernor(target_fps=20, frame_budget_ms=33.0, step_interval_s=1.0,
+                              restore_hold_s=3.0, detector_budgets={"letters": 200.0})
+    # Loop fluido e p95 nel budget, ma l'OCR consuma 300 ms di CPU al secondo
+    assert gov.update(fps=30, frame_p95_ms=20.0, detector_load_ms={"letters": 300.0},
+                      now=0.0).name == "ocr_ridotto"
+    assert "letters" in gov.history[-1]["reason"]
+
+    # Ancora oltre budget: salta risoluzione_75 (stessa frequenza OCR) fino al livello con OCR più lento
+    gov.update(fps=30, frame_p95_ms=20.0, detector_load_ms={"letters": 250.0}, now=1.5)
+    assert gov.level.name == "risoluzione_50", gov.level.name
+
+    # Con l'OCR vicino al budget non risale, sotto il 70% sì
+    for t in range(2, 10):
+        gov.update(fps=30, frame_p95_ms=20.0, detector_load_ms={"letters": 180.0}, now=float(t))
+    assert gov.level.name == "risoluzione_50"
+    for t in range(10, 14):
+        gov.update(fps=30, frame_p95_ms=20.0, detector_load_ms={"letters": 60.0}, now=float(t))
+    assert gov.level.name == "risoluzione_75"
+
+    # Detector senza budget o misure mancanti non creano pressione
+    other = DegradationGovernor(target_fps=20, detector_budgets={"letters": 200.0})
+    assert other.update(fps=30, detector_load_ms={"floor": 900.0}, now=0.0).name == "full"
+    assert other.update(fps=30, now=5.0).name == "full"
+
+
+def test_letter_scan_fits_degraded_frames():
+    detector = LetterDetector(size=200, velocita=6, clahe=False)   # come nel wrapper
+    detector.run_ocr = lambda image: ""
+    for level in DEFAULT_LEVELS:
+        if level.max_priority is not None and level.max_priority < 1:
+            continue                            # lettere (priorità 1) disabilitate
+        detector.set_scale(level.scale)
+        h, w = int(480 * level.scale), int(640 * level.scale)
+        for _ in range(200):
+            detector.process_frame(np.zeros((h, w, 3), dtype=np.uint8))
+            # La ROI resta dentro la zona centrale del frame ridotto
+            assert int(w * 0.2) <= detector.x <= w - int(w * 0.2) - detector.size
+            assert int(h * 0.2) <= detector.y <= h - int(h * 0.2) - detector.size
+        assert detector.size == round(200 * level.scale)
+
+
+if __name__ == "__main__":
+    test_thermal_source_reads_files()
+    test_degrade_on_heat_and_restore()
+    test_low_fps_degrades_without_sysfs()
+    test_ocr_load_triggers_ocr_level()
+    test_letter_scan_fits_degraded_frames()
+    print("PASSED")
@@ -0,0 +1,176 @@
+import random
+import sys
+import threading
+
+import numpy as np
+
+from Mapping import (GridMap, CellState, WALL_N, WALL_E, WALL_S, WALL_W,
+                     WALL_SIDES, WALL_OFFSETS, OPPOSITE_WALL, NEIGHBOUR_OFFSETS)
+
+
+def brute_passable(grid, x, y, known_only=False):
+    row = []
+    for side in WALL_SIDES:
+        dx, dy = WALL_OFFSETS[side]
+        nx, ny = x + dx, y + dy
+        state = grid.get_cell(nx, ny)
+        ok = (abs(nx) <= grid.max_size and abs(ny) <= grid.max_size
+              and not grid.get_walls(x, y) & side and state != CellState.WALL)
+        if known_only:
+            ok = ok and state != CellState.UNKNOWN
+        row.append(ok)
+    return row
+
+
+def brute_frontier(grid):
+    cells = grid.get_all_cells()
+    frontier = set()
+    for (x, y), state in cells.items():
+        if state == CellState.WALL:
+            continue
+        for side in WALL_SIDES:
+            dx, dy = WALL_OFFSETS[side]
+            nx, ny = x + dx, y + dy
+            if (abs(nx) <= grid.max_size and abs(ny) <= grid.max_size
+                    and not grid.get_walls(x, y) & side and (nx, ny) not in cells):
+                frontier.add((x, y))
+    return frontier
+
+
+def test_shared_edge_consistency():
+    grid = GridMap(max_size=5, storage="dense")
+    grid.set_wall(0, 0, WALL_E)
+    assert grid.has_wall(0, 0, WALL_E) and grid.has_wall(1, 0, WALL_W)
+
+    grid.set_walls(1, 0, WALL_N | WALL_S)  # toglie il lato W: sparisce anche da (0,0)
+    assert grid.get_walls(0, 0) == 0
+    assert grid.get_walls(1, -1) == WALL_S and grid.get_walls(1, 1) == WALL_N
+
+    # Cella sul bordo: il vicino fuori griglia non esiste
+    grid.set_wall(5, 5, WALL_E)
+    assert grid.get_walls(5, 5) == WALL_E
+
+    rnd = random.Random(3)
+    for _ in range(500):
+        grid.set_wall(rnd.randint(-5, 5), rnd.randint(-5, 5), rnd.choice(WALL_SIDES), rnd.random() < 0.6)
+    for y in range(-5, 6):
+        for x in range(-5, 6):
+            for side in WALL_SIDES:
+                dx, dy = WALL_OFFSETS[side]
+                if abs(x + dx) <= 5 and abs(y + dy) <= 5:
+                    assert grid.has_wall(x, y, side) == grid.has_wall(x + dx, y + dy, OPPOSITE_WALL[side])
+
+
+def test_passable_neighbours_vectorized():
+    for storage in ("dict", "dense"):
+        rnd = random.Random(5)
+        grid = GridMap(max_size=8, storage=storage)
+        for _ in range(200):
+            x, y = rnd.randint(-8, 8), rnd.randint(-8, 8)
+            grid.set_cell(x, y, rnd.choice((CellState.FLOOR, CellState.WALL, CellState.VICTIM_FOUND)))
+            grid.set_wall(x, y, rnd.choice(WALL_SIDES))
+
+        cells = np.array([(x, y) for y in range(-8, 9) for x in range(-8, 9)])
+        for known_only in (False, True):
+            result = grid.passable_neighbours(cells, known_only=known_only)
+            assert result.shape == (len(cells), 4)
+            expected = [brute_passable(grid, x, y, known_only) for x, y in cells]
+            assert result.tolist() == expected, storage
+
+        # Coordinate dei vicini raggiungibili di (0, 0)
+        mask = grid.passable_neighbours([(0, 0)])[0]
+        reachable = (np.array([0, 0]) + NEIGHBOUR_OFFSETS)[mask]
+        expected = [WALL_OFFSETS[side] for side, ok in zip(WALL_SIDES, brute_passable(grid, 0, 0)) if ok]
+        assert [tuple(c) for c in reachable.tolist()] == expected
+
+
+def test_frontier_index_tracks_changes():
+    for storage in ("dict", "dense"):
+        rnd = random.Random(11)
+        grid = GridMap(max_size=10, storage=storage)
+        assert grid.frontier_cells() == set()
+
+        # Molte scritture: ricalcolo vettoriale completo
+        for y in range(-10, 11):
+            for x in range(-10, 3):
+                grid.set_cell(x, y, CellState.WALL if rnd.random() < 0.2 else CellState.FLOOR)
+        assert grid.frontier_cells() == brute_frontier(grid)
+
+        # Poche scritture per volta: aggiornamento incrementale
+        for _ in range(300):
+            x, y = rnd.randint(-10, 10), rnd.randint(-10, 10)
+            if rnd.random() < 0.5:
+                grid.set_cell(x, y, rnd.choice((CellState.FLOOR, CellState.WALL, CellState.UNKNOWN)))
+            else:
+                grid.set_wall(x, y, rnd.choice(WALL_SIDES), rnd.random() < 0.7)
+            if rnd.random() < 0.3:
+                assert grid.frontier_cells() == brute_frontier(grid), storage
+        assert grid.frontier_cells() == brute_frontier(grid)
+
+        grid.clear()
+        assert grid.frontier_cells() == set() and grid.get_walls(0, 0) == 0
+
+
+def test_wall_changes_in_journal_and_snapshot():
+    grid = GridMap(max_size=5, journal_size=4)
+    grid.set_cell(0, 0, CellState.FLOOR)
+    version = grid.version
+    grid.set_wall(0, 0, WALL_N)
+
+    changes = grid.changes_since(version)
+    assert not changes.full_resync and changes.cells == {}
+    assert changes.walls == {(0, 0): WALL_N, (0, -1): WALL_S}
+
+    snap = grid.snapshot()
+    grid.set_wall(0, 0, WALL_N, present=False)
+    assert snap.get_walls(0, 0) == WALL_N and snap.walls == {(0, 0): WALL_N, (0, -1): WALL_S}
+    assert grid.snapshot().walls == {}
+
+    # Il journal (4 voci) contiene ancora entrambe le voci di ogni set_wall
+    version = grid.version
+    grid.set_wall(1, 1, WALL_E)
+    grid.set_wall(2, 2, WALL_E)
+    changes = grid.changes_since(version)
+    assert not changes.full_resync
+    assert changes.walls == {(1, 1): WALL_E, (2, 1): WALL_W, (2, 2): WALL_E, (3, 2): WALL_W}
+
+    # Una voce di (1,1) esce dal journal: chi era fermo prima deve fare un resync
+    grid.set_wall(3, 3, WALL_S, present=True)
+    changes = grid.changes_since(version)
+    assert changes.full_resync
+    assert changes.walls[(1, 1)] == WALL_E and changes.walls[(3, 4)] == WALL_N
+    assert not grid.changes_since(version + 1).full_resync
+
+
+def test_concurrent_set_wall_keeps_every_side():
+    grid = GridMap(max_size=5, storage="dense")
+    all_walls = WALL_N | WALL_E | WALL_S | WALL_W
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)  # cambi di thread frequenti: rende visibile la race
+    try:
+        for _ in range(200):
+            grid.set_walls(0, 0, 0)
+            barrier = threading.Barrier(len(WALL_SIDES))
+
+            def add(side):
+                barrier.wait()
+                grid.set_wall(0, 0, side)
+
+            threads = [threading.Thread(target=add, args=(side,)) for side in WALL_SIDES]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            assert grid.get_walls(0, 0) == all_walls
+    finally:
+        sys.setswitchinterval(interval)
+    assert grid.has_wall(1, 0, WALL_W) and grid.has_wall(0, -1, WALL_S)
+
+
+if __name__ == "__main__":
+    test_shared_edge_consistency()
+    test_passable_neighbours_vectorized()
+    test_frontier_index_tracks_changes()
+    test_wall_changes_in_journal_and_snapshot()
+    test_concurrent_set_wall_keeps_every_side()
+    print("PASSED")
@@ -0,0 +1,164 @@
+import os
+import random
+import tempfile
+import time
+
+from Mapping import GridMap, CellState, WALL_E, WALL_N
+from map_journal import MapJournal, read_journal, RECORD_SIZE, JOURNAL_HEADER
+
+
+def fill(grid, rnd, count, side=20):
+    states = (CellState.FLOOR, CellState.WALL, CellState.VICTIM_FOUND, CellState.LETTER_H)
+    for _ in range(count):
+        x, y = rnd.randint(-side, side), rnd.randint(-side, side)
+        grid.set_cell(x, y, rnd.choice(states))
+        if rnd.random() < 0.2:
+            grid.set_wall(x, y, rnd.choice((WALL_N, WALL_E)))
+
+
+def restored(directory, storage="dense", resume_clean=False):
+    grid = GridMap(max_size=30, storage=storage)
+    journal = MapJournal(grid, directory, fsync=False, resume_clean=resume_clean)
+    info = journal.restore()
+    return grid, journal, info
+
+
+def same_map(a, b):
+    return (a.get_all_cells() == b.get_all_cells() and a.snapshot().walls == b.snapshot().walls
+            and a.get_stats() == b.get_stats() and a.frontier_cells() == b.frontier_cells())
+
+
+def test_journal_and_snapshot_roundtrip():
+    with tempfile.TemporaryDirectory() as tmp:
+        rnd = random.Random(1)
+        grid = GridMap(max_size=30, storage="dense")
+        journal = MapJournal(grid, tmp, poll_interval_s=0.01, fsync=False)
+        journal.start()
+
+        fill(grid, rnd, 500)
+        journal.write_snapshot()
+        fill(grid, rnd, 100)
+        grid.set_cell(0, 0, CellState.UNKNOWN)  # anche le rimozioni vanno nel journal
+        journal.stop()
+
+        copy, reopened, info = restored(tmp, resume_clean=True)
+        assert same_map(grid, copy)
+        assert info["snapshot_cells"] > 0 and 0 < info["journal_records"] <= 200
+        assert reopened.seq == journal.seq
+        print(f"Ripristino: {info}")
+
+        # La sessione successiva continua lo stesso journal
+        reopened.start()
+        copy.set_cell(1, 1, CellState.LETTER_X)
+        reopened.stop()
+        again, _, _ = restored(tmp, resume_clean=True)
+        assert same_map(copy, again)
+
+
+def test_torn_and_corrupted_tail():
+    with tempfile.TemporaryDirectory() as tmp:
+        grid = GridMap(max_size=30)
+        journal = MapJournal(grid, tmp, fsync=False)
+        journal.restore()
+        for x in range(10):
+            grid.set_cell(x, 0, CellState.FLOOR)
+        journal.flush()
+        journal._file.close()
+        journal._file = None  # "crash": nessuno stop()
+
+        path = journal.journal_path
+        with open(path, "ab") as f:
+            f.write(b"\x01\x02\x03")  # ultimo record scritto a metà
+
+        copy, reopened, info = restored(tmp)
+        assert same_map(grid, copy) and info["torn_bytes"] == 3
+        assert os.path.getsize(path) == JOURNAL_HEADER.size + 10 * RECORD_SIZE
+
+        # I record successivi si appendono dopo l'ultimo valido
+        copy.set_cell(20, 0, CellState.VICTIM_FOUND)
+        reopened.stop()
+        records, _, torn = read_journal(path)
+        assert len(records) == 11 and torn == 0
+
+        # Un byte corrotto a metà journal: il replay si ferma al record rovinato
+        with open(path, "r+b") as f:
+            f.seek(JOURNAL_HEADER.size + 5 * RECORD_SIZE + 2)
+            f.write(b"\xff")
+        partial, _, info = restored(tmp, resume_clean=True)
+        assert info["journal_records"] == 5
+        assert partial.get_cell(4, 0) == CellState.FLOOR and partial.get_cell(5, 0) == CellState.UNKNOWN
+
+
+def test_clear_triggers_snapshot():
+    with tempfile.TemporaryDirectory() as tmp:
+        grid = GridMap(max_size=30)
+        journal = MapJournal(grid, tmp, fsync=False)
+        journal.restore()
+        fill(grid, random.Random(2), 50)
+        journal.flush()
+        grid.clear()
+        grid.set_cell(3, 3, CellState.START_POINT)
+        journal.flush()   # full_resync della mappa -> snapshot
+        journal.flush()
+        assert journal.snapshots_written == 1
+        journal.stop()
+
+        copy, _, _ = restored(tmp, storage="dict", resume_clean=True)
+        assert copy.get_all_cells() == {(3, 3): CellState.START_POINT}
+        assert copy.get_bounds() == (3, 3, 3, 3) and copy.frontier_cells() == {(3, 3)}
+
+
+def test_writes_do_not_wait_for_io():
+    with tempfile.TemporaryDirectory() as tmp:
+        grid = GridMap(max_size=60, storage="dense")
+        journal = MapJournal(grid, tmp, poll_interval_s=0.005, snapshot_interval_s=0.05, fsync=True)
+        journal.start()
+        rnd = random.Random(3)
+        latencies = []
+        for _ in range(20000):
+            x, y = rnd.randint(-60, 60), rnd.randint(-60, 60)
+            start = time.perf_counter()
+            grid.set_cell(x, y, CellState.FLOOR)
+            latencies.append(time.perf_counter() - start)
+        journal.stop()
+        latencies.sort()
+        print(f"set_cell con journal attivo: p50 {latencies[len(latencies) // 2] * 1e6:.1f}us "
+              f"p99 {latencies[int(len(latencies) * 0.99)] * 1e6:.1f}us, "
+              f"{journal.snapshots_written} snapshot, {journal.records_written} record")
+
+        copy = GridMap(max_size=60, storage="dense")
+        start = time.perf_counter()
+        MapJournal(copy, tmp, fsync=False, resume_clean=True).restore()
+        print(f"Ripristino di {len(copy.get_all_cells())} celle in {(time.perf_counter() - start) * 1000:.1f} ms")
+        assert same_map(grid, copy)
+
+
+def test_clean_stop_starts_new_round():
+    with tempfile.TemporaryDirectory() as tmp:
+        grid = GridMap(max_size=30)
+        journal = MapJournal(grid, tmp, fsync=False)
+        journal.start()
+        fill(grid, random.Random(4), 50)
+        journal.stop()            # fine round: sessione chiusa correttamente
+
+        fresh, reopened, info = restored(tmp)
+        assert info["previous_clean"] and not fresh.get_all_cells()
+        assert os.path.exists(reopened.snapshot_path + ".prev") or os.path.exists(reopened.journal_path + ".prev")
+
+        # Crash durante il nuovo round: la mappa viene ripristinata
+        fresh.set_cell(2, 2, CellState.VICTIM_FOUND)
+        reopened.flush()
+        reopened._file.close()
+        reopened._file = None
+        recovered, _, info = restored(tmp)
+        assert not info["previous_clean"]
+        assert recovered.get_all_cells() == {(2, 2): CellState.VICTIM_FOUND}
+
+
+if __name__ == "__main__":
+    test_journal_and_snapshot_roundtrip()
+    test_torn_and_corrupted_tail()
+    test_clear_triggers_snapshot()
+    test_writes_do_not_wait_for_io()
+    test_clean_stop_starts_new_round()
+    print("PASSED")
@@ -0,0 +1,129 @@
+import os
+import struct
+import tempfile
+import time
+import zlib
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import numpy as np
+import pygame
+
+from Mapping import CONFIG, GridMap, CellState, MazeMapperUI, InferenceThread, VisionSystem, LatestFrameSlot, WALL_N, WALL_E
+from map_raster import MapRasterizer, MapExporter, write_png
+from maze_sim import generate_maze
+
+
+def read_png(path):
+    """Decodifica minima dei PNG scritti da write_png (RGB 8 bit, filtro None)."""
+    with open(path, "rb") as f:
+        data = f.read()
+    assert data[:8] == b"\x89PNG\r\n\x1a\n"
+    pos, idat, size = 8, b"", None
+    while pos < len(data):
+        length, tag = struct.unpack(">I4s", data[pos:pos + 8])
+        body = data[pos + 8:pos + 8 + length]
+        assert struct.unpack(">I", data[pos + 8 + length:pos + 12 + length])[0] == zlib.crc32(tag + body)
+        if tag == b"IHDR":
+            size = struct.unpack(">II", body[:8])
+        elif tag == b"IDAT":
+            idat += body
+        pos += 12 + length
+    w, h = size
+    raw = np.frombuffer(zlib.decompress(idat), dtype=np.uint8).reshape(h, w * 3 + 1)
+    assert not raw[:, 0].any()
+    return raw[:, 1:].reshape(h, w, 3)
+
+
+def test_lut_walls_and_markers():
+    grid = GridMap(max_size=20, storage="dense")
+    grid.set_cell(0, 0, CellState.FLOOR)
+    grid.set_cell(1, 0, CellState.VICTIM_FOUND)
+    grid.set_walls(0, 0, WALL_N | WALL_E)
+
+    # Tile da un pixel: LUT pura, UNKNOWN = sfondo
+    tiny = MapRasterizer(1).render(grid, bounds=(0, 2, 0, 1))
+    colors = CONFIG["COLORS"]
+    assert tiny.shape == (2, 3, 3)
+    assert tuple(tiny[0, 0]) == colors["FLOOR"] and tuple(tiny[0, 1]) == colors["VICTIM"]
+    assert tuple(tiny[1, 2]) == colors["BACKGROUND"]
+
+    raster = MapRasterizer(16)
+    image = raster.render(grid, markers=[(1, 0, (1, 2, 3))])
+    assert image.shape == (16, 32, 3)
+    wall, t = colors["WALL"], raster.wall_thickness
+    assert (image[:t, :16] == wall).all() and (image[:, 16 - t:16] == wall).all()
+    assert tuple(image[8, 4]) == colors["FLOOR"]          # interno del pavimento
+    assert tuple(image[0, 20]) == colors["GRID_LINE"]     # bordo della vittima (senza muri)
+    assert tuple(image[8, 24]) == (1, 2, 3)               # marker al centro della cella
+
+
+def test_png_roundtrip_and_exporter():
+    maze = generate_maze(12, seed=3, loops=0.1, victims=0.1, letters=0.1)
+    grid = GridMap(max_size=maze.max_size, storage="dense")
+    for y in range(maze.y0, maze.y0 + maze.height):
+        for x in range(maze.x0, maze.x0 + maze.width):
+            grid.set_cell(x, y, maze.tile_at(x, y))
+            grid.set_walls(x, y, maze.walls_at(x, y))
+    raster = MapRasterizer(8)
+    image = raster.render(grid)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "a.png")
+        write_png(path, image)
+        assert np.array_equal(read_png(path), image)
+
+        exporter = MapExporter(grid, os.path.join(tmp, "out"), interval_s=0.02, sequence=True, tile_size=8)
+        exporter.start()
+        deadline = time.monotonic() + 2.0
+        while exporter.frames_written == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        time.sleep(0.1)
+        assert exporter.frames_written == 1  # mappa invariata: nessun nuovo file
+
+        grid.set_cell(1, 1, CellState.WALL)
+        exporter.stop()                       # export finale con la modifica
+        files = sorted(os.listdir(exporter.directory))
+        assert files == ["map.png", "map_00001.png", "map_00002.png"]
+        final = read_png(exporter.latest_path)
+        assert np.array_equal(final, raster.render(grid))
+        assert not np.array_equal(final, image)
+        print(f"Export {final.shape[1]}x{final.shape[0]} in {exporter.last_export_ms:.1f} ms")
+
+
+def test_ui_full_redraw_uses_raster():
+    grid = GridMap(max_size=50, storage="dense")
+    grid.set_cell(-2, -1, CellState.START_POINT)
+    grid.set_cell(3, 2, CellState.LETTER_H)
+    grid.set_walls(0, 0, WALL_N)
+    ui = MazeMapperUI(grid, InferenceThread(VisionSystem("", ""), grid, LatestFrameSlot()))
+    ui._render()
+
+    surface = pygame.surfarray.array3d(ui.grid_surface).transpose(1, 0, 2)
+    h, w = surface.shape[:2]
+    robot = (0, 0, CONFIG["COLORS"]["ROBOT"])
+    expected = ui._rasterizer.render(grid, bounds=(-2, 40, -1, 40), markers=[robot])[:h, :w]
+    assert np.array_equal(surface, expected)
+
+
+def test_raster_speed():
+    grid = GridMap(max_size=500, storage="dense")
+    maze = generate_maze(200, seed=1)
+    for y in range(maze.y0, maze.y0 + maze.height):
+        for x in range(maze.x0, maze.x0 + maze.width):
+            grid.set_cell(x, y, maze.tile_at(x, y))
+            grid.set_walls(x, y, maze.walls_at(x, y))
+    raster = MapRasterizer(4)
+    start = time.perf_counter()
+    image = raster.render(grid)
+    elapsed = (time.perf_counter() - start) * 1000.0
+    print(f"Raster {image.shape[1]}x{image.shape[0]}: {elapsed:.1f} ms")
+    assert elapsed < 1000
+
+
+if __name__ == "__main__":
+    test_lut_walls_and_markers()
+    test_png_roundtrip_and_exporter()
+    test_ui_full_redraw_uses_raster()
+    test_raster_speed()
+    print("PASSED")
@@ -0,0 +1,197 @@
+import http.client
+import json
+import random
+import time
+
+import numpy as np
+
+from Mapping import GridMap, CellState, WALL_E
+from map_server import MapServer, encode_rle, decode_rle, _Client
+
+
+class StreamReader:
+    """Client SSE minimale sopra http.client."""
+
+    def __init__(self, port):
+        self.conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+        self.conn.request("GET", "/map/stream")
+        self.response = self.conn.getresponse()
+        assert self.response.getheader("Content-Type") == "text/event-stream"
+
+    def next_event(self):
+        event = {}
+        while True:
+            line = self.response.fp.readline().decode().rstrip("\n")
+            if not line:
+                if "data" in event:
+                    return event["event"], json.loads(event["data"])
+                continue
+            if line.startswith(":"):
+                continue
+            key, _, value = line.partition(": ")
+            event[key] = value
+
+    def close(self):
+        self.conn.close()
+
+
+class ClientMap:
+    """Ricostruzione della mappa lato client, come fa la dashboard."""
+
+    def __init__(self):
+        self.cells = {}
+        self.walls = {}
+        self.version = -1
+
+    def apply(self, message):
+        if message["type"] == "full":
+            self.cells, self.walls = {}, {}
+            values = decode_rle(message["cells"]).reshape(message["height"], message["width"])
+            for (row, col), value in np.ndenumerate(values):
+                if value:
+                    self.cells[(message["x0"] + col, message["y0"] + row)] = int(value)
+        else:
+            c = message["cells"]
+            for x, y, value in zip(c[0::3], c[1::3], c[2::3]):
+                if value:
+                    self.cells[(x, y)] = value
+                else:
+                    self.cells.pop((x, y), None)
+        w = message["walls"]
+        for x, y, mask in zip(w[0::3], w[1::3], w[2::3]):
+            if mask:
+                self.walls[(x, y)] = mask
+            else:
+                self.walls.pop((x, y), None)
+        self.version = message["version"]
+
+
+def server_map(grid):
+    snap = grid.snapshot()
+    return {xy: state.value for xy, state in snap.cells.items()}, snap.walls
+
+
+def wait_for(reader, client_map, version):
+    while client_map.version < version:
+        _, message = reader.next_event()
+        client_map.apply(message)
+
+
+def test_rle_roundtrip():
+    rnd = np.random.default_rng(0)
+    values = rnd.choice([0, 0, 0, 1, 2], size=1000).astype(np.int8)
+    rle = encode_rle(values)
+    assert np.array_equal(decode_rle(rle), values)
+    assert sum(rle[1::2]) == 1000 and len(rle) < 2 * 1000
+    assert encode_rle(np.zeros(0, dtype=np.int8)) == []
+
+
+def test_stream_full_then_deltas():
+    grid = GridMap(max_size=20, storage="dense")
+    for x in range(-5, 6):
+        grid.set_cell(x, 0, CellState.FLOOR)
+    grid.set_wall(0, 0, WALL_E)
+
+    server = MapServer(grid, host="127.0.0.1", port=0, poll_interval_s=0.01)
+    server.start()
+    try:
+        reader = StreamReader(server.port)
+        client_map = ClientMap()
+        event, message = reader.next_event()
+        assert event == "full"
+        client_map.apply(message)
+        assert (client_map.cells, client_map.walls) == server_map(grid)
+
+        rnd = random.Random(4)
+        states = (CellState.FLOOR, CellState.WALL, CellState.VICTIM_FOUND, CellState.UNKNOWN)
+        for _ in range(20):
+            for _ in range(rnd.randint(1, 10)):
+                x, y = rnd.randint(-20, 20), rnd.randint(-20, 20)
+                grid.set_cell(x, y, rnd.choice(states))
+                if rnd.random() < 0.3:
+                    grid.set_wall(x, y, WALL_E, rnd.random() < 0.7)
+            wait_for(reader, client_map, grid.version)
+            assert (client_map.cells, client_map.walls) == server_map(grid)
+
+        # clear(): la GridMap richiede un resync e il server invia un nuovo full
+        grid.clear()
+        grid.set_cell(2, 2, CellState.START_POINT)
+        wait_for(reader, client_map, grid.version)
+        assert client_map.cells == {(2, 2): CellState.START_POINT.value} and client_map.walls == {}
+        reader.close()
+    finally:
+        server.stop()
+
+
+def test_polling_endpoint():
+    grid = GridMap(max_size=10)
+    grid.set_cell(1, 1, CellState.FLOOR)
+    server = MapServer(grid, host="127.0.0.1", port=0)
+    server.start()
+    try:
+        conn = http.client.HTTPConnection("127.0.0.1", server.port, timeout=5)
+        conn.request("GET", "/map")
+        response = conn.getresponse()
+        assert response.getheader("Access-Control-Allow-Origin") == "*"
+        full = json.loads(response.read())
+        assert full["type"] == "full" and full["cells"] == [CellState.FLOOR.value, 1]
+
+        grid.set_cell(2, 1, CellState.WALL)
+        conn.request("GET", f"/map?since={full['version']}")
+        delta = json.loads(conn.getresponse().read())
+        assert delta == {"type": "delta", "version": grid.version,
+                         "cells": [2, 1, CellState.WALL.value], "walls": []}
+
+        conn.request("GET", "/map?since=abc")
+        assert conn.getresponse().status == 400
+        conn.close()
+    finally:
+        server.stop()
+
+
+def test_slow_client_is_dropped():
+    grid = GridMap(max_size=10)
+    server = MapServer(grid, host="127.0.0.1", port=0, max_buffer=4)
+    try:
+        slow = _Client(("10.0.0.1", 0), server.max_buffer)
+        fast = _Client(("10.0.0.2", 0), 1000)
+        server._clients += [slow, fast]
+        for i in range(10):
+            grid.set_cell(i, 0, CellState.FLOOR)
+            assert server.poll()
+        assert not server.poll()  # nessuna modifica: nessun messaggio
+        assert slow.dropped and slow.buffer.qsize() == 4
+        assert not fast.dropped and fast.buffer.qsize() == 10
+        assert server.clients_dropped == 1
+    finally:
+        server.httpd.server_close()
+
+
+def test_many_clients_share_one_encoding():
+    grid = GridMap(max_size=50, storage="dense")
+    server = MapServer(grid, host="127.0.0.1", port=0, poll_interval_s=0.01)
+    server.start()
+    try:
+        readers = [StreamReader(server.port) for _ in range(8)]
+        maps = [ClientMap() for _ in readers]
+        rnd = random.Random(9)
+        start = time.perf_counter()
+        for _ in range(2000):
+            grid.set_cell(rnd.randint(-50, 50), rnd.randint(-50, 50), CellState.FLOOR)
+        for reader, client_map in zip(readers, maps):
+            wait_for(reader, client_map, grid.version)
+            assert client_map.cells == server_map(grid)[0]
+            reader.close()
+        print(f"8 client aggiornati su {len(maps[0].cells)} celle in "
+              f"{(time.perf_counter() - start) * 1000:.1f} ms, {server.messages_sent} eventi inviati")
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    test_rle_roundtrip()
+    test_stream_full_then_deltas()
+    test_polling_endpoint()
+    test_slow_client_is_dropped()
+    test_many_clients_share_one_encoding()
+    print("PASSED")
@@ -0,0 +1,207 @@
+import os
+import random
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+
+from Mapping import GridMap, CellState, MazeMapperUI, MapViewport, InferenceThread, VisionSystem, LatestFrameSlot
+from maze_sim import generate_maze, VirtualRobot
+
+
+def test_stats_follow_state_transitions():
+    for storage in ("dict", "dense"):
+        grid = GridMap(max_size=50, storage=storage)
+        grid.set_cell(0, 0, CellState.WALL)
+        grid.set_cell(0, 0, CellState.WALL)      # ri-osservazione: non conta due volte
+        grid.set_cell(1, 0, CellState.VICTIM_FOUND)
+        grid.set_cell(2, 0, CellState.LETTER_X)
+        grid.set_cell(0, 0, CellState.FLOOR)     # muro diventato pavimento
+
+        stats = grid.get_stats()
+        print(f"{storage}: {stats}")
+        assert stats == {"total_cells": 3, "victims_found": 1, "letters_found": 1, "walls_detected": 0}
+
+        grid.clear()
+        assert grid.get_stats()["total_cells"] == 0
+        assert grid.get_bounds() == (0, 0, 0, 0)
+
+
+def test_dense_matches_dict():
+    random.seed(42)
+    dict_grid = GridMap(max_size=50, storage="dict")
+    dense_grid = GridMap(max_size=50, storage="dense")
+    states = list(CellState)
+
+    for _ in range(3000):
+        x, y = random.randint(-55, 55), random.randint(-55, 55)
+        state = random.choice(states)
+        dict_grid.set_cell(x, y, state)
+        dense_grid.set_cell(x, y, state)
+
+    assert dense_grid.get_all_cells() == dict_grid.get_all_cells()
+    assert dense_grid.get_stats() == dict_grid.get_stats()
+    assert dense_grid.get_bounds() == dict_grid.get_bounds()
+    assert dense_grid.get_cell(-50, 50) == dict_grid.get_cell(-50, 50)
+    assert dense_grid.get_cell(51, 0) == CellState.UNKNOWN  # fuori da max_size
+
+
+def test_dense_growth_keeps_cells():
+    grid = GridMap(max_size=1000, storage="dense")
+    grid.set_cell(0, 0, CellState.START_POINT)
+    grid.set_cell(-300, 5, CellState.WALL)
+    grid.set_cell(700, -900, CellState.VICTIM_FOUND)
+
+    assert grid.get_cell(0, 0) == CellState.START_POINT
+    assert grid.get_cell(-300, 5) == CellState.WALL
+    assert grid.get_cell(700, -900) == CellState.VICTIM_FOUND
+    assert grid.get_bounds() == (-300, 700, -900, 5)
+    assert len(grid.get_all_cells()) == 3
+
+
+def test_changes_since_journal():
+    grid = GridMap(max_size=50, storage="dense", journal_size=8)
+    grid.set_cell(0, 0, CellState.FLOOR)
+    grid.set_cell(1, 0, CellState.WALL)
+    v = grid.version
+
+    grid.set_cell(2, 0, CellState.FLOOR)
+    grid.set_cell(1, 0, CellState.FLOOR)
+    grid.set_cell(1, 0, CellState.FLOOR)  # nessun cambiamento, nessuna versione
+    changes = grid.changes_since(v)
+    assert not changes.full_resync
+    assert changes.version == v + 2 == grid.version
+    assert changes.cells == {(2, 0): CellState.FLOOR, (1, 0): CellState.FLOOR}
+    assert grid.changes_since(grid.version).cells == {}
+
+    # Journal sovrascritto: resync completo
+    for i in range(20):
+        grid.set_cell(i, 5, CellState.WALL)
+    changes = grid.changes_since(v)
+    assert changes.full_resync
+    assert changes.cells == grid.get_all_cells()
+
+    # Dopo clear() chi era indietro deve risincronizzarsi
+    current = grid.version
+    grid.clear()
+    changes = grid.changes_since(current)
+    assert changes.full_resync and changes.cells == {}
+
+
+def test_incremental_render_matches_full_redraw():
+    random.seed(7)
+    grid = GridMap(max_size=50, storage="dense")
+    inference = InferenceThread(VisionSystem("", ""), grid, LatestFrameSlot())
+    ui = MazeMapperUI(grid, inference)
+    ui._render()
+
+    for _ in range(150):
+        for _ in range(3):
+            grid.set_cell(random.randint(-4, 12), random.randint(-3, 9), random.choice(list(CellState)))
+        ui._render()
+
+    # Una UI nuova disegna tutto da zero: lo schermo deve coincidere
+    fresh = MazeMapperUI(grid, inference)
+    fresh._render()
+    incremental = pygame.surfarray.array3d(ui.screen)
+    full = pygame.surfarray.array3d(fresh.screen)
+    assert (incremental == full).all()
+
+    # Senza modifiche non c'è nulla da ridisegnare nella griglia
+    assert ui._render_grid() == []
+
+
+def test_viewport_zoom_pan_follow():
+    view = MapViewport(400, 300, tile_size=40, zoom_levels=(10, 20, 40, 80), lod_tile_size=20)
+    view.anchor(-3, 2)
+    assert view.origin == (-120, 80) and view.visible_cells() == (-3, 6, 2, 9)
+
+    # Lo zoom tiene fermo il punto sotto il cursore
+    before = ((view.origin[0] + 100) / view.tile_size, (view.origin[1] + 60) / view.tile_size)
+    assert view.zoom(-2, (100, 60)) and view.tile_size == 10 and not view.detailed
+    assert ((view.origin[0] + 100) / 10, (view.origin[1] + 60) / 10) == before
+    assert not view.zoom(-1)  # già al minimo
+
+    view.zoom(2)
+    ox, oy = view.origin
+    view.pan(25, -10)                        # contenuto trascinato a destra e in alto
+    assert view.origin == (ox - 25, oy + 10)
+
+    # Inseguimento: fermo finché il robot resta nella zona centrale
+    view.origin = (0, 0)
+    view.follow(4, 3, margin=0.25)
+    assert view.origin == (0, 0)
+    view.follow(7, 3, margin=0.25)           # bordo destro della cella oltre 300 px
+    assert view.cell_rect(7, 3).right == 300
+    view.follow(100, 100, margin=0.25)       # fuori vista: centrata
+    assert view.cell_rect(100, 100).center == (200, 150)
+
+
+def _ui_with_view(grid, inference, like):
+    """UI nuova con la stessa vista di `like` (ridisegno completo)."""
+    ui = MazeMapperUI(grid, inference)
+    ui._view_mode = "free"
+    ui._viewport.tile_size = like._viewport.tile_size
+    ui._viewport.origin = like._viewport.origin
+    ui._set_tile_size()
+    ui._render()
+    return ui
+
+
+def test_viewport_incremental_matches_full_redraw_on_large_map():
+    maze = generate_maze(150, seed=5, loops=0.1, victims=0.05, letters=0.05)
+    grid = GridMap(max_size=maze.max_size, storage="dense")
+    robot = VirtualRobot(maze, grid, view_range=3)
+    inference = InferenceThread(VisionSystem("", ""), grid, LatestFrameSlot())
+    ui = MazeMapperUI(grid, inference)
+    ui._view_mode = "follow"
+    ui._render()
+
+    for zoom in (0, -3, 2, -6, 5):
+        ui._zoom(zoom)
+        for _ in range(40):
+            robot.step()
+            ui._render()
+        full = _ui_with_view(grid, inference, ui)
+        assert (pygame.surfarray.array3d(ui.grid_surface) == pygame.surfarray.array3d(full.grid_surface)).all()
+        assert ui._viewport.cell_rect(*robot.position).colliderect(ui.grid_surface.get_rect())
+
+    # Pan a mano: la vista smette di seguire il robot
+    ui._pan(-37, 12)
+    robot.step()
+    ui._render()
+    assert ui._view_mode == "free"
+    full = _ui_with_view(grid, inference, ui)
+    assert (pygame.surfarray.array3d(ui.grid_surface) == pygame.surfarray.array3d(full.grid_surface)).all()
+
+
+def test_full_redraw_cost_bounded_by_view():
+    timings = {}
+    for side in (40, 300):
+        maze = generate_maze(side, seed=1)
+        grid = GridMap(max_size=maze.max_size, storage="dense")
+        for y in range(maze.y0, maze.y0 + maze.height):
+            for x in range(maze.x0, maze.x0 + maze.width):
+                grid.set_cell(x, y, maze.tile_at(x, y))
+        inference = InferenceThread(VisionSystem("", ""), grid, LatestFrameSlot())
+        ui = MazeMapperUI(grid, inference)
+        ui._render()
+        start = time.perf_counter()
+        for _ in range(10):
+            ui._redraw_grid_surface()
+        timings[side] = (time.perf_counter() - start) * 100.0
+    print(f"Ridisegno completo: 40x40 {timings[40]:.2f} ms, 300x300 {timings[300]:.2f} ms")
+    assert timings[300] < 3 * timings[40] + 5.0
+
+
+if __name__ == "__main__":
+    test_stats_follow_state_transitions()
+    test_dense_matches_dict()
+    test_dense_growth_keeps_cells()
+    test_changes_since_journal()
+    test_incremental_render_matches_full_redraw()
+    test_viewport_zoom_pan_follow()
+    test_viewport_incremental_matches_full_redraw_on_large_map()
+    test_full_redraw_cost_bounded_by_view()
+    print("PASSED")
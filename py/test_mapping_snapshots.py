@@ -0,0 +1,111 @@
+import random
+import threading
+import time
+
+from Mapping import GridMap, CellState
+
+WRITERS = 4
+WRITES_PER_WRITER = 4000
+
+
+def legacy_read(grid):
+    """Lettura come faceva la UI prima degli snapshot: copia completa sotto il lock."""
+    with grid.lock:
+        cells = grid._cells.to_dict()
+        bounds = grid._bounds
+        stats = dict(grid.stats)
+    return cells, bounds, stats
+
+
+def snapshot_read(grid):
+    snap = grid.snapshot()
+    return snap.cells, snap.bounds, snap.stats
+
+
+def run_stress(storage, reader, side=60):
+    grid = GridMap(max_size=side, storage=storage)
+    # Mappa già popolata, come a metà gara
+    for y in range(-side, side + 1, 2):
+        for x in range(-side, side + 1):
+            grid.set_cell(x, y, CellState.FLOOR)
+
+    stop = threading.Event()
+    latencies = [[] for _ in range(WRITERS)]
+    errors = []
+    reads = [0]
+
+    def writer(idx):
+        rnd = random.Random(idx)
+        states = [CellState.FLOOR, CellState.WALL, CellState.VICTIM_FOUND, CellState.LETTER_Y]
+        out = latencies[idx]
+        for _ in range(WRITES_PER_WRITER):
+            x, y = rnd.randint(-side, side), rnd.randint(-side, side)
+            start = time.perf_counter()
+            grid.set_cell(x, y, rnd.choice(states))
+            out.append(time.perf_counter() - start)
+
+    def reader_loop():
+        while not stop.is_set():
+            cells, bounds, stats = reader(grid)
+            reads[0] += 1
+            if stats["total_cells"] != len(cells):
+                errors.append(f"stats incoerenti: {stats['total_cells']} != {len(cells)}")
+            min_x, max_x, min_y, max_y = bounds
+            if cells and not all(min_x <= x <= max_x and min_y <= y <= max_y for x, y in cells):
+                errors.append("cella fuori dai bounds dello snapshot")
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(WRITERS)]
+    read_thread = threading.Thread(target=reader_loop)
+    read_thread.start()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    stop.set()
+    read_thread.join()
+
+    samples = sorted(lat for per_writer in latencies for lat in per_writer)
+    p50 = samples[len(samples) // 2] * 1e6
+    p99 = samples[int(len(samples) * 0.99)] * 1e6
+    worst = samples[-1] * 1e6
+    return p50, p99, worst, reads[0], errors
+
+
+def test_snapshot_readers_do_not_block_writers():
+    for storage in ("dict", "dense"):
+        before = run_stress(storage, legacy_read)
+        after = run_stress(storage, snapshot_read)
+        for label, (p50, p99, worst, reads, _) in (("lock+copia", before), ("snapshot", after)):
+            print(f"[{storage:5}] {label:10} writer p50 {p50:7.1f}us  p99 {p99:8.1f}us  "
+                  f"max {worst:9.1f}us  letture {reads}")
+        assert not after[4], after[4][:3]
+        assert not before[4], before[4][:3]
+
+
+def test_snapshot_is_immutable_and_cached():
+    grid = GridMap(max_size=10, storage="dense")
+    grid.set_cell(1, 1, CellState.WALL)
+    snap = grid.snapshot()
+    assert grid.snapshot() is snap, "Senza modifiche si riusa lo stesso snapshot"
+
+    grid.set_cell(1, 1, CellState.FLOOR)
+    grid.set_cell(-9, 9, CellState.VICTIM_FOUND)  # forza la crescita dell'array
+    assert snap.get_cell(1, 1) == CellState.WALL
+    assert dict(snap.cells) == {(1, 1): CellState.WALL}
+
+    new_snap = grid.snapshot()
+    assert new_snap is not snap and new_snap.version == grid.version
+    assert new_snap.get_cell(-9, 9) == CellState.VICTIM_FOUND
+    assert new_snap.stats["victims_found"] == 1
+
+    try:
+        new_snap.cells[(0, 0)] = CellState.WALL
+        raise AssertionError("Lo snapshot deve essere in sola lettura")
+    except TypeError:
+        pass
+
+
+if __name__ == "__main__":
+    test_snapshot_is_immutable_and_cached()
+    test_snapshot_readers_do_not_block_writers()
+    print("PASSED")
@@ -0,0 +1,113 @@
+import time
+from collections import deque
+
+import numpy as np
+
+from Mapping import GridMap, CellState, WALL_SIDES, WALL_OFFSETS, OPPOSITE_WALL
+from maze_sim import generate_maze, VirtualRobot, MazeSimulator
+
+
+def open_edges(maze):
+    """Passaggi tra celle adiacenti (contati una volta)."""
+    edges = 0
+    for y in range(maze.y0, maze.y0 + maze.height):
+        for x in range(maze.x0, maze.x0 + maze.width):
+            for side in WALL_SIDES:
+                dx, dy = WALL_OFFSETS[side]
+                if maze.contains(x + dx, y + dy):
+                    assert bool(maze.walls_at(x, y) & side) == bool(maze.walls_at(x + dx, y + dy) & OPPOSITE_WALL[side])
+                    if not maze.walls_at(x, y) & side:
+                        edges += 1
+                elif not maze.walls_at(x, y) & side:
+                    raise AssertionError("Bordo esterno aperto")
+    return edges // 2
+
+
+def reachable(maze):
+    seen = {(0, 0)}
+    queue = deque([(0, 0)])
+    while queue:
+        x, y = queue.popleft()
+        for side in WALL_SIDES:
+            dx, dy = WALL_OFFSETS[side]
+            n = (x + dx, y + dy)
+            if not maze.walls_at(x, y) & side and n not in seen:
+                seen.add(n)
+                queue.append(n)
+    return len(seen)
+
+
+def test_generation_is_deterministic_and_valid():
+    a = generate_maze(25, 15, seed=4)
+    b = generate_maze(25, 15, seed=4)
+    assert np.array_equal(a.walls, b.walls) and np.array_equal(a.tiles, b.tiles)
+    assert not np.array_equal(a.walls, generate_maze(25, 15, seed=5).walls)
+    assert a.tile_at(0, 0) == CellState.START_POINT and a.max_size == 12
+
+    # Perfetto: albero ricoprente (connesso, celle - 1 passaggi)
+    cells = a.width * a.height
+    assert reachable(a) == cells and open_edges(a) == cells - 1
+
+    # Con anelli: più passaggi, bordo e muri condivisi sempre coerenti
+    loopy = generate_maze(25, 15, seed=4, loops=0.3)
+    assert reachable(loopy) == cells and open_edges(loopy) > cells - 1
+
+    tiles = generate_maze(60, seed=1, victims=0.05, letters=0.05).tiles
+    assert (tiles == CellState.VICTIM_FOUND.value).sum() > 0
+    assert all((tiles == s.value).sum() > 0 for s in (CellState.LETTER_X, CellState.LETTER_Y, CellState.LETTER_H))
+
+
+def test_robot_explores_whole_maze_and_returns_home():
+    for loops, view_range in ((0.0, 1), (0.2, 3)):
+        maze = generate_maze(12, seed=7, loops=loops)
+        grid = GridMap(max_size=maze.max_size, storage="dense")
+        robot = VirtualRobot(maze, grid, view_range=view_range)
+        while robot.step():
+            assert robot.steps < 5000
+        assert robot.position == (0, 0)
+
+        # La mappa costruita coincide con il labirinto
+        for y in range(maze.y0, maze.y0 + maze.height):
+            for x in range(maze.x0, maze.x0 + maze.width):
+                assert grid.get_cell(x, y) == maze.tile_at(x, y)
+                assert grid.get_walls(x, y) == maze.walls_at(x, y)
+        print(f"loops={loops} view_range={view_range}: {robot.stats()}")
+
+
+def test_noisy_walls_still_terminate():
+    for size, seed in ((10, 3), (10, 6), (15, 2), (20, 22)):
+        maze = generate_maze(size, seed=seed, loops=0.1)
+        grid = GridMap(max_size=maze.max_size, storage="dense")
+        robot = VirtualRobot(maze, grid, wall_noise=0.05, seed=seed)
+        while robot.step():
+            assert robot.steps < 20000
+        coverage = grid.get_stats()["total_cells"] / (size * size)
+        print(f"{size}x{size} seed {seed}: copertura {coverage:.0%}, {robot.stats()}")
+        assert robot.done and robot.position == (0, 0)
+        assert coverage == 1.0   # i muri fantasma vengono riletti prima di chiudere
+
+
+def test_unthrottled_simulator_thread():
+    grid = GridMap(max_size=20, storage="dense")
+    sim = MazeSimulator(grid, size=30, seed=2, rate_hz=None)
+    start = time.perf_counter()
+    sim.start()
+    sim.join(timeout=30)
+    elapsed = time.perf_counter() - start
+    assert not sim.is_alive() and sim.robot.done
+    assert grid.get_stats()["total_cells"] == 30 * 30
+    print(f"30x30 esplorato in {elapsed * 1000:.0f} ms ({sim.robot.steps} passi)")
+
+    try:
+        MazeSimulator(GridMap(max_size=5), size=20)
+        raise AssertionError("Labirinto più grande della mappa accettato")
+    except ValueError:
+        pass
+
+
+if __name__ == "__main__":
+    test_generation_is_deterministic_and_valid()
+    test_robot_explores_whole_maze_and_returns_home()
+    test_noisy_walls_still_terminate()
+    test_unthrottled_simulator_thread()
+    print("PASSED")
@@ -0,0 +1,126 @@
+import time
+
+import cv2
+import numpy as np
+
+from detector_registry import DetectorRegistry, DetectorScheduler
+from enhanced_cognitive_target import EnhancedCognitiveTarget
+from floor_tile import FloorTileDetector, TileColor
+from photometric import PhotometricNormalizer
+from temporal_stats import TemporalStats
+from test_enhanced_cognitive_target import create_mock_target
+
+
+def arena_frame():
+    """Pareti bianche, piastrella blu in basso."""
+    frame = np.full((480, 640, 3), 220, dtype=np.uint8)
+    frame[360:] = (200, 40, 0)
+    return frame
+
+
+def test_low_light_classification_is_stable():
+    normalizer = PhotometricNormalizer()
+    for light in (1.0, 0.5, 0.3):
+        frame = (arena_frame() * light).astype(np.uint8)
+        raw_tile = FloorTileDetector(history_size=1).process_frame(frame.copy())[0]
+        normalizer.process(frame)
+        tile = FloorTileDetector(history_size=1).process_frame(frame)[0]
+        print(f"Luce {light:.1f}: grezzo {raw_tile.name}, normalizzato {tile.name} (guadagno {normalizer.gain:.2f})")
+        assert tile == TileColor.BLUE
+        # Il bianco torna a target_high
+        assert abs(int(frame[0, 0, 0]) - 240) <= 3
+
+
+def test_estimate_cadence_and_scene_change():
+    normalizer = PhotometricNormalizer(update_every=10)
+    frame = arena_frame()
+    updates = [normalizer.update(frame) for _ in range(25)]
+    assert updates == [True] + [False] * 9 + [True] + [False] * 9 + [True] + [False] * 4
+
+    dark = (frame * 0.5).astype(np.uint8)      # luce dimezzata: nuova stima subito
+    assert normalizer.update(dark) and normalizer.estimates == 4
+    assert not normalizer.update(dark)
+
+
+def test_white_balance_from_neutral_pixels():
+    normalizer = PhotometricNormalizer()
+    warm = np.full((240, 320, 3), 150, dtype=np.float32) * np.float32([0.8, 1.0, 1.2])
+    warm = warm.astype(np.uint8)               # luce calda su pareti grigie (BGR)
+    warm[180:] = (30, 30, 180)                 # piastrella rossa
+    normalizer.process(warm)
+    b, g, r = warm[0, 0].astype(int)
+    assert max(b, g, r) - min(b, g, r) <= 4    # le pareti tornano neutre
+    assert warm[200, 0, 2] > 2 * warm[200, 0, 0]  # il rosso resta rosso
+
+    # Piastrella blu che riempie il frame: nessun pixel neutro, bilanciamento invariato
+    blue = np.zeros((240, 320, 3), dtype=np.uint8)
+    blue[:] = (180, 60, 10)
+    wb = normalizer.white_balance.copy()
+    normalizer.estimate(blue)
+    assert np.array_equal(normalizer.white_balance, wb)
+
+
+def test_gain_is_capped():
+    normalizer = PhotometricNormalizer(max_gain=2.0)
+    frame = (arena_frame() * 0.3).astype(np.uint8)       # pareti a 66: servirebbe 240 / 66 = 3.6
+    normalizer.process(frame)
+    assert normalizer.gain == 2.0 and frame[0, 0, 0] == 132
+
+
+def test_black_tile_stays_black():
+    for value in (12, 20, 30, 45):
+        normalizer = PhotometricNormalizer(max_gain=4.0)
+        black = np.full((120, 160, 3), value, dtype=np.uint8)   # piastrella nera in primo piano
+        normalizer.process(black)
+        assert normalizer.gain == 1.0 and black.max() == value
+        assert FloorTileDetector(history_size=1).process_frame(black)[0] == TileColor.BLACK
+
+
+def test_scheduler_normalizes_once_in_place():
+    normalizer = PhotometricNormalizer()
+    stats = TemporalStats(block=8, window=4)
+    registry = DetectorRegistry()
+    seen = []
+    registry.register("a", lambda planes: seen.append(planes.bgr[0, 0, 1]))
+    registry.register("b", lambda planes: seen.append(planes.bgr[0, 0, 1]), priority=1)
+    scheduler = DetectorScheduler(registry, budget_ms=1000.0, temporal=stats, normalizer=normalizer)
+
+    frame = (arena_frame() * 0.3).astype(np.uint8)
+    raw_value = frame[0, 0, 1]
+    scheduler.run_frame(frame, now=0.0)
+    assert seen == [frame[0, 0, 1]] * 2 and frame[0, 0, 1] > 2 * raw_value
+    assert stats.mean[0, 0] == raw_value        # le statistiche temporali vedono il frame grezzo
+
+
+def test_enhanced_target_low_light_without_clahe():
+    img = create_mock_target(["VERDE", "GIALLO", "GIALLO", "GIALLO", "GIALLO"], light_level=0.2)
+    PhotometricNormalizer().process(img)
+    detector = EnhancedCognitiveTarget(history_size=1, clahe=False)
+    assert detector.process_frame(img) == (1, "VICTIM_STOP_LED_1KIT")
+
+    # Costo: un cv2.LUT condiviso contro un CLAHE per detector
+    frame = create_mock_target(["VERDE"] * 5, light_level=0.2)
+    normalizer = PhotometricNormalizer()
+    normalizer.update(frame)
+    clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+    runs = 50
+    start = time.perf_counter()
+    for _ in range(runs):
+        normalizer.apply(frame, dst=frame)
+    lut_ms = (time.perf_counter() - start) * 1000.0 / runs
+    start = time.perf_counter()
+    for _ in range(runs):
+        clahe.apply(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+    clahe_ms = (time.perf_counter() - start) * 1000.0 / runs
+    print(f"LUT condivisa {lut_ms:.3f} ms/frame, CLAHE {clahe_ms:.3f} ms per detector")
+
+
+if __name__ == "__main__":
+    test_low_light_classification_is_stable()
+    test_estimate_cadence_and_scene_change()
+    test_white_balance_from_neutral_pixels()
+    test_gain_is_capped()
+    test_black_tile_stays_black()
+    test_scheduler_normalizes_once_in_place()
+    test_enhanced_target_low_light_without_clahe()
+    print("PASSED")
@@ -0,0 +1,172 @@
+import random
+import time
+from collections import deque
+
+from Mapping import GridMap, CellState, WALL_SIDES, WALL_OFFSETS, WALL_S, WALL_W
+from planner import ExplorationPlanner, INF
+
+
+def open_neighbours(grid, cell):
+    """Vicini non separati da un muro sul lato condiviso."""
+    x, y = cell
+    walls = grid.get_walls(x, y)
+    return [(x + WALL_OFFSETS[side][0], y + WALL_OFFSETS[side][1])
+            for side in WALL_SIDES if not walls & side]
+
+
+def bfs_distance(grid, start, goal_test):
+    """BFS di riferimento sulle celle note non-muro (4-connessa, rispetta i muri sui lati)."""
+    cells = grid.get_all_cells()
+    passable = lambda c: cells.get(c, CellState.UNKNOWN) not in (CellState.UNKNOWN, CellState.WALL)
+    if not passable(start):
+        return INF
+    seen = {start}
+    queue = deque([(start, 0)])
+    while queue:
+        (x, y), d = queue.popleft()
+        if goal_test((x, y), cells):
+            return d
+        for n in open_neighbours(grid, (x, y)):
+            if n not in seen and passable(n):
+                seen.add(n)
+                queue.append((n, d + 1))
+    return INF
+
+
+def is_frontier(grid):
+    m = grid.max_size
+
+    def test(cell, cells):
+        return any(cells.get(n, CellState.UNKNOWN) == CellState.UNKNOWN
+                   for n in open_neighbours(grid, cell)
+                   if abs(n[0]) <= m and abs(n[1]) <= m)
+    return test
+
+
+def check_path(grid, path, start):
+    assert path[0] == start
+    for (ax, ay), (bx, by) in zip(path, path[1:]):
+        assert abs(ax - bx) + abs(ay - by) == 1, "Passi non adiacenti"
+        assert grid.get_cell(bx, by) not in (CellState.UNKNOWN, CellState.WALL)
+
+
+def corridor_map():
+    # Corridoio noto da (0,0) a (5,0), con l'ignoto oltre (5,0) e un ramo in (2,1)
+    grid = GridMap(max_size=10)
+    grid.set_cell(0, 0, CellState.START_POINT)
+    for x in range(1, 6):
+        grid.set_cell(x, 0, CellState.FLOOR)
+    for x in range(-1, 7):
+        grid.set_cell(x, -1, CellState.WALL)
+        if x != 2:
+            grid.set_cell(x, 1, CellState.WALL)
+    grid.set_cell(-1, 0, CellState.WALL)
+    return grid
+
+
+def test_nearest_frontier_and_home():
+    grid = corridor_map()
+    planner = ExplorationPlanner(grid, position=(0, 0))
+    planner.update()
+    # (2,0) confina con (2,1) ignota: frontiera più vicina
+    assert planner.frontier_path() == [(0, 0), (1, 0), (2, 0)]
+
+    # Il ramo viene chiuso da un muro: la frontiera diventa (5,0)
+    grid.set_cell(2, 1, CellState.WALL)
+    planner.update(position=(1, 0))
+    path = planner.frontier_path()
+    assert path[0] == (1, 0) and path[-1] == (5, 0) and len(path) == 5
+    assert planner.home_path() == [(1, 0), (0, 0)]
+    assert planner.next_waypoint() == (2, 0)
+
+
+def test_incremental_matches_bfs_on_random_changes():
+    rnd = random.Random(7)
+    side = 12
+    grid = GridMap(max_size=side)
+    grid.set_cell(0, 0, CellState.START_POINT)
+    for y in range(-side, side + 1):
+        for x in range(-side, side + 1):
+            if (x, y) != (0, 0) and rnd.random() < 0.6:
+                grid.set_cell(x, y, CellState.WALL if rnd.random() < 0.25 else CellState.FLOOR)
+
+    planner = ExplorationPlanner(grid, position=(0, 0))
+    planner.update()
+    position = (0, 0)
+    frontier_test = is_frontier(grid)
+    home_test = lambda c, cells: c == (0, 0)
+    states = (CellState.FLOOR, CellState.FLOOR, CellState.WALL, CellState.UNKNOWN)
+
+    for step in range(300):
+        for _ in range(rnd.randint(1, 4)):
+            cell = (rnd.randint(-side, side), rnd.randint(-side, side))
+            if cell not in ((0, 0), position):
+                grid.set_cell(*cell, rnd.choice(states))
+        if rnd.random() < 0.5:
+            # Muro tra due celle (o rimozione)
+            cell = (rnd.randint(-side, side), rnd.randint(-side, side))
+            grid.set_wall(*cell, rnd.choice(WALL_SIDES), present=rnd.random() < 0.7)
+        path = planner.frontier_path()
+        if len(path) > 1:
+            position = path[1]
+        planner.update(position=position)
+
+        expected = bfs_distance(grid, position, frontier_test)
+        assert planner.frontier.distance() == expected, (step, planner.frontier.distance(), expected)
+        path = planner.frontier_path()
+        if expected != INF:
+            assert len(path) == expected + 1
+            check_path(grid, path, position)
+        assert planner.return_home.distance() == bfs_distance(grid, position, home_test)
+
+
+def test_walls_between_cells_block_path():
+    grid = corridor_map()
+    grid.set_wall(2, 0, WALL_S)  # chiude il ramo verso (2,1) senza una cella WALL
+    planner = ExplorationPlanner(grid, position=(0, 0))
+    planner.update()
+    assert planner.frontier_path()[-1] == (5, 0)
+
+    grid.set_wall(3, 0, WALL_W)  # lo stesso lato visto da (3,0): corridoio chiuso
+    planner.update()
+    assert planner.frontier_path() == []
+    assert planner.home_path() == [(0, 0)]
+
+
+def test_replan_time_on_competition_map():
+    rnd = random.Random(1)
+    side = 40  # 81x81 celle, ben oltre un campo di gara
+    grid = GridMap(max_size=side, storage="dense")
+    grid.set_cell(0, 0, CellState.START_POINT)
+    for y in range(-side, side + 1):
+        for x in range(-side, 10):
+            if (x, y) != (0, 0):
+                grid.set_cell(x, y, CellState.WALL if rnd.random() < 0.2 else CellState.FLOOR)
+
+    planner = ExplorationPlanner(grid, position=(0, 0))
+    initial = planner.update()
+    times = []
+    position = (0, 0)
+    for _ in range(200):
+        path = planner.frontier_path()
+        if len(path) > 1:
+            position = path[1]
+        # Il robot scopre la colonna davanti alla frontiera
+        x, y = path[-1] if path else position
+        grid.set_cell(x + 1, y, CellState.WALL if rnd.random() < 0.3 else CellState.FLOOR)
+        start = time.perf_counter()
+        planner.update(position=position)
+        times.append((time.perf_counter() - start) * 1000.0)
+
+    times.sort()
+    print(f"Piano iniziale {initial:.2f} ms, replan p50 {times[len(times) // 2]:.3f} ms "
+          f"p95 {times[int(len(times) * 0.95)]:.3f} ms")
+    assert times[len(times) // 2] < initial
+
+
+if __name__ == "__main__":
+    test_nearest_frontier_and_home()
+    test_incremental_matches_bfs_on_random_changes()
+    test_walls_between_cells_block_path()
+    test_replan_time_on_competition_map()
+    print("PASSED")
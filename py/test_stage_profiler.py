@@ -0,0 +1,59 @@
+import json
+import os
+import tempfile
+
+import cv2
+import numpy as np
+
+from cognitive_target import CognitiveTargetDetector
+from enhanced_cognitive_target import EnhancedCognitiveTarget
+from stage_profiler import StageProfiler, NULL_PROFILER
+
+
+def create_target():
+    """Synthetic yellow target on a light grey background."""
+    img = np.full((480, 640, 3), 200, dtype=np.uint8)
+    for r in [150, 120, 90, 60, 30]:
+        cv2.circle(img, (320, 240), r, (0, 255, 255), -1)
+    return img
+
+
+def test_stages_recorded():
+    profiler = StageProfiler(enabled=True)
+    detector = CognitiveTargetDetector(history_size=1, profiler=profiler)
+    enhanced = EnhancedCognitiveTarget(history_size=1, profiler=profiler)
+
+    for _ in range(3):
+        detector.process_frame(create_target())
+        enhanced.process_frame(create_target())
+
+    summary = profiler.summary()
+    print(f"Stages: {sorted(summary)}")
+    for stage in ["color_conversion", "blur", "hough", "ring_sampling", "debounce",
+                  "clahe", "threshold", "contours", "ellipse_fit"]:
+        assert stage in summary, f"Missing stage {stage}"
+        assert summary[stage]["count"] > 0
+        assert summary[stage]["p95_ms"] >= summary[stage]["p50_ms"] >= 0
+        assert sum(summary[stage]["bins"]) == summary[stage]["count"]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = profiler.dump_json(os.path.join(tmp, "profile.json"))
+        with open(path) as f:
+            data = json.load(f)
+        assert data["stages"]["hough"]["count"] == 3
+
+    hud = profiler.draw_hud(create_target())
+    assert hud.shape == (480, 640, 3)
+
+
+def test_disabled_profiler_records_nothing():
+    detector = CognitiveTargetDetector(history_size=1)
+    assert detector.profiler is NULL_PROFILER
+    detector.process_frame(create_target())
+    assert NULL_PROFILER.histograms == {}
+
+
+if __name__ == "__main__":
+    test_stages_recorded()
+    test_disabled_profiler_records_nothing()
+    print("PASSED")
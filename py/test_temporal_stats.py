@@ -0,0 +1,112 @@
+import time
+
+import numpy as np
+
+from detector_registry import DetectorRegistry, DetectorScheduler
+from floor_tile import FloorTileDetector, TileColor
+from temporal_stats import TemporalStats
+
+
+def test_matches_exponential_welford():
+    stats = TemporalStats(block=4, window=9)
+    rng = np.random.default_rng(0)
+    frames = rng.integers(0, 256, (40, 32, 48, 3), dtype=np.uint8)
+
+    # Riferimento in float64 sulla V media di ogni blocco 4x4
+    a = stats.alpha
+    mean = var = None
+    for frame in frames:
+        v = frame.reshape(8, 4, 12, 4, 3).mean(axis=(1, 3)).max(axis=2)
+        stats.update(frame)
+        if mean is None:
+            mean, var = v.copy(), np.zeros_like(v)
+        else:
+            d = v - mean
+            mean = mean + a * d
+            var = (1 - a) * (var + a * d * d)
+    assert stats.shape == (8, 12) and stats.ready
+    # INTER_AREA arrotonda la media di ogni canale prima del max
+    assert np.abs(stats.value - frames[-1].reshape(8, 4, 12, 4, 3).mean(axis=(1, 3)).round().max(axis=2)).max() <= 1
+    assert np.abs(stats.mean - mean).max() < 1.0
+    assert np.abs(stats.variance - var).max() / var.max() < 0.02
+
+
+def test_constant_cost_and_no_reallocation():
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    timings = {}
+    for window in (5, 500):
+        stats = TemporalStats(block=8, window=window)
+        stats.update(frame)
+        buffers = [id(stats.mean), id(stats.variance), id(stats.flicker)]
+        start = time.perf_counter()
+        for i in range(200):
+            frame[:] = i % 256
+            stats.update(frame)
+        timings[window] = (time.perf_counter() - start) * 1000.0 / 200
+        assert [id(stats.mean), id(stats.variance), id(stats.flicker)] == buffers
+        assert stats.mean.dtype == np.float32
+    print(f"Aggiornamento 80x60 blocchi: {timings[5]:.3f} ms (finestra 5), {timings[500]:.3f} ms (finestra 500)")
+    assert timings[500] < 5 * timings[5] + 0.5
+
+    stats.update(np.zeros((240, 320, 3), dtype=np.uint8))  # scala del governor: si riparte
+    assert stats.shape == (30, 40) and stats.frames == 1
+
+
+def test_flicker_marks_glints_only():
+    stats = TemporalStats(block=1, window=10)
+    frame = np.full((2, 2, 3), 100, dtype=np.uint8)
+    rng = np.random.default_rng(1)
+    for i in range(60):
+        frame[0, 0] = 100 + rng.integers(-2, 3)       # rumore del sensore
+        frame[0, 1] = 240 if i % 4 == 0 else 100      # riflesso intermittente
+        frame[1, 0] = 60 if i % 4 == 0 else 100       # ombra intermittente
+        stats.update(frame)
+    assert stats.flicker[0, 0] == 0 and stats.flicker[1, 1] == 0 and stats.flicker[1, 0] == 0
+    assert stats.flicker[0, 1] > 0.1
+    assert stats.std()[0, 1] > 20 and stats.std()[1, 1] == 0
+
+
+def test_scheduler_updates_every_frame():
+    stats = TemporalStats(block=8, window=4)
+    registry = DetectorRegistry()
+    seen = []
+    registry.register("slow", lambda planes: seen.append(planes.temporal.frames), rate_hz=10.0)
+    scheduler = DetectorScheduler(registry, budget_ms=1000.0, temporal=stats)
+    for i in range(30):
+        scheduler.run_frame(np.full((48, 64, 3), i, dtype=np.uint8), now=i / 30.0)
+    assert stats.frames == 30        # aggiornate anche nei frame senza detector
+    assert len(seen) == 10 and seen[0] == 1 and seen[-1] > 25
+
+
+def test_temporal_silver_check():
+    rng = np.random.default_rng(2)
+    frame = np.full((480, 640, 3), 230, dtype=np.uint8)
+
+    # Grigio con trama fissa: varia nello spazio ma non nel tempo -> non è argento
+    texture = rng.integers(110, 175, (120, 640, 1), dtype=np.uint8)
+    detector, stats = FloorTileDetector(history_size=1), TemporalStats(window=8)
+    frame[360:] = texture
+    assert detector.process_frame(frame)[0] == TileColor.SILVER   # solo spaziale
+    for _ in range(10):
+        stats.update(frame)
+        tile, _ = detector.process_frame(frame, stats)
+    assert tile == TileColor.NORMAL
+
+    # Grigio uniforme che luccica nel tempo -> argento, anche se ogni frame è piatto
+    detector, stats = FloorTileDetector(history_size=1), TemporalStats(window=8)
+    for i in range(12):
+        frame[360:] = 110 if i % 2 else 170
+        stats.update(frame)
+        tile, _ = detector.process_frame(frame, stats)
+        if i == 0:
+            assert tile == TileColor.NORMAL  # finestra non piena: controllo spaziale
+    assert tile == TileColor.SILVER
+
+
+if __name__ == "__main__":
+    test_matches_exponential_welford()
+    test_constant_cost_and_no_reallocation()
+    test_flicker_marks_glints_only()
+    test_scheduler_updates_every_frame()
+    test_temporal_silver_check()
+    print("PASSED")
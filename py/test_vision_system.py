@@ -0,0 +1,137 @@
+import os
+import tempfile
+
+import numpy as np
+
+from Mapping import VisionSystem, InferenceBackend
+
+LABELS = ["WALL", "FLOOR", "VICTIM"]
+
+
+class ColorBackend(InferenceBackend):
+    """Modello locale minimale: la classe è il canale RGB dominante (R=WALL, G=FLOOR, B=VICTIM)."""
+
+    def __init__(self, batching=True, size=16, quantized=False):
+        self.batching = batching
+        self.input_shape = (1, size, size, 3)
+        if quantized:
+            self.input_dtype = np.uint8
+            self.input_quantization = (1.0 / 127.5, 127)
+            self.output_quantization = (1.0 / 255.0, 0)
+        self.invocations = 0
+        self.loaded_threads = None
+
+    def load(self, model_path, num_threads):
+        self.loaded_threads = num_threads
+
+    def resize_batch(self, batch_size):
+        if not self.batching and batch_size != 1:
+            return False
+        self.input_shape = (batch_size, *self.input_shape[1:])
+        return True
+
+    def invoke(self, input_tensor):
+        self.invocations += 1
+        assert input_tensor.shape == self.input_shape
+        x = input_tensor.astype(np.float32)
+        if self.input_quantization[0]:
+            scale, zero_point = self.input_quantization
+            x = (x - zero_point) * scale
+        means = x.mean(axis=(1, 2))  # (batch, 3) in [-1, 1]
+        scores = np.exp(4.0 * means)
+        scores /= scores.sum(axis=1, keepdims=True)
+        if self.output_quantization[0]:
+            return np.round(scores / self.output_quantization[0]).astype(np.uint8)
+        return scores
+
+
+def make_vision(backend, top_k=3):
+    tmp = tempfile.mkdtemp()
+    labels_path = os.path.join(tmp, "labels.txt")
+    with open(labels_path, "w") as f:
+        # Indice iniziale opzionale, come nei labels.txt esportati da Teachable Machine
+        f.write("0 WALL\n1 FLOOR\n\nVICTIM\n")
+    vision = VisionSystem(os.path.join(tmp, "model.tflite"), labels_path,
+                          backend=backend, num_threads=2, top_k=top_k)
+    assert vision.load_model()
+    return vision
+
+
+def solid(bgr, shape=(120, 160)):
+    frame = np.zeros((*shape, 3), dtype=np.uint8)
+    frame[:] = bgr
+    return frame
+
+
+def test_labels_and_top_k():
+    backend = ColorBackend()
+    vision = make_vision(backend)
+    assert vision.labels == LABELS
+    assert backend.loaded_threads == 2
+
+    # Frame BGR rosso -> canale R dominante dopo la conversione in RGB
+    top = vision.predict_top_k(solid((0, 0, 255)))
+    assert [r.label for r in top][0] == "WALL"
+    assert len(top) == 3 and top[0].confidence >= top[1].confidence >= top[2].confidence
+    assert top[0].latency_ms > 0
+
+    result = vision.predict(solid((255, 0, 0)))
+    assert result.label == "VICTIM" and result.latency_ms == vision.last_latency_ms
+
+
+def test_preprocess_matches_reference():
+    vision = make_vision(ColorBackend(size=8))
+    frame = np.random.RandomState(0).randint(0, 256, (48, 64, 3), dtype=np.uint8)
+    out = np.empty((8, 8, 3), dtype=np.float32)
+    vision.preprocess(frame, out)
+
+    rows = ((np.arange(8) + 0.5) * 48 / 8).astype(int)
+    cols = ((np.arange(8) + 0.5) * 64 / 8).astype(int)
+    expected = frame[rows][:, cols][..., ::-1].astype(np.float32) / 127.5 - 1.0
+    assert np.allclose(out, expected, atol=1e-6)
+
+
+def test_batch_uses_one_invoke_when_supported():
+    crops = [solid((0, 0, 255)), solid((0, 255, 0), (30, 30)), solid((255, 0, 0), (64, 48))]
+
+    batched = ColorBackend(batching=True)
+    vision = make_vision(batched, top_k=1)
+    tensor_before = vision._input_tensor(3)
+    results = vision.predict_batch(crops)
+    assert [r[0].label for r in results] == ["WALL", "FLOOR", "VICTIM"]
+    assert batched.invocations == 1
+    assert vision._input_tensor(3) is tensor_before, "Il tensore di input deve essere riusato"
+
+    single = ColorBackend(batching=False)
+    vision = make_vision(single, top_k=1)
+    results = vision.predict_batch(crops)
+    assert [r[0].label for r in results] == ["WALL", "FLOOR", "VICTIM"]
+    assert single.invocations == 3
+    print(f"Latenza batch {vision.last_latency_ms:.2f} ms")
+
+
+def test_incomplete_backend_fails_at_construction():
+    class NoInvoke(InferenceBackend):
+        def load(self, model_path, num_threads):
+            pass
+
+    try:
+        NoInvoke()
+        raise AssertionError("Backend senza invoke() istanziato")
+    except TypeError:
+        pass
+
+
+def test_quantized_model():
+    vision = make_vision(ColorBackend(quantized=True))
+    top = vision.predict_top_k(solid((0, 255, 0)), 2)
+    assert top[0].label == "FLOOR" and 0.0 < top[0].confidence <= 1.0
+
+
+if __name__ == "__main__":
+    test_labels_and_top_k()
+    test_preprocess_matches_reference()
+    test_batch_uses_one_invoke_when_supported()
+    test_quantized_model()
+    test_incomplete_backend_fails_at_construction()
+    print("PASSED")
@@ -1,102 +1,370 @@
-import cv2
 import time
+
+# Riferimento per i tempi di avvio: il più presto possibile
+_PROCESS_START = time.perf_counter()
+
+import json
 import sys
 import os
-import serial
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 # Aggiungi la cartella py al path per gli import
 sys.path.append(os.path.join(os.path.dirname(__file__), 'py'))
 
-try:
-    from cognitive_target import CognitiveTargetDetector
-    from letterIdentifier import LetterDetector
-except ImportError as e:
-    print(f"Errore Import: {e}")
-    sys.exit(1)
+# Solo moduli leggeri qui: cv2, i detector, pytesseract e serial vengono
+# importati durante l'avvio, in parallelo all'apertura di camera e seriale
+from stage_profiler import StageProfiler, StartupProfile
 
 class ModuleWrapper:
-    def __init__(self, camera_index=0):
-        print(f"Inizializzazione Wrapper con Camera {camera_index}...")
-        self.cap = cv2.VideoCapture(camera_index)
-        
-        # Configurazione camera comune
-        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-        
-        # Inizializzazione moduli
-        self.cognitive_detector = CognitiveTargetDetector()
-        self.letter_detector = LetterDetector(size=200, velocita=6)
+    def __init__(self, camera_index=0, profile=False, profile_path="stage_profile.json",
+                 source=None, record_path=None, record_capacity=1800, cpu_budget_ms=33.0,
+                 prewarm=True, startup_log_path="startup_profile.jsonl",
+                 governor=True, target_fps=20.0, governor_log_path="governor.jsonl",
+                 ocr_budget_ms=250.0, debug_frames=False, color_profile_path=None, normalize=True):
+        self.startup = StartupProfile(_PROCESS_START)
+        self.startup_log_path = startup_log_path
+
+        # Registrazione opzionale della sessione per il replay offline
+        # (il file viene creato al primo frame, quando la risoluzione è nota)
+        self.record_path = record_path
+        self.record_capacity = record_capacity
+        self.recorder = None
+
+        # Buffer riciclati per i frame (creati al primo frame, quando la risoluzione è nota)
+        self.frame_pool = None
+        self.debug_frames = debug_frames
         
-        # Inizializzazione Serial per ESP32
-        try:
-            self.ser = serial.Serial('/dev/ttyUSB0', 115200, timeout=1)
-            print("Connessione Serial stabilita su /dev/ttyUSB0")
-        except Exception as e:
-            print(f"Avviso: Impossibile aprire la porta seriale: {e}")
-            self.ser = None
+        # Profiler per stage (disabilitato: costo quasi nullo)
+        self.profiler = StageProfiler(enabled=profile)
+        self.profile_path = profile_path
+        self.show_profile_hud = profile
+
+        # Camera e seriale si aprono in parallelo mentre si caricano i detector
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            camera_future = pool.submit(self._open_camera, camera_index, source)
+            serial_future = pool.submit(self._open_serial)
+
+            try:
+                with self.startup.step("import detector"):
+                    from cognitive_target import CognitiveTargetDetector
+                    from letterIdentifier import LetterDetector
+                    from floor_tile import FloorTileDetector
+                    from detector_registry import DetectorRegistry, DetectorScheduler
+                    from temporal_stats import TemporalStats
+                    from color_calibration import load_profile
+                    from photometric import PhotometricNormalizer
+            except ImportError as e:
+                print(f"Errore Import: {e}")
+                sys.exit(1)
+
+            # Profilo colori calibrato (LUT HSV in memory-map), condiviso dai detector
+            self.color_profile = None
+            if color_profile_path:
+                with self.startup.step("profilo colori"):
+                    self.color_profile = load_profile(color_profile_path)
+                print(f"Profilo colori: {self.color_profile.name} ({color_profile_path})")
+
+            # Inizializzazione moduli
+            with self.startup.step("init detector"):
+                self.cognitive_detector = CognitiveTargetDetector(profiler=self.profiler,
+                                                                  color_profile=self.color_profile)
+                # Con la normalizzazione condivisa il CLAHE per detector non serve
+                self.letter_detector = LetterDetector(size=200, velocita=6, profiler=self.profiler,
+                                                      clahe=not normalize)
+                self.floor_detector = FloorTileDetector(profiler=self.profiler,
+                                                        color_profile=self.color_profile)
+
+            self.cap = camera_future.result()
+            self.ser = serial_future.result()
 
         self.last_letter_time = 0
         self.last_circle_time = 0
         self.detection_cooldown = 2.0  # secondi tra notifiche dello stesso tipo
+        self.last_tile = None
+        self.last_tile_time = 0
+        self.tile_resend_s = 1.0  # la piastrella va all'ESP32 a ogni cambio e poi una volta al secondo
+
+        # Registro detector: frequenza, priorità e piani richiesti per ciascuno.
+        # Altri detector (es. EnhancedCognitiveTarget) si aggiungono con self.registry.register(...)
+        self.registry = DetectorRegistry()
+        self.registry.register(
+            "cognitive_target", lambda planes: self.cognitive_detector.process_frame(planes.bgr),
+            rate_hz=None, priority=0, on_result=self._on_circle_result,
+            prewarm=self.cognitive_detector.prewarm)
+        self.registry.register(
+            "floor_tile", lambda planes: self.floor_detector.process_frame(planes.bgr, planes.temporal),
+            rate_hz=None, priority=0, on_result=self._on_tile_result,
+            prewarm=self.floor_detector.prewarm)
+        self.registry.register(
+            "letters", lambda planes: self.letter_detector.process_frame(planes.bgr),
+            rate_hz=5.0, priority=1, on_result=self._on_letter_result,
+            prewarm=self.letter_detector.prewarm)
+        # Media/varianza temporale per blocco 8x8 (riflessi delle piastrelle argentate)
+        self.temporal_stats = TemporalStats(block=8, window=15)
+        # Guadagno e bilanciamento del bianco stimati ogni 30 frame (o al cambio scena),
+        # applicati in place con un solo cv2.LUT prima di tutti i detector
+        self.normalizer = PhotometricNormalizer(update_every=30) if normalize else None
+        self.scheduler = DetectorScheduler(self.registry, budget_ms=cpu_budget_ms, profiler=self.profiler,
+                                           temporal=self.temporal_stats, normalizer=self.normalizer)
+
+        # Pre-warm: primo OCR, primo HoughCircles, ecc. prima del loop
+        if prewarm:
+            with self.startup.step("pre-warm detector"):
+                for name, ms in self.scheduler.prewarm().items():
+                    print(f"Pre-warm {name}: {ms:.1f} ms")
+
+        self.startup.report()
+
+        # Governor termico/di carico: abbassa risoluzione, frequenza OCR e
+        # detector secondari quando il loop non regge, li ripristina col margine
+        self.processing_scale = 1.0
+        self.frame_times_ms = deque(maxlen=90)
+        self._detector_runs = {}
+        self.governor = None
+        if governor:
+            from governor import DegradationGovernor, SysfsThermalSource
+            self.governor = DegradationGovernor(
+                target_fps=target_fps, frame_budget_ms=cpu_budget_ms,
+                # ms di CPU al secondo concessi all'OCR, che gira su pochi frame
+                # e quindi sfugge al p95 del frame intero
+                detector_budgets={"letters": ocr_budget_ms},
+                thermal=SysfsThermalSource(), log_path=governor_log_path,
+                on_change=self._apply_degradation)
+            self._apply_degradation(self.governor.level)
         
         self.running = True
 
+    def _apply_degradation(self, level):
+        """Applica un livello del governor a scala di elaborazione e detector."""
+        self.processing_scale = level.scale
+        self.letter_detector.set_scale(level.scale)
+        # I tempi misurati al livello precedente non descrivono il nuovo: senza
+        # svuotare la finestra il p95 vecchio farebbe scendere ancora il governor
+        self.frame_times_ms.clear()
+        if "letters" in self.registry:
+            self.registry.set_rate("letters", level.ocr_rate_hz)
+        for det in self.registry:
+            det.enabled = level.max_priority is None or det.priority <= level.max_priority
+
+    def _detector_load_ms(self, elapsed_s):
+        """ms di CPU al secondo spesi da ogni detector dall'ultima chiamata (costo medio * esecuzioni)."""
+        load = {}
+        for det in self.registry:
+            runs = det.runs - self._detector_runs.get(det.name, 0)
+            self._detector_runs[det.name] = det.runs
+            load[det.name] = det.cost_ms * runs / max(elapsed_s, 1e-3)
+        return load
+
+    def set_color_profile(self, path):
+        """Passa tutti i detector a un altro profilo colori (il file viene solo mappato in memoria)."""
+        from color_calibration import load_profile
+        start = time.perf_counter()
+        profile = load_profile(path)
+        for detector in (self.cognitive_detector, self.floor_detector):
+            detector.set_color_profile(profile)
+        self.color_profile = profile
+        print(f"Profilo colori: {profile.name} in {(time.perf_counter() - start) * 1000.0:.1f} ms")
+
+    def next_color_profile(self):
+        """Profilo successivo tra i .hsvlut nella cartella di quello attuale."""
+        if self.color_profile is None or self.color_profile.path is None:
+            return
+        directory = os.path.dirname(self.color_profile.path)
+        paths = sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                       if name.endswith(".hsvlut"))
+        if self.color_profile.path in paths:
+            position = paths.index(self.color_profile.path)
+            self.set_color_profile(paths[(position + 1) % len(paths)])
+
+    def _open_camera(self, camera_index, source):
+        with self.startup.step("apertura camera"):
+            if source is not None:
+                # Sorgente alternativa con interfaccia VideoCapture (es. ReplayCapture)
+                print(f"Inizializzazione Wrapper con sorgente {type(source).__name__}...")
+                return source
+
+            import cv2
+            print(f"Inizializzazione Wrapper con Camera {camera_index}...")
+            cap = cv2.VideoCapture(camera_index)
+            
+            # Configurazione camera comune
+            cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
+            cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+            return cap
+
+    def _open_serial(self):
+        # Inizializzazione Serial per ESP32
+        with self.startup.step("apertura seriale"):
+            try:
+                import serial
+                ser = serial.Serial('/dev/ttyUSB0', 115200, timeout=1)
+                print("Connessione Serial stabilita su /dev/ttyUSB0")
+                return ser
+            except Exception as e:
+                print(f"Avviso: Impossibile aprire la porta seriale: {e}")
+                return None
+
+    def _log_startup(self):
+        """Accoda i tempi di avvio al log, per seguirne l'andamento tra un avvio e l'altro."""
+        if not self.startup_log_path:
+            return
+        try:
+            with open(self.startup_log_path, "a") as f:
+                f.write(json.dumps({"timestamp": time.time(), **self.startup.as_dict()}) + "\n")
+        except OSError as e:
+            print(f"Avviso: impossibile salvare i tempi di avvio: {e}")
+
+    def _on_circle_result(self, result):
+        """Sincronizzazione Cerchio con ESP32 via Serial."""
+        score, action = result
+        if score is not None and self.ser:
+            current_time = time.time()
+            if current_time - self.last_circle_time > self.detection_cooldown:
+                char_to_send = str(int(score))
+                self.ser.write(char_to_send.encode())
+                print(f"Inviato a ESP32 (Cerchio): {char_to_send} (Azione: {action})")
+                self.last_circle_time = current_time
+
+    def _on_letter_result(self, result):
+        """Sincronizzazione Lettera con ESP32 via Serial."""
+        letter, status = result
+        if letter and self.ser:
+            current_time = time.time()
+            if current_time - self.last_letter_time > self.detection_cooldown:
+                char_to_send = letter[0] # Prende la prima lettera (O, P, S)
+                self.ser.write(char_to_send.encode())
+                print(f"Inviato a ESP32 (Lettera): {char_to_send}")
+                self.last_letter_time = current_time
+
+    def _on_tile_result(self, result):
+        """Sincronizzazione Piastrella con ESP32 via Serial (un carattere per colore)."""
+        tile, color = result
+        if tile is None:
+            return
+        current_time = time.time()
+        changed = tile != self.last_tile
+        if changed or current_time - self.last_tile_time > self.tile_resend_s:
+            self.last_tile = tile
+            self.last_tile_time = current_time
+            if self.ser:
+                self.ser.write(tile.serial_code.encode())
+                if changed:
+                    print(f"Inviato a ESP32 (Piastrella): {tile.serial_code} ({color})")
+
     def run(self):
-        print("Wrapper avviato. Premi 'q' per uscire.")
+        import cv2
+
+        print("Wrapper avviato. Premi 'q' per uscire, 'p' per il pannello profiler, 'c' per cambiare profilo colori.")
         
         fps_count = 0
         fps_start_time = time.time()
         fps_display = 0
 
+        pooled = None
         try:
             while self.running:
-                ret, frame = self.cap.read()
+                if self.frame_pool is None:
+                    ret, frame = self.cap.read()
+                    if ret:
+                        from frame_pool import FramePool
+                        self.frame_pool = FramePool(frame.shape, dtype=frame.dtype, capacity=2,
+                                                    debug=self.debug_frames)
+                else:
+                    # Lettura in place in un buffer del pool: nessuna allocazione per frame
+                    ret, pooled = self.frame_pool.read(self.cap, timeout=1.0)
+                    frame = pooled.array if ret else None
                 if not ret:
                     break
                 
                 h, w, _ = frame.shape
+                frame_start = time.perf_counter()
+
+                # Registrazione prima che i detector disegnino sul frame
+                if self.record_path and self.recorder is None:
+                    from frame_recorder import FrameRecorder
+                    self.recorder = FrameRecorder(self.record_path, w, h, frame.shape[2],
+                                                  capacity=self.record_capacity)
+                    print(f"Registrazione frame su {self.record_path} (max {self.record_capacity} frame)")
+                if self.recorder is not None and not self.recorder.full:
+                    self.recorder.write(frame)
                 
-                # 1. Cognitive Target Detection
-                score, action = self.cognitive_detector.process_frame(frame)
-                
-                # Sincronizzazione Cerchio con ESP32 via Serial
-                if score is not None and self.ser:
-                    current_time = time.time()
-                    if current_time - self.last_circle_time > self.detection_cooldown:
-                        char_to_send = str(int(score))
-                        self.ser.write(char_to_send.encode())
-                        print(f"Inviato a ESP32 (Cerchio): {char_to_send} (Azione: {action})")
-                        self.last_circle_time = current_time
-
-                # 2. Letter Recognition
-                letter, status = self.letter_detector.process_frame(frame)
-                
-                # Sincronizzazione Lettera con ESP32 via Serial
-                if letter and self.ser:
-                    current_time = time.time()
-                    if current_time - self.last_letter_time > self.detection_cooldown:
-                        char_to_send = letter[0] # Prende la prima lettera (O, P, S)
-                        self.ser.write(char_to_send.encode())
-                        print(f"Inviato a ESP32 (Lettera): {char_to_send}")
-                        self.last_letter_time = current_time
+                # Risoluzione ridotta se il governor lo richiede
+                if self.processing_scale < 1.0:
+                    frame = cv2.resize(frame, None, fx=self.processing_scale, fy=self.processing_scale,
+                                       interpolation=cv2.INTER_AREA)
+                    h, w, _ = frame.shape
+
+                # Detector schedulati per questo frame (i risultati vanno agli handler on_result)
+                self.scheduler.run_frame(frame)
+
+                if self.startup.time_to_first_frame_ms is None:
+                    ttff = self.startup.mark_first_frame()
+                    print(f"Primo frame elaborato dopo {ttff:.1f} ms dall'avvio")
+                    self._log_startup()
                 
+                frame_ms = (time.perf_counter() - frame_start) * 1000.0
+                self.frame_times_ms.append(frame_ms)
+                if self.profiler.enabled:
+                    self.profiler.record("frame_total", frame_ms)
+
                 # Calcolo FPS
                 fps_count += 1
-                if time.time() - fps_start_time >= 1.0:
+                elapsed_s = time.time() - fps_start_time
+                if elapsed_s >= 1.0:
                     fps_display = fps_count
                     fps_count = 0
                     fps_start_time = time.time()
+
+                    # Il governor valuta le misure una volta al secondo
+                    if self.governor is not None:
+                        ordered = sorted(self.frame_times_ms)
+                        p95 = ordered[int(len(ordered) * 0.95)] if ordered else None
+                        self.governor.update(fps=fps_display, frame_p95_ms=p95,
+                                             detector_load_ms=self._detector_load_ms(elapsed_s))
                 
                 # HUD Wrapper
                 cv2.putText(frame, f"WRAPPER FPS: {fps_display}", (10, h - 20), 
                             cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+                if self.last_tile is not None:
+                    cv2.putText(frame, f"TILE: {self.last_tile.name}", (w - 170, h - 20),
+                                cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+                if self.governor is not None and self.governor.index > 0:
+                    cv2.putText(frame, f"DEGRADO: {self.governor.level.name}", (10, h - 45),
+                                cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 165, 255), 2)
+                if self.show_profile_hud:
+                    self.profiler.draw_hud(frame)
                 
                 cv2.imshow("RoboCup 2026 - Multitask Wrapper", frame)
                 
-                if cv2.waitKey(1) & 0xFF == ord('q'):
+                key = cv2.waitKey(1) & 0xFF
+                if key == ord('q'):
                     self.running = False
+                elif key == ord('p'):
+                    # Il pannello ha senso solo se il profiler raccoglie dati
+                    self.profiler.enabled = True
+                    self.show_profile_hud = not self.show_profile_hud
+                elif key == ord('c'):
+                    self.next_color_profile()
+
+                # imshow ha già copiato il frame: il buffer torna al pool
+                if pooled is not None:
+                    pooled.release()
+                    pooled = None
                     
         finally:
+            if pooled is not None:
+                pooled.release()
+            if self.profiler.histograms:
+                path = self.profiler.dump_json(self.profile_path, extra={
+                    "detectors": self.scheduler.stats(),
+                    "startup": self.startup.as_dict(),
+                    "governor": self.governor.history if self.governor is not None else [],
+                })
+                print(f"Profilo stage salvato in {path}")
+            if self.recorder is not None:
+                self.recorder.close()
+                print(f"Registrati {self.recorder.count} frame")
             if self.ser:
                 self.ser.close()
             self.cap.release()
@@ -106,5 +374,21 @@ if __name__ == "__main__":
     # È possibile passare l'indice della camera come argomento
     # cam_id = int(sys.argv[1]) if len(sys.argv) > 1 else 0
     cam_id = 1
-    wrapper = ModuleWrapper(camera_index=cam_id)
+    profile = "--profile" in sys.argv
+    use_governor = "--no-governor" not in sys.argv
+
+    # --record <file>: salva la sessione; --replay <file> [--realtime]: rigioca una sessione
+    def arg_value(flag):
+        if flag in sys.argv and sys.argv.index(flag) + 1 < len(sys.argv):
+            return sys.argv[sys.argv.index(flag) + 1]
+        return None
+
+    replay_path = arg_value("--replay")
+    if replay_path:
+        from frame_recorder import ReplayCapture
+    source = ReplayCapture(replay_path, realtime="--realtime" in sys.argv) if replay_path else None
+    wrapper = ModuleWrapper(camera_index=cam_id, profile=profile, source=source, governor=use_governor,
+                            record_path=arg_value("--record"), debug_frames="--debug-frames" in sys.argv,
+                            color_profile_path=arg_value("--color-profile"),
+                            normalize="--no-normalize" not in sys.argv)
     wrapper.run()
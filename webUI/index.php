@@ -67,6 +67,10 @@ if (isset($_GET['logout'])) {
                             <label for="ipInput">Indirizzo IP ESP32</label>
                             <input type="text" id="ipInput" placeholder="es. 192.168.1.10" style="width: 200px;">
                         </div>
+                        <div class="input-group">
+                            <label for="mapHostInput">Host Mappa (Python)</label>
+                            <input type="text" id="mapHostInput" placeholder="es. 192.168.1.20:8765" style="width: 200px;">
+                        </div>
                         <button onclick="updateIP()">Salva IP</button>
                     </div>
 
@@ -120,6 +124,7 @@ if (isset($_GET['logout'])) {
 
         <script>
             let ESP_IP = localStorage.getItem('esp_ip') || "172.20.10.5";
+            let MAP_HOST = localStorage.getItem('map_host') || `${location.hostname || "localhost"}:8765`;
 
             // Imposta l'IP iniziale nell'input
             document.addEventListener("DOMContentLoaded", () => {
@@ -127,6 +132,10 @@ if (isset($_GET['logout'])) {
                 if (ipInput) {
                     ipInput.value = ESP_IP;
                 }
+                const mapHostInput = document.getElementById('mapHostInput');
+                if (mapHostInput) {
+                    mapHostInput.value = MAP_HOST;
+                }
             });
 
             function updateIP() {
@@ -136,6 +145,12 @@ if (isset($_GET['logout'])) {
                     localStorage.setItem('esp_ip', ESP_IP);
                     document.getElementById('statusField').innerText = "Stato: IP aggiornato a " + ESP_IP;
                 }
+                const newMapHost = document.getElementById('mapHostInput').value;
+                if (newMapHost && newMapHost !== MAP_HOST) {
+                    MAP_HOST = newMapHost;
+                    localStorage.setItem('map_host', MAP_HOST);
+                    connectMap();
+                }
             }
 
             function updateSettings() {
@@ -202,14 +217,158 @@ if (isset($_GET['logout'])) {
                 if(e.key === " ") sendCommand('STOP');
             });
 
-            document.addEventListener("DOMContentLoaded", () => {
-                
-                /* function getMap() {
-                    let response = fetch(`http://${ESP_IP}/map`);
-                    console.log(response);
+            // ----------------------------------------------------------------
+            // Mappa live: /map/stream (Server-Sent Events) su Mapping.py.
+            // Alla connessione arriva la mappa completa ("full", celle in RLE),
+            // poi solo le celle cambiate ("delta"); i valori sono assoluti.
+            // ----------------------------------------------------------------
+            const TILE = 16;
+            const CELL_COLORS = [
+                null,         // UNKNOWN
+                "#50505a",    // WALL
+                "#28282d",    // FLOOR
+                "#64ff96",    // START_POINT
+                "#ff6478",    // VICTIM_FOUND
+                "#64b4ff",    // LETTER_X
+                "#ffdc64",    // LETTER_Y
+                "#b464ff"     // LETTER_H
+            ];
+            const WALL_N = 1, WALL_E = 2, WALL_S = 4, WALL_W = 8;
+
+            const mapState = { cells: new Map(), walls: new Map(), bounds: null, version: -1 };
+            let mapSource = null;
+            let mapCanvas = null;
+
+            function connectMap() {
+                if (mapSource) {
+                    mapSource.close();
+                }
+                // EventSource si riconnette da solo e riceve di nuovo la mappa completa
+                mapSource = new EventSource(`http://${MAP_HOST}/map/stream`);
+                mapSource.addEventListener("full", (e) => applyFull(JSON.parse(e.data)));
+                mapSource.addEventListener("delta", (e) => applyDelta(JSON.parse(e.data)));
+                mapSource.onerror = () => {
+                    document.getElementById('statusField').innerText = "Errore: mappa non raggiungibile su " + MAP_HOST;
+                };
+            }
+
+            function applyFull(msg) {
+                mapState.cells.clear();
+                mapState.walls.clear();
+                mapState.bounds = null;
+                let i = 0;
+                for (let r = 0; r < msg.cells.length; r += 2) {
+                    const value = msg.cells[r], run = msg.cells[r + 1];
+                    if (value) {
+                        for (let k = i; k < i + run; k++) {
+                            setCell(msg.x0 + (k % msg.width), msg.y0 + Math.floor(k / msg.width), value);
+                        }
+                    }
+                    i += run;
+                }
+                setWalls(msg.walls);
+                mapState.version = msg.version;
+                drawMap();
+            }
+
+            function applyDelta(msg) {
+                const c = msg.cells;
+                let grown = false;
+                for (let i = 0; i < c.length; i += 3) {
+                    grown = setCell(c[i], c[i + 1], c[i + 2]) || grown;
+                }
+                grown = setWalls(msg.walls) || grown;
+                mapState.version = msg.version;
+                const b = mapState.bounds;
+                if (grown || !b) {
+                    drawMap();  // bounds cambiati (o mappa vuota): ridisegna e ridimensiona il canvas
+                    return;
+                }
+                const ctx = mapCanvas.getContext("2d");
+                for (let i = 0; i < c.length; i += 3) {
+                    drawTile(ctx, b, c[i], c[i + 1]);
+                }
+                for (let i = 0; i < msg.walls.length; i += 3) {
+                    drawTile(ctx, b, msg.walls[i], msg.walls[i + 1]);
+                }
+            }
+
+            function setCell(x, y, value) {
+                const key = x + "," + y;
+                if (value) {
+                    mapState.cells.set(key, value);
+                    return extendBounds(x, y);
+                }
+                mapState.cells.delete(key);
+                return false;
+            }
+
+            function setWalls(w) {
+                let grown = false;
+                for (let i = 0; i < w.length; i += 3) {
+                    const key = w[i] + "," + w[i + 1];
+                    if (w[i + 2]) {
+                        mapState.walls.set(key, w[i + 2]);
+                        grown = extendBounds(w[i], w[i + 1]) || grown;
+                    } else {
+                        mapState.walls.delete(key);
+                    }
+                }
+                return grown;
+            }
+
+            function extendBounds(x, y) {
+                const b = mapState.bounds;
+                if (!b) {
+                    mapState.bounds = { minX: x, maxX: x, minY: y, maxY: y };
+                    return true;
+                }
+                if (x >= b.minX && x <= b.maxX && y >= b.minY && y <= b.maxY) {
+                    return false;
+                }
+                b.minX = Math.min(b.minX, x); b.maxX = Math.max(b.maxX, x);
+                b.minY = Math.min(b.minY, y); b.maxY = Math.max(b.maxY, y);
+                return true;
+            }
+
+            function drawMap() {
+                const container = document.getElementById('mapCanvas');
+                if (!mapCanvas) {
+                    mapCanvas = document.createElement("canvas");
+                    container.replaceChildren(mapCanvas);
+                }
+                const b = mapState.bounds || { minX: 0, maxX: 0, minY: 0, maxY: 0 };
+                mapCanvas.width = (b.maxX - b.minX + 1) * TILE;
+                mapCanvas.height = (b.maxY - b.minY + 1) * TILE;
+                const ctx = mapCanvas.getContext("2d");
+                for (let y = b.minY; y <= b.maxY; y++) {
+                    for (let x = b.minX; x <= b.maxX; x++) {
+                        drawTile(ctx, b, x, y);
+                    }
+                }
+            }
+
+            function drawTile(ctx, b, x, y) {
+                const px = (x - b.minX) * TILE, py = (y - b.minY) * TILE;
+                const color = CELL_COLORS[mapState.cells.get(x + "," + y) || 0];
+                ctx.fillStyle = color || "#000";
+                ctx.fillRect(px, py, TILE, TILE);
+                if (color) {
+                    ctx.strokeStyle = "#3c3c46";
+                    ctx.strokeRect(px + 0.5, py + 0.5, TILE - 1, TILE - 1);
                 }
+                const walls = mapState.walls.get(x + "," + y) || 0;
+                ctx.fillStyle = "#f0f0f5";
+                if (walls & WALL_N) ctx.fillRect(px, py, TILE, 2);
+                if (walls & WALL_S) ctx.fillRect(px, py + TILE - 2, TILE, 2);
+                if (walls & WALL_W) ctx.fillRect(px, py, 2, TILE);
+                if (walls & WALL_E) ctx.fillRect(px + TILE - 2, py, 2, TILE);
+            }
 
-                setInterval(getMap, 1000); */
+            document.addEventListener("DOMContentLoaded", () => {
+                if (document.getElementById('mapCanvas')) {
+                    connectMap();
+                }
             });
         </script>
 